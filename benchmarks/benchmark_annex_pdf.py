@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+"""
+Benchmark de la génération des annexes PDF (pages 21, 22, 23, 26)
+Compare l'ancien rendu (un canvas par page, ré-encodage PNG de chaque image,
+relecture pypdf puis réécriture) au rendu sur un canvas unique d'AnnexPDFService.
+
+Usage: python benchmarks/benchmark_annex_pdf.py [--runs 20]
+"""
+import argparse
+import base64
+import logging
+import os
+import sys
+import time
+from io import BytesIO
+from pathlib import Path
+
+import django
+
+# Configuration Django
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'xamila.settings')
+django.setup()
+logging.disable(logging.CRITICAL)
+
+from PIL import Image, ImageDraw
+from pypdf import PdfReader, PdfWriter
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+from core.services_annex_pdf import AnnexPDFService
+
+
+def signature_base64(seed):
+    """Signature manuscrite simulée (PNG 600x200, comme envoyée par le pad de signature)"""
+    image = Image.new('RGBA', (600, 200), (255, 255, 255, 0))
+    draw = ImageDraw.Draw(image)
+    for x in range(0, 600, 6):
+        draw.line([(x, (x * seed) % 200), (x + 25, (x * 3 + seed) % 200)], fill=(10, 10, 80, 255), width=3)
+    buffer = BytesIO()
+    image.save(buffer, format='PNG')
+    return 'data:image/png;base64,' + base64.b64encode(buffer.getvalue()).decode()
+
+
+def photo_base64():
+    """Photo d'identité simulée (JPEG 800x1000)"""
+    image = Image.effect_mandelbrot((800, 1000), (-2, -1.5, 1, 1.5), 100).convert('RGB')
+    buffer = BytesIO()
+    image.save(buffer, format='JPEG', quality=90)
+    return 'data:image/jpeg;base64,' + base64.b64encode(buffer.getvalue()).decode()
+
+
+def build_annex_data():
+    """annex_data réaliste: la signature du titulaire est réutilisée sur plusieurs pages"""
+    titulaire, sgi = signature_base64(3), signature_base64(5)
+    return {
+        'page21': {'signature_titulaire': titulaire, 'signature_sgi': sgi, 'date': '2025-01-15', 'lieu': 'Abidjan'},
+        'page22': {
+            'account_number': 'CI-000123', 'photo_base64': photo_base64(),
+            'nom': 'KOUASSI', 'prenoms': 'Awa', 'email': 'awa.kouassi@example.com',
+            'phone_portable': '+2250700000000', 'date_naissance': '1990-05-12',
+        },
+        'page23': {'signature': titulaire},
+        'page26': {'signature_mandant': titulaire, 'signature_mandataire': sgi},
+    }
+
+
+class LegacyAnnexPDFService(AnnexPDFService):
+    """Ancien comportement: images ré-encodées en PNG à chaque usage, une passe pypdf par page"""
+
+    def _base64_to_image(self, base64_string):
+        if ',' in base64_string:
+            base64_string = base64_string.split(',', 1)[1]
+        image = Image.open(BytesIO(base64.b64decode(base64_string)))
+        image_buffer = BytesIO()
+        image.save(image_buffer, format='PNG')
+        image_buffer.seek(0)
+        return ImageReader(image_buffer)
+
+    def generate_annexes_pdf(self, aor, annex_data):
+        writer = PdfWriter()
+        for draw_func in (self._draw_page21, self._draw_page22, self._draw_page23, self._draw_page26):
+            page_buffer = BytesIO()
+            c = canvas.Canvas(page_buffer, pagesize=A4)
+            draw_func(c, aor, annex_data)
+            c.save()
+            page_buffer.seek(0)
+            for page in PdfReader(page_buffer).pages:
+                writer.add_page(page)
+        output = BytesIO()
+        writer.write(output)
+        output.seek(0)
+        return output
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    annex_data = build_annex_data()
+    services = {'legacy': LegacyAnnexPDFService(), 'canvas': AnnexPDFService()}
+
+    print(f"=== Annexes pages 21/22/23/26, {args.runs} générations ===")
+    timings, sizes = {}, {}
+    for name, service in services.items():
+        sizes[name] = len(service.generate_annexes_pdf(None, annex_data).getvalue())
+        runs = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            service.generate_annexes_pdf(None, annex_data)
+            runs.append(time.perf_counter() - start)
+        timings[name] = min(runs)
+
+    legacy, single = timings['legacy'], timings['canvas']
+    print(f"Canvas par page + pypdf : {legacy * 1000:8.1f} ms  ({sizes['legacy'] / 1024:.0f} Ko)")
+    print(f"Canvas unique           : {single * 1000:8.1f} ms  ({sizes['canvas'] / 1024:.0f} Ko)")
+    print(f"Gain                    : x{legacy / single:.2f}")
+
+
+if __name__ == '__main__':
+    main()
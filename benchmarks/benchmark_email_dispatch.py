@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+"""
+Benchmark de l'envoi des emails de contrat contre un serveur SMTP local
+Compare l'ancien envoi (une connexion et un encodage des PDF par destinataire)
+au lot EmailBatch de ContractEmailService (une connexion, encodage unique).
+
+Usage: python benchmarks/benchmark_email_dispatch.py [--admins 5] [--pdf-mb 3] [--latency-ms 50] [--runs 3]
+"""
+import argparse
+import logging
+import os
+import socketserver
+import sys
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from uuid import uuid4
+
+import django
+
+# Configuration Django
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'xamila.settings')
+os.environ['EMAIL_BACKEND'] = 'django.core.mail.backends.smtp.EmailBackend'
+django.setup()
+logging.disable(logging.INFO)
+
+from django.conf import settings
+from django.core.mail import EmailMessage
+
+from core.services_email import ContractEmailService
+
+
+class SMTPStandInHandler(socketserver.StreamRequestHandler):
+    """Serveur SMTP minimal: accepte tout, simule la latence d'ouverture de session"""
+
+    def handle(self):
+        time.sleep(self.server.connect_latency)
+        self.wfile.write(b'220 localhost SMTP stand-in\r\n')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.strip().upper()
+            if command.startswith((b'EHLO', b'HELO')):
+                self.wfile.write(b'250 localhost\r\n')
+            elif command == b'DATA':
+                self.wfile.write(b'354 End data with <CR><LF>.<CR><LF>\r\n')
+                while self.rfile.readline() not in (b'.\r\n', b''):
+                    pass
+                self.server.messages += 1
+                self.wfile.write(b'250 OK\r\n')
+            elif command == b'QUIT':
+                self.wfile.write(b'221 Bye\r\n')
+                return
+            else:
+                self.wfile.write(b'250 OK\r\n')
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, connect_latency):
+        super().__init__(('127.0.0.1', 0), SMTPStandInHandler)
+        self.connect_latency = connect_latency
+        self.messages = 0
+
+
+def build_request(pdf_mb):
+    """Demande d'ouverture de compte factice (pas d'accès base de données)"""
+    return SimpleNamespace(
+        id=uuid4(), full_name='Awa Kouassi', email='client@example.com', phone='+2250700000000',
+        sgi=SimpleNamespace(name='GEK CAPITAL'), country_of_residence="Côte d'Ivoire",
+        nationality='Ivoirienne', investor_profile='PRUDENT', created_at=django.utils.timezone.now(),
+        funding_by_visa=True, funding_by_mobile_money=True, funding_by_bank_transfer=False,
+        funding_by_intermediary=False, funding_by_wu_mg_ria=False,
+        wants_digital_opening=True, wants_in_person_opening=False, wants_xamila_plus=False,
+        photo=None, id_card_scan=None,
+    ), os.urandom(pdf_mb * 1024 * 1024), os.urandom(pdf_mb * 1024 * 1024 // 4)
+
+
+def send_legacy(aor, contract_pdf, annexes_pdf, recipients):
+    """Ancien comportement: un EmailMessage.send() (donc une connexion) par destinataire"""
+    for to_email in recipients:
+        email = EmailMessage(subject='Contrat', body='<p>Contrat</p>', from_email=settings.DEFAULT_FROM_EMAIL, to=[to_email])
+        email.content_subtype = 'html'
+        email.attach(f'Contrat_{aor.id}.pdf', contract_pdf, 'application/pdf')
+        email.attach(f'Annexes_{aor.id}.pdf', annexes_pdf, 'application/pdf')
+        email.send()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--admins', type=int, default=5)
+    parser.add_argument('--pdf-mb', type=int, default=3)
+    parser.add_argument('--latency-ms', type=float, default=50.0, help="Latence d'ouverture de session SMTP simulée")
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    server = SMTPStandIn(args.latency_ms / 1000)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    settings.EMAIL_HOST, settings.EMAIL_PORT = server.server_address
+    settings.EMAIL_USE_TLS = False
+    settings.EMAIL_HOST_USER = settings.EMAIL_HOST_PASSWORD = ''
+
+    aor, contract_pdf, annexes_pdf = build_request(args.pdf_mb)
+    admin_emails = [f'admin{i}@example.com' for i in range(args.admins)]
+    recipients = [aor.email, 'manager@example.com', settings.XAMILA_TEAM_EMAIL] + admin_emails
+    service = ContractEmailService()
+
+    print(f"=== {len(recipients)} destinataires, contrat {args.pdf_mb} Mo, latence session {args.latency_ms} ms ===")
+    timings = {'legacy': [], 'batch': []}
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        send_legacy(aor, contract_pdf, annexes_pdf, recipients)
+        timings['legacy'].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        results = service.send_contract_emails(
+            aor, contract_pdf, annexes_pdf,
+            sgi_manager_email='manager@example.com', admin_emails=admin_emails,
+        )
+        timings['batch'].append(time.perf_counter() - start)
+        if results['errors']:
+            print(f"Erreurs: {results['errors']}")
+            sys.exit(1)
+
+    legacy, batch = min(timings['legacy']), min(timings['batch'])
+    print(f"Envoi unitaire : {legacy * 1000:8.1f} ms")
+    print(f"Lot EmailBatch : {batch * 1000:8.1f} ms")
+    print(f"Gain           : x{legacy / batch:.2f}")
+    print(f"Messages reçus par le serveur local: {server.messages}")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+"""
+Benchmark du chemin de connexion
+Mesure séparément ce que coûte une connexion à un worker:
+- le hachage du mot de passe (PBKDF2 configuré, bcrypt/argon2 si installés),
+  qui domine le temps CPU lors des pics de connexions;
+- la résolution de l'identifiant: ancienne requête Q(email) | Q(phone) et
+  ancien backend (deuxième requête après un échec) contre resolve_user,
+  en requêtes SQL et en temps;
+- l'émission des jetons JWT.
+
+Nécessite la base configurée. L'utilisateur de test est créé puis supprimé.
+
+Usage: python benchmarks/benchmark_login.py [--rounds 5] [--lookups 200]
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+from uuid import uuid4
+
+import django
+
+# Configuration Django
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'xamila.settings')
+django.setup()
+logging.disable(logging.WARNING)
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import get_hasher
+from django.db import connection
+from django.db.models import Q
+from django.test.utils import CaptureQueriesContext
+
+from core.services_auth import authenticate_identifier, resolve_user
+from core.views_auth import create_tokens_for_user
+
+User = get_user_model()
+
+HASHERS = ('pbkdf2_sha256', 'bcrypt_sha256', 'argon2')
+
+
+def timed(fn, runs):
+    """Durées (ms) de runs appels et nombre de requêtes SQL du dernier"""
+    durations = []
+    for _ in range(runs):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            fn()
+            durations.append((time.perf_counter() - start) * 1000)
+    return durations, len(queries)
+
+
+def report(label, durations, queries=None):
+    line = f"{label:<38} moy {statistics.mean(durations):8.2f} ms  p95 {sorted(durations)[int(len(durations) * 0.95) - 1]:8.2f} ms"
+    if queries is not None:
+        line += f"  {queries} requête(s)"
+    print(line)
+
+
+def legacy_view_lookup(identifier):
+    """Ancien login_user: OR sur deux colonnes"""
+    try:
+        return User.objects.get(Q(email=identifier) | Q(phone=identifier))
+    except User.DoesNotExist:
+        return None
+
+
+def legacy_backend_lookup(identifier, phone):
+    """Ancien EmailOrPhoneBackend: colonne devinée puis OR après un échec"""
+    try:
+        if '@' in identifier:
+            return User.objects.get(email=identifier)
+        return User.objects.get(phone=phone)
+    except User.DoesNotExist:
+        try:
+            return User.objects.get(Q(email=identifier) | Q(phone=identifier))
+        except User.DoesNotExist:
+            return None
+
+
+def bench_hashers(rounds):
+    print("=== Hachage du mot de passe (check_password) ===")
+    for algorithm in HASHERS:
+        try:
+            hasher = get_hasher(algorithm)
+            encoded = hasher.encode('benchmark-password', hasher.salt())
+        except (ValueError, ImportError) as e:
+            print(f"{algorithm:<38} indisponible ({e})")
+            continue
+        durations, _ = timed(lambda: hasher.verify('benchmark-password', encoded), rounds)
+        report(algorithm, durations)
+        print(f"{'':<38} => {1000 / statistics.mean(durations):.1f} connexions/s par cœur")
+
+
+def bench_lookups(user, phone, lookups):
+    print(f"\n=== Résolution de l'identifiant ({lookups} appels) ===")
+    missing = f'absent-{uuid4().hex[:8]}@example.com'
+    cases = [
+        ('ancien login_user, email', lambda: legacy_view_lookup(user.email)),
+        ('resolve_user, email', lambda: resolve_user(user.email)),
+        ('ancien login_user, téléphone', lambda: legacy_view_lookup(phone)),
+        ('resolve_user, téléphone', lambda: resolve_user(phone)),
+        ('ancien backend, téléphone local', lambda: legacy_backend_lookup('0' + phone[-9:], '+33' + phone[-9:])),
+        ('resolve_user, téléphone local', lambda: resolve_user('0' + phone[-9:])),
+        ('ancien backend, compte absent', lambda: legacy_backend_lookup(missing, None)),
+        ('resolve_user, compte absent', lambda: resolve_user(missing)),
+        ('resolve_user, identifiant invalide', lambda: resolve_user('not an identifier')),
+    ]
+    for label, fn in cases:
+        durations, queries = timed(fn, lookups)
+        report(label, durations, queries)
+
+
+def bench_login(user, password, rounds):
+    print(f"\n=== Connexion complète ({rounds} appels) ===")
+    durations, queries = timed(lambda: authenticate_identifier(user.email, password), rounds)
+    report('authenticate_identifier', durations, queries)
+    durations, queries = timed(lambda: authenticate_identifier(f'absent-{uuid4().hex[:8]}@example.com', password), rounds)
+    report('authenticate_identifier, compte absent', durations, queries)
+    durations, queries = timed(lambda: create_tokens_for_user(user), rounds * 20)
+    report('create_tokens_for_user', durations, queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rounds', type=int, default=5, help='Vérifications de mot de passe par hasher')
+    parser.add_argument('--lookups', type=int, default=200, help='Résolutions d\'identifiant par cas')
+    args = parser.parse_args()
+
+    suffix = uuid4().hex[:8]
+    password = uuid4().hex
+    phone = '+33' + str(int(suffix, 16) % 10 ** 9).zfill(9)
+    user = User.objects.create_user(
+        email=f'bench-login-{suffix}@example.com', username=f'bench-login-{suffix}', password=password, phone=phone
+    )
+    try:
+        bench_hashers(args.rounds)
+        bench_lookups(user, phone, args.lookups)
+        bench_login(user, password, args.rounds)
+    finally:
+        user.delete()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+"""
+Benchmark de l'exécution concurrente des ordres de trading
+Plusieurs threads exécutent en parallèle des ordres d'achat sur UN même portefeuille,
+dont les liquidités ne couvrent qu'une partie des ordres. Vérifie qu'aucun ordre
+n'est payé deux fois (liquidités jamais négatives, cash + coûts = capital initial)
+puis mesure le chemin groupé execute_pending_limit_orders.
+
+Nécessite la base configurée (MySQL: select_for_update effectif). Les données de
+test sont créées puis supprimées.
+
+Usage: python benchmarks/benchmark_order_execution.py [--threads 8] [--orders 200] [--affordable 120] [--limit-orders 500]
+"""
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+from decimal import Decimal
+from pathlib import Path
+from uuid import uuid4
+
+import django
+
+# Configuration Django
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'xamila.settings')
+django.setup()
+logging.disable(logging.INFO)
+
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections
+from django.db.models import Sum
+
+from core.models_trading import StockExtended, Portfolio, Holding, TradingOrder, Transaction
+from core.services_trading import OrderExecutionService, OrderExecutionError, COMMISSION_RATE
+
+PRICE = Decimal('100.00')
+# Coût d'un ordre d'une action: prix + 0.1% de commission
+ORDER_COST = PRICE + (PRICE * COMMISSION_RATE).quantize(Decimal('0.01'))
+
+
+def create_fixtures(affordable):
+    suffix = uuid4().hex[:8]
+    user = get_user_model().objects.create_user(email=f'bench-{suffix}@example.com', password=uuid4().hex)
+    stock = StockExtended.objects.create(
+        symbol=f'BN{suffix[:6]}'.upper(), company_name='Benchmark SA', sector='Test', industry='Test',
+        category='VALUE', market_cap=Decimal('1000000'), shares_outstanding=1000000,
+        current_price=PRICE, opening_price=PRICE, high_price=PRICE, low_price=PRICE, previous_close=PRICE,
+    )
+    capital = ORDER_COST * affordable
+    portfolio = Portfolio.objects.create(
+        user=user, name='Benchmark', portfolio_type='SIMULATION',
+        initial_capital=capital, current_cash=capital, total_value=capital,
+    )
+    return user, stock, portfolio
+
+
+def create_orders(portfolio, stock, count, **fields):
+    orders = [
+        TradingOrder(portfolio=portfolio, stock=stock, side='BUY', quantity=Decimal('1'), **fields)
+        for _ in range(count)
+    ]
+    TradingOrder.objects.bulk_create(orders)
+    return [order.id for order in orders]
+
+
+def run_parallel(order_ids, threads):
+    """Exécute les ordres depuis plusieurs threads, chacun sur sa connexion"""
+    service = OrderExecutionService()
+    counts = {'filled': 0, 'rejected': 0}
+    lock = threading.Lock()
+    queue = list(order_ids)
+
+    def worker():
+        close_old_connections()
+        while True:
+            with lock:
+                if not queue:
+                    break
+                order_id = queue.pop()
+            try:
+                service.execute(order_id)
+                outcome = 'filled'
+            except OrderExecutionError:
+                outcome = 'rejected'
+            with lock:
+                counts[outcome] += 1
+        close_old_connections()
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return counts, time.perf_counter() - start
+
+
+def check(portfolio, expected_fills):
+    portfolio.refresh_from_db()
+    spent = Transaction.objects.filter(portfolio=portfolio).aggregate(
+        total=Sum('total_amount'), commission=Sum('commission')
+    )
+    spent = (spent['total'] or 0) + (spent['commission'] or 0)
+    holding = Holding.objects.filter(portfolio=portfolio).first()
+    quantity = holding.quantity if holding else 0
+
+    errors = []
+    if portfolio.current_cash < 0:
+        errors.append(f"liquidités négatives: {portfolio.current_cash}")
+    if portfolio.current_cash + spent != portfolio.initial_capital:
+        errors.append(f"cash {portfolio.current_cash} + dépensé {spent} != capital {portfolio.initial_capital}")
+    if quantity != expected_fills:
+        errors.append(f"position {quantity} != {expected_fills} ordres exécutés")
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--orders', type=int, default=200, help='Ordres MARKET exécutés en parallèle')
+    parser.add_argument('--affordable', type=int, default=120, help='Nombre d\'ordres couverts par les liquidités')
+    parser.add_argument('--limit-orders', type=int, default=500, help='Ordres LIMIT du chemin groupé')
+    args = parser.parse_args()
+
+    user, stock, portfolio = create_fixtures(args.affordable)
+    errors = []
+    try:
+        print(f"=== {args.orders} ordres, {args.threads} threads, liquidités pour {args.affordable} ===")
+        order_ids = create_orders(portfolio, stock, args.orders, order_type='MARKET')
+        counts, elapsed = run_parallel(order_ids, args.threads)
+        expected = min(args.orders, args.affordable)
+        print(f"Exécutés: {counts['filled']}  rejetés: {counts['rejected']}  en {elapsed * 1000:.1f} ms")
+        print(f"Débit    : {args.orders / elapsed:.1f} ordres/s")
+        if counts['filled'] != expected:
+            errors.append(f"{counts['filled']} ordres exécutés, {expected} attendus")
+        errors += check(portfolio, counts['filled'])
+
+        # Chemin groupé: réapprovisionnement puis ordres LIMIT déclenchés par un nouveau prix
+        capital = ORDER_COST * args.limit_orders
+        Portfolio.objects.filter(id=portfolio.id).update(
+            current_cash=capital, initial_capital=capital, total_value=capital
+        )
+        Transaction.objects.filter(portfolio=portfolio).delete()
+        Holding.objects.filter(portfolio=portfolio).delete()
+        create_orders(portfolio, stock, args.limit_orders, order_type='LIMIT', limit_price=PRICE)
+
+        start = time.perf_counter()
+        trades = OrderExecutionService().execute_pending_limit_orders(stock, price=PRICE)
+        elapsed = time.perf_counter() - start
+        print(f"Lot LIMIT: {len(trades)} ordres en {elapsed * 1000:.1f} ms ({len(trades) / elapsed:.1f} ordres/s)")
+        if len(trades) != args.limit_orders:
+            errors.append(f"lot LIMIT: {len(trades)} ordres exécutés, {args.limit_orders} attendus")
+        errors += check(portfolio, len(trades))
+    finally:
+        portfolio.delete()
+        stock.delete()
+        user.delete()
+
+    if errors:
+        for error in errors:
+            print(f"ERREUR: {error}")
+        sys.exit(1)
+    print("Cohérence vérifiée: aucune double dépense")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+"""
+Commande Django pour reconstruire les indicateurs journaliers du tableau de bord admin
+(inscriptions, vérifications, OTP, statuts des SGI et des contrats)
+"""
+
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.services_platform_metrics import backfill
+
+
+class Command(BaseCommand):
+    help = 'Recalcule depuis les tables sources les indicateurs journaliers (DailyPlatformMetric)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help='Nombre de jours jusqu\'à aujourd\'hui (défaut: 30)')
+        parser.add_argument('--start', help='Premier jour (AAAA-MM-JJ), prioritaire sur --days')
+        parser.add_argument('--end', help='Dernier jour inclus (AAAA-MM-JJ, défaut: aujourd\'hui)')
+
+    def handle(self, *args, **options):
+        try:
+            end = date.fromisoformat(options['end']) if options['end'] else timezone.localdate()
+            start = date.fromisoformat(options['start']) if options['start'] else end - timedelta(days=options['days'] - 1)
+        except ValueError:
+            raise CommandError('Dates invalides (format attendu: AAAA-MM-JJ)')
+        if start > end:
+            raise CommandError('--start doit précéder --end')
+
+        # Par tranches de 30 jours: transactions courtes
+        written = 0
+        chunk_start = start
+        while chunk_start <= end:
+            chunk_end = min(chunk_start + timedelta(days=29), end)
+            written += backfill(chunk_start, chunk_end)
+            chunk_start = chunk_end + timedelta(days=1)
+
+        self.stdout.write(self.style.SUCCESS(f'Indicateurs du {start} au {end} reconstruits: {written} ligne(s)'))
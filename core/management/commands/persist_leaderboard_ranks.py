@@ -0,0 +1,37 @@
+"""
+Commande Django pour persister les rangs des classements des compétitions de trading
+(current_rank des participants, écrit en masse depuis le classement en cache)
+"""
+
+from django.core.management.base import BaseCommand
+import time
+
+from core.models_trading import TradingCompetition
+from core.services_leaderboard import CompetitionLeaderboard
+
+
+class Command(BaseCommand):
+    help = 'Persiste en masse les rangs des participants des compétitions de trading actives'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--competition', help='Identifiant d\'une compétition (toutes les actives par défaut)')
+        parser.add_argument('--loop', action='store_true', help='Tourne en continu (mode planifié)')
+        parser.add_argument('--interval', type=float, default=60.0, help='Pause entre deux passages en mode --loop (secondes)')
+
+    def handle(self, *args, **options):
+        while True:
+            competitions = TradingCompetition.objects.filter(status='ACTIVE')
+            if options['competition']:
+                competitions = TradingCompetition.objects.filter(id=options['competition'])
+
+            updated = 0
+            for competition_id in competitions.values_list('id', flat=True):
+                updated += CompetitionLeaderboard(competition_id).persist_ranks()
+            if updated:
+                self.stdout.write(f"{updated} rang(s) mis à jour")
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS('Persistance des classements terminée'))
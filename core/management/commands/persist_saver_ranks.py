@@ -0,0 +1,30 @@
+"""
+Commande Django pour persister le classement global des épargnants
+(global_rank des comptes d'épargne, écrit en masse depuis l'index communautaire)
+"""
+
+from django.core.management.base import BaseCommand
+import time
+
+from core.services_community import CommunityStatsService
+
+
+class Command(BaseCommand):
+    help = 'Persiste en masse le rang global des comptes d\'épargne actifs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Tourne en continu (mode planifié)')
+        parser.add_argument('--interval', type=float, default=300.0, help='Pause entre deux passages en mode --loop (secondes)')
+
+    def handle(self, *args, **options):
+        service = CommunityStatsService()
+        while True:
+            updated = service.persist_ranks()
+            if updated:
+                self.stdout.write(f"{updated} rang(s) mis à jour")
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS('Persistance du classement des épargnants terminée'))
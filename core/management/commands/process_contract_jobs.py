@@ -0,0 +1,38 @@
+"""
+Commande Django pour traiter les jobs du pipeline contrat
+(génération des PDF, stockage et envoi des emails des demandes d'ouverture de compte)
+
+À déployer en continu à côté du serveur web:
+    python manage.py process_contract_jobs --loop
+Indispensable en mode 'worker' ou 'sync'; en mode 'thread' il reprend les jobs
+dont la nouvelle tentative a été perdue par un redémarrage du processus web.
+"""
+
+from django.core.management.base import BaseCommand
+import time
+
+from core.services_contract_pipeline import ContractPipelineService
+
+
+class Command(BaseCommand):
+    help = 'Traite les jobs en attente du pipeline contrat (PDF, stockage, emails)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=50, help='Nombre maximum de jobs par passage')
+        parser.add_argument('--loop', action='store_true', help='Tourne en continu (mode worker)')
+        parser.add_argument('--interval', type=float, default=5.0, help='Pause entre deux passages en mode --loop (secondes)')
+
+    def handle(self, *args, **options):
+        service = ContractPipelineService()
+
+        while True:
+            processed = service.process_due_jobs(limit=options['limit'])
+            if processed:
+                self.stdout.write(f"{processed} job(s) traité(s)")
+
+            if not options['loop']:
+                break
+            if not processed:
+                time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS('Traitement des jobs terminé'))
@@ -0,0 +1,37 @@
+"""
+Commande Django pour vider la file des notifications
+(envoi par priorité des emails, SMS et notifications in-app, avec reprise des échecs)
+Plusieurs instances peuvent tourner en parallèle: les lots réservés sont disjoints.
+"""
+
+from django.core.management.base import BaseCommand
+import time
+
+from core.services_notification_queue import NotificationQueueWorker, QUEUE_BATCH_SIZE, QUEUE_CONCURRENCY
+
+
+class Command(BaseCommand):
+    help = 'Envoie les notifications en attente dans la file (NotificationQueue)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=QUEUE_BATCH_SIZE, help='Nombre d\'entrées réservées par lot')
+        parser.add_argument('--concurrency', type=int, default=QUEUE_CONCURRENCY, help='Nombre d\'envois simultanés')
+        parser.add_argument('--loop', action='store_true', help='Tourne en continu (mode worker)')
+        parser.add_argument('--interval', type=float, default=5.0, help='Pause entre deux passages en mode --loop (secondes)')
+
+    def handle(self, *args, **options):
+        worker = NotificationQueueWorker(batch_size=options['batch_size'], concurrency=options['concurrency'])
+
+        while True:
+            stats = worker.drain()
+            if stats['claimed']:
+                self.stdout.write(
+                    f"{stats['claimed']} notification(s) traitée(s): {stats['sent']} envoyée(s), "
+                    f"{stats['retrying']} à retenter, {stats['failed']} en échec"
+                )
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS('Traitement de la file des notifications terminé'))
@@ -0,0 +1,34 @@
+"""
+Commande Django pour reconstruire l'index communautaire de l'épargne
+(totaux, classement global des épargnants servi par collective_progress et all_savers)
+
+L'index vit dans le cache partagé (REDIS_URL): la reconstruction vaut pour tous les
+processus web. Elle n'est pas nécessaire à la cohérence, l'index étant relu depuis la
+base à son échéance (COMMUNITY_INDEX_TIMEOUT); elle la devance après une correction
+de soldes faite hors du grand livre.
+"""
+
+from django.core.management.base import BaseCommand
+import time
+
+from core.services_community import CommunityStatsService
+
+
+class Command(BaseCommand):
+    help = 'Force la relecture depuis la base de l\'index des soldes et du classement global des épargnants'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Tourne en continu (mode planifié)')
+        parser.add_argument('--interval', type=float, default=900.0, help='Pause entre deux passages en mode --loop (secondes)')
+
+    def handle(self, *args, **options):
+        service = CommunityStatsService()
+        while True:
+            ranked = service.rebuild()
+            self.stdout.write(f"{ranked} compte(s) classé(s)")
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS('Reconstruction de l\'index communautaire terminée'))
@@ -0,0 +1,34 @@
+"""
+Commande Django pour réconcilier les compteurs de notifications non lues
+(recomptage depuis la base des compteurs tenus dans le cache)
+"""
+
+from django.core.management.base import BaseCommand
+import time
+
+from core.services_notification_inbox import UnreadCounter
+
+
+class Command(BaseCommand):
+    help = 'Recompte depuis la base les compteurs de notifications in-app non lues'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', help='Identifiant d\'un utilisateur (répétable, tous les actifs par défaut)')
+        parser.add_argument('--loop', action='store_true', help='Tourne en continu (mode worker)')
+        parser.add_argument('--interval', type=float, default=900.0, help='Pause entre deux passages en mode --loop (secondes)')
+
+    def handle(self, *args, **options):
+        counter = UnreadCounter()
+
+        while True:
+            if options['user']:
+                written = counter.reconcile(options['user'])
+            else:
+                written = counter.reconcile_all()
+            self.stdout.write(f"{written} compteur(s) réconcilié(s)")
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS('Réconciliation des compteurs terminée'))
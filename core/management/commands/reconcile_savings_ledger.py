@@ -0,0 +1,30 @@
+"""
+Commande Django pour réconcilier les soldes d'épargne avec le grand livre
+(écritures des dépôts antérieurs reprises, puis soldes des comptes et totaux
+des participations recalculés en masse)
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.services_savings_ledger import SavingsLedgerError, SavingsLedgerService
+
+
+class Command(BaseCommand):
+    help = 'Recalcule les soldes des comptes et participations à partir du grand livre d\'épargne'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Rapport des écarts sans correction')
+        parser.add_argument('--user', action='append', help='Identifiant utilisateur (répétable, tous par défaut)')
+
+    def handle(self, *args, **options):
+        service = SavingsLedgerService()
+        try:
+            result = service.reconcile(user_ids=options['user'], apply=not options['dry_run'])
+        except SavingsLedgerError as e:
+            raise CommandError(str(e))
+
+        verb = 'divergent(s)' if options['dry_run'] else 'corrigé(s)'
+        self.stdout.write(f"{result['backfilled']} écriture(s) reprise(s) pour les dépôts existants")
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['accounts']} compte(s) et {result['participations']} participation(s) {verb}"
+        ))
@@ -0,0 +1,38 @@
+"""
+Commande Django pour recalculer en masse les statistiques du dashboard client
+(instantanés UserDashboardStats, servis tels quels par customer_dashboard_stats)
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+import time
+
+from core.services_dashboard_stats import DashboardStatsService
+
+
+class Command(BaseCommand):
+    help = 'Recalcule les instantanés des statistiques du dashboard (périmés ou de tous les utilisateurs)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Recalcule tous les utilisateurs actifs (sinon seulement les instantanés périmés)')
+        parser.add_argument('--user', action='append', help='Identifiant d\'un utilisateur (répétable)')
+        parser.add_argument('--loop', action='store_true', help='Tourne en continu (mode planifié)')
+        parser.add_argument('--interval', type=float, default=300.0, help='Pause entre deux passages en mode --loop (secondes)')
+
+    def handle(self, *args, **options):
+        service = DashboardStatsService()
+        while True:
+            if options['user']:
+                written = service.refresh(options['user'])
+            elif options['all']:
+                user_ids = get_user_model().objects.filter(is_active=True).values_list('id', flat=True)
+                written = service.refresh(list(user_ids))
+            else:
+                written = service.refresh_stale()
+            self.stdout.write(f"{written} instantané(s) recalculé(s)")
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS('Statistiques du dashboard à jour'))
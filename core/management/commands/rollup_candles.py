@@ -0,0 +1,24 @@
+"""
+Commande Django pour recalculer les bougies agrégées de PriceHistory
+(5MIN à 1MONTH à partir des bougies 1MIN, par exemple après un import d'historique)
+"""
+
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.services_candles import CandleRollupService
+
+
+class Command(BaseCommand):
+    help = 'Recalcule les bougies 5MIN/15MIN/1HOUR/1DAY/1WEEK/1MONTH à partir des bougies 1MIN'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help='Fenêtre à recalculer (jours)')
+        parser.add_argument('--stock', action='append', help='Identifiant d\'action (répétable, toutes par défaut)')
+
+    def handle(self, *args, **options):
+        end = timezone.now()
+        start = end - timedelta(days=options['days'])
+        written = CandleRollupService().rebuild(start, end, stock_ids=options['stock'])
+        self.stdout.write(self.style.SUCCESS(f'{written} bougie(s) agrégée(s) écrite(s)'))
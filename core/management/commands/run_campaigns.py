@@ -0,0 +1,35 @@
+"""
+Commande Django pour diffuser les campagnes de notifications actives
+(création par tranches des notifications et des entrées de file, reprise après interruption)
+"""
+
+from django.core.management.base import BaseCommand
+import time
+
+from core.services_campaigns import fan_out_campaign, pending_campaign_ids
+
+
+class Command(BaseCommand):
+    help = 'Diffuse les campagnes de notifications actives dont la diffusion n\'est pas terminée'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--campaign', help='Identifiant d\'une campagne (toutes les actives par défaut)')
+        parser.add_argument('--loop', action='store_true', help='Tourne en continu (mode worker)')
+        parser.add_argument('--interval', type=float, default=30.0, help='Pause entre deux passages en mode --loop (secondes)')
+
+    def handle(self, *args, **options):
+        while True:
+            campaign_ids = [options['campaign']] if options['campaign'] else pending_campaign_ids()
+            for campaign_id in campaign_ids:
+                progress = fan_out_campaign(campaign_id)
+                if progress:
+                    self.stdout.write(
+                        f"Campagne {campaign_id}: {progress['created']} notification(s) créée(s), "
+                        f"{progress['skipped']} ignorée(s)"
+                    )
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS('Diffusion des campagnes terminée'))
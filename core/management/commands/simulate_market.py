@@ -0,0 +1,72 @@
+"""
+Commande Django pour simuler le marché du module Trading
+(ticker: avance les cours de toutes les actions actives et écrit les bougies OHLCV)
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+import time
+
+from core.services_market import MarketSimulator, SIMULATION_MODELS, SIMULATED_TIMEFRAMES
+
+
+class Command(BaseCommand):
+    help = 'Simule les cotations des actions (marche aléatoire ou GBM) et écrit PriceHistory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', choices=SIMULATION_MODELS, default='gbm', help='Modèle de prix')
+        parser.add_argument('--seed', type=int, help='Graine du générateur (simulation reproductible)')
+        parser.add_argument('--timeframe', choices=SIMULATED_TIMEFRAMES, default='1MIN', help='Période des bougies écrites')
+        parser.add_argument('--drift', type=float, default=0.0, help='Dérive du facteur de marché par tick')
+        parser.add_argument('--market-volatility', type=float, default=0.002, help='Volatilité du facteur de marché par tick')
+        parser.add_argument('--volatility', type=float, default=0.003, help='Volatilité propre de chaque action par tick')
+        parser.add_argument('--interval', type=float, default=1.0, help='Intervalle entre deux ticks (secondes)')
+        parser.add_argument('--ticks', type=int, default=0, help='Nombre de ticks (0: en continu)')
+        parser.add_argument('--persist-every', type=int, default=1, help='Écrit les prix en base tous les N ticks')
+        parser.add_argument('--reload-every', type=int, default=300, help='Recharge la liste des actions tous les N ticks')
+        parser.add_argument('--no-fill', action='store_true', help='Ne pas exécuter les ordres LIMIT atteints')
+
+    def handle(self, *args, **options):
+        try:
+            simulator = MarketSimulator(
+                model=options['model'],
+                seed=options['seed'],
+                timeframe=options['timeframe'],
+                drift=options['drift'],
+                market_volatility=options['market_volatility'],
+                idiosyncratic_volatility=options['volatility'],
+            )
+        except (RuntimeError, ValueError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(f"{len(simulator.stocks)} action(s) simulée(s), modèle {options['model']}")
+
+        tick = 0
+        try:
+            while not options['ticks'] or tick < options['ticks']:
+                started = time.monotonic()
+                tick += 1
+
+                if options['reload_every'] and tick % options['reload_every'] == 0:
+                    # Appliqué à la prochaine fermeture de bougie
+                    simulator.reload_requested = True
+
+                result = simulator.tick(
+                    persist=tick % max(options['persist_every'], 1) == 0,
+                    fill_orders=not options['no_fill'],
+                )
+                if result['candles'] or result['filled']:
+                    self.stdout.write(
+                        f"Tick {tick}: {result['candles']} bougie(s), {result['filled']} ordre(s) exécuté(s)"
+                    )
+
+                elapsed = time.monotonic() - started
+                if options['interval'] > elapsed:
+                    time.sleep(options['interval'] - elapsed)
+        except KeyboardInterrupt:
+            self.stdout.write('Arrêt demandé')
+        finally:
+            # Dernier état: prix et bougie en cours
+            simulator.persist()
+            simulator.flush_candles()
+
+        self.stdout.write(self.style.SUCCESS(f'Simulation terminée ({tick} tick(s))'))
@@ -0,0 +1,14 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:11
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_add_payment_fields'),
+        ('core', '0007_alter_cohorte_code'),
+    ]
+
+    operations = [
+    ]
@@ -0,0 +1,120 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:30
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+def create_missing_tables(apps, schema_editor):
+    """Crée la table des demandes sur une base neuve; les bases existantes l'ont déjà"""
+    existing = set(schema_editor.connection.introspection.table_names())
+    model = apps.get_model('core', 'AccountOpeningRequest')
+    if model._meta.db_table not in existing:
+        schema_editor.create_model(model)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_merge_0007_add_payment_fields_0007_alter_cohorte_code'),
+    ]
+
+    operations = [
+        # La table core_accountopeningrequest existe déjà en production (modèle sans migration):
+        # on ne fait qu'enregistrer le modèle dans l'état des migrations.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='AccountOpeningRequest',
+                    fields=[
+                        ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                        ('full_name', models.CharField(max_length=200)),
+                        ('email', models.EmailField(max_length=254)),
+                        ('phone', models.CharField(max_length=30)),
+                        ('is_phone_linked_to_kyc_mobile_money', models.BooleanField(default=False)),
+                        ('alternate_kyc_mobile_money_phone', models.CharField(blank=True, max_length=30, null=True)),
+                        ('country_of_residence', models.CharField(max_length=100)),
+                        ('nationality', models.CharField(max_length=100)),
+                        ('customer_banks_current_account', models.JSONField(default=list, help_text='Liste des banques avec compte courant')),
+                        ('wants_digital_opening', models.BooleanField(default=True)),
+                        ('wants_in_person_opening', models.BooleanField(default=False)),
+                        ('available_minimum_amount', models.DecimalField(blank=True, decimal_places=2, max_digits=15, null=True)),
+                        ('wants_100_percent_digital_sgi', models.BooleanField(default=False)),
+                        ('funding_by_visa', models.BooleanField(default=False)),
+                        ('funding_by_mobile_money', models.BooleanField(default=False)),
+                        ('funding_by_bank_transfer', models.BooleanField(default=False)),
+                        ('funding_by_intermediary', models.BooleanField(default=False)),
+                        ('funding_by_wu_mg_ria', models.BooleanField(default=False)),
+                        ('wants_xamila_as_intermediary', models.BooleanField(default=False)),
+                        ('prefer_service_quality_over_fees', models.BooleanField(default=True)),
+                        ('sources_of_income', models.TextField()),
+                        ('investor_profile', models.CharField(choices=[('PRUDENT', 'Prudent'), ('AUDACIOUS', 'Audacieux'), ('MODERATE', 'Modéré')], max_length=20)),
+                        ('holder_info', models.TextField(blank=True, help_text='Infos sur le titulaire du compte')),
+                        ('photo', models.ImageField(blank=True, null=True, upload_to='kyc/account_opening/photos/')),
+                        ('id_card_scan', models.FileField(blank=True, null=True, upload_to='kyc/account_opening/id_scans/')),
+                        ('wants_xamila_plus', models.BooleanField(default=False)),
+                        ('authorize_xamila_to_receive_account_info', models.BooleanField(default=False)),
+                        ('annex_data', models.JSONField(blank=True, default=dict)),
+                        ('contract_pdf', models.FileField(blank=True, help_text='Contrat principal (statique)', null=True, upload_to='contracts/main/')),
+                        ('annexes_pdf', models.FileField(blank=True, help_text='Annexes avec données dynamiques', null=True, upload_to='contracts/annexes/')),
+                        ('status', models.CharField(default='PENDING', max_length=20)),
+                        ('created_at', models.DateTimeField(auto_now_add=True)),
+                        ('updated_at', models.DateTimeField(auto_now=True)),
+                        ('customer', models.ForeignKey(limit_choices_to={'role': 'CUSTOMER'}, on_delete=django.db.models.deletion.CASCADE, related_name='account_opening_requests', to=settings.AUTH_USER_MODEL)),
+                        ('sgi', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='account_opening_requests', to='core.sgi')),
+                    ],
+                    options={
+                        'verbose_name': "Demande d'ouverture de compte titre",
+                        'verbose_name_plural': "Demandes d'ouverture de compte titre",
+                        'ordering': ['-created_at'],
+                    },
+                ),
+                migrations.AddIndex(
+                    model_name='accountopeningrequest',
+                    index=models.Index(fields=['customer'], name='core_accoun_custome_9bea8f_idx'),
+                ),
+                migrations.AddIndex(
+                    model_name='accountopeningrequest',
+                    index=models.Index(fields=['sgi'], name='core_accoun_sgi_id_82fedc_idx'),
+                ),
+                migrations.AddIndex(
+                    model_name='accountopeningrequest',
+                    index=models.Index(fields=['status'], name='core_accoun_status_23afcc_idx'),
+                ),
+            ],
+        ),
+        migrations.RunPython(create_missing_tables, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='AccountOpeningJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('PENDING', 'En attente'), ('RUNNING', 'En cours'), ('RETRY', 'Nouvelle tentative programmée'), ('COMPLETED', 'Terminé'), ('FAILED', 'Échoué')], default='PENDING', max_length=20)),
+                ('stage', models.CharField(choices=[('RENDER', 'Génération des PDF'), ('STORE', 'Stockage des PDF'), ('EMAIL', 'Envoi des emails'), ('DONE', 'Terminé')], default='RENDER', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('max_attempts', models.PositiveIntegerField(default=5)),
+                ('next_retry_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('stage_results', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('account_opening_request', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to='core.accountopeningrequest')),
+            ],
+            options={
+                'verbose_name': "Traitement de demande d'ouverture de compte",
+                'verbose_name_plural': "Traitements de demandes d'ouverture de compte",
+                'db_table': 'account_opening_job',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='accountopeningjob',
+            index=models.Index(fields=['status', 'next_retry_at'], name='account_ope_status_742654_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='accountopeningjob',
+            index=models.Index(fields=['account_opening_request'], name='account_ope_account_223294_idx'),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def create_missing_tables(apps, schema_editor):
+    """Crée les tables absentes sur une base neuve; les bases existantes les ont déjà"""
+    existing = set(schema_editor.connection.introspection.table_names())
+    for name in ('SGIAccountTerms',):
+        model = apps.get_model('core', name)
+        if model._meta.db_table not in existing:
+            schema_editor.create_model(model)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_accountopeningrequest_accountopeningjob'),
+    ]
+
+    operations = [
+        # La table des conditions d'ouverture SGI existe déjà en production (modèle sans
+        # migration): on ne fait qu'enregistrer ce modèle dans l'état des migrations.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='SGIAccountTerms',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('country', models.CharField(max_length=100, verbose_name='Pays')),
+                        ('headquarters_address', models.CharField(max_length=255, verbose_name='Adresse du siège')),
+                        ('director_name', models.CharField(max_length=150, verbose_name='Nom du dirigeant')),
+                        ('profile', models.TextField(verbose_name='Présentation/Profil de la SGI')),
+                        ('has_minimum_amount', models.BooleanField(default=False)),
+                        ('minimum_amount_value', models.DecimalField(blank=True, decimal_places=2, max_digits=15, null=True)),
+                        ('has_opening_fees', models.BooleanField(default=False)),
+                        ('opening_fees_amount', models.DecimalField(blank=True, decimal_places=2, max_digits=15, null=True)),
+                        ('is_digital_opening', models.BooleanField(default=True, help_text='Ouverture 100% à distance')),
+                        ('deposit_methods', models.JSONField(default=list, help_text='Liste parmi PAYMENT_METHODS')),
+                        ('is_bank_subsidiary', models.BooleanField(default=False)),
+                        ('parent_bank_name', models.CharField(blank=True, max_length=150, null=True)),
+                        ('custody_fees', models.DecimalField(blank=True, decimal_places=2, help_text='Frais de garde (FCFA ou %)', max_digits=10, null=True)),
+                        ('account_maintenance_fees', models.DecimalField(blank=True, decimal_places=2, help_text='Frais de tenue de compte (FCFA ou %)', max_digits=10, null=True)),
+                        ('brokerage_fees_transactions_ordinary', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                        ('brokerage_fees_files', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                        ('brokerage_fees_transactions', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                        ('transfer_account_fees', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                        ('transfer_securities_fees', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                        ('pledge_fees', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                        ('redemption_methods', models.JSONField(default=list, help_text='Liste parmi REDEMPTION_METHODS')),
+                        ('preferred_customer_banks', models.JSONField(default=list, help_text='Noms de banques partenaires/compatibles')),
+                        ('created_at', models.DateTimeField(auto_now_add=True)),
+                        ('updated_at', models.DateTimeField(auto_now=True)),
+                        ('sgi', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='account_terms', to='core.sgi')),
+                    ],
+                    options={
+                        'verbose_name': "Conditions d'ouverture de compte SGI",
+                        'verbose_name_plural': "Conditions d'ouverture de compte SGI",
+                    },
+                ),
+            ],
+        ),
+        migrations.RunPython(create_missing_tables, migrations.RunPython.noop),
+    ]
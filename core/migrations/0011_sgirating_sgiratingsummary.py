@@ -0,0 +1,63 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:40
+
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def create_missing_tables(apps, schema_editor):
+    """Crée les tables absentes sur une base neuve; les bases existantes les ont déjà"""
+    existing = set(schema_editor.connection.introspection.table_names())
+    for name in ('SGIRating',):
+        model = apps.get_model('core', name)
+        if model._meta.db_table not in existing:
+            schema_editor.create_model(model)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_sgiaccountterms'),
+    ]
+
+    operations = [
+        # La table des notes SGI existe déjà en production (modèle sans migration):
+        # on ne fait qu'enregistrer ce modèle dans l'état des migrations.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='SGIRating',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('score', models.PositiveSmallIntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(5)])),
+                        ('comment', models.TextField(blank=True)),
+                        ('created_at', models.DateTimeField(auto_now_add=True)),
+                        ('updated_at', models.DateTimeField(auto_now=True)),
+                        ('customer', models.ForeignKey(limit_choices_to={'role': 'CUSTOMER'}, on_delete=django.db.models.deletion.CASCADE, related_name='sgi_ratings', to=settings.AUTH_USER_MODEL)),
+                        ('sgi', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ratings', to='core.sgi')),
+                    ],
+                    options={
+                        'indexes': [models.Index(fields=['sgi'], name='core_sgirat_sgi_id_7b7e31_idx'), models.Index(fields=['customer'], name='core_sgirat_custome_b9b073_idx')],
+                        'unique_together': {('sgi', 'customer')},
+                    },
+                ),
+            ],
+        ),
+        migrations.RunPython(create_missing_tables, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='SGIRatingSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ratings_count', models.PositiveIntegerField(default=0)),
+                ('ratings_total', models.PositiveIntegerField(default=0, help_text='Somme des notes')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('sgi', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='rating_summary', to='core.sgi')),
+            ],
+            options={
+                'verbose_name': 'Résumé des notes SGI',
+                'verbose_name_plural': 'Résumés des notes SGI',
+                'db_table': 'sgi_rating_summary',
+            },
+        ),
+    ]
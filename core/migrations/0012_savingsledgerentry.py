@@ -0,0 +1,44 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:20
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_sgirating_sgiratingsummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SavingsLedgerEntry',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('entry_type', models.CharField(choices=[('DEPOSIT', 'Dépôt'), ('WITHDRAWAL', 'Retrait'), ('ADJUSTMENT', 'Ajustement')], max_length=20, verbose_name="Type d'écriture")),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=15, verbose_name='Montant signé (FCFA)')),
+                ('points', models.PositiveIntegerField(default=0, verbose_name='Points attribués')),
+                ('reference', models.CharField(max_length=100, unique=True, verbose_name='Référence')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('account', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to='core.savingsaccount')),
+                ('deposit', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_entry', to='core.savingsdeposit')),
+                ('participation', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to='core.challengeparticipation')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='savings_ledger_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': "Écriture d'épargne",
+                'verbose_name_plural': "Grand livre d'épargne",
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='savingsledgerentry',
+            index=models.Index(fields=['account', 'created_at'], name='core_saving_account_abf116_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='savingsledgerentry',
+            index=models.Index(fields=['participation', 'created_at'], name='core_saving_partici_041f6b_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_savingsledgerentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='savingsaccount',
+            name='global_rank',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Rang global'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:50
+
+from datetime import timedelta
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_dashboard_window(apps, schema_editor):
+    """Indicateurs des 30 derniers jours, pour que le tableau de bord admin soit juste dès le déploiement"""
+    from core.services_platform_metrics import DASHBOARD_DAYS, backfill
+
+    end = timezone.localdate()
+    backfill(end - timedelta(days=DASHBOARD_DAYS - 1), end, apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_savingsaccount_global_rank'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyPlatformMetric',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('metric', models.CharField(max_length=50)),
+                ('dimension', models.CharField(blank=True, default='', max_length=50)),
+                ('value', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Indicateur journalier',
+                'verbose_name_plural': 'Indicateurs journaliers',
+                'db_table': 'daily_platform_metrics',
+                'indexes': [models.Index(fields=['metric', 'date'], name='daily_platf_metric_94e750_idx')],
+                'unique_together': {('date', 'metric', 'dimension')},
+            },
+        ),
+        migrations.RunPython(backfill_dashboard_window, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,209 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:17
+
+import core.models
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def create_missing_tables(apps, schema_editor):
+    """Crée les tables absentes sur une base neuve; les bases existantes les ont déjà"""
+    existing = set(schema_editor.connection.introspection.table_names())
+    for name in ('SGIManager', 'SGIManagerAssignment', 'ClientSGIRelationship', 'SGIPerformance'):
+        model = apps.get_model('core', name)
+        if model._meta.db_table not in existing:
+            schema_editor.create_model(model)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_dailyplatformmetric'),
+    ]
+
+    operations = [
+        # Rattrapage de l'état des migrations: ces modèles et options existent déjà en base
+        # (tables créées hors migrations, options sans effet SQL). Aucune opération de schéma
+        # sur une base existante; seules les tables manquantes d'une base neuve sont créées.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='SGIManager',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('professional_title', models.CharField(help_text='Titre professionnel', max_length=100)),
+                        ('license_number', models.CharField(help_text='Numéro de licence professionnelle', max_length=50, unique=True)),
+                        ('years_of_experience', models.PositiveIntegerField(help_text="Années d'expérience", validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(50)])),
+                        ('specializations', models.JSONField(default=list, help_text='Spécialisations du manager (liste des SPECIALIZATION_CHOICES)')),
+                        ('certifications', models.JSONField(default=list, help_text='Certifications professionnelles')),
+                        ('professional_email', models.EmailField(help_text='Email professionnel', max_length=254)),
+                        ('professional_phone', models.CharField(help_text='Téléphone professionnel', max_length=20)),
+                        ('is_active', models.BooleanField(default=True)),
+                        ('is_verified', models.BooleanField(default=False, help_text="Manager vérifié par l'admin")),
+                        ('created_at', models.DateTimeField(auto_now_add=True)),
+                        ('updated_at', models.DateTimeField(auto_now=True)),
+                        ('verified_at', models.DateTimeField(blank=True, null=True)),
+                    ],
+                    options={
+                        'verbose_name': 'Manager SGI',
+                        'verbose_name_plural': 'Managers SGI',
+                        'db_table': 'sgi_manager',
+                        'ordering': ['-created_at'],
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='cohorte',
+                    name='annee',
+                    field=models.IntegerField(default=core.models.current_year, help_text='Année de la cohorte'),
+                ),
+                migrations.AlterField(
+                    model_name='savingsgoal',
+                    name='date_activation_caisse',
+                    field=models.DateField(blank=True, null=True, verbose_name="Date d'activation Ma Caisse"),
+                ),
+                migrations.AlterField(
+                    model_name='sgiclientrelationship',
+                    name='sgi',
+                    field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='manager_client_relationships', to='core.sgi'),
+                ),
+                migrations.AlterField(
+                    model_name='sgimanagerprofile',
+                    name='sgi',
+                    field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='manager_profiles', to='core.sgi'),
+                ),
+                migrations.CreateModel(
+                    name='SGIManagerAssignment',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('role', models.CharField(choices=[('PRIMARY', 'Manager principal'), ('SECONDARY', 'Manager secondaire'), ('ANALYST', 'Analyste'), ('ADVISOR', 'Conseiller')], default='SECONDARY', max_length=20)),
+                        ('permissions', models.JSONField(default=list, help_text='Permissions du manager pour cette SGI')),
+                        ('is_active', models.BooleanField(default=True)),
+                        ('assigned_at', models.DateTimeField(auto_now_add=True)),
+                        ('assigned_by', models.ForeignKey(blank=True, help_text='Qui a créé cette assignation', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sgi_assignments_created', to=settings.AUTH_USER_MODEL)),
+                        ('manager', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sgi_assignments', to='core.sgimanager')),
+                        ('sgi', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='manager_assignments', to='core.sgi')),
+                    ],
+                    options={
+                        'verbose_name': 'Assignation Manager SGI',
+                        'verbose_name_plural': 'Assignations Managers SGI',
+                        'db_table': 'sgi_manager_assignment',
+                        'ordering': ['-assigned_at'],
+                    },
+                ),
+                migrations.AddField(
+                    model_name='sgimanager',
+                    name='managed_sgis',
+                    field=models.ManyToManyField(related_name='managers', through='core.SGIManagerAssignment', to='core.sgi'),
+                ),
+                migrations.AddField(
+                    model_name='sgimanager',
+                    name='user',
+                    field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='sgi_manager', to=settings.AUTH_USER_MODEL),
+                ),
+                migrations.AddField(
+                    model_name='sgimanager',
+                    name='verified_by',
+                    field=models.ForeignKey(blank=True, help_text='Administrateur qui a vérifié le manager', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='verified_sgi_managers', to=settings.AUTH_USER_MODEL),
+                ),
+                migrations.CreateModel(
+                    name='ClientSGIRelationship',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('matching_score', models.DecimalField(blank=True, decimal_places=2, help_text='Score de compatibilité (0-100%)', max_digits=5, null=True, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(100)])),
+                        ('matching_criteria', models.JSONField(default=dict, help_text='Critères utilisés pour le matching')),
+                        ('source', models.CharField(choices=[('SMART_MATCHING', 'Matching intelligent'), ('MANUAL_SELECTION', 'Sélection manuelle'), ('REFERRAL', 'Recommandation'), ('DIRECT_CONTACT', 'Contact direct')], default='SMART_MATCHING', max_length=20)),
+                        ('status', models.CharField(choices=[('MATCHED', 'Matching effectué'), ('CONTACTED', 'Client contacté'), ('INTERESTED', 'Client intéressé'), ('CONTRACT_SENT', 'Contrat envoyé'), ('CONTRACT_SIGNED', 'Contrat signé'), ('ACTIVE', 'Relation active'), ('SUSPENDED', 'Suspendue'), ('TERMINATED', 'Terminée'), ('REJECTED', 'Rejetée')], default='MATCHED', max_length=20)),
+                        ('notes', models.TextField(blank=True, help_text='Notes sur la relation', null=True)),
+                        ('contract_sent_at', models.DateTimeField(blank=True, null=True)),
+                        ('contract_signed_at', models.DateTimeField(blank=True, null=True)),
+                        ('initial_investment', models.DecimalField(blank=True, decimal_places=2, help_text='Investissement initial (en euros)', max_digits=12, null=True, validators=[django.core.validators.MinValueValidator(0)])),
+                        ('created_at', models.DateTimeField(auto_now_add=True)),
+                        ('updated_at', models.DateTimeField(auto_now=True)),
+                        ('assigned_manager', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='client_relationships', to='core.sgimanager')),
+                        ('client', models.ForeignKey(limit_choices_to={'role': 'CUSTOMER'}, on_delete=django.db.models.deletion.CASCADE, related_name='sgi_relationships', to=settings.AUTH_USER_MODEL)),
+                        ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='created_sgi_relationships', to=settings.AUTH_USER_MODEL)),
+                        ('sgi', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='client_relationships', to='core.sgi')),
+                    ],
+                    options={
+                        'verbose_name': 'Relation Client-SGI',
+                        'verbose_name_plural': 'Relations Client-SGI',
+                        'db_table': 'client_sgi_relationship',
+                        'ordering': ['-created_at'],
+                    },
+                ),
+                migrations.CreateModel(
+                    name='SGIPerformance',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('period_type', models.CharField(choices=[('MONTHLY', 'Mensuel'), ('QUARTERLY', 'Trimestriel'), ('YEARLY', 'Annuel')], max_length=20)),
+                        ('period_start', models.DateField(help_text='Début de la période')),
+                        ('period_end', models.DateField(help_text='Fin de la période')),
+                        ('return_rate', models.DecimalField(decimal_places=4, help_text='Taux de rendement (%)', max_digits=8)),
+                        ('volatility', models.DecimalField(blank=True, decimal_places=4, help_text='Volatilité (%)', max_digits=8, null=True)),
+                        ('sharpe_ratio', models.DecimalField(blank=True, decimal_places=4, help_text='Ratio de Sharpe', max_digits=8, null=True)),
+                        ('max_drawdown', models.DecimalField(blank=True, decimal_places=4, help_text='Drawdown maximum (%)', max_digits=8, null=True)),
+                        ('new_clients', models.PositiveIntegerField(default=0, help_text='Nouveaux clients')),
+                        ('total_clients', models.PositiveIntegerField(default=0, help_text='Total clients')),
+                        ('aum_growth', models.DecimalField(decimal_places=4, default=0, help_text='Croissance des AUM (%)', max_digits=8)),
+                        ('created_at', models.DateTimeField(auto_now_add=True)),
+                        ('updated_at', models.DateTimeField(auto_now=True)),
+                        ('sgi', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='performance_records', to='core.sgi')),
+                    ],
+                    options={
+                        'verbose_name': 'Performance SGI',
+                        'verbose_name_plural': 'Performances SGI',
+                        'db_table': 'sgi_performance',
+                        'ordering': ['-period_end'],
+                        'indexes': [models.Index(fields=['sgi', 'period_type'], name='sgi_perform_sgi_id_fceadc_idx'), models.Index(fields=['period_start', 'period_end'], name='sgi_perform_period__784ee2_idx')],
+                        'unique_together': {('sgi', 'period_type', 'period_start', 'period_end')},
+                    },
+                ),
+                migrations.AddIndex(
+                    model_name='sgimanagerassignment',
+                    index=models.Index(fields=['sgi', 'manager'], name='sgi_manager_sgi_id_4bd22f_idx'),
+                ),
+                migrations.AddIndex(
+                    model_name='sgimanagerassignment',
+                    index=models.Index(fields=['is_active'], name='sgi_manager_is_acti_fc9770_idx'),
+                ),
+                migrations.AlterUniqueTogether(
+                    name='sgimanagerassignment',
+                    unique_together={('sgi', 'manager')},
+                ),
+                migrations.AddIndex(
+                    model_name='sgimanager',
+                    index=models.Index(fields=['is_active'], name='sgi_manager_is_acti_dbd5d2_idx'),
+                ),
+                migrations.AddIndex(
+                    model_name='sgimanager',
+                    index=models.Index(fields=['is_verified'], name='sgi_manager_is_veri_ea9dda_idx'),
+                ),
+                migrations.AddIndex(
+                    model_name='sgimanager',
+                    index=models.Index(fields=['license_number'], name='sgi_manager_license_a06ffe_idx'),
+                ),
+                migrations.AddIndex(
+                    model_name='clientsgirelationship',
+                    index=models.Index(fields=['client', 'sgi'], name='client_sgi__client__bd65d3_idx'),
+                ),
+                migrations.AddIndex(
+                    model_name='clientsgirelationship',
+                    index=models.Index(fields=['status'], name='client_sgi__status_f436fc_idx'),
+                ),
+                migrations.AddIndex(
+                    model_name='clientsgirelationship',
+                    index=models.Index(fields=['source'], name='client_sgi__source_27575d_idx'),
+                ),
+                migrations.AddIndex(
+                    model_name='clientsgirelationship',
+                    index=models.Index(fields=['created_at'], name='client_sgi__created_97dee6_idx'),
+                ),
+                migrations.AlterUniqueTogether(
+                    name='clientsgirelationship',
+                    unique_together={('client', 'sgi')},
+                ),
+            ],
+        ),
+        migrations.RunPython(create_missing_tables, migrations.RunPython.noop),
+    ]
@@ -115,7 +115,7 @@ class User(AbstractUser):
     )
     
     phone = models.CharField(
-        max_length=20, blank=True, null=True,
+        max_length=20, blank=True, null=True, db_index=True,
         validators=[RegexValidator(r'^\+?1?\d{9,15}$', 'Numéro de téléphone invalide')]
     )
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='CUSTOMER')
@@ -1176,6 +1176,11 @@ class ResourceContent(models.Model):
         return content
 
 
+def current_year():
+    """Année courante, évaluée à la création (et non à l'import du module)"""
+    return timezone.now().year
+
+
 class Cohorte(models.Model):
     """
     Modèle pour gérer les cohortes d'utilisateurs du Challenge Épargne
@@ -1213,7 +1218,7 @@ class Cohorte(models.Model):
         help_text="Mois de la cohorte (1-12)"
     )
     annee = models.IntegerField(
-        default=timezone.now().year,
+        default=current_year,
         help_text="Année de la cohorte"
     )
     user = models.ForeignKey(
@@ -78,12 +78,11 @@ class UserSavingsProgress(models.Model):
     
     @property
     def rank(self):
-        """Calcule le rang de l'utilisateur dans le challenge"""
-        better_users = UserSavingsProgress.objects.filter(
-            challenge=self.challenge,
-            current_amount__gt=self.current_amount
-        ).count()
-        return better_users + 1
+        """Rang de l'utilisateur dans le challenge (index des rangs en cache, sans COUNT)"""
+        if getattr(self, '_rank', None) is None:
+            from .services_savings_progress import SavingsProgressRankIndex
+            self._rank = SavingsProgressRankIndex().rank_of(self)
+        return self._rank
 
 class DashboardTransaction(models.Model):
     """Transactions financières"""
@@ -157,50 +156,36 @@ class UserDashboardStats(models.Model):
         return f"Stats - {self.user.username}"
     
     def refresh_stats(self):
-        """Recalcule les statistiques"""
-        from django.db.models import Sum
-        from datetime import datetime
-        
-        # Calcul du portefeuille
-        investments = UserInvestment.objects.filter(user=self.user, is_active=True)
-        self.total_portfolio_value = investments.aggregate(
-            total=Sum('current_value')
-        )['total'] or 0
-        
-        self.total_invested_amount = investments.aggregate(
-            total=Sum('invested_amount')
-        )['total'] or 0
-        
-        # Performance globale
-        if self.total_invested_amount > 0:
-            self.global_performance_percentage = (
-                (self.total_portfolio_value - self.total_invested_amount) / 
-                self.total_invested_amount
-            ) * 100
-        
-        # Épargne du mois actuel
-        current_month = datetime.now().replace(day=1)
-        self.current_month_savings = DashboardTransaction.objects.filter(
-            user=self.user,
-            transaction_type='SAVINGS',
-            status='CONFIRMED',
-            created_at__gte=current_month
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        # Rang d'épargne (simplifié)
-        SavingsChallenge = get_savings_challenge_model()
-        active_challenge = SavingsChallenge.objects.filter(status='ACTIVE').first()
-        if active_challenge:
-            user_progress = UserSavingsProgress.objects.filter(
-                user=self.user, 
-                challenge=active_challenge
-            ).first()
-            if user_progress:
-                self.savings_rank = user_progress.rank
+        """Recalcule et enregistre les statistiques (une écriture)"""
+        from .services_dashboard_stats import DashboardStatsService
         
+        values = DashboardStatsService().compute([self.user_id])[str(self.user_id)]
+        for field, value in values.items():
+            setattr(self, field, value)
         self.save()
-        
-        # Log pour debug
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.info(f"Stats refreshed for {self.user.email}: portfolio={self.total_portfolio_value}, invested={self.total_invested_amount}, performance={self.global_performance_percentage}%")
+
+class DailyPlatformMetric(models.Model):
+    """
+    Agrégat journalier d'un indicateur de la plateforme (tableau de bord admin)
+
+    Une ligne par (jour, indicateur, dimension): inscriptions par rôle, vérifications,
+    OTP envoyés/utilisés par type, changements de statut des SGI et des contrats.
+    Tenu à jour par les signaux, reconstruit par la commande backfill_platform_metrics.
+    """
+    date = models.DateField()
+    metric = models.CharField(max_length=50)
+    dimension = models.CharField(max_length=50, blank=True, default='')
+    value = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'daily_platform_metrics'
+        verbose_name = 'Indicateur journalier'
+        verbose_name_plural = 'Indicateurs journaliers'
+        unique_together = ['date', 'metric', 'dimension']
+        indexes = [
+            models.Index(fields=['metric', 'date']),
+        ]
+    
+    def __str__(self):
+        return f"{self.date} - {self.metric}[{self.dimension}] = {self.value}"
@@ -212,6 +212,12 @@ class NotificationCampaign(models.Model):
         if self.opened_count > 0:
             return (self.clicked_count / self.opened_count) * 100
         return 0
+    
+    @property
+    def fanout_progress(self):
+        """Avancement de la diffusion (état, destinataires traités, notifications créées)"""
+        from .services_campaigns import get_campaign_progress
+        return get_campaign_progress(self.id)
 
 
 class Notification(models.Model):
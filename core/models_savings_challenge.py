@@ -500,6 +500,12 @@ class SavingsAccount(models.Model):
         default='ACTIVE', verbose_name="Statut"
     )
     
+    # Classement global des épargnants (persisté par persist_saver_ranks)
+    global_rank = models.PositiveIntegerField(
+        blank=True, null=True,
+        verbose_name="Rang global"
+    )
+    
     # Métadonnées
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -513,6 +519,82 @@ class SavingsAccount(models.Model):
         return f"{self.account_number} - {self.user.full_name}"
 
 
+class SavingsLedgerEntry(models.Model):
+    """
+    Écriture du grand livre d'épargne (immuable)
+    Le solde des comptes et le total épargné des participations en sont des projections.
+    """
+    
+    ENTRY_TYPES = [
+        ('DEPOSIT', 'Dépôt'),
+        ('WITHDRAWAL', 'Retrait'),
+        ('ADJUSTMENT', 'Ajustement'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    
+    # Relations
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE,
+        related_name='savings_ledger_entries'
+    )
+    account = models.ForeignKey(
+        SavingsAccount, on_delete=models.CASCADE, blank=True, null=True,
+        related_name='ledger_entries'
+    )
+    participation = models.ForeignKey(
+        ChallengeParticipation, on_delete=models.CASCADE, blank=True, null=True,
+        related_name='ledger_entries'
+    )
+    deposit = models.OneToOneField(
+        SavingsDeposit, on_delete=models.SET_NULL, blank=True, null=True,
+        related_name='ledger_entry'
+    )
+    
+    # Mouvement (positif pour un dépôt, négatif pour un retrait)
+    entry_type = models.CharField(
+        max_length=20, choices=ENTRY_TYPES,
+        verbose_name="Type d'écriture"
+    )
+    amount = models.DecimalField(
+        max_digits=15, decimal_places=2,
+        verbose_name="Montant signé (FCFA)"
+    )
+    points = models.PositiveIntegerField(
+        default=0, verbose_name="Points attribués"
+    )
+    
+    # Référence unique: un mouvement rejoué (ex: callback mobile money) n'est écrit qu'une fois
+    reference = models.CharField(
+        max_length=100, unique=True,
+        verbose_name="Référence"
+    )
+    
+    # Métadonnées
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = "Écriture d'épargne"
+        verbose_name_plural = "Grand livre d'épargne"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['account', 'created_at']),
+            models.Index(fields=['participation', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.entry_type} {self.amount} FCFA - {self.reference}"
+    
+    def save(self, *args, **kwargs):
+        """Les écritures sont immuables: une correction passe par une écriture d'ajustement"""
+        if not self._state.adding:
+            raise ValueError("Une écriture du grand livre d'épargne ne peut pas être modifiée")
+        super().save(*args, **kwargs)
+    
+    def delete(self, *args, **kwargs):
+        raise ValueError("Une écriture du grand livre d'épargne ne peut pas être supprimée")
+
+
 class ChallengeLeaderboard(models.Model):
     """
     Classement des participants aux défis
@@ -453,6 +453,31 @@ class SGIRating(models.Model):
         return f"Rating {self.score}/5 - {self.sgi.name} by {self.customer.get_full_name()}"
 
 
+class SGIRatingSummary(models.Model):
+    """
+    Résumé dénormalisé des notes d'une SGI (moyenne et nombre de notes)
+    Tenu à jour à chaque note enregistrée, lu par le comparateur
+    """
+
+    sgi = models.OneToOneField(BaseSGI, on_delete=models.CASCADE, related_name="rating_summary")
+    ratings_count = models.PositiveIntegerField(default=0)
+    ratings_total = models.PositiveIntegerField(default=0, help_text="Somme des notes")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "sgi_rating_summary"
+        verbose_name = "Résumé des notes SGI"
+        verbose_name_plural = "Résumés des notes SGI"
+
+    def __str__(self):
+        return f"Notes {self.sgi_id}: {self.avg_rating:.2f}/5 ({self.ratings_count})"
+
+    @property
+    def avg_rating(self):
+        """Note moyenne (0 si aucune note)"""
+        return self.ratings_total / self.ratings_count if self.ratings_count else 0.0
+
+
 class AccountOpeningRequest(models.Model):
     """
     Demande de mise en relation / ouverture de compte titre
@@ -556,3 +581,68 @@ class AccountOpeningRequest(models.Model):
 
     def __str__(self):
         return f"AccountOpeningRequest {self.id} - {self.full_name}"
+
+
+class AccountOpeningJob(models.Model):
+    """
+    Traitement asynchrone d'une demande d'ouverture de compte
+    Génération des PDF, stockage puis envoi des emails, par étapes rejouables
+    """
+
+    STATUS_CHOICES = [
+        ("PENDING", "En attente"),
+        ("RUNNING", "En cours"),
+        ("RETRY", "Nouvelle tentative programmée"),
+        ("COMPLETED", "Terminé"),
+        ("FAILED", "Échoué"),
+    ]
+
+    STAGE_CHOICES = [
+        ("RENDER", "Génération des PDF"),
+        ("STORE", "Stockage des PDF"),
+        ("EMAIL", "Envoi des emails"),
+        ("DONE", "Terminé"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    account_opening_request = models.ForeignKey(
+        AccountOpeningRequest,
+        on_delete=models.CASCADE,
+        related_name="jobs"
+    )
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="PENDING")
+    stage = models.CharField(max_length=20, choices=STAGE_CHOICES, default="RENDER")
+
+    # Tentatives
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    next_retry_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+
+    # Résultats par étape (tailles des PDF, destinataires, erreurs partielles...)
+    stage_results = models.JSONField(default=dict, blank=True)
+
+    # Métadonnées
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    completed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = "account_opening_job"
+        verbose_name = "Traitement de demande d'ouverture de compte"
+        verbose_name_plural = "Traitements de demandes d'ouverture de compte"
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "next_retry_at"]),
+            models.Index(fields=["account_opening_request"]),
+        ]
+
+    def __str__(self):
+        return f"Job {self.id} - {self.stage} ({self.status})"
+
+    @property
+    def is_finished(self):
+        """Retourne True si le job n'évoluera plus"""
+        return self.status in ("COMPLETED", "FAILED")
@@ -2,7 +2,7 @@
 Base PDF Template class that all SGI templates inherit from.
 Defines the interface and common utilities.
 """
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 from io import BytesIO
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import A4
@@ -17,6 +17,10 @@ class BasePDFTemplate:
     - fill_page_X(): Methods to fill specific pages with data
     """
     
+    # 0-based indices of the pages drawn by fill_page().
+    # None means "unknown": every page of the template gets an overlay.
+    filled_pages: Optional[Tuple[int, ...]] = None
+    
     def __init__(self):
         self.page_size = A4
         self.font_name = "Helvetica"
@@ -37,6 +41,20 @@ class BasePDFTemplate:
         """
         return 30  # Default
     
+    def get_filled_pages(self, page_count: int) -> Tuple[int, ...]:
+        """
+        Return the 0-based indices of the pages that fill_page() draws on.
+        Pages not listed are copied from the template without any overlay.
+        
+        Args:
+            page_count: Number of pages of the template PDF
+        """
+        if type(self).fill_page is BasePDFTemplate.fill_page:
+            return ()
+        if self.filled_pages is None:
+            return tuple(range(page_count))
+        return tuple(i for i in self.filled_pages if 0 <= i < page_count)
+    
     def draw_checkbox(self, canvas_obj, x: float, y: float, checked: bool):
         """
         Draw a checkbox at position (x, y).
@@ -14,6 +14,9 @@ class GEKCapitalTemplate(BasePDFTemplate):
     Handles all 95 annex fields across pages 22, 23, and 26.
     """
     
+    # Pages 1, 2, 22, 23 and 26 (see fill_page)
+    filled_pages = (0, 1, 21, 22, 25)
+    
     def get_template_path(self) -> str:
         """Return path to GEK CAPITAL PDF template."""
         return os.path.join(
@@ -16,6 +16,9 @@ class NSIATemplate(BasePDFTemplate):
     Identical structure to GEK CAPITAL.
     """
     
+    # Pages 1, 2, 22, 23 and 26 (see fill_page)
+    filled_pages = (0, 1, 21, 22, 25)
+    
     def get_template_path(self) -> str:
         """Return path to NSIA FINANCE PDF template."""
         return os.path.join(
@@ -5,6 +5,8 @@ Permissions personnalisées pour la plateforme XAMILA
 
 from rest_framework import permissions
 
+from .services_permissions import get_permission_matrix
+
 
 class IsAdminUser(permissions.BasePermission):
     """
@@ -132,3 +134,35 @@ class CanManageContent(permissions.BasePermission):
             request.user.is_authenticated and
             request.user.role in ['INSTRUCTOR', 'ADMIN']
         )
+
+
+class HasRolePermission(permissions.BasePermission):
+    """
+    Permission selon la matrice rôle -> permissions (RolePermission)
+    La vue déclare les codes requis dans required_permissions; tous doivent être
+    accordés au rôle de l'utilisateur. Vérification en mémoire, sans requête.
+
+    Usage:
+        permission_classes = [HasRolePermission]
+        required_permissions = ['users.view']
+    """
+    required_permissions = None
+
+    def has_permission(self, request, view):
+        if not (request.user and request.user.is_authenticated):
+            return False
+        codes = self.required_permissions
+        if codes is None:
+            codes = getattr(view, 'required_permissions', ())
+        granted = get_permission_matrix().codes(request.user.role)
+        return all(code in granted for code in codes)
+
+
+def require_permissions(*codes):
+    """
+    Classe de permission exigeant les codes donnés (vues fonctions)
+
+    Usage:
+        @permission_classes([require_permissions('users.view', 'users.edit')])
+    """
+    return type('RequirePermissions', (HasRolePermission,), {'required_permissions': codes})
@@ -9,7 +9,7 @@ from .models import (
     OTP, Contract, QuizQuestion, QuizSubmission, Stock, ResourceContent,
     Cohorte
 )
-from .models_sgi import SGIAccountTerms, SGIRating, AccountOpeningRequest
+from .models_sgi import SGIAccountTerms, SGIRating, AccountOpeningRequest, AccountOpeningJob
 from .models_permissions import Permission, RolePermission
 
 
@@ -142,6 +142,20 @@ class AccountOpeningRequestSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'customer', 'sgi', 'status', 'created_at', 'updated_at']
 
 
+class AccountOpeningJobSerializer(serializers.ModelSerializer):
+    """Serializer lecture du traitement asynchrone d'une demande d'ouverture de compte"""
+    account_opening_request_id = serializers.UUIDField(read_only=True)
+    is_finished = serializers.ReadOnlyField()
+    class Meta:
+        model = AccountOpeningJob
+        fields = [
+            'id', 'account_opening_request_id', 'status', 'stage', 'is_finished',
+            'attempts', 'max_attempts', 'next_retry_at', 'last_error', 'stage_results',
+            'created_at', 'updated_at', 'started_at', 'completed_at'
+        ]
+        read_only_fields = fields
+
+
 class ManagerContractSerializer(serializers.ModelSerializer):
     """Manager-facing contract serializer with KYC URLs and PDF link"""
     sgi = SGIListSerializer(read_only=True)
@@ -95,6 +95,7 @@ class NotificationCampaignSerializer(serializers.ModelSerializer):
     delivery_rate = serializers.SerializerMethodField()
     open_rate = serializers.ReadOnlyField()
     click_rate = serializers.ReadOnlyField()
+    fanout_progress = serializers.ReadOnlyField()
     
     # Affichage des choix
     campaign_type_display = serializers.CharField(
@@ -116,7 +117,7 @@ class NotificationCampaignSerializer(serializers.ModelSerializer):
             'delivered_count', 'opened_count', 'clicked_count',
             'created_at', 'updated_at', 'started_at', 'completed_at',
             'template_name', 'template_type', 'created_by_name',
-            'delivery_rate', 'open_rate', 'click_rate',
+            'delivery_rate', 'open_rate', 'click_rate', 'fanout_progress',
             'campaign_type_display', 'status_display', 'target_audience_display'
         ]
         read_only_fields = [
@@ -1,4 +1,4 @@
-from django.core.mail import send_mail
+from django.core.mail import EmailMultiAlternatives
 from django.conf import settings
 from django.template.loader import render_to_string
 from django.utils import timezone
@@ -10,6 +10,11 @@ from .models import (
     SGI, ClientInvestmentProfile, SGIMatchingRequest,
     ClientSGIInteraction, EmailNotification
 )
+from .utils_email import EmailBatch
+from .services_sgi_matching import (
+    get_matching_index, build_sgi_features, amount_is_compatible,
+    OBJECTIVE_SCORE, RISK_SCORE, HORIZON_SCORE, AMOUNT_SCORE, RISK_CODES, HORIZON_CODES
+)
 
 logger = logging.getLogger(__name__)
 
@@ -22,52 +27,22 @@ class SGIMatchingService:
     def __init__(self):
         self.minimum_score_threshold = 50
     
-    def find_matching_sgis(self, client_profile: ClientInvestmentProfile) -> List[Dict[str, Any]]:
+    def find_matching_sgis(self, client_profile: ClientInvestmentProfile, top_k: int = None) -> List[Dict[str, Any]]:
         """
         Trouve les SGI compatibles avec le profil client
         
         Args:
             client_profile: Profil d'investissement du client
+            top_k: Nombre maximum de SGI retournées (toutes si None)
             
         Returns:
-            Liste des SGI avec leurs scores de compatibilité
+            Liste des SGI avec leurs scores de compatibilité, par score décroissant
         """
         try:
-            # Récupérer toutes les SGI actives
-            sgis = SGI.objects.filter(is_active=True)
-            
-            results = []
-            
-            for sgi in sgis:
-                # Calculer le score de compatibilité
-                score = sgi.calculate_matching_score(client_profile)
-                
-                # Préparer les données de la SGI
-                sgi_data = {
-                    'sgi_id': str(sgi.id),
-                    'sgi_name': sgi.name,
-                    'sgi_description': sgi.description,
-                    'manager_name': sgi.manager_name,
-                    'manager_email': sgi.manager_email,
-                    'matching_score': score,
-                    'min_investment_amount': float(sgi.min_investment_amount),
-                    'max_investment_amount': float(sgi.max_investment_amount) if sgi.max_investment_amount else None,
-                    'historical_performance': float(sgi.historical_performance),
-                    'management_fees': float(sgi.management_fees),
-                    'entry_fees': float(sgi.entry_fees),
-                    'logo': sgi.logo.url if sgi.logo else None,
-                    'website': sgi.website,
-                    'is_verified': sgi.is_verified,
-                    'total_clients': sgi.total_clients,
-                    'total_assets_under_management': float(sgi.total_assets_under_management)
-                }
-                
-                results.append(sgi_data)
-            
-            # Trier par score décroissant
-            results.sort(key=lambda x: x['matching_score'], reverse=True)
-            
-            logger.info(f"Matching terminé pour {client_profile.full_name}: {len(results)} SGI évaluées")
+            index = get_matching_index()
+            results = index.match(client_profile, top_k=top_k)
+            
+            logger.info(f"Matching terminé pour {client_profile.full_name}: {len(index)} SGI évaluées")
             
             return results
             
@@ -75,6 +50,12 @@ class SGIMatchingService:
             logger.error(f"Erreur lors du matching SGI: {str(e)}")
             raise
     
+    def count_matches(self, client_profile: ClientInvestmentProfile) -> int:
+        """
+        Nombre de SGI atteignant le seuil de compatibilité pour ce profil
+        """
+        return get_matching_index().count_matches(client_profile, self.minimum_score_threshold)
+    
     def get_matching_explanation(self, sgi: SGI, client_profile: ClientInvestmentProfile) -> Dict[str, Any]:
         """
         Génère une explication détaillée du score de matching
@@ -86,6 +67,7 @@ class SGIMatchingService:
         Returns:
             Dictionnaire avec les détails du scoring
         """
+        features = build_sgi_features(sgi)
         explanation = {
             'total_score': 0,
             'criteria_breakdown': [],
@@ -95,7 +77,8 @@ class SGIMatchingService:
         # Objectif d'investissement (30 points)
         # TODO: Réactiver après ajout du champ supported_objectives
         # objective_match = client_profile.investment_objective in sgi.supported_objectives
-        objective_score = 20  # Score par défaut temporaire
+        objective_match = True
+        objective_score = OBJECTIVE_SCORE  # Score par défaut temporaire
         explanation['total_score'] += objective_score
         explanation['criteria_breakdown'].append({
             'criterion': 'Objectif d\'investissement',
@@ -106,8 +89,10 @@ class SGIMatchingService:
         })
         
         # Tolérance au risque (25 points)
-        risk_match = client_profile.risk_tolerance in sgi.supported_risk_levels
-        risk_score = 25 if risk_match else 0
+        risk_match = client_profile.risk_tolerance in RISK_CODES and bool(
+            features.risk_mask >> RISK_CODES.index(client_profile.risk_tolerance) & 1
+        )
+        risk_score = RISK_SCORE if risk_match else 0
         explanation['total_score'] += risk_score
         explanation['criteria_breakdown'].append({
             'criterion': 'Tolérance au risque',
@@ -118,8 +103,10 @@ class SGIMatchingService:
         })
         
         # Horizon d'investissement (20 points)
-        horizon_match = client_profile.investment_horizon in sgi.supported_horizons
-        horizon_score = 20 if horizon_match else 0
+        horizon_match = client_profile.investment_horizon in HORIZON_CODES and bool(
+            features.horizon_mask >> HORIZON_CODES.index(client_profile.investment_horizon) & 1
+        )
+        horizon_score = HORIZON_SCORE if horizon_match else 0
         explanation['total_score'] += horizon_score
         explanation['criteria_breakdown'].append({
             'criterion': 'Horizon d\'investissement',
@@ -130,12 +117,8 @@ class SGIMatchingService:
         })
         
         # Montant d'investissement (15 points)
-        amount_compatible = (
-            client_profile.investment_amount >= sgi.min_investment_amount and
-            (sgi.max_investment_amount is None or 
-             client_profile.investment_amount <= sgi.max_investment_amount)
-        )
-        amount_score = 15 if amount_compatible else 0
+        amount_compatible = amount_is_compatible(features, client_profile.investment_amount)
+        amount_score = AMOUNT_SCORE if amount_compatible else 0
         explanation['total_score'] += amount_score
         explanation['criteria_breakdown'].append({
             'criterion': 'Montant d\'investissement',
@@ -146,7 +129,7 @@ class SGIMatchingService:
         })
         
         # Performance historique (10 points)
-        performance_score = 10 if sgi.historical_performance >= 5 else (5 if sgi.historical_performance >= 0 else 0)
+        performance_score = features.performance_score
         explanation['total_score'] += performance_score
         explanation['criteria_breakdown'].append({
             'criterion': 'Performance historique',
@@ -196,14 +179,33 @@ class EmailNotificationService:
         }
         
         try:
-            # 1. Notification au manager SGI
-            results['manager_notification'] = self._send_manager_notification(interaction)
-            
-            # 2. Confirmation au client
-            results['client_confirmation'] = self._send_client_confirmation(interaction)
+            # Préparer les trois emails: manager SGI, client, équipe Xamila
+            prepared = {
+                'manager_notification': self._build_manager_notification(interaction),
+                'client_confirmation': self._build_client_confirmation(interaction),
+                'xamila_notification': self._build_xamila_notification(interaction),
+            }
             
-            # 3. Notification à l'équipe Xamila
-            results['xamila_notification'] = self._send_xamila_notification(interaction)
+            # Envoi groupé sur une seule connexion SMTP
+            batch = EmailBatch()
+            for key, (email, notification) in prepared.items():
+                if email is not None:
+                    batch.add(key, email)
+            sent = batch.send()
+            
+            # Enregistrer toutes les notifications en une requête
+            now = timezone.now()
+            notifications = []
+            for key, (email, notification) in prepared.items():
+                success = sent.get(key, False)
+                if email is not None:
+                    notification.status = 'SENT' if success else 'FAILED'
+                    notification.sent_at = now if success else None
+                    if not success:
+                        notification.error_message = batch.errors.get(key, '')
+                results[key] = success
+                notifications.append(notification)
+            EmailNotification.objects.bulk_create(notifications)
             
             logger.info(f"Notifications envoyées pour l'interaction {interaction.id}: {results}")
             
@@ -212,9 +214,21 @@ class EmailNotificationService:
         
         return results
     
-    def _send_manager_notification(self, interaction: ClientSGIInteraction) -> bool:
+    def _build_message(self, subject, message, recipient_list, html_message=None) -> EmailMultiAlternatives:
+        """Construit un email texte (+ HTML optionnel) comme send_mail"""
+        email = EmailMultiAlternatives(
+            subject=subject,
+            body=message,
+            from_email=self.from_email,
+            to=recipient_list
+        )
+        if html_message:
+            email.attach_alternative(html_message, 'text/html')
+        return email
+    
+    def _build_manager_notification(self, interaction: ClientSGIInteraction):
         """
-        Envoie une notification au manager de la SGI
+        Prépare la notification au manager de la SGI
         """
         try:
             client = interaction.client_profile
@@ -243,36 +257,27 @@ class EmailNotificationService:
             message = self._generate_manager_email_content(context)
             html_message = self._generate_manager_email_html(context)
             
-            # Envoyer l'email
-            success = send_mail(
-                subject=subject,
-                message=message,
-                from_email=self.from_email,
-                recipient_list=[sgi.manager_email],
-                html_message=html_message,
-                fail_silently=False
-            )
+            # Préparer l'email (envoyé dans le lot commun)
+            email = self._build_message(subject, message, [sgi.manager_email], html_message)
             
-            # Enregistrer la notification
-            EmailNotification.objects.create(
+            # Notification enregistrée après l'envoi du lot
+            notification = EmailNotification(
                 to_email=sgi.manager_email,
                 from_email=self.from_email,
                 subject=subject,
                 message=message,
                 html_message=html_message,
                 notification_type='SGI_MANAGER',
-                client_interaction=interaction,
-                status='SENT' if success else 'FAILED',
-                sent_at=timezone.now() if success else None
+                client_interaction=interaction
             )
             
-            return success
+            return email, notification
             
         except Exception as e:
-            logger.error(f"Erreur envoi notification manager: {str(e)}")
+            logger.error(f"Erreur préparation notification manager: {str(e)}")
             
             # Enregistrer l'erreur
-            EmailNotification.objects.create(
+            return None, EmailNotification(
                 to_email=interaction.sgi.manager_email,
                 from_email=self.from_email,
                 subject=f"Nouveau client intéressé - {interaction.client_profile.full_name}",
@@ -282,12 +287,10 @@ class EmailNotificationService:
                 status='FAILED',
                 error_message=str(e)
             )
-            
-            return False
     
-    def _send_client_confirmation(self, interaction: ClientSGIInteraction) -> bool:
+    def _build_client_confirmation(self, interaction: ClientSGIInteraction):
         """
-        Envoie une confirmation au client
+        Prépare la confirmation au client
         """
         try:
             client = interaction.client_profile
@@ -317,36 +320,27 @@ class EmailNotificationService:
             message = self._generate_client_email_content(context)
             html_message = self._generate_client_email_html(context)
             
-            # Envoyer l'email
-            success = send_mail(
-                subject=subject,
-                message=message,
-                from_email=self.from_email,
-                recipient_list=[client.user.email],
-                html_message=html_message,
-                fail_silently=False
-            )
+            # Préparer l'email (envoyé dans le lot commun)
+            email = self._build_message(subject, message, [client.user.email], html_message)
             
-            # Enregistrer la notification
-            EmailNotification.objects.create(
+            # Notification enregistrée après l'envoi du lot
+            notification = EmailNotification(
                 to_email=client.user.email,
                 from_email=self.from_email,
                 subject=subject,
                 message=message,
                 html_message=html_message,
                 notification_type='CLIENT_CONFIRMATION',
-                client_interaction=interaction,
-                status='SENT' if success else 'FAILED',
-                sent_at=timezone.now() if success else None
+                client_interaction=interaction
             )
             
-            return success
+            return email, notification
             
         except Exception as e:
-            logger.error(f"Erreur envoi confirmation client: {str(e)}")
+            logger.error(f"Erreur préparation confirmation client: {str(e)}")
             
             # Enregistrer l'erreur
-            EmailNotification.objects.create(
+            return None, EmailNotification(
                 to_email=interaction.client_profile.user.email,
                 from_email=self.from_email,
                 subject=f"Confirmation de votre intérêt pour {interaction.sgi.name}",
@@ -356,12 +350,10 @@ class EmailNotificationService:
                 status='FAILED',
                 error_message=str(e)
             )
-            
-            return False
     
-    def _send_xamila_notification(self, interaction: ClientSGIInteraction) -> bool:
+    def _build_xamila_notification(self, interaction: ClientSGIInteraction):
         """
-        Envoie une notification à l'équipe Xamila
+        Prépare la notification à l'équipe Xamila
         """
         try:
             client = interaction.client_profile
@@ -386,34 +378,26 @@ class EmailNotificationService:
             # Générer le message
             message = self._generate_xamila_email_content(context)
             
-            # Envoyer l'email
-            success = send_mail(
-                subject=subject,
-                message=message,
-                from_email=self.from_email,
-                recipient_list=[self.xamila_email],
-                fail_silently=False
-            )
+            # Préparer l'email (envoyé dans le lot commun)
+            email = self._build_message(subject, message, [self.xamila_email], None)
             
-            # Enregistrer la notification
-            EmailNotification.objects.create(
+            # Notification enregistrée après l'envoi du lot
+            notification = EmailNotification(
                 to_email=self.xamila_email,
                 from_email=self.from_email,
                 subject=subject,
                 message=message,
                 notification_type='XAMILA_NOTIFICATION',
-                client_interaction=interaction,
-                status='SENT' if success else 'FAILED',
-                sent_at=timezone.now() if success else None
+                client_interaction=interaction
             )
             
-            return success
+            return email, notification
             
         except Exception as e:
-            logger.error(f"Erreur envoi notification Xamila: {str(e)}")
+            logger.error(f"Erreur préparation notification Xamila: {str(e)}")
             
             # Enregistrer l'erreur
-            EmailNotification.objects.create(
+            return None, EmailNotification(
                 to_email=self.xamila_email,
                 from_email=self.from_email,
                 subject=f"Nouvelle sélection SGI - {interaction.client_profile.full_name}",
@@ -423,8 +407,6 @@ class EmailNotificationService:
                 status='FAILED',
                 error_message=str(e)
             )
-            
-            return False
     
     def _calculate_priority(self, investment_amount) -> str:
         """Calcule la priorité basée sur le montant d'investissement"""
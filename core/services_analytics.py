@@ -0,0 +1,229 @@
+"""
+Moteur de requêtes analytiques du back-office
+Les rapports s'expriment en quelques agrégations groupées (GROUP BY, Count/Sum
+conditionnels) au lieu d'une requête par SGI ou par jour, et leurs résultats sont
+mis en cache quelques instants, par rapport et par paramètres.
+"""
+from datetime import datetime, time, timedelta
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Avg, Count, DateField, Q, Sum
+from django.db.models.functions import Trunc
+from django.utils import timezone
+import logging
+
+from .models import SGI, Contract
+from .utils_cache import make_cache_key
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+
+ANALYTICS_NAMESPACE = 'admin_analytics'
+ANALYTICS_CACHE_TTL = 60  # secondes
+BUCKETS = ('day', 'week', 'month')
+
+
+def cached_report(name, params, build, ttl=ANALYTICS_CACHE_TTL):
+    """
+    Résultat d'un rapport, recalculé au plus une fois par TTL pour les mêmes paramètres
+
+    Args:
+        name: Nom du rapport
+        params: Paramètres sérialisables qui identifient le résultat
+        build: Fonction sans argument qui calcule le rapport
+    """
+    key = make_cache_key(f"{ANALYTICS_NAMESPACE}:{name}", params)
+    report = cache.get(key)
+    if report is None:
+        report = build()
+        cache.set(key, report, ttl)
+    return report
+
+
+# ----------------------------------------------------------------------
+# Séries temporelles
+# ----------------------------------------------------------------------
+
+def _bucket_start(day, bucket):
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def _next_bucket(day, bucket):
+    if bucket == 'week':
+        return day + timedelta(days=7)
+    if bucket == 'month':
+        return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return day + timedelta(days=1)
+
+
+def _as_date(value):
+    if isinstance(value, datetime):
+        return timezone.localdate(value) if timezone.is_aware(value) else value.date()
+    return value
+
+
+def time_series(queryset, date_field, start, end, bucket='day', value=None):
+    """
+    Série agrégée par jour, semaine (lundi) ou mois, en une requête groupée
+
+    Les périodes sans ligne valent 0.
+
+    Args:
+        queryset: Lignes à agréger
+        date_field: Champ date/datetime qui place chaque ligne dans une période
+        start, end: Premier et dernier jour inclus
+        bucket: 'day', 'week' ou 'month'
+        value: Agrégat par période (Count('pk') par défaut)
+
+    Returns:
+        Liste [{date, count}] dans l'ordre chronologique
+    """
+    if bucket not in BUCKETS:
+        raise ValueError(f"Période inconnue: {bucket}")
+    tz = timezone.get_current_timezone()
+    low = timezone.make_aware(datetime.combine(start, time.min), tz)
+    high = timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min), tz)
+
+    rows = queryset.filter(**{f'{date_field}__gte': low, f'{date_field}__lt': high}).annotate(
+        period=Trunc(date_field, bucket, output_field=DateField())
+    ).order_by().values('period').annotate(total=value or Count('pk')).values_list('period', 'total')
+    totals = {_as_date(period): total for period, total in rows}
+
+    series = []
+    period = _bucket_start(start, bucket)
+    while period <= end:
+        series.append({'date': period.isoformat(), 'count': totals.get(period) or 0})
+        period = _next_bucket(period, bucket)
+    return series
+
+
+def _rate(part, total):
+    return round((part / total * 100), 2) if total > 0 else 0
+
+
+# ----------------------------------------------------------------------
+# Rapports
+# ----------------------------------------------------------------------
+
+def sgi_analytics(days=30):
+    """
+    Analytics des SGI en trois requêtes: vue d'ensemble, performance groupée par SGI
+    (Count/Sum/Avg conditionnels sur les contrats), évolution des inscriptions
+    """
+    def build():
+        now = timezone.now()
+        overview = SGI.objects.aggregate(total=Count('id'), active=Count('id', filter=Q(is_active=True)))
+
+        approved = Q(contracts__status='APPROVED')
+        rows = SGI.objects.filter(is_active=True).annotate(
+            total_contracts=Count('contracts'),
+            approved_contracts=Count('contracts', filter=approved),
+            total_investment=Sum('contracts__investment_amount', filter=approved),
+            average_investment=Avg('contracts__investment_amount', filter=approved),
+        ).order_by().values(
+            'id', 'name', 'manager_name', 'created_at', 'total_contracts', 'approved_contracts',
+            'total_investment', 'average_investment'
+        )
+        performance = [
+            {
+                'sgi_id': row['id'],
+                'sgi_name': row['name'],
+                'manager': row['manager_name'],
+                'total_contracts': row['total_contracts'],
+                'approved_contracts': row['approved_contracts'],
+                'approval_rate': _rate(row['approved_contracts'], row['total_contracts']),
+                'total_investment': row['total_investment'] or 0,
+                'average_investment': row['average_investment'] or 0,
+                'created_at': row['created_at']
+            }
+            for row in rows
+        ]
+        performance.sort(key=lambda x: x['approval_rate'], reverse=True)
+
+        today = timezone.localdate()
+        return {
+            'overview': {
+                'total_sgis': overview['total'],
+                'active_sgis': overview['active'],
+                'pending_sgis': overview['total'] - overview['active'],
+                'activation_rate': _rate(overview['active'], overview['total'])
+            },
+            'performance_ranking': performance,
+            'top_performers': performance[:5],
+            'registration_evolution': time_series(
+                SGI.objects.all(), 'created_at', today - timedelta(days=days - 1), today
+            ),
+            'last_updated': now.isoformat()
+        }
+
+    return cached_report('sgi_analytics', {'days': days}, build)
+
+
+def business_intelligence():
+    """
+    Métriques BI en trois requêtes: agrégat conditionnel des utilisateurs, des
+    contrats, et répartition par pays
+    """
+    def build():
+        now = timezone.now()
+        current_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        last_month = (current_month - timedelta(days=1)).replace(day=1)
+
+        users = User.objects.aggregate(
+            total=Count('id'),
+            verified=Count('id', filter=Q(is_verified=True)),
+            current_month=Count('id', filter=Q(created_at__gte=current_month)),
+            last_month=Count('id', filter=Q(created_at__gte=last_month, created_at__lt=current_month)),
+            active_7d=Count('id', filter=Q(last_login__gte=now - timedelta(days=7))),
+            active_30d=Count('id', filter=Q(last_login__gte=now - timedelta(days=30))),
+        )
+        approved = Q(status='APPROVED')
+        contracts = Contract.objects.aggregate(
+            total=Count('id'),
+            approved=Count('id', filter=approved),
+            customers=Count('customer', distinct=True),
+            total_investment=Sum('investment_amount', filter=approved),
+            monthly_investment=Sum('investment_amount', filter=approved & Q(updated_at__gte=current_month)),
+        )
+        country_stats = User.objects.values('country_of_residence').annotate(
+            count=Count('id')
+        ).order_by('-count')[:10]
+
+        total_investment = contracts['total_investment'] or 0
+        user_growth_rate = 0
+        if users['last_month'] > 0:
+            user_growth_rate = round(((users['current_month'] - users['last_month']) / users['last_month']) * 100, 2)
+
+        return {
+            'growth_metrics': {
+                'user_growth_rate_monthly': user_growth_rate,
+                'new_users_current_month': users['current_month'],
+                'new_users_last_month': users['last_month']
+            },
+            'engagement_metrics': {
+                'active_users_7d': users['active_7d'],
+                'active_users_30d': users['active_30d'],
+                'engagement_rate_7d': _rate(users['active_7d'], users['total']),
+                'engagement_rate_30d': _rate(users['active_30d'], users['total'])
+            },
+            'financial_metrics': {
+                'total_investment': float(total_investment),
+                'monthly_investment': float(contracts['monthly_investment'] or 0),
+                'average_contract_value': float(total_investment / contracts['approved']) if contracts['approved'] > 0 else 0
+            },
+            'conversion_funnel': {
+                'registration_to_verification': _rate(users['verified'], users['total']),
+                'verification_to_contract': _rate(contracts['customers'], users['verified']),
+                'contract_to_approval': _rate(contracts['approved'], contracts['total'])
+            },
+            'geographic_distribution': list(country_stats),
+            'generated_at': now.isoformat()
+        }
+
+    return cached_report('business_intelligence', {}, build)
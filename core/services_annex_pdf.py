@@ -14,7 +14,6 @@ from reportlab.lib.colors import HexColor
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.lib.utils import ImageReader
-from pypdf import PdfWriter
 from django.conf import settings
 import os
 from PIL import Image
@@ -22,6 +21,10 @@ from PIL import Image
 logger = logging.getLogger(__name__)
 
 
+class AnnexRenderError(Exception):
+    """Page d'annexe impossible à dessiner (erreur déterministe: inutile de réessayer)"""
+
+
 class AnnexPDFService:
     """
     Génère un PDF contenant uniquement les annexes (pages 21, 22, 23, 26)
@@ -69,6 +72,9 @@ class AnnexPDFService:
     def _base64_to_image(self, base64_string):
         """
         Convertit une chaîne base64 en objet ImageReader utilisable par ReportLab.
+        Chaque image n'est décodée qu'une fois par génération: une même signature
+        réutilisée sur plusieurs pages partage le même ImageReader (et donc le même
+        objet image dans le PDF).
         
         Args:
             base64_string: Chaîne base64 (avec ou sans préfixe data:image/png;base64,)
@@ -76,30 +82,34 @@ class AnnexPDFService:
         Returns:
             ImageReader object ou None si erreur
         """
+        cache = getattr(self, '_image_cache', None)
+        if cache is not None and base64_string in cache:
+            return cache[base64_string]
+        
         try:
             # Supprimer le préfixe data:image/png;base64, si présent
-            if ',' in base64_string:
-                base64_string = base64_string.split(',', 1)[1]
-            
-            # Décoder le base64
-            image_data = base64.b64decode(base64_string)
-            
-            # Créer un objet Image PIL
-            image = Image.open(BytesIO(image_data))
-            
-            # Convertir en ImageReader pour ReportLab
-            image_buffer = BytesIO()
-            image.save(image_buffer, format='PNG')
-            image_buffer.seek(0)
+            data = base64_string
+            if ',' in data:
+                data = data.split(',', 1)[1]
             
-            return ImageReader(image_buffer)
+            # Décoder le base64 et lire directement les octets (PNG/JPEG),
+            # sans ré-encodage intermédiaire par PIL
+            image_data = base64.b64decode(data)
+            image = ImageReader(BytesIO(image_data))
+            image.getSize()  # Valide l'image dès le décodage
         except Exception as e:
             logger.error(f"Erreur conversion base64 vers image: {e}")
-            return None
+            image = None
+        
+        if cache is not None:
+            cache[base64_string] = image
+        return image
     
     def generate_annexes_pdf(self, aor, annex_data: dict) -> BytesIO:
         """
         Génère un PDF avec les 4 pages d'annexes remplies.
+        Toutes les pages sont dessinées sur un seul canvas, sans relecture PDF.
+        Si une page échoue, aucun PDF n'est produit (AnnexRenderError).
         
         Args:
             aor: AccountOpeningRequest instance
@@ -107,42 +117,43 @@ class AnnexPDFService:
             
         Returns:
             BytesIO contenant le PDF des annexes
+            
+        Raises:
+            AnnexRenderError: une page n'a pas pu être dessinée
         """
-        writer = PdfWriter()
+        output = BytesIO()
+        c = canvas.Canvas(output, pagesize=A4)
         
-        # Générer chaque page d'annexe
+        # Dessiner chaque page d'annexe
         pages = [
-            ('Page 21 - Texte légal et signatures', self._generate_page21),
-            ('Page 22 - Formulaire d\'ouverture', self._generate_page22),
-            ('Page 23 - Caractéristiques du compte', self._generate_page23),
-            ('Page 26 - Procuration', self._generate_page26),
+            ('Page 21 - Texte légal et signatures', self._draw_page21),
+            ('Page 22 - Formulaire d\'ouverture', self._draw_page22),
+            ('Page 23 - Caractéristiques du compte', self._draw_page23),
+            ('Page 26 - Procuration', self._draw_page26),
         ]
         
-        for title, generator_func in pages:
-            try:
-                logger.info(f"Génération de {title}...")
-                page_buffer = generator_func(aor, annex_data)
-                if page_buffer:
-                    from pypdf import PdfReader
-                    reader = PdfReader(page_buffer)
-                    for page in reader.pages:
-                        writer.add_page(page)
+        self._image_cache = {}
+        try:
+            for title, draw_func in pages:
+                try:
+                    logger.info(f"Génération de {title}...")
+                    draw_func(c, aor, annex_data)
                     logger.info(f"✅ {title} générée avec succès")
-                else:
-                    logger.warning(f"⚠️ {title} - buffer vide")
-            except Exception as e:
-                logger.error(f"❌ Erreur génération {title}: {e}", exc_info=True)
+                except Exception as e:
+                    # Une page à moitié dessinée ne peut pas être retirée du canvas:
+                    # le rendu est abandonné plutôt que d'émettre une annexe incomplète
+                    logger.error(f"❌ Erreur génération {title}: {e}", exc_info=True)
+                    raise AnnexRenderError(f"{title}: {e}") from e
+        finally:
+            self._image_cache = None
         
         # Écrire le PDF final
-        output = BytesIO()
-        writer.write(output)
+        c.save()
         output.seek(0)
         return output
     
-    def _generate_page21(self, aor, annex_data: dict) -> BytesIO:
+    def _draw_page21(self, c, aor, annex_data: dict):
         """Génère la page 21 - Fin du contrat (Articles 30 et 34)"""
-        buffer = BytesIO()
-        c = canvas.Canvas(buffer, pagesize=A4)
         width, height = A4
         
         p21 = annex_data.get('page21', {})
@@ -307,14 +318,9 @@ class AnnexPDFService:
                 c.drawString(125*mm, sig_y + 8*mm, "[Erreur signature]")
         
         c.showPage()
-        c.save()
-        buffer.seek(0)
-        return buffer
     
-    def _generate_page22(self, aor, annex_data: dict) -> BytesIO:
+    def _draw_page22(self, c, aor, annex_data: dict):
         """Génère la page 22 - Formulaire d'ouverture avec design exact"""
-        buffer = BytesIO()
-        c = canvas.Canvas(buffer, pagesize=A4)
         width, height = A4
         
         p22 = annex_data.get('page22', {})
@@ -386,9 +392,9 @@ class AnnexPDFService:
             try:
                 logger.info(f"Tentative de chargement depuis fichier: {aor.photo.name}")
                 aor.photo.seek(0)
-                photo_img = Image.open(aor.photo)
+                photo_img = ImageReader(Image.open(aor.photo))
                 photo_source = "file"
-                logger.info(f"✅ Photo chargée depuis fichier: {photo_img.size[0]}x{photo_img.size[1]} pixels")
+                logger.info(f"✅ Photo chargée depuis fichier: {photo_img.getSize()[0]}x{photo_img.getSize()[1]} pixels")
             except Exception as e:
                 logger.warning(f"Impossible de charger depuis fichier: {e}")
         
@@ -407,17 +413,11 @@ class AnnexPDFService:
                 
                 if photo_base64:
                     logger.info("Tentative de chargement depuis base64...")
-                    # Supprimer le préfixe data:image si présent
-                    if ',' in photo_base64:
-                        photo_base64 = photo_base64.split(',', 1)[1]
-                    
-                    # Décoder le base64
-                    import base64
-                    photo_bytes = base64.b64decode(photo_base64)
-                    photo_buffer = BytesIO(photo_bytes)
-                    photo_img = Image.open(photo_buffer)
-                    photo_source = "base64"
-                    logger.info(f"✅ Photo chargée depuis base64: {photo_img.size[0]}x{photo_img.size[1]} pixels")
+                    # Décoder le base64 (une seule fois par génération)
+                    photo_img = self._base64_to_image(photo_base64)
+                    if photo_img:
+                        photo_source = "base64"
+                        logger.info(f"✅ Photo chargée depuis base64: {photo_img.getSize()[0]}x{photo_img.getSize()[1]} pixels")
             except Exception as e:
                 logger.warning(f"Impossible de charger depuis base64: {e}")
         
@@ -434,7 +434,7 @@ class AnnexPDFService:
                 photo_height_pt = photo_height_mm * mm
                 
                 # Calculer le ratio pour maintenir les proportions
-                img_width, img_height = photo_img.size
+                img_width, img_height = photo_img.getSize()
                 img_ratio = img_width / img_height
                 box_ratio = photo_width_pt / photo_height_pt
                 
@@ -453,15 +453,8 @@ class AnnexPDFService:
                 photo_x = photo_box_x + (30*mm - final_width) / 2
                 photo_y = photo_box_y - 35*mm + (40*mm - final_height) / 2
                 
-                # Créer un ImageReader depuis PIL Image
-                # Convertir PIL Image en buffer pour ImageReader
-                img_buffer = BytesIO()
-                photo_img.save(img_buffer, format='PNG')
-                img_buffer.seek(0)
-                photo_reader = ImageReader(img_buffer)
-                
                 # Dessiner la photo
-                c.drawImage(photo_reader, photo_x, photo_y, width=final_width, height=final_height, preserveAspectRatio=True)
+                c.drawImage(photo_img, photo_x, photo_y, width=final_width, height=final_height, preserveAspectRatio=True)
                 
                 logger.info(f"✅ Photo ajoutée sur l'annexe page 22 à la position ({photo_x}, {photo_y})")
             except Exception as e:
@@ -666,14 +659,9 @@ class AnnexPDFService:
         c.drawString(22*mm, y, f"Email : {email}")
         
         c.showPage()
-        c.save()
-        buffer.seek(0)
-        return buffer
     
-    def _generate_page23(self, aor, annex_data: dict) -> BytesIO:
+    def _draw_page23(self, c, aor, annex_data: dict):
         """Génère la page 23 - Caractéristiques du compte"""
-        buffer = BytesIO()
-        c = canvas.Canvas(buffer, pagesize=A4)
         width, height = A4
         
         p23 = annex_data.get('page23', {})
@@ -809,14 +797,9 @@ class AnnexPDFService:
                 c.drawString(35*mm, sig_y + 10*mm, "[Erreur signature]")
         
         c.showPage()
-        c.save()
-        buffer.seek(0)
-        return buffer
     
-    def _generate_page26(self, aor, annex_data: dict) -> BytesIO:
+    def _draw_page26(self, c, aor, annex_data: dict):
         """Génère la page 26 - Procuration"""
-        buffer = BytesIO()
-        c = canvas.Canvas(buffer, pagesize=A4)
         width, height = A4
         
         p26 = annex_data.get('page26', {})
@@ -985,6 +968,3 @@ class AnnexPDFService:
                     c.drawString(125*mm, sig_y + 12*mm, "[Erreur signature]")
         
         c.showPage()
-        c.save()
-        buffer.seek(0)
-        return buffer
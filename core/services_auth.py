@@ -0,0 +1,104 @@
+"""
+Authentification par identifiant (email ou téléphone)
+L'identifiant est normalisé une fois, puis résolu par une seule requête d'égalité
+sur la colonne indexée qui lui correspond (email unique, phone indexé). Le mot de
+passe n'est haché qu'une fois par tentative, utilisateur trouvé ou non.
+"""
+from django.contrib.auth import get_user_model
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+
+EMAIL = 'email'
+PHONE = 'phone'
+
+EMAIL_PATTERN = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+PHONE_PATTERN = re.compile(r'^\+?\d{8,15}$')
+PHONE_SEPARATORS = re.compile(r'[\s\-\(\)\.]')
+
+# Champs de la réponse de connexion en mode minimal
+MINIMAL_USER_FIELDS = ('id', 'email', 'first_name', 'last_name', 'role', 'is_verified')
+
+
+def clean_phone(phone):
+    """Retire espaces, tirets, points et parenthèses"""
+    return PHONE_SEPARATORS.sub('', phone)
+
+
+def international_phone(phone):
+    """
+    Forme internationale historique du backend EmailOrPhoneBackend: numéro
+    national à 9-10 chiffres préfixé par +33
+    """
+    normalized = clean_phone(phone)
+    if normalized.startswith('0'):
+        return '+33' + normalized[1:]
+    if normalized.startswith('33'):
+        return '+' + normalized
+    if not normalized.startswith('+') and len(normalized) in [9, 10]:
+        return '+33' + normalized
+    return normalized
+
+
+def normalize_identifier(identifier):
+    """
+    Colonne et valeurs à rechercher pour un identifiant de connexion
+
+    Returns:
+        (EMAIL, [email]) ou (PHONE, [numéro saisi nettoyé, forme internationale]),
+        (None, []) si l'identifiant n'est ni un email ni un téléphone
+    """
+    value = (identifier or '').strip()
+    if EMAIL_PATTERN.match(value):
+        return EMAIL, [User.objects.normalize_email(value)]
+    phone = clean_phone(value)
+    if PHONE_PATTERN.match(phone):
+        return PHONE, list(dict.fromkeys([phone, international_phone(phone)]))
+    return None, []
+
+
+def resolve_user(identifier):
+    """
+    Utilisateur correspondant à l'identifiant, en une requête au plus
+
+    Un numéro partagé par plusieurs comptes ne désigne personne.
+    """
+    field, values = normalize_identifier(identifier)
+    if field is None:
+        return None
+    users = list(User.objects.filter(**{f'{field}__in': values})[:2])
+    if len(users) != 1:
+        if users:
+            logger.warning(f"Connexion refusée: identifiant {field} partagé par plusieurs comptes")
+        return None
+    return users[0]
+
+
+def authenticate_identifier(identifier, password):
+    """
+    Vérifie un couple identifiant / mot de passe
+
+    Sans utilisateur, le mot de passe est tout de même haché (comme ModelBackend)
+    pour que la durée de réponse ne révèle pas l'existence du compte.
+
+    Returns:
+        L'utilisateur (actif ou non) si le mot de passe est correct, sinon None
+    """
+    if not password:
+        return None
+    user = resolve_user(identifier)
+    if user is None:
+        User().set_password(password)
+        return None
+    return user if user.check_password(password) else None
+
+
+def minimal_user_payload(user):
+    """Représentation réduite de l'utilisateur connecté (sans UserSerializer)"""
+    data = {field: getattr(user, field) for field in MINIMAL_USER_FIELDS}
+    data['id'] = str(data['id'])
+    return data
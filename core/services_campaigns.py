@@ -0,0 +1,249 @@
+"""
+Diffusion des campagnes de notifications
+Les destinataires sont parcourus par tranches d'identifiants, les préférences
+chargées une fois par tranche et les templates compilés une fois par campagne.
+Notifications et entrées de file sont créées par bulk_create, hors de la requête.
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.template import Context, Template
+from django.utils import timezone
+import logging
+
+from .models_notifications import NotificationCampaign, Notification, NotificationPreference, NotificationQueue
+from .services_notification_inbox import UnreadCounter
+from .services_notification_stream import publish_notifications
+from .utils_tasks import run_in_background
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+
+CAMPAIGN_CHUNK_SIZE = 1000
+CAMPAIGN_PROGRESS_TIMEOUT = 7 * 86400
+CAMPAIGN_LOCK_TIMEOUT = 3600
+
+# Priorité de file (NotificationQueue.priority): plus faible = plus prioritaire
+QUEUE_PRIORITIES = {
+    'URGENT': 10,
+    'HIGH': 50,
+    'NORMAL': 100,
+    'LOW': 200,
+}
+
+_RECIPIENT_FIELDS = ('id', 'username', 'email', 'first_name', 'last_name')
+
+
+def campaign_recipients(campaign):
+    """Destinataires d'une campagne (queryset non évalué)"""
+    if campaign.target_audience == 'ALL_USERS':
+        return User.objects.filter(is_active=True)
+    elif campaign.target_audience == 'CUSTOMERS':
+        return User.objects.filter(role='CUSTOMER', is_active=True)
+    elif campaign.target_audience == 'SGI_MANAGERS':
+        return User.objects.filter(role='SGI_MANAGER', is_active=True)
+    elif campaign.target_audience == 'STUDENTS':
+        return User.objects.filter(role='STUDENT', is_active=True)
+    elif campaign.target_audience == 'CUSTOM':
+        queryset = User.objects.filter(is_active=True)
+        filters = campaign.custom_audience_filter
+
+        if 'roles' in filters:
+            queryset = queryset.filter(role__in=filters['roles'])
+        if 'registration_date_after' in filters:
+            queryset = queryset.filter(date_joined__gte=filters['registration_date_after'])
+
+        return queryset
+
+    return User.objects.none()
+
+
+def _progress_key(campaign_id):
+    return f"campaign_fanout:{campaign_id}"
+
+
+def get_campaign_progress(campaign_id):
+    """
+    Avancement de la diffusion d'une campagne
+
+    Returns:
+        Dict {state, processed, created, skipped} ou None si aucune diffusion connue
+    """
+    return cache.get(_progress_key(campaign_id))
+
+
+def _compile(template_string):
+    if not template_string:
+        return None
+    try:
+        return Template(template_string)
+    except Exception:
+        logger.warning("Template de campagne invalide, texte brut utilisé")
+        return template_string
+
+
+def _render(compiled, context):
+    if compiled is None:
+        return ''
+    if isinstance(compiled, str):
+        return compiled
+    try:
+        return compiled.render(context)
+    except Exception:
+        return compiled.source
+
+
+class CampaignFanOut:
+    """
+    Création des notifications d'une campagne, tranche par tranche
+
+    Reprenable: la diffusion repart après le plus grand identifiant de destinataire
+    déjà notifié pour la campagne, si bien qu'un worker interrompu ne crée pas de doublons.
+    """
+
+    def __init__(self, campaign, chunk_size=CAMPAIGN_CHUNK_SIZE):
+        self.campaign = campaign
+        self.chunk_size = chunk_size
+        self.template = campaign.template
+        self.subject = _compile(self.template.subject_template)
+        self.body = _compile(self.template.body_template)
+        self.priority = 'NORMAL'
+        self.current_date = timezone.now().strftime('%d/%m/%Y')
+
+    def _allowed(self, preference):
+        """Le destinataire accepte-t-il ce canal pour la catégorie du template"""
+        if preference is None:
+            return True
+        return preference.is_channel_enabled(self.template.template_type, self.template.category)
+
+    def _build(self, recipient):
+        context = Context({
+            'user_name': f"{recipient['first_name']} {recipient['last_name']}".strip() or recipient['username'],
+            'user_email': recipient['email'],
+            'user_first_name': recipient['first_name'],
+            'user_last_name': recipient['last_name'],
+            'current_date': self.current_date,
+        })
+        return Notification(
+            recipient_id=recipient['id'],
+            campaign_id=self.campaign.id,
+            notification_type=self.template.template_type,
+            subject=_render(self.subject, context)[:500],
+            message=_render(self.body, context),
+            priority=self.priority,
+            scheduled_at=self.campaign.scheduled_at,
+        )
+
+    def _save_progress(self, progress):
+        cache.set(_progress_key(self.campaign.id), progress, CAMPAIGN_PROGRESS_TIMEOUT)
+
+    def run(self):
+        """
+        Diffuse la campagne jusqu'au dernier destinataire
+
+        Returns:
+            Dict d'avancement {state, processed, created, skipped}
+        """
+        recipients = campaign_recipients(self.campaign).order_by('id')
+        last_id = Notification.objects.filter(campaign=self.campaign).order_by('-recipient_id').values_list(
+            'recipient_id', flat=True
+        ).first()
+
+        progress = get_campaign_progress(self.campaign.id) or {}
+        progress.update({'state': 'RUNNING'})
+        for field in ('processed', 'created', 'skipped'):
+            progress.setdefault(field, 0)
+        self._save_progress(progress)
+
+        queue_priority = QUEUE_PRIORITIES[self.priority]
+        while True:
+            chunk = recipients.filter(id__gt=last_id) if last_id is not None else recipients
+            chunk = list(chunk.values(*_RECIPIENT_FIELDS)[:self.chunk_size])
+            if not chunk:
+                break
+
+            ids = [recipient['id'] for recipient in chunk]
+            preferences = {
+                preference.user_id: preference
+                for preference in NotificationPreference.objects.filter(user_id__in=ids).only(
+                    'user_id', 'preferences', 'global_opt_out'
+                )
+            }
+
+            notifications = [
+                self._build(recipient)
+                for recipient in chunk
+                if self._allowed(preferences.get(recipient['id']))
+            ]
+            with transaction.atomic():
+                Notification.objects.bulk_create(notifications, batch_size=self.chunk_size)
+                NotificationQueue.objects.bulk_create([
+                    NotificationQueue(notification=notification, priority=queue_priority)
+                    for notification in notifications
+                ], batch_size=self.chunk_size)
+                if self.template.template_type == 'IN_APP':
+                    # bulk_create n'émet pas post_save: compteurs de non lues mis à jour ici
+                    UnreadCounter().increment_many({
+                        notification.recipient_id: 1 for notification in notifications
+                    })
+                    publish_notifications(notifications)
+
+            last_id = ids[-1]
+            progress['processed'] += len(chunk)
+            progress['created'] += len(notifications)
+            progress['skipped'] += len(chunk) - len(notifications)
+            self._save_progress(progress)
+
+        progress['state'] = 'DONE'
+        self._save_progress(progress)
+        logger.info(
+            f"Campagne {self.campaign.id} diffusée: {progress['created']} notification(s), "
+            f"{progress['skipped']} destinataire(s) désabonné(s)"
+        )
+        return progress
+
+
+def start_campaign(campaign):
+    """
+    Passe une campagne en ACTIVE et programme sa diffusion après le commit
+
+    Returns:
+        bool: True si la diffusion est lancée dans ce processus, False si laissée au worker
+    """
+    campaign.status = 'ACTIVE'
+    campaign.started_at = timezone.now()
+    campaign.total_recipients = campaign_recipients(campaign).count()
+    campaign.save(update_fields=['status', 'started_at', 'total_recipients', 'updated_at'])
+    cache.set(
+        _progress_key(campaign.id),
+        {'state': 'QUEUED', 'processed': 0, 'created': 0, 'skipped': 0},
+        CAMPAIGN_PROGRESS_TIMEOUT
+    )
+    return run_in_background(fan_out_campaign, campaign.id)
+
+
+def fan_out_campaign(campaign_id):
+    """Diffuse une campagne active (point d'entrée des tâches d'arrière-plan)"""
+    lock_key = f"{_progress_key(campaign_id)}:lock"
+    if not cache.add(lock_key, 1, CAMPAIGN_LOCK_TIMEOUT):
+        # Déjà diffusée par un autre thread ou worker
+        return None
+    try:
+        campaign = NotificationCampaign.objects.select_related('template').get(id=campaign_id)
+        if campaign.status != 'ACTIVE':
+            return None
+        return CampaignFanOut(campaign).run()
+    finally:
+        cache.delete(lock_key)
+
+
+def pending_campaign_ids():
+    """Campagnes actives dont la diffusion n'est pas connue comme terminée"""
+    ids = []
+    for campaign_id in NotificationCampaign.objects.filter(status='ACTIVE').values_list('id', flat=True):
+        progress = get_campaign_progress(campaign_id)
+        if progress is None or progress.get('state') != 'DONE':
+            ids.append(campaign_id)
+    return ids
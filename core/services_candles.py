@@ -0,0 +1,234 @@
+"""
+Bougies multi-résolutions de PriceHistory
+Les bougies 1MIN sont agrégées incrémentalement en 5MIN/15MIN/1HOUR/1DAY/1WEEK/1MONTH.
+Les lectures choisissent la résolution stockée la plus proche de la demande et
+sous-échantillonnent côté serveur au-delà d'un nombre maximum de points.
+"""
+from collections import OrderedDict
+from datetime import timedelta
+from django.db.models import Count
+from django.utils import timezone
+import logging
+import math
+
+from .models_trading import PriceHistory
+
+logger = logging.getLogger(__name__)
+
+
+# Résolutions de la plus fine à la plus grossière, avec leur durée approximative
+TIMEFRAME_ORDER = ['1MIN', '5MIN', '15MIN', '1HOUR', '1DAY', '1WEEK', '1MONTH']
+TIMEFRAME_SECONDS = {
+    '1MIN': 60,
+    '5MIN': 300,
+    '15MIN': 900,
+    '1HOUR': 3600,
+    '1DAY': 86400,
+    '1WEEK': 7 * 86400,
+    '1MONTH': 30 * 86400,
+}
+
+DEFAULT_MAX_POINTS = 500
+WRITE_BATCH_SIZE = 1000
+
+
+def bucket_start(timestamp, timeframe):
+    """Début de la bougie de la période timeframe contenant timestamp"""
+    if timeframe in ('1DAY', '1WEEK', '1MONTH'):
+        local = timezone.localtime(timestamp).replace(hour=0, minute=0, second=0, microsecond=0)
+        if timeframe == '1WEEK':
+            local -= timedelta(days=local.weekday())
+        elif timeframe == '1MONTH':
+            local = local.replace(day=1)
+        return local
+    seconds = TIMEFRAME_SECONDS[timeframe]
+    epoch = int(timestamp.timestamp())
+    return timestamp.replace(microsecond=0) - timedelta(seconds=epoch % seconds)
+
+
+def _coarser(timeframe):
+    return TIMEFRAME_ORDER[TIMEFRAME_ORDER.index(timeframe) + 1:]
+
+
+class CandleRollupService:
+    """
+    Agrégation des bougies et lecture des séries de prix
+    """
+
+    # ------------------------------------------------------------------
+    # Agrégation
+    # ------------------------------------------------------------------
+
+    def ingest(self, candles, timeframes=None):
+        """
+        Reporte de nouvelles bougies dans toutes les résolutions plus grossières
+
+        Chaque bougie ne doit être ingérée qu'une fois (son volume est cumulé).
+
+        Args:
+            candles: Bougies PriceHistory d'une même résolution, déjà enregistrées
+            timeframes: Résolutions à mettre à jour (toutes les plus grossières par défaut)
+
+        Returns:
+            Nombre de bougies agrégées créées ou mises à jour
+        """
+        candles = sorted(candles, key=lambda c: c.timestamp)
+        if not candles:
+            return 0
+
+        written = 0
+        for timeframe in timeframes or _coarser(candles[0].timeframe):
+            # Fusion en mémoire des bougies source par (action, période)
+            merged = OrderedDict()
+            for candle in candles:
+                key = (candle.stock_id, bucket_start(candle.timestamp, timeframe))
+                bar = merged.get(key)
+                if bar is None:
+                    merged[key] = {
+                        'open': candle.open_price, 'high': candle.high_price, 'low': candle.low_price,
+                        'close': candle.close_price, 'volume': candle.volume,
+                    }
+                else:
+                    bar['high'] = max(bar['high'], candle.high_price)
+                    bar['low'] = min(bar['low'], candle.low_price)
+                    bar['close'] = candle.close_price
+                    bar['volume'] += candle.volume
+            written += self._upsert(timeframe, merged)
+        return written
+
+    def _upsert(self, timeframe, merged):
+        """Fusionne les barres calculées avec celles déjà stockées (une lecture, deux écritures)"""
+        stock_ids = {stock_id for stock_id, _ in merged}
+        timestamps = {ts for _, ts in merged}
+        existing = {
+            (bar.stock_id, bar.timestamp): bar
+            for bar in PriceHistory.objects.filter(
+                timeframe=timeframe, stock_id__in=stock_ids, timestamp__in=timestamps
+            )
+        }
+
+        created, updated = [], []
+        for (stock_id, ts), values in merged.items():
+            bar = existing.get((stock_id, ts))
+            if bar is None:
+                created.append(PriceHistory(
+                    stock_id=stock_id, timestamp=ts, timeframe=timeframe,
+                    open_price=values['open'], high_price=values['high'], low_price=values['low'],
+                    close_price=values['close'], volume=values['volume'],
+                ))
+            else:
+                bar.high_price = max(bar.high_price, values['high'])
+                bar.low_price = min(bar.low_price, values['low'])
+                bar.close_price = values['close']
+                bar.volume += values['volume']
+                updated.append(bar)
+
+        if created:
+            PriceHistory.objects.bulk_create(created, batch_size=WRITE_BATCH_SIZE)
+        if updated:
+            PriceHistory.objects.bulk_update(
+                updated, ['high_price', 'low_price', 'close_price', 'volume'], batch_size=WRITE_BATCH_SIZE
+            )
+        return len(created) + len(updated)
+
+    def rebuild(self, start, end, stock_ids=None, source='1MIN'):
+        """
+        Recalcule les résolutions plus grossières à partir des bougies source
+
+        Pour chaque résolution, les barres des périodes couvertes (élargies au début
+        de la période contenant start) sont supprimées puis recalculées.
+
+        Returns:
+            Nombre de bougies agrégées écrites
+        """
+        written = 0
+        for timeframe in _coarser(source):
+            period_start = bucket_start(start, timeframe)
+            source_qs = PriceHistory.objects.filter(
+                timeframe=source, timestamp__gte=period_start, timestamp__lt=end
+            )
+            derived_qs = PriceHistory.objects.filter(
+                timeframe=timeframe, timestamp__gte=period_start, timestamp__lt=end
+            )
+            if stock_ids is not None:
+                source_qs = source_qs.filter(stock_id__in=stock_ids)
+                derived_qs = derived_qs.filter(stock_id__in=stock_ids)
+
+            derived_qs.delete()
+            batch = []
+            for candle in source_qs.order_by('timestamp').iterator(chunk_size=WRITE_BATCH_SIZE):
+                batch.append(candle)
+                if len(batch) >= WRITE_BATCH_SIZE * 10:
+                    written += self.ingest(batch, timeframes=[timeframe])
+                    batch = []
+            if batch:
+                written += self.ingest(batch, timeframes=[timeframe])
+        return written
+
+    # ------------------------------------------------------------------
+    # Lecture
+    # ------------------------------------------------------------------
+
+    def choose_timeframe(self, stock, timeframe, start, end, max_points=DEFAULT_MAX_POINTS):
+        """
+        Résolution stockée à servir pour la fenêtre demandée
+
+        La plus fine, à partir de celle demandée, qui tient dans max_points;
+        sinon la plus grossière disponible. Sans données à ces résolutions,
+        la plus proche des résolutions plus fines.
+        """
+        counts = dict(
+            PriceHistory.objects.filter(stock=stock, timestamp__gte=start, timestamp__lte=end)
+            .order_by().values('timeframe').annotate(count=Count('id')).values_list('timeframe', 'count')
+        )
+        requested = TIMEFRAME_ORDER.index(timeframe) if timeframe in TIMEFRAME_ORDER else 0
+        coarser = [tf for tf in TIMEFRAME_ORDER[requested:] if counts.get(tf)]
+        for tf in coarser:
+            if counts[tf] <= max_points:
+                return tf
+        if coarser:
+            return coarser[-1]
+        finer = [tf for tf in TIMEFRAME_ORDER[:requested] if counts.get(tf)]
+        return finer[-1] if finer else timeframe
+
+    def get_series(self, stock, timeframe, start, end=None, max_points=DEFAULT_MAX_POINTS):
+        """
+        Série OHLCV en colonnes, sous-échantillonnée à max_points
+
+        Returns:
+            Dict {timeframe, downsampled, columns: {timestamp, open, high, low, close, volume}}
+        """
+        end = end or timezone.now()
+        served = self.choose_timeframe(stock, timeframe, start, end, max_points)
+        rows = list(
+            PriceHistory.objects.filter(
+                stock=stock, timeframe=served, timestamp__gte=start, timestamp__lte=end
+            ).order_by('timestamp').values_list(
+                'timestamp', 'open_price', 'high_price', 'low_price', 'close_price', 'volume'
+            )
+        )
+
+        step = max(1, math.ceil(len(rows) / max_points)) if max_points else 1
+        if step > 1:
+            rows = [
+                (
+                    chunk[0][0], chunk[0][1],
+                    max(r[2] for r in chunk), min(r[3] for r in chunk),
+                    chunk[-1][4], sum(r[5] for r in chunk),
+                )
+                for chunk in (rows[i:i + step] for i in range(0, len(rows), step))
+            ]
+
+        columns = list(zip(*rows)) if rows else [()] * 6
+        return {
+            'timeframe': served,
+            'downsampled': step > 1,
+            'columns': {
+                'timestamp': [ts.isoformat() for ts in columns[0]],
+                'open': [float(v) for v in columns[1]],
+                'high': [float(v) for v in columns[2]],
+                'low': [float(v) for v in columns[3]],
+                'close': [float(v) for v in columns[4]],
+                'volume': list(columns[5]),
+            },
+        }
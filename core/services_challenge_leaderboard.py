@@ -0,0 +1,281 @@
+"""
+Classements matérialisés des défis d'épargne
+Les lignes ChallengeLeaderboard sont tenues à jour incrémentalement: seules les
+participations touchées par un mouvement sont rescorées, et seules les lignes dont
+le rang ou le score change sont réécrites. Les positions sont calculées en base sous
+le verrou de la ligne du défi, à partir des rangs déjà matérialisés: aucun état
+n'est tenu hors de la base.
+"""
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+import logging
+
+from .models_savings_challenge import SavingsChallenge, ChallengeParticipation, ChallengeLeaderboard
+
+logger = logging.getLogger(__name__)
+
+
+RANKED_STATUSES = ('ACTIVE', 'COMPLETED')
+WRITE_BATCH_SIZE = 500
+
+_SCORE_FIELDS = ('id', 'total_saved', 'points_earned', 'personal_target', 'longest_streak', 'deposits_count')
+
+
+def _sort_key(participation_id, total_saved, points_earned):
+    """Clé de tri: total épargné puis points décroissants, identifiant pour départager les ex aequo"""
+    return (-total_saved, -points_earned, str(participation_id))
+
+
+def _ranked_before(key):
+    """Filtre des participations classées avant la clé de tri key"""
+    total_saved, points_earned, participation_id = -key[0], -key[1], key[2]
+    return (
+        Q(total_saved__gt=total_saved) |
+        Q(total_saved=total_saved, points_earned__gt=points_earned) |
+        Q(total_saved=total_saved, points_earned=points_earned, id__lt=participation_id)
+    )
+
+
+def participation_score(row, target_amount):
+    """
+    Score affiché d'une participation: progression (%) + 5 par jour de plus longue série
+    + 2 par dépôt
+    """
+    target = row['personal_target'] or target_amount
+    progress = min(100, (row['total_saved'] / target) * 100) if target > 0 else 0
+    score = Decimal(str(progress)) + row['longest_streak'] * 5 + row['deposits_count'] * 2
+    return score.quantize(Decimal('0.01'))
+
+
+class ChallengeLeaderboardService:
+    """
+    Classement d'un défi d'épargne
+
+    Invariant: chaque participation classée a une ligne ChallengeLeaderboard dont le
+    rang est 1 + sa position dans l'ordre des clés de tri. Les rescorages sont
+    sérialisés par un verrou sur la ligne du défi; si l'invariant ne tient plus
+    (classement jamais matérialisé, participations modifiées hors des mouvements),
+    le défi entier est resynchronisé.
+    """
+
+    def __init__(self, challenge_id):
+        self.challenge_id = challenge_id
+
+    def _rows(self, participation_ids=None):
+        rows = ChallengeParticipation.objects.filter(
+            challenge_id=self.challenge_id, status__in=RANKED_STATUSES
+        )
+        if participation_ids is not None:
+            rows = rows.filter(id__in=participation_ids)
+        return rows.order_by().values(*_SCORE_FIELDS)
+
+    def _entries(self):
+        return ChallengeLeaderboard.objects.filter(challenge_id=self.challenge_id)
+
+    def _lock(self):
+        return SavingsChallenge.objects.select_for_update().only('id', 'target_amount').get(pk=self.challenge_id)
+
+    # ------------------------------------------------------------------
+    # Rescorage
+    # ------------------------------------------------------------------
+
+    def touch(self, participation_ids):
+        """Rescore des participations après le commit courant"""
+        participation_ids = {str(pid) for pid in participation_ids}
+
+        def _rescore():
+            try:
+                self.rescore(participation_ids)
+            except Exception as e:
+                # Le mouvement est déjà validé: le classement sera resynchronisé
+                logger.error(f"Rescorage du classement du défi {self.challenge_id} impossible: {str(e)}")
+
+        transaction.on_commit(_rescore)
+
+    def rescore(self, participation_ids):
+        """
+        Rescore les participations données et réécrit les lignes dont le rang ou le score change
+
+        Les participations absentes ou non classées sont retirées du classement.
+        Anciennes positions: rangs matérialisés; nouvelles positions: participations
+        classées avant chaque nouvelle clé (COUNT). Hors de l'intervalle couvert, les
+        rangs sont inchangés.
+
+        Returns:
+            Nombre de lignes créées, mises à jour ou supprimées
+        """
+        participation_ids = {str(pid) for pid in participation_ids}
+        with transaction.atomic():
+            challenge = self._lock()
+            others = self._rows().exclude(id__in=participation_ids)
+            other_entries = self._entries().exclude(participation_id__in=participation_ids)
+            counts = other_entries.aggregate(
+                total=Count('id'), ranked=Count('id', filter=Q(participation__status__in=RANKED_STATUSES))
+            )
+            if not counts['total'] == counts['ranked'] == others.count():
+                return self._rebuild(challenge)
+
+            previous = {
+                str(pid): rank - 1
+                for pid, rank in self._entries().filter(
+                    participation_id__in=participation_ids
+                ).values_list('participation_id', 'rank')
+            }
+            fresh = {str(row['id']): row for row in self._rows(participation_ids)}
+            keys = {pid: _sort_key(pid, row['total_saved'], row['points_earned']) for pid, row in fresh.items()}
+            scores = {pid: participation_score(row, challenge.target_amount) for pid, row in fresh.items()}
+
+            # Nouvelle position: autres participations classées avant + participations touchées avant
+            positions = list(previous.values())
+            for pid, key in keys.items():
+                before = others.filter(_ranked_before(key)).count()
+                positions.append(before + sum(1 for other in keys.values() if other < key))
+            if not positions:
+                return 0
+
+            count_before = counts['total'] + len(previous)
+            count_after = counts['total'] + len(fresh)
+            low = min(positions)
+            high = max(positions) if count_after == count_before else count_after - 1
+
+            # Intervalle [low, high]: participations touchées et autres lignes de rang low + 1 à high + 1
+            span_entries = other_entries.filter(rank__gt=low)
+            if count_after == count_before:
+                span_entries = span_entries.filter(rank__lte=high + 1)
+            span = sorted(list(keys.values()) + [
+                _sort_key(pid, total_saved, points_earned)
+                for pid, total_saved, points_earned in span_entries.values_list(
+                    'participation_id', 'participation__total_saved', 'participation__points_earned'
+                )
+            ])
+            if len(span) != high - low + 1:
+                logger.warning(f"Classement du défi {self.challenge_id} incohérent, resynchronisation")
+                return self._rebuild(challenge)
+
+            removed = participation_ids - set(fresh)
+            return self._write(challenge, span, low, scores, removed)
+
+    def resync(self):
+        """
+        Resynchronise toutes les lignes du défi (écrit seulement les écarts)
+
+        Returns:
+            Nombre de lignes créées, mises à jour ou supprimées
+        """
+        with transaction.atomic():
+            return self._rebuild(self._lock())
+
+    def _rebuild(self, challenge):
+        """Recalcule toutes les participations classées du défi (sous le verrou du défi)"""
+        keys, scores = [], {}
+        for row in self._rows():
+            pid = str(row['id'])
+            keys.append(_sort_key(pid, row['total_saved'], row['points_earned']))
+            scores[pid] = participation_score(row, challenge.target_amount)
+        keys.sort()
+
+        deleted, _ = self._entries().exclude(participation__status__in=RANKED_STATUSES).delete()
+        written = deleted + self._write(challenge, keys, 0, scores)
+        logger.info(f"Classement du défi {self.challenge_id} reconstruit: {written} ligne(s) écrite(s)")
+        return written
+
+    def _write(self, challenge, span, offset, scores, removed=()):
+        """
+        Aligne les lignes des participations de span sur leur rang (offset + position + 1)
+
+        Args:
+            span: Clés de tri consécutives du classement
+            offset: Position de la première clé de span
+            scores: Scores recalculés (id participation -> score)
+            removed: Participations à retirer du classement
+        """
+        ranks = {key[2]: rank for rank, key in enumerate(span, offset + 1)}
+        existing = {
+            str(entry.participation_id): entry
+            for entry in ChallengeLeaderboard.objects.filter(
+                challenge_id=self.challenge_id, participation_id__in=list(ranks)
+            ).only('id', 'participation_id', 'rank', 'score')
+        }
+
+        # Participations classées sans ligne ni score recalculé (classement jamais matérialisé)
+        missing = [pid for pid in ranks if pid not in existing and pid not in scores]
+        if missing:
+            for row in self._rows(missing):
+                scores[str(row['id'])] = participation_score(row, challenge.target_amount)
+
+        now = timezone.now()
+        created, updated = [], []
+        for pid, rank in ranks.items():
+            entry = existing.get(pid)
+            score = scores.get(pid)
+            if entry is None:
+                created.append(ChallengeLeaderboard(
+                    challenge_id=self.challenge_id, participation_id=pid,
+                    rank=rank, score=score if score is not None else Decimal('0.00')
+                ))
+            elif entry.rank != rank or (score is not None and entry.score != score):
+                entry.rank = rank
+                if score is not None:
+                    entry.score = score
+                entry.calculated_at = now
+                updated.append(entry)
+
+        deleted = 0
+        if removed:
+            deleted, _ = ChallengeLeaderboard.objects.filter(
+                challenge_id=self.challenge_id, participation_id__in=list(removed)
+            ).delete()
+        if created:
+            ChallengeLeaderboard.objects.bulk_create(created, batch_size=WRITE_BATCH_SIZE)
+        if updated:
+            ChallengeLeaderboard.objects.bulk_update(
+                updated, ['rank', 'score', 'calculated_at'], batch_size=WRITE_BATCH_SIZE
+            )
+        return deleted + len(created) + len(updated)
+
+    def ensure(self):
+        """Matérialise le classement s'il ne couvre pas toutes les participations classées"""
+        if self._rows().count() != self._entries().count():
+            self.resync()
+
+    # ------------------------------------------------------------------
+    # Lectures
+    # ------------------------------------------------------------------
+
+    def count(self):
+        return ChallengeLeaderboard.objects.filter(challenge_id=self.challenge_id).count()
+
+    def window(self, offset, limit):
+        """Lignes classées entre les rangs offset + 1 et offset + limit"""
+        offset = max(offset, 0)
+        return list(
+            ChallengeLeaderboard.objects.filter(
+                challenge_id=self.challenge_id, rank__gt=offset, rank__lte=offset + limit
+            ).select_related('participation__user').order_by('rank')
+        )
+
+    def rank_of(self, participation_id):
+        """Rang matérialisé d'une participation (None si elle n'est pas classée)"""
+        return ChallengeLeaderboard.objects.filter(
+            challenge_id=self.challenge_id, participation_id=participation_id
+        ).values_list('rank', flat=True).first()
+
+    def around(self, participation_id, radius=10):
+        """
+        Fenêtre "mon rang ± radius"
+
+        Returns:
+            Tuple (lignes, rang de la participation ou None)
+        """
+        rank = self.rank_of(participation_id)
+        if rank is None:
+            return [], None
+        start = max(rank - 1 - radius, 0)
+        return self.window(start, rank + radius - start), rank
+
+
+def touch_participation(participation_id, challenge_id):
+    """Planifie le rescorage d'une participation dans le classement de son défi"""
+    ChallengeLeaderboardService(challenge_id).touch([participation_id])
@@ -0,0 +1,322 @@
+"""
+Statistiques communautaires de l'épargne
+Les totaux de la communauté et l'index trié des soldes des comptes d'épargne actifs
+sont tenus dans le cache Django (utils_cache.SortedCacheIndex), mis à jour à chaque
+dépôt ou retrait et relus depuis la base au plus tard après COMMUNITY_INDEX_TIMEOUT.
+Le "top N" et le rang d'un utilisateur se lisent par recherche dichotomique dans
+l'index, sans agrégat ni parcours de la table SavingsAccount.
+L'annuaire des épargnants est paginé par curseur sur (solde, id): une page
+profonde coûte autant que la première.
+"""
+from decimal import Decimal, InvalidOperation
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+import base64
+import logging
+import uuid
+
+from .models_savings_challenge import SavingsAccount
+from .utils_cache import SortedCacheIndex, make_cache_key
+
+logger = logging.getLogger(__name__)
+
+
+COMMUNITY_CACHE_NAMESPACE = 'savings_community'
+COMMUNITY_INDEX_TIMEOUT = 900
+TOP_SAVERS_CACHE_TIMEOUT = 60
+PERSIST_BATCH_SIZE = 500
+
+COMMUNITY_LEVEL_STEP = 10000000  # 1 niveau communautaire par 10M FCFA
+SAVER_LEVEL_STEP = 100000  # 1 niveau d'épargnant par 100K FCFA
+MAX_LEVEL = 5
+
+DIRECTORY_MAX_PAGE_SIZE = 100
+
+
+def _sort_key(account_id, balance):
+    """Clé de tri: solde décroissant, puis identifiant pour départager les ex aequo"""
+    return (-balance, str(account_id))
+
+
+def saver_level(balance):
+    return min(MAX_LEVEL, max(1, int(balance / SAVER_LEVEL_STEP)))
+
+
+def community_level(total_saved):
+    return min(MAX_LEVEL, max(1, int(total_saved / COMMUNITY_LEVEL_STEP)))
+
+
+class CommunityStatsService:
+    """
+    Index des soldes et totaux de la communauté d'épargnants
+
+    L'index contient les clés de tri (-solde, id compte) des comptes actifs; son
+    total (somme des -solde) donne le total épargné.
+    """
+
+    def __init__(self):
+        self.index = SortedCacheIndex(COMMUNITY_CACHE_NAMESPACE, self._build, COMMUNITY_INDEX_TIMEOUT)
+
+    def _build(self):
+        """Clés de tri de tous les comptes actifs, en une requête"""
+        rows = SavingsAccount.objects.filter(status='ACTIVE').order_by().values_list('id', 'balance')
+        return [_sort_key(account_id, balance) for account_id, balance in rows]
+
+    def _apply(self, account_id, balance):
+        """Repositionne un compte dans l'index (retiré si balance est None)"""
+        key = _sort_key(account_id, balance) if balance is not None else None
+        self.index.move(str(account_id), key)
+
+    # ------------------------------------------------------------------
+    # Mises à jour
+    # ------------------------------------------------------------------
+
+    def refresh_account(self, account_id):
+        """
+        Relit le solde et le statut d'un compte et le repositionne dans l'index
+        après le commit courant (les projections du grand livre passent par des UPDATE)
+        """
+        def _refresh():
+            row = SavingsAccount.objects.filter(pk=account_id).values_list('balance', 'status').first()
+            if row is None:
+                self._apply(account_id, None)
+                return
+            balance, account_status = row
+            self._apply(account_id, balance if account_status == 'ACTIVE' else None)
+
+        transaction.on_commit(_refresh)
+
+    def sync_account(self, account):
+        """Reporte dans l'index l'état d'une instance de compte enregistrée"""
+        balance = account.balance if account.status == 'ACTIVE' else None
+        transaction.on_commit(lambda: self._apply(account.id, balance))
+
+    def remove_account(self, account_id):
+        transaction.on_commit(lambda: self._apply(account_id, None))
+
+    def rebuild(self):
+        """
+        Force la relecture de l'index depuis la base, pour tous les processus
+        (rattrape les soldes modifiés hors du grand livre sans attendre l'échéance)
+
+        Returns:
+            Nombre de comptes classés
+        """
+        self.invalidate()
+        return self.index.count()
+
+    def persist_ranks(self):
+        """
+        Écrit global_rank en base pour les comptes dont le rang a changé
+        (rang lu par la recherche de l'annuaire)
+
+        Returns:
+            Nombre de comptes mis à jour
+        """
+        keys, _ = self.index.slice(0, self.index.count())
+        ranks = {key[1]: rank for rank, key in enumerate(keys, 1)}
+        changed = []
+        for account in SavingsAccount.objects.only('id', 'global_rank', 'status').iterator(chunk_size=PERSIST_BATCH_SIZE):
+            rank = ranks.get(str(account.id)) if account.status == 'ACTIVE' else None
+            if account.global_rank != rank:
+                account.global_rank = rank
+                changed.append(account)
+
+        if changed:
+            SavingsAccount.objects.bulk_update(changed, ['global_rank'], batch_size=PERSIST_BATCH_SIZE)
+        return len(changed)
+
+    def invalidate(self):
+        """Force la reconstruction de l'index à la prochaine lecture"""
+        self.index.invalidate()
+
+    # ------------------------------------------------------------------
+    # Lectures
+    # ------------------------------------------------------------------
+
+    def totals(self):
+        """
+        Totaux de la communauté
+
+        Returns:
+            Dict {total_participants, total_saved, community_level, next_level_target, progress_to_next}
+        """
+        total_participants = self.index.count()
+        total_saved = -self.index.total()
+        level = community_level(total_saved)
+        next_level_target = (level + 1) * COMMUNITY_LEVEL_STEP
+        return {
+            'total_participants': total_participants,
+            'total_saved': float(total_saved),
+            'community_level': level,
+            'next_level_target': next_level_target,
+            'progress_to_next': round(float(total_saved) / next_level_target * 100, 2),
+        }
+
+    def rank_of_account(self, account_id):
+        """Rang d'un compte actif (None s'il n'est pas classé)"""
+        return self.ranks_of_accounts([account_id]).get(str(account_id))
+
+    def rank_of_user(self, user_id):
+        """Rang du meilleur compte actif d'un utilisateur (None s'il n'en a pas)"""
+        account_ids = SavingsAccount.objects.filter(user_id=user_id, status='ACTIVE').values_list('id', flat=True)
+        ranks = self.ranks_of_accounts(account_ids)
+        return min(ranks.values()) if ranks else None
+
+    def ranks_of_accounts(self, account_ids):
+        """Dict id compte -> rang pour les comptes actifs parmi account_ids"""
+        keys = self.index.keys_of([str(account_id) for account_id in account_ids])
+        if not keys:
+            return {}
+        accounts = list(keys)
+        positions = self.index.positions([keys[account_id] for account_id in accounts])
+        return {account_id: position + 1 for account_id, position in zip(accounts, positions)}
+
+    def slice(self, offset=0, limit=10, after=None):
+        """
+        Clés de tri d'une page du classement
+
+        Args:
+            offset: Position de départ (ignorée si after est fourni)
+            limit: Taille de la page
+            after: Clé de tri (-solde, id compte) de la dernière ligne de la page précédente
+
+        Returns:
+            Tuple (clés de la page, position de la première clé, nombre total de classés)
+        """
+        start = self.index.positions([after], right=True)[0] if after is not None else max(offset, 0)
+        keys, total = self.index.slice(start, limit)
+        return keys, start, total
+
+    def top_savers(self, limit=10):
+        """
+        Les limit meilleurs épargnants, sous forme de dictionnaires prêts à sérialiser
+
+        Les lignes sont mises en cache sous une clé dérivée des clés de tri du top:
+        tout changement de solde ou de classement produit une nouvelle clé.
+        """
+        top, _ = self.index.slice(0, limit)
+        key = make_cache_key(COMMUNITY_CACHE_NAMESPACE, {'top': top})
+        rows = cache.get(key)
+        if rows is not None:
+            return rows
+
+        accounts = {
+            str(account.id): account
+            for account in SavingsAccount.objects.select_related('user').filter(id__in=[k[1] for k in top])
+        }
+        rows = []
+        for rank, sort_key in enumerate(top, 1):
+            account = accounts.get(sort_key[1])
+            if account is None:
+                continue
+            rows.append(saver_row(account, rank, display_name=account.user.username or f"Épargnant #{rank}"))
+
+        cache.set(key, rows, TOP_SAVERS_CACHE_TIMEOUT)
+        return rows
+
+
+def saver_row(account, rank, display_name=None):
+    """Représentation d'un épargnant dans les vues de progression collective"""
+    user = account.user
+    progress = 0
+    if user.monthly_savings_goal > 0:
+        progress = (account.balance / user.monthly_savings_goal) * 100
+    return {
+        'id': str(user.id),
+        'display_name': display_name or user.username or f"{user.first_name} {user.last_name}",
+        'amount': float(account.balance),
+        'level': saver_level(account.balance),
+        'progress': round(float(progress), 2),
+        'rank': rank,
+    }
+
+
+def encode_cursor(balance, account_id):
+    """Curseur opaque pointant après la ligne (solde, id compte)"""
+    raw = f"{balance}|{account_id}".encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Curseur -> (solde, id compte); ValueError si le curseur est invalide"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        balance, account_id = base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8').split('|')
+        return Decimal(balance), uuid.UUID(account_id)
+    except (ValueError, UnicodeError, InvalidOperation) as e:
+        raise ValueError(f"Curseur invalide: {cursor}") from e
+
+
+class SaversDirectory:
+    """
+    Annuaire paginé des épargnants actifs
+
+    Ordre: solde décroissant puis id croissant, identique à l'index communautaire.
+    - Sans recherche, les pages sont découpées dans l'index (aucun COUNT ni OFFSET)
+      et le rang global de chaque ligne est sa position dans l'index.
+    - Avec recherche, la requête est paginée par curseur sur (solde, id) et filtrée
+      par sous-chaîne sur le nom, le username et l'email; le rang global est celui
+      persisté sur le compte (global_rank, au plus un passage de persist_saver_ranks
+      de retard).
+    """
+
+    def __init__(self):
+        self.community = CommunityStatsService()
+
+    def page(self, page_size=10, cursor=None, page=1, search=''):
+        """
+        Returns:
+            Dict {accounts (avec global_rank renseigné), count, next_cursor, page}
+            count vaut None pour une recherche paginée au-delà de la première page
+        """
+        page_size = min(max(page_size, 1), DIRECTORY_MAX_PAGE_SIZE)
+        after = decode_cursor(cursor) if cursor else None
+        if search:
+            return self._search(search, page_size, after)
+
+        sort_after = _sort_key(after[1], after[0]) if after else None
+        keys, start, total = self.community.slice((page - 1) * page_size, page_size, sort_after)
+        accounts = {
+            str(account.id): account
+            for account in SavingsAccount.objects.select_related('user').filter(id__in=[k[1] for k in keys])
+        }
+        results = []
+        for rank, key in enumerate(keys, start + 1):
+            account = accounts.get(key[1])
+            if account is not None:
+                account.global_rank = rank
+                results.append(account)
+
+        has_next = start + len(keys) < total
+        return {
+            'accounts': results,
+            'count': total,
+            'next_cursor': encode_cursor(results[-1].balance, results[-1].id) if results and has_next else None,
+            'page': start // page_size + 1,
+        }
+
+    def _search(self, search, page_size, after):
+        matches = (
+            Q(user__first_name__icontains=search) |
+            Q(user__last_name__icontains=search) |
+            Q(user__username__icontains=search) |
+            Q(user__email__icontains=search)
+        )
+        queryset = SavingsAccount.objects.filter(matches, status='ACTIVE')
+        count = queryset.count() if after is None else None
+        if after is not None:
+            balance, account_id = after
+            queryset = queryset.filter(Q(balance__lt=balance) | Q(balance=balance, id__gt=account_id))
+
+        rows = list(queryset.select_related('user').order_by('-balance', 'id')[:page_size + 1])
+        has_next = len(rows) > page_size
+        rows = rows[:page_size]
+
+        return {
+            'accounts': rows,
+            'count': count,
+            'next_cursor': encode_cursor(rows[-1].balance, rows[-1].id) if has_next else None,
+            'page': None,
+        }
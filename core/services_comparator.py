@@ -0,0 +1,207 @@
+"""
+Couche de requêtes du comparateur SGI.
+Les SGI, leurs conditions d'ouverture et leurs notes sont chargées en un nombre
+constant de requêtes, et chaque combinaison de filtres est mise en cache.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Sum
+import logging
+
+from .models import SGI
+from .models_sgi import SGIAccountTerms, SGIRating, SGIRatingSummary
+from .serializers import SGIListSerializer, SGIAccountTermsSerializer
+from .utils_cache import make_cache_key, invalidate_on_commit
+
+logger = logging.getLogger(__name__)
+
+
+COMPARATOR_CACHE_NAMESPACE = 'sgi_comparator'
+COMPARATOR_CACHE_TIMEOUT = 300
+
+
+def invalidate_comparator_cache():
+    """Invalide les résultats du comparateur après le commit courant"""
+    invalidate_on_commit(COMPARATOR_CACHE_NAMESPACE)
+
+
+def refresh_rating_summary(sgi_id):
+    """
+    Recalcule le résumé des notes d'une SGI
+
+    La ligne de résumé est verrouillée pendant le recalcul: deux notes
+    enregistrées en parallèle sur la même SGI ne peuvent pas s'écraser.
+    """
+    with transaction.atomic():
+        summary, _ = SGIRatingSummary.objects.select_for_update().get_or_create(sgi_id=sgi_id)
+        totals = SGIRating.objects.filter(sgi_id=sgi_id).aggregate(count=Count('id'), total=Sum('score'))
+        summary.ratings_count = totals['count']
+        summary.ratings_total = totals['total'] or 0
+        summary.save(update_fields=['ratings_count', 'ratings_total', 'updated_at'])
+    invalidate_comparator_cache()
+    return summary
+
+
+class SGIComparatorService:
+    """
+    Service de comparaison et de sélection des SGI (comparateur et stepper)
+    """
+
+    SORT_FIELDS = ('minimum_amount_value', 'opening_fees_amount', 'custody_fees')
+
+    def _cached(self, name, params, compute):
+        """Retourne le résultat en cache pour ces paramètres, ou le calcule"""
+        key = make_cache_key(COMPARATOR_CACHE_NAMESPACE, [name, params])
+        result = cache.get(key)
+        if result is None:
+            result = compute()
+            cache.set(key, result, COMPARATOR_CACHE_TIMEOUT)
+        return result
+
+    def _rating_summaries(self, sgis):
+        """
+        Résumés des notes des SGI (chargés par select_related)
+        Les résumés manquants sont calculés en une requête groupée et enregistrés.
+        """
+        summaries = {}
+        missing = []
+        for sgi in sgis:
+            summary = getattr(sgi, 'rating_summary', None)
+            if summary is None:
+                missing.append(sgi.id)
+            else:
+                summaries[sgi.id] = summary
+
+        if missing:
+            totals = {
+                row['sgi_id']: row
+                for row in SGIRating.objects.filter(sgi_id__in=missing)
+                .values('sgi_id').annotate(count=Count('id'), total=Sum('score'))
+            }
+            created = [
+                SGIRatingSummary(
+                    sgi_id=sgi_id,
+                    ratings_count=totals.get(sgi_id, {}).get('count', 0),
+                    ratings_total=totals.get(sgi_id, {}).get('total') or 0,
+                )
+                for sgi_id in missing
+            ]
+            SGIRatingSummary.objects.bulk_create(created, ignore_conflicts=True)
+            summaries.update((summary.sgi_id, summary) for summary in created)
+
+        return summaries
+
+    def _entry(self, sgi, term, summaries):
+        summary = summaries.get(sgi.id)
+        return {
+            'sgi': SGIListSerializer(sgi).data,
+            'terms': SGIAccountTermsSerializer(term).data if term else None,
+            'avg_rating': float(summary.avg_rating) if summary else 0.0,
+            'ratings_count': summary.ratings_count if summary else 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Comparateur (GET /comparator/)
+    # ------------------------------------------------------------------
+
+    def compare(self, country=None, bank_name=None, sgi_name=None, digital_only=None,
+                order_by='minimum_amount_value', direction='asc'):
+        """
+        Liste des SGI actives filtrées et triées selon leurs conditions d'ouverture
+
+        Returns:
+            Liste de dicts {sgi, terms, avg_rating, ratings_count}
+        """
+        params = {
+            'country': country, 'bank_name': bank_name, 'sgi_name': sgi_name,
+            'digital_only': digital_only, 'order_by': order_by, 'direction': direction,
+        }
+        return self._cached('compare', params, lambda: self._compare(**params))
+
+    def _compare(self, country, bank_name, sgi_name, digital_only, order_by, direction):
+        sgi_qs = SGI.objects.filter(is_active=True).select_related('account_terms', 'rating_summary')
+        if sgi_name:
+            sgi_qs = sgi_qs.filter(name__icontains=sgi_name)
+        sgis = list(sgi_qs)
+        pairs = [(sgi, getattr(sgi, 'account_terms', None)) for sgi in sgis]
+
+        filtered = pairs
+        if country or digital_only or bank_name:
+            # Sans terms, une SGI ne peut pas matcher les critères
+            filtered = [
+                (sgi, term) for sgi, term in pairs
+                if term
+                and (not country or term.country.lower() == country.lower())
+                and (digital_only != 'true' or term.is_digital_opening)
+                and (not bank_name or bank_name.lower() in (term.preferred_customer_banks or []))
+            ]
+            # Si aucun résultat avec filtres, afficher toutes les SGI
+            if not filtered:
+                filtered = pairs
+
+        def get_sort_value(item):
+            term = item[1]
+            if order_by in self.SORT_FIELDS and term:
+                return getattr(term, order_by) or 0
+            return 0
+
+        filtered = sorted(filtered, key=get_sort_value, reverse=(direction == 'desc'))
+
+        summaries = self._rating_summaries(sgis)
+        return [self._entry(sgi, term, summaries) for sgi, term in filtered]
+
+    # ------------------------------------------------------------------
+    # Stepper (POST /comparator/match/)
+    # ------------------------------------------------------------------
+
+    def match(self, wants_digital=False, available_amount=None, wanted_methods=None, prefer_quality=True):
+        """
+        SGI correspondant aux réponses du stepper
+
+        Returns:
+            Dict {results, fallback}: fallback=True si aucune SGI ne correspond
+            (toutes les SGI actives sont alors retournées)
+        """
+        params = {
+            'wants_digital': wants_digital, 'available_amount': available_amount,
+            'wanted_methods': sorted(wanted_methods or []), 'prefer_quality': prefer_quality,
+        }
+        return self._cached('match', params, lambda: self._match(**params))
+
+    def _match(self, wants_digital, available_amount, wanted_methods, prefer_quality):
+        all_terms = list(
+            SGIAccountTerms.objects.select_related('sgi', 'sgi__rating_summary').filter(sgi__is_active=True)
+        )
+
+        terms = [
+            t for t in all_terms
+            if (not wants_digital or t.is_digital_opening)
+            and (available_amount is None or t.sgi.min_investment_amount <= available_amount)
+            # Au moins une des méthodes de dépôt cochées
+            and (not wanted_methods or any(m in (t.deposit_methods or []) for m in wanted_methods))
+        ]
+
+        # Aucune correspondance: fallback à toutes les SGI actives
+        fallback = not terms
+        if fallback:
+            terms = all_terms
+
+        def coalesce(x):
+            return x if x is not None else 0
+
+        if prefer_quality:
+            # Tri par vérification SGI puis performance historique desc puis frais de gestion asc
+            def sort_key(t):
+                s = t.sgi
+                return (0 if s.is_verified else 1, -(s.historical_performance or 0), (s.management_fees or 0))
+        else:
+            # Frais bas: gestion asc, frais ouverture asc, frais de garde asc
+            def sort_key(t):
+                return (coalesce(t.sgi.management_fees), coalesce(t.opening_fees_amount), coalesce(t.custody_fees))
+        terms = sorted(terms, key=sort_key)
+
+        summaries = self._rating_summaries([t.sgi for t in terms])
+        return {
+            'results': [self._entry(t.sgi, t, summaries) for t in terms],
+            'fallback': fallback,
+        }
@@ -0,0 +1,288 @@
+"""
+Pipeline asynchrone des demandes d'ouverture de compte.
+Génère les PDF (contrat + annexes), les stocke puis envoie les emails,
+en étapes rejouables suivies par un AccountOpeningJob.
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.mail import send_mail
+from django.db.models import F, Q
+from django.utils import timezone
+import logging
+import os
+
+from .models_sgi import AccountOpeningJob
+from .services_annex_pdf import AnnexPDFService, AnnexRenderError
+from .services_email import ContractEmailService
+from .utils_tasks import run_in_background, run_later
+
+logger = logging.getLogger(__name__)
+
+
+class ContractPipelineError(Exception):
+    """Erreur d'une étape du pipeline (déclenche une nouvelle tentative)"""
+
+
+class ContractPipelineService:
+    """
+    Orchestration des étapes RENDER -> STORE -> EMAIL d'une demande d'ouverture de compte.
+    Chaque étape terminée est enregistrée sur le job: une nouvelle tentative reprend
+    à la première étape non terminée.
+    """
+
+    NEXT_STAGE = {
+        'RENDER': 'STORE',
+        'STORE': 'EMAIL',
+        'EMAIL': 'DONE',
+    }
+
+    # Délai de reprise d'un job resté RUNNING (worker interrompu)
+    STALE_AFTER = timedelta(minutes=15)
+
+    # Backoff exponentiel: 30s, 60s, 120s... plafonné à 1h
+    RETRY_BASE_SECONDS = 30
+    RETRY_MAX_SECONDS = 3600
+
+    DEFAULT_CONTRACT = 'NSIA_Convention_Compte_Titres.pdf'
+
+    def __init__(self):
+        self.annex_service = AnnexPDFService()
+        self.email_service = ContractEmailService()
+
+    # ------------------------------------------------------------------
+    # Mise en file
+    # ------------------------------------------------------------------
+
+    def enqueue(self, aor) -> AccountOpeningJob:
+        """
+        Crée le job d'une demande et programme son traitement après le commit
+
+        Args:
+            aor: AccountOpeningRequest instance
+
+        Returns:
+            AccountOpeningJob créé
+        """
+        job = AccountOpeningJob.objects.create(
+            account_opening_request=aor,
+            max_attempts=getattr(settings, 'CONTRACT_PIPELINE_MAX_ATTEMPTS', 5),
+        )
+        run_in_background(process_account_opening_job, job.id)
+        logger.info(f"Job pipeline contrat créé: {job.id} (demande {aor.id})")
+        return job
+
+    def due_jobs(self):
+        """Jobs prêts à être (re)traités"""
+        now = timezone.now()
+        return AccountOpeningJob.objects.filter(
+            Q(status='PENDING')
+            | Q(status='RETRY', next_retry_at__lte=now)
+            | Q(status='RUNNING', updated_at__lt=now - self.STALE_AFTER)
+        ).order_by('created_at')
+
+    def process_due_jobs(self, limit=50) -> int:
+        """
+        Traite les jobs en attente (utilisé par la commande process_contract_jobs)
+
+        Returns:
+            int: Nombre de jobs traités par ce worker
+        """
+        processed = 0
+        for job_id in self.due_jobs().values_list('id', flat=True)[:limit]:
+            if self.process(job_id) is not None:
+                processed += 1
+        return processed
+
+    # ------------------------------------------------------------------
+    # Exécution
+    # ------------------------------------------------------------------
+
+    def _claim(self, job_id):
+        """
+        Réserve un job de façon atomique: un seul worker peut le passer en RUNNING
+        """
+        now = timezone.now()
+        claimed = AccountOpeningJob.objects.filter(pk=job_id).filter(
+            Q(status__in=['PENDING', 'RETRY'])
+            | Q(status='RUNNING', updated_at__lt=now - self.STALE_AFTER)
+        ).update(
+            status='RUNNING',
+            attempts=F('attempts') + 1,
+            started_at=now,
+            updated_at=now,
+        )
+        if not claimed:
+            return None
+        return AccountOpeningJob.objects.select_related(
+            'account_opening_request', 'account_opening_request__sgi'
+        ).get(pk=job_id)
+
+    def process(self, job_id):
+        """
+        Exécute les étapes restantes d'un job
+
+        Returns:
+            AccountOpeningJob traité, ou None si le job est déjà pris/terminé
+        """
+        job = self._claim(job_id)
+        if job is None:
+            return None
+
+        aor = job.account_opening_request
+        context = {}
+        try:
+            while job.stage != 'DONE':
+                stage = job.stage
+                getattr(self, f'_stage_{stage.lower()}')(job, aor, context)
+                job.stage = self.NEXT_STAGE[stage]
+                job.save(update_fields=['stage', 'stage_results', 'updated_at'])
+        except Exception as e:
+            self._schedule_retry(job, e)
+            return job
+
+        job.status = 'COMPLETED'
+        job.last_error = ''
+        job.next_retry_at = None
+        job.completed_at = timezone.now()
+        job.save(update_fields=['status', 'last_error', 'next_retry_at', 'completed_at', 'updated_at'])
+        logger.info(f"Job pipeline contrat terminé: {job.id}")
+        return job
+
+    def _schedule_retry(self, job, error):
+        """Programme une nouvelle tentative ou marque le job en échec"""
+        job.last_error = str(error)
+        if job.attempts >= job.max_attempts:
+            job.status = 'FAILED'
+            job.next_retry_at = None
+            logger.error(f"Job pipeline contrat {job.id} en échec à l'étape {job.stage}: {error}", exc_info=True)
+        else:
+            delay = min(self.RETRY_BASE_SECONDS * 2 ** (job.attempts - 1), self.RETRY_MAX_SECONDS)
+            job.status = 'RETRY'
+            job.next_retry_at = timezone.now() + timedelta(seconds=delay)
+            logger.warning(
+                f"Job pipeline contrat {job.id} - étape {job.stage} en erreur "
+                f"(tentative {job.attempts}/{job.max_attempts}), reprise dans {delay}s: {error}"
+            )
+        job.save(update_fields=['status', 'last_error', 'next_retry_at', 'updated_at'])
+        if job.status == 'RETRY':
+            # Mode thread: reprise dans ce processus; sinon (ou après redémarrage) par process_contract_jobs
+            run_later(delay, process_account_opening_job, job.id)
+
+    # ------------------------------------------------------------------
+    # Étapes
+    # ------------------------------------------------------------------
+
+    def _resolve_contract_path(self, aor):
+        """Détermine le fichier de contrat vierge selon la SGI"""
+        contract_filename = self.DEFAULT_CONTRACT
+        if aor.sgi and aor.sgi.name:
+            sgi_name = aor.sgi.name.upper()
+            if 'GEK' in sgi_name:
+                contract_filename = 'GEK --Convention commerciale VF 2025.pdf'
+        return os.path.join(settings.BASE_DIR, 'contracts', contract_filename)
+
+    def _stage_render(self, job, aor, context):
+        """Charge le contrat vierge et génère les annexes pré-remplies"""
+        contract_path = self._resolve_contract_path(aor)
+        if os.path.exists(contract_path):
+            with open(contract_path, 'rb') as f:
+                context['contract_pdf'] = f.read()
+        else:
+            logger.warning(f"Contrat vierge introuvable: {contract_path}")
+            context['contract_pdf'] = None
+
+        annex_data = aor.annex_data or {}
+        annexes_error = None
+        if annex_data:
+            try:
+                context['annexes_pdf'] = self.annex_service.generate_annexes_pdf(aor, annex_data).getvalue()
+            except AnnexRenderError as e:
+                # Erreur déterministe: le contrat part sans annexes plutôt que d'épuiser les tentatives
+                logger.error(f"Annexes non générées pour la demande {aor.id}, envoi du contrat seul: {e}")
+                context['annexes_pdf'] = None
+                annexes_error = str(e)
+        else:
+            logger.warning(f"Pas de données d'annexes pour la demande {aor.id}")
+            context['annexes_pdf'] = None
+
+        job.stage_results['render'] = {
+            'contract_bytes': len(context['contract_pdf'] or b''),
+            'annexes_bytes': len(context['annexes_pdf'] or b''),
+        }
+        if annexes_error:
+            job.stage_results['render']['annexes_error'] = annexes_error
+
+    def _stage_store(self, job, aor, context):
+        """Enregistre les PDF générés sur la demande"""
+        if 'contract_pdf' not in context:
+            # Reprise après interruption: les PDF ne sont pas conservés entre deux tentatives
+            self._stage_render(job, aor, context)
+
+        update_fields = []
+        if context['contract_pdf']:
+            aor.contract_pdf.save(f'contrat_{aor.id}.pdf', ContentFile(context['contract_pdf']), save=False)
+            update_fields.append('contract_pdf')
+        if context['annexes_pdf']:
+            aor.annexes_pdf.save(f'annexes_{aor.id}.pdf', ContentFile(context['annexes_pdf']), save=False)
+            update_fields.append('annexes_pdf')
+        if update_fields:
+            aor.save(update_fields=update_fields + ['updated_at'])
+
+        job.stage_results['store'] = {'fields': update_fields}
+
+    def _read_stored_pdf(self, field_file):
+        """Relit un PDF stocké (None si absent)"""
+        if not field_file:
+            return None
+        field_file.open('rb')
+        try:
+            return field_file.read()
+        finally:
+            field_file.close()
+
+    def _stage_email(self, job, aor, context):
+        """Envoie les emails au client, au manager SGI, à l'équipe Xamila et aux admins"""
+        contract_pdf = context.get('contract_pdf') or self._read_stored_pdf(aor.contract_pdf)
+        annexes_pdf = context.get('annexes_pdf') or self._read_stored_pdf(aor.annexes_pdf)
+        annexes_failed = 'annexes_error' in job.stage_results.get('render', {})
+
+        if not (contract_pdf and (annexes_pdf or annexes_failed)):
+            logger.warning(f"PDFs non générés pour la demande {aor.id}, envoi d'un email de base")
+            from_email = getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@xamila.com')
+            send_mail(
+                subject='Xamila - Confirmation de votre demande d\'ouverture de compte titre',
+                message=f"Bonjour {aor.full_name},\n\nVotre demande a été reçue. Nous vous recontacterons sous 48h.",
+                from_email=from_email,
+                recipient_list=[aor.email],
+                fail_silently=False,
+            )
+            job.stage_results['email'] = {'fallback': True}
+            return
+
+        from .models import User
+        sgi_manager_email = getattr(aor.sgi, 'manager_email', None) if aor.sgi else None
+        admin_emails = list(
+            User.objects.filter(role='ADMIN', is_active=True).values_list('email', flat=True)
+        )
+
+        results = self.email_service.send_contract_emails(
+            aor=aor,
+            contract_pdf=contract_pdf,
+            annexes_pdf=annexes_pdf,
+            sgi_manager_email=sgi_manager_email,
+            admin_emails=admin_emails or None,
+        )
+        job.stage_results['email'] = results
+
+        delivered = any(results.get(key) for key in ('client', 'sgi_manager', 'xamila_team', 'admin'))
+        if not delivered:
+            # Aucun email parti (SMTP indisponible...): l'étape sera rejouée
+            raise ContractPipelineError(f"Aucun email envoyé: {results.get('errors')}")
+        if results.get('errors'):
+            logger.warning(f"Erreurs partielles lors de l'envoi des emails: {results['errors']}")
+
+
+def process_account_opening_job(job_id):
+    """Point d'entrée des tâches d'arrière-plan pour un job"""
+    return ContractPipelineService().process(job_id)
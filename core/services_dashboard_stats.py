@@ -0,0 +1,191 @@
+"""
+Cache des statistiques du dashboard client (UserDashboardStats)
+Le dashboard sert toujours l'instantané enregistré. Les écritures qui le concernent
+(investissements, transactions, progression d'épargne) le marquent périmé; un
+instantané périmé ou plus vieux que le TTL est recalculé en arrière-plan
+(stale-while-revalidate). Le recalcul est groupé: quelques requêtes par lot
+d'utilisateurs, une seule écriture par instantané.
+"""
+from bisect import bisect_left
+from decimal import Decimal
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+from datetime import timedelta
+import logging
+
+from .models_dashboard import UserInvestment, UserSavingsProgress, DashboardTransaction, UserDashboardStats
+from .models_savings_challenge import SavingsChallenge
+from .services_savings_progress import SavingsProgressRankIndex
+from .utils_tasks import run_in_background
+
+logger = logging.getLogger(__name__)
+
+
+DASHBOARD_STATS_TTL = 3600  # secondes
+DASHBOARD_STATS_REFRESH_LOCK = 60
+REFRESH_BATCH_SIZE = 500
+
+_STATS_FIELDS = [
+    'total_portfolio_value', 'total_invested_amount', 'global_performance_percentage',
+    'current_month_savings', 'savings_rank', 'last_updated',
+]
+
+
+def _stale_key(user_id):
+    return f"dashboard_stats:stale:{user_id}"
+
+
+def _refresh_lock_key(user_id):
+    return f"dashboard_stats:refreshing:{user_id}"
+
+
+def mark_stale(user_id):
+    """Marque l'instantané d'un utilisateur comme périmé après le commit courant"""
+    transaction.on_commit(lambda: cache.set(_stale_key(user_id), 1, DASHBOARD_STATS_TTL))
+
+
+class DashboardStatsService:
+    """
+    Calcul et service des instantanés UserDashboardStats
+    """
+
+    # ------------------------------------------------------------------
+    # Calcul groupé
+    # ------------------------------------------------------------------
+
+    def compute(self, user_ids):
+        """
+        Statistiques de plusieurs utilisateurs: une requête groupée par source
+
+        Returns:
+            Dict id utilisateur (str) -> valeurs des champs de UserDashboardStats
+        """
+        user_ids = [str(user_id) for user_id in user_ids]
+        values = {
+            user_id: {
+                'total_portfolio_value': Decimal('0.00'),
+                'total_invested_amount': Decimal('0.00'),
+                'global_performance_percentage': Decimal('0.00'),
+                'current_month_savings': Decimal('0.00'),
+                'savings_rank': 0,
+            }
+            for user_id in user_ids
+        }
+
+        # Portefeuille
+        for row in UserInvestment.objects.filter(user_id__in=user_ids, is_active=True).order_by().values(
+            'user_id'
+        ).annotate(value=Sum('current_value'), invested=Sum('invested_amount')):
+            stats = values[str(row['user_id'])]
+            stats['total_portfolio_value'] = row['value'] or Decimal('0.00')
+            stats['total_invested_amount'] = row['invested'] or Decimal('0.00')
+            if stats['total_invested_amount'] > 0:
+                stats['global_performance_percentage'] = (
+                    (stats['total_portfolio_value'] - stats['total_invested_amount'])
+                    / stats['total_invested_amount'] * 100
+                ).quantize(Decimal('0.01'))
+
+        # Épargne du mois actuel
+        month_start = timezone.localtime().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        for user_id, total in DashboardTransaction.objects.filter(
+            user_id__in=user_ids, transaction_type='SAVINGS', status='CONFIRMED', created_at__gte=month_start
+        ).order_by().values('user_id').annotate(total=Sum('amount')).values_list('user_id', 'total'):
+            values[str(user_id)]['current_month_savings'] = total or Decimal('0.00')
+
+        # Rang dans le challenge actif
+        active_challenge = SavingsChallenge.objects.filter(status='ACTIVE').only('id').first()
+        if active_challenge:
+            keys = SavingsProgressRankIndex().load_many([active_challenge.id])[str(active_challenge.id)]['keys']
+            for user_id, amount in UserSavingsProgress.objects.filter(
+                challenge=active_challenge, user_id__in=user_ids
+            ).values_list('user_id', 'current_amount'):
+                values[str(user_id)]['savings_rank'] = bisect_left(keys, (-amount,)) + 1
+        return values
+
+    def refresh(self, user_ids):
+        """
+        Recalcule et enregistre les instantanés (créés au besoin) par lots
+
+        Returns:
+            Nombre d'instantanés écrits
+        """
+        user_ids = [str(user_id) for user_id in user_ids]
+        written = 0
+        for start in range(0, len(user_ids), REFRESH_BATCH_SIZE):
+            batch = user_ids[start:start + REFRESH_BATCH_SIZE]
+            # Effacé avant le calcul: une écriture concurrente re-marque l'instantané
+            cache.delete_many([_stale_key(user_id) for user_id in batch])
+            values = self.compute(batch)
+            now = timezone.now()
+
+            snapshots = {
+                str(stats.user_id): stats
+                for stats in UserDashboardStats.objects.filter(user_id__in=batch)
+            }
+            created, updated = [], []
+            for user_id in batch:
+                stats = snapshots.get(user_id)
+                if stats is None:
+                    created.append(UserDashboardStats(user_id=user_id, **values[user_id]))
+                    continue
+                for field, value in values[user_id].items():
+                    setattr(stats, field, value)
+                stats.last_updated = now
+                updated.append(stats)
+
+            if created:
+                UserDashboardStats.objects.bulk_create(created, ignore_conflicts=True)
+            if updated:
+                UserDashboardStats.objects.bulk_update(updated, _STATS_FIELDS)
+            written += len(created) + len(updated)
+        return written
+
+    def refresh_user(self, user_id):
+        try:
+            self.refresh([user_id])
+        finally:
+            cache.delete(_refresh_lock_key(user_id))
+
+    def refresh_stale(self):
+        """
+        Recalcule les instantanés périmés: marqués par une écriture ou plus vieux que le TTL
+
+        Returns:
+            Nombre d'instantanés écrits
+        """
+        threshold = timezone.now() - timedelta(seconds=DASHBOARD_STATS_TTL)
+        user_ids = [str(user_id) for user_id in UserDashboardStats.objects.values_list('user_id', flat=True)]
+        marked = set()
+        for start in range(0, len(user_ids), REFRESH_BATCH_SIZE):
+            batch = user_ids[start:start + REFRESH_BATCH_SIZE]
+            flags = cache.get_many([_stale_key(user_id) for user_id in batch])
+            marked.update(user_id for user_id in batch if _stale_key(user_id) in flags)
+        expired = UserDashboardStats.objects.filter(last_updated__lt=threshold).values_list('user_id', flat=True)
+        return self.refresh(marked | {str(user_id) for user_id in expired})
+
+    # ------------------------------------------------------------------
+    # Lecture
+    # ------------------------------------------------------------------
+
+    def is_stale(self, stats):
+        if cache.get(_stale_key(stats.user_id)) is not None:
+            return True
+        return timezone.now() - stats.last_updated > timedelta(seconds=DASHBOARD_STATS_TTL)
+
+    def get(self, user):
+        """
+        Instantané des statistiques d'un utilisateur
+
+        Servi tel quel; s'il est périmé, un seul recalcul est lancé en arrière-plan.
+        Seul le premier accès (aucun instantané) calcule dans la requête.
+        """
+        stats = UserDashboardStats.objects.filter(user=user).first()
+        if stats is None:
+            self.refresh([user.id])
+            return UserDashboardStats.objects.get(user=user)
+
+        if self.is_stale(stats) and cache.add(_refresh_lock_key(user.id), 1, DASHBOARD_STATS_REFRESH_LOCK):
+            run_in_background(self.refresh_user, user.id)
+        return stats
@@ -8,6 +8,8 @@ from django.template.loader import render_to_string
 import logging
 from typing import List, Optional
 
+from .utils_email import EmailBatch, EncodedAttachment
+
 logger = logging.getLogger(__name__)
 
 
@@ -24,7 +26,7 @@ class ContractEmailService:
         self,
         aor,
         contract_pdf: bytes,
-        annexes_pdf: bytes,
+        annexes_pdf: Optional[bytes],
         sgi_manager_email: Optional[str] = None,
         admin_emails: Optional[List[str]] = None
     ) -> dict:
@@ -34,7 +36,7 @@ class ContractEmailService:
         Args:
             aor: AccountOpeningRequest instance
             contract_pdf: Contenu du PDF du contrat principal
-            annexes_pdf: Contenu du PDF des annexes
+            annexes_pdf: Contenu du PDF des annexes (None: contrat envoyé sans annexes)
             sgi_manager_email: Email du manager SGI (optionnel)
             admin_emails: Liste des emails admin (optionnel)
             
@@ -49,55 +51,105 @@ class ContractEmailService:
             'errors': []
         }
         
+        # Pièces jointes lues et encodées une seule fois pour tous les destinataires
+        attachments = self._prepare_attachments(aor, contract_pdf, annexes_pdf)
+        
+        batch = EmailBatch()
+        labels = {}
+        
         # Email du client
-        client_email = aor.email
-        if client_email:
-            try:
-                self._send_client_email(aor, client_email, contract_pdf, annexes_pdf)
-                results['client'] = True
-                logger.info(f"Email envoyé au client: {client_email}")
-            except Exception as e:
-                error_msg = f"Erreur envoi email client: {e}"
-                logger.error(error_msg)
-                results['errors'].append(error_msg)
+        if aor.email:
+            self._queue_email(batch, labels, results, 'client', 'client',
+                              self._build_client_email, aor, aor.email, attachments)
         
         # Email du manager SGI
         if sgi_manager_email:
-            try:
-                self._send_sgi_manager_email(aor, sgi_manager_email, contract_pdf, annexes_pdf)
-                results['sgi_manager'] = True
-                logger.info(f"Email envoyé au manager SGI: {sgi_manager_email}")
-            except Exception as e:
-                error_msg = f"Erreur envoi email manager SGI: {e}"
+            self._queue_email(batch, labels, results, 'sgi_manager', 'manager SGI',
+                              self._build_sgi_manager_email, aor, sgi_manager_email, attachments)
+        
+        # Email de l'équipe Xamila
+        self._queue_email(batch, labels, results, 'xamila_team', 'équipe Xamila',
+                          self._build_xamila_team_email, aor, attachments)
+        
+        # Email des admins
+        for admin_email in admin_emails or []:
+            self._queue_email(batch, labels, results, f'admin:{admin_email}', f'admin {admin_email}',
+                              self._build_admin_email, aor, admin_email, attachments)
+        
+        # Un seul lot, une seule connexion SMTP
+        sent = batch.send()
+        for label, success in sent.items():
+            key = 'admin' if label.startswith('admin:') else label
+            if success:
+                results[key] = True
+                logger.info(f"Email envoyé ({labels[label]})")
+            else:
+                error_msg = f"Erreur envoi email {labels[label]}: {batch.errors.get(label, 'non envoyé')}"
                 logger.error(error_msg)
                 results['errors'].append(error_msg)
         
-        # Email de l'équipe Xamila
+        return results
+    
+    def _queue_email(self, batch, labels: dict, results: dict, label: str, description: str, build, *args):
+        """Prépare un email et l'ajoute au lot (une erreur de préparation n'arrête pas les autres)"""
         try:
-            self._send_xamila_team_email(aor, contract_pdf, annexes_pdf)
-            results['xamila_team'] = True
-            logger.info(f"Email envoyé à l'équipe Xamila: {self.xamila_team_email}")
+            batch.add(label, build(*args))
+            labels[label] = description
         except Exception as e:
-            error_msg = f"Erreur envoi email équipe Xamila: {e}"
+            error_msg = f"Erreur préparation email {description}: {e}"
             logger.error(error_msg)
             results['errors'].append(error_msg)
+    
+    def _prepare_attachments(self, aor, contract_pdf: bytes, annexes_pdf: Optional[bytes]) -> dict:
+        """
+        Encode une seule fois le contrat, les annexes, la photo et la CNI
         
-        # Email des admins
-        if admin_emails:
-            for admin_email in admin_emails:
-                try:
-                    self._send_admin_email(aor, admin_email, contract_pdf, annexes_pdf)
-                    results['admin'] = True
-                    logger.info(f"Email envoyé à l'admin: {admin_email}")
-                except Exception as e:
-                    error_msg = f"Erreur envoi email admin {admin_email}: {e}"
-                    logger.error(error_msg)
-                    results['errors'].append(error_msg)
+        Returns:
+            dict: nom logique -> (EncodedAttachment, extension)
+        """
+        attachments = {
+            'contract': (EncodedAttachment(contract_pdf, 'application/pdf'), 'pdf'),
+        }
+        if annexes_pdf:
+            attachments['annexes'] = (EncodedAttachment(annexes_pdf, 'application/pdf'), 'pdf')
         
-        return results
+        # Ajouter la photo si disponible
+        if aor.photo:
+            try:
+                photo_content = aor.photo.read()
+                aor.photo.seek(0)  # Reset file pointer
+                ext = aor.photo.name.split(".")[-1]
+                attachments['photo'] = (EncodedAttachment(photo_content, f'image/{ext}'), ext)
+            except Exception as e:
+                logger.warning(f"Impossible d'attacher la photo: {e}")
+        
+        # Ajouter la CNI si disponible
+        if aor.id_card_scan:
+            try:
+                id_content = aor.id_card_scan.read()
+                aor.id_card_scan.seek(0)  # Reset file pointer
+                ext = aor.id_card_scan.name.split(".")[-1]
+                mimetype = 'application/pdf' if aor.id_card_scan.name.endswith('.pdf') else f'image/{ext}'
+                attachments['id_card'] = (EncodedAttachment(id_content, mimetype), ext)
+            except Exception as e:
+                logger.warning(f"Impossible d'attacher la CNI: {e}")
+        
+        return attachments
     
-    def _send_client_email(self, aor, to_email: str, contract_pdf: bytes, annexes_pdf: bytes):
-        """Envoie l'email au client"""
+    def _attach_documents(self, email, attachments: dict, contract_name: str, annexes_name: str, client_name: str):
+        """Attache les documents pré-encodés à un email"""
+        email.attach(attachments['contract'][0].as_mime(f'{contract_name}.pdf'))
+        if 'annexes' in attachments:
+            email.attach(attachments['annexes'][0].as_mime(f'{annexes_name}.pdf'))
+        if 'photo' in attachments:
+            attachment, ext = attachments['photo']
+            email.attach(attachment.as_mime(f'Photo_{client_name}.{ext}'))
+        if 'id_card' in attachments:
+            attachment, ext = attachments['id_card']
+            email.attach(attachment.as_mime(f'CNI_{client_name}.{ext}'))
+    
+    def _build_client_email(self, aor, to_email: str, attachments: dict) -> EmailMessage:
+        """Prépare l'email du client"""
         subject = f"Votre demande d'ouverture de compte-titres - {aor.sgi.name if aor.sgi else 'SGI'}"
         
         # Contexte pour le template
@@ -165,52 +217,13 @@ class ContractEmailService:
         )
         email.content_subtype = "html"
         
-        # Ajouter les pièces jointes
-        sgi_name = aor.sgi.name.replace(' ', '_') if aor.sgi else 'SGI'
         client_name = aor.full_name.replace(" ", "_")
-        
-        email.attach(
-            f'Contrat_{sgi_name}_{client_name}.pdf',
-            contract_pdf,
-            'application/pdf'
-        )
-        email.attach(
-            f'Annexes_{sgi_name}_{client_name}.pdf',
-            annexes_pdf,
-            'application/pdf'
-        )
-        
-        # Ajouter la photo si disponible
-        if aor.photo:
-            try:
-                photo_content = aor.photo.read()
-                aor.photo.seek(0)  # Reset file pointer
-                email.attach(
-                    f'Photo_{client_name}.{aor.photo.name.split(".")[-1]}',
-                    photo_content,
-                    f'image/{aor.photo.name.split(".")[-1]}'
-                )
-            except Exception as e:
-                logger.warning(f"Impossible d'attacher la photo: {e}")
-        
-        # Ajouter la CNI si disponible
-        if aor.id_card_scan:
-            try:
-                id_content = aor.id_card_scan.read()
-                aor.id_card_scan.seek(0)  # Reset file pointer
-                email.attach(
-                    f'CNI_{client_name}.{aor.id_card_scan.name.split(".")[-1]}',
-                    id_content,
-                    'application/pdf' if aor.id_card_scan.name.endswith('.pdf') else f'image/{aor.id_card_scan.name.split(".")[-1]}'
-                )
-            except Exception as e:
-                logger.warning(f"Impossible d'attacher la CNI: {e}")
-        
-        # Envoyer
-        email.send()
+        sgi_name = aor.sgi.name.replace(' ', '_') if aor.sgi else 'SGI'
+        self._attach_documents(email, attachments, f'Contrat_{sgi_name}_{client_name}', f'Annexes_{sgi_name}_{client_name}', client_name)
+        return email
     
-    def _send_sgi_manager_email(self, aor, to_email: str, contract_pdf: bytes, annexes_pdf: bytes):
-        """Envoie l'email au manager de la SGI"""
+    def _build_sgi_manager_email(self, aor, to_email: str, attachments: dict) -> EmailMessage:
+        """Prépare l'email du manager de la SGI"""
         subject = f"Nouvelle demande d'ouverture de compte - {aor.full_name}"
         
         html_message = f"""
@@ -260,48 +273,11 @@ class ContractEmailService:
         email.content_subtype = "html"
         
         client_name = aor.full_name.replace(" ", "_")
-        
-        email.attach(
-            f'Contrat_{client_name}.pdf',
-            contract_pdf,
-            'application/pdf'
-        )
-        email.attach(
-            f'Annexes_{client_name}.pdf',
-            annexes_pdf,
-            'application/pdf'
-        )
-        
-        # Ajouter la photo si disponible
-        if aor.photo:
-            try:
-                photo_content = aor.photo.read()
-                aor.photo.seek(0)
-                email.attach(
-                    f'Photo_{client_name}.{aor.photo.name.split(".")[-1]}',
-                    photo_content,
-                    f'image/{aor.photo.name.split(".")[-1]}'
-                )
-            except Exception as e:
-                logger.warning(f"Impossible d'attacher la photo: {e}")
-        
-        # Ajouter la CNI si disponible
-        if aor.id_card_scan:
-            try:
-                id_content = aor.id_card_scan.read()
-                aor.id_card_scan.seek(0)
-                email.attach(
-                    f'CNI_{client_name}.{aor.id_card_scan.name.split(".")[-1]}',
-                    id_content,
-                    'application/pdf' if aor.id_card_scan.name.endswith('.pdf') else f'image/{aor.id_card_scan.name.split(".")[-1]}'
-                )
-            except Exception as e:
-                logger.warning(f"Impossible d'attacher la CNI: {e}")
-        
-        email.send()
+        self._attach_documents(email, attachments, f'Contrat_{client_name}', f'Annexes_{client_name}', client_name)
+        return email
     
-    def _send_xamila_team_email(self, aor, contract_pdf: bytes, annexes_pdf: bytes):
-        """Envoie l'email à l'équipe Xamila"""
+    def _build_xamila_team_email(self, aor, attachments: dict) -> EmailMessage:
+        """Prépare l'email de l'équipe Xamila"""
         subject = f"[NOUVELLE DEMANDE] {aor.full_name} - {aor.sgi.name if aor.sgi else 'SGI'}"
         
         html_message = f"""
@@ -350,48 +326,11 @@ class ContractEmailService:
         email.content_subtype = "html"
         
         client_name = aor.full_name.replace(" ", "_")
-        
-        email.attach(
-            f'Contrat_{aor.id}.pdf',
-            contract_pdf,
-            'application/pdf'
-        )
-        email.attach(
-            f'Annexes_{aor.id}.pdf',
-            annexes_pdf,
-            'application/pdf'
-        )
-        
-        # Ajouter la photo si disponible
-        if aor.photo:
-            try:
-                photo_content = aor.photo.read()
-                aor.photo.seek(0)
-                email.attach(
-                    f'Photo_{client_name}.{aor.photo.name.split(".")[-1]}',
-                    photo_content,
-                    f'image/{aor.photo.name.split(".")[-1]}'
-                )
-            except Exception as e:
-                logger.warning(f"Impossible d'attacher la photo: {e}")
-        
-        # Ajouter la CNI si disponible
-        if aor.id_card_scan:
-            try:
-                id_content = aor.id_card_scan.read()
-                aor.id_card_scan.seek(0)
-                email.attach(
-                    f'CNI_{client_name}.{aor.id_card_scan.name.split(".")[-1]}',
-                    id_content,
-                    'application/pdf' if aor.id_card_scan.name.endswith('.pdf') else f'image/{aor.id_card_scan.name.split(".")[-1]}'
-                )
-            except Exception as e:
-                logger.warning(f"Impossible d'attacher la CNI: {e}")
-        
-        email.send()
+        self._attach_documents(email, attachments, f'Contrat_{aor.id}', f'Annexes_{aor.id}', client_name)
+        return email
     
-    def _send_admin_email(self, aor, to_email: str, contract_pdf: bytes, annexes_pdf: bytes):
-        """Envoie l'email à un administrateur"""
+    def _build_admin_email(self, aor, to_email: str, attachments: dict) -> EmailMessage:
+        """Prépare l'email d'un administrateur"""
         subject = f"[ADMIN] Nouvelle demande - {aor.full_name} - {aor.sgi.name if aor.sgi else 'SGI'}"
         
         html_message = f"""
@@ -445,42 +384,5 @@ class ContractEmailService:
         email.content_subtype = "html"
         
         client_name = aor.full_name.replace(" ", "_")
-        
-        email.attach(
-            f'Contrat_{aor.id}.pdf',
-            contract_pdf,
-            'application/pdf'
-        )
-        email.attach(
-            f'Annexes_{aor.id}.pdf',
-            annexes_pdf,
-            'application/pdf'
-        )
-        
-        # Ajouter la photo si disponible
-        if aor.photo:
-            try:
-                photo_content = aor.photo.read()
-                aor.photo.seek(0)
-                email.attach(
-                    f'Photo_{client_name}.{aor.photo.name.split(".")[-1]}',
-                    photo_content,
-                    f'image/{aor.photo.name.split(".")[-1]}'
-                )
-            except Exception as e:
-                logger.warning(f"Impossible d'attacher la photo: {e}")
-        
-        # Ajouter la CNI si disponible
-        if aor.id_card_scan:
-            try:
-                id_content = aor.id_card_scan.read()
-                aor.id_card_scan.seek(0)
-                email.attach(
-                    f'CNI_{client_name}.{aor.id_card_scan.name.split(".")[-1]}',
-                    id_content,
-                    'application/pdf' if aor.id_card_scan.name.endswith('.pdf') else f'image/{aor.id_card_scan.name.split(".")[-1]}'
-                )
-            except Exception as e:
-                logger.warning(f"Impossible d'attacher la CNI: {e}")
-        
-        email.send()
+        self._attach_documents(email, attachments, f'Contrat_{aor.id}', f'Annexes_{aor.id}', client_name)
+        return email
@@ -0,0 +1,293 @@
+"""
+Exports en flux (CSV, JSONL, gzip) du back-office
+Les lignes sont lues par tranches de taille fixe (pagination par clé primaire,
+colonnes projetées avec values()) et écrites au fil de l'eau dans une
+StreamingHttpResponse: la mémoire reste constante quelle que soit la taille de
+l'export et le premier octet part avant la lecture de la deuxième tranche.
+"""
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+import csv
+import logging
+import zlib
+
+from .models import Cohorte, Contract
+from .models_savings_challenge import SavingsDeposit
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FORMATS = ('csv', 'jsonl')
+
+_CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+
+class Column:
+    """
+    Colonne d'un export
+
+    Args:
+        key: Nom de la colonne en JSONL
+        header: En-tête CSV
+        field: Champ lu par values() (relations avec __)
+        display: Mise en forme CSV optionnelle de la valeur
+    """
+
+    def __init__(self, key, header, field=None, display=None):
+        self.key = key
+        self.header = header
+        self.field = field or key
+        self.display = display
+
+    def csv_value(self, value):
+        if self.display is not None:
+            return self.display(value)
+        return '' if value is None else value
+
+
+def yes_no(value):
+    return 'Oui' if value else 'Non'
+
+
+def date_time(value, empty=''):
+    return value.strftime('%Y-%m-%d %H:%M:%S') if value else empty
+
+
+def choices(options):
+    """Affiche le libellé d'un champ à choix"""
+    labels = {code: str(label) for code, label in options}
+    return lambda value: labels.get(value, value or '')
+
+
+class _Buffer:
+    """Tampon minimal pour csv.writer: chaque ligne écrite est renvoyée telle quelle"""
+
+    def write(self, value):
+        return value
+
+
+class StreamingExport:
+    """
+    Export en flux d'un queryset
+
+    Usage:
+        export = StreamingExport(User.objects.filter(...), USER_COLUMNS, fmt='csv', compress=True)
+        return export.response('users')
+    """
+
+    def __init__(self, queryset, columns, fmt='csv', compress=False, chunk_size=EXPORT_CHUNK_SIZE):
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Format d'export inconnu: {fmt}")
+        self.queryset = queryset
+        self.columns = columns
+        self.fmt = fmt
+        self.compress = compress
+        self.chunk_size = chunk_size
+        self._first_chunk = None
+
+    def _chunk(self, last_pk=None):
+        fields = ['pk'] + [column.field for column in self.columns]
+        queryset = self.queryset.order_by('pk').values(*fields)
+        if last_pk is not None:
+            queryset = queryset.filter(pk__gt=last_pk)
+        return list(queryset[:self.chunk_size])
+
+    def rows(self):
+        """
+        Lignes projetées, tranche par tranche (pk > dernier pk lu)
+
+        Pas de curseur serveur: le client MySQL met en tampon tout le résultat
+        d'une requête, la pagination par clé garde chaque requête bornée.
+        """
+        chunk, self._first_chunk = self._first_chunk, None
+        if chunk is None:
+            chunk = self._chunk()
+        while chunk:
+            yield from chunk
+            if len(chunk) < self.chunk_size:
+                return
+            chunk = self._chunk(chunk[-1]['pk'])
+
+    def _lines(self):
+        if self.fmt == 'csv':
+            writer = csv.writer(_Buffer())
+            yield writer.writerow([column.header for column in self.columns])
+            for row in self.rows():
+                yield writer.writerow([column.csv_value(row[column.field]) for column in self.columns])
+        else:
+            encoder = DjangoJSONEncoder(ensure_ascii=False)
+            for row in self.rows():
+                yield encoder.encode({column.key: row[column.field] for column in self.columns}) + '\n'
+
+    def chunks(self):
+        """Octets de l'export, regroupés par tranche (compressés en gzip si demandé)"""
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if self.compress else None
+        batch = []
+        for line in self._lines():
+            batch.append(line)
+            if len(batch) >= self.chunk_size:
+                data = ''.join(batch).encode('utf-8')
+                batch = []
+                yield compressor.compress(data) if compressor else data
+        data = ''.join(batch).encode('utf-8')
+        if compressor:
+            yield compressor.compress(data) + compressor.flush()
+        elif data:
+            yield data
+
+    def response(self, name):
+        """
+        StreamingHttpResponse en pièce jointe: {name}_export_{horodatage}.{csv|jsonl}[.gz]
+
+        La première tranche est lue avant de renvoyer la réponse: un filtre invalide
+        lève ici, avant l'envoi des en-têtes 200, plutôt qu'en tronquant le fichier.
+        """
+        self._first_chunk = self._chunk()
+        filename = f"{name}_export_{timezone.now().strftime('%Y%m%d_%H%M%S')}.{self.fmt}"
+        if self.compress:
+            filename += '.gz'
+            content_type = 'application/gzip'
+        else:
+            content_type = _CONTENT_TYPES[self.fmt]
+        response = StreamingHttpResponse(self.chunks(), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response['X-Accel-Buffering'] = 'no'  # pas de mise en tampon par nginx
+        return response
+
+
+# ----------------------------------------------------------------------
+# Jeux de données exportables
+# ----------------------------------------------------------------------
+
+class Dataset:
+    """
+    Jeu de données exportable: queryset filtré selon les paramètres de la requête et colonnes
+
+    Args:
+        queryset: Fonction (paramètres GET) -> queryset filtré
+        columns: Colonnes exportées
+    """
+
+    def __init__(self, queryset, columns):
+        self.queryset = queryset
+        self.columns = columns
+
+    def export(self, params, fmt='csv', compress=False):
+        return StreamingExport(self.queryset(params), self.columns, fmt=fmt, compress=compress)
+
+
+def _users(params):
+    users = User.objects.all()
+    if params.get('role'):
+        users = users.filter(role=params['role'])
+    if params.get('is_verified') is not None:
+        users = users.filter(is_verified=params['is_verified'].lower() == 'true')
+    if params.get('country'):
+        users = users.filter(
+            Q(country_of_residence__icontains=params['country']) |
+            Q(country__icontains=params['country'])
+        )
+    return users
+
+
+def _contracts(params):
+    contracts = Contract.objects.all()
+    if params.get('status'):
+        contracts = contracts.filter(status=params['status'])
+    if params.get('sgi'):
+        contracts = contracts.filter(sgi_id=params['sgi'])
+    return contracts
+
+
+def _savings_deposits(params):
+    deposits = SavingsDeposit.objects.all()
+    if params.get('status'):
+        deposits = deposits.filter(status=params['status'])
+    if params.get('challenge'):
+        deposits = deposits.filter(participation__challenge_id=params['challenge'])
+    return deposits
+
+
+def _cohorts(params):
+    cohorts = Cohorte.objects.all()
+    if params.get('annee'):
+        cohorts = cohorts.filter(annee=params['annee'])
+    if params.get('mois'):
+        cohorts = cohorts.filter(mois=params['mois'])
+    if params.get('actif') is not None:
+        cohorts = cohorts.filter(actif=params['actif'].lower() == 'true')
+    return cohorts
+
+
+USER_COLUMNS = [
+    Column('id', 'ID'),
+    Column('username', 'Username'),
+    Column('email', 'Email'),
+    Column('first_name', 'Prénom'),
+    Column('last_name', 'Nom'),
+    Column('phone', 'Téléphone'),
+    Column('role', 'Rôle', display=choices(User.ROLE_CHOICES)),
+    Column('is_active', 'Actif', display=yes_no),
+    Column('is_verified', 'Vérifié', display=yes_no),
+    Column('country_of_residence', 'Pays de résidence'),
+    Column('country', 'Pays d\'origine'),
+    Column('created_at', 'Date d\'inscription', display=date_time),
+    Column('last_login', 'Dernière connexion', display=lambda value: date_time(value, 'Jamais')),
+]
+
+
+CONTRACT_COLUMNS = [
+    Column('id', 'ID'),
+    Column('contract_number', 'Numéro de contrat'),
+    Column('customer_email', 'Client', field='customer__email'),
+    Column('sgi', 'SGI', field='sgi__name'),
+    Column('investment_amount', 'Montant investi'),
+    Column('funding_source', 'Source de financement', display=choices(Contract.FUNDING_SOURCES)),
+    Column('status', 'Statut', display=choices(Contract.STATUS_CHOICES)),
+    Column('created_at', 'Date de création', display=date_time),
+    Column('approved_at', 'Date d\'approbation', display=date_time),
+    Column('rejected_at', 'Date de rejet', display=date_time),
+]
+
+
+SAVINGS_DEPOSIT_COLUMNS = [
+    Column('id', 'ID'),
+    Column('user_email', 'Épargnant', field='participation__user__email'),
+    Column('challenge', 'Défi', field='participation__challenge__title'),
+    Column('amount', 'Montant (FCFA)'),
+    Column('deposit_method', 'Méthode', display=choices(SavingsDeposit.DEPOSIT_METHODS)),
+    Column('status', 'Statut', display=choices(SavingsDeposit.DEPOSIT_STATUS)),
+    Column('transaction_reference', 'Référence'),
+    Column('points_awarded', 'Points'),
+    Column('processed_at', 'Date de traitement', display=date_time),
+    Column('created_at', 'Date du dépôt', display=date_time),
+]
+
+
+COHORT_COLUMNS = [
+    Column('id', 'ID'),
+    Column('code', 'Code'),
+    Column('nom', 'Nom'),
+    Column('mois', 'Mois'),
+    Column('annee', 'Année'),
+    Column('email_utilisateur', 'Email utilisateur'),
+    Column('actif', 'Active', display=yes_no),
+    Column('created_at', 'Date de création', display=date_time),
+]
+
+
+DATASETS = {
+    'users': Dataset(_users, USER_COLUMNS),
+    'contracts': Dataset(_contracts, CONTRACT_COLUMNS),
+    'savings_deposits': Dataset(_savings_deposits, SAVINGS_DEPOSIT_COLUMNS),
+    'cohorts': Dataset(_cohorts, COHORT_COLUMNS),
+}
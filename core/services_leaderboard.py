@@ -0,0 +1,181 @@
+"""
+Classements des compétitions de trading
+Le classement de chaque compétition est tenu dans le cache Django sous forme d'index
+trié segmenté (utils_cache.SortedCacheIndex), mis à jour incrémentalement à chaque
+changement de valeur d'un portefeuille et relu depuis la base au plus tard après
+LEADERBOARD_CACHE_TIMEOUT. Les lectures ne font aucune écriture en base: les rangs
+sont persistés en masse par la commande persist_leaderboard_ranks.
+"""
+from django.db import transaction
+from django.db.models import F
+import logging
+
+from .models_trading import CompetitionParticipant
+from .utils_cache import SortedCacheIndex
+
+logger = logging.getLogger(__name__)
+
+
+LEADERBOARD_CACHE_NAMESPACE = 'trading_leaderboard'
+LEADERBOARD_CACHE_TIMEOUT = 3600
+PERSIST_BATCH_SIZE = 500
+
+
+def _namespace(competition_id):
+    return f"{LEADERBOARD_CACHE_NAMESPACE}:{competition_id}"
+
+
+def _sort_key(participant_id, portfolio_return):
+    """Clé de tri: rendement décroissant, puis identifiant pour départager les ex aequo"""
+    return (-portfolio_return, str(participant_id))
+
+
+class CompetitionLeaderboard:
+    """
+    Classement d'une compétition de trading
+
+    L'index contient les clés de tri (-rendement, id participant) des participants
+    actifs; le rang d'un participant est la position de sa clé (à partir de 1).
+    """
+
+    def __init__(self, competition_id):
+        self.competition_id = competition_id
+        self.index = SortedCacheIndex(_namespace(competition_id), self._build, LEADERBOARD_CACHE_TIMEOUT)
+
+    def _build(self):
+        """Clés de tri de tous les participants actifs, en une requête"""
+        rows = CompetitionParticipant.objects.filter(
+            competition_id=self.competition_id,
+            status='ACTIVE'
+        ).annotate(
+            portfolio_return=F('portfolio__total_value') - F('portfolio__initial_capital')
+        ).values_list('id', 'portfolio_return')
+        return [_sort_key(pid, ret) for pid, ret in rows]
+
+    def _apply(self, participant_id, portfolio_return):
+        """Met à jour la position d'un participant (retiré si portfolio_return est None)"""
+        key = _sort_key(participant_id, portfolio_return) if portfolio_return is not None else None
+        self.index.move(str(participant_id), key)
+
+    # ------------------------------------------------------------------
+    # Mises à jour
+    # ------------------------------------------------------------------
+
+    def update(self, participant_id, portfolio_return):
+        """Repositionne un participant après le commit courant"""
+        transaction.on_commit(lambda: self._apply(participant_id, portfolio_return))
+
+    def remove(self, participant_id):
+        """Retire un participant du classement après le commit courant"""
+        transaction.on_commit(lambda: self._apply(participant_id, None))
+
+    def invalidate(self):
+        """Force la reconstruction du classement à la prochaine lecture"""
+        self.index.invalidate()
+
+    # ------------------------------------------------------------------
+    # Lectures
+    # ------------------------------------------------------------------
+
+    def count(self):
+        return self.index.count()
+
+    def rank_of(self, participant_id):
+        """Rang d'un participant (None s'il n'est pas classé)"""
+        key = self.index.keys_of([participant_id]).get(str(participant_id))
+        if key is None:
+            return None
+        return self.index.positions([key])[0] + 1
+
+    def ranks(self):
+        """Dict id participant -> rang pour tout le classement"""
+        keys, _ = self.index.slice(0, self.index.count())
+        return {key[1]: rank for rank, key in enumerate(keys, 1)}
+
+    def window(self, offset, limit):
+        """
+        Participants classés entre offset et offset + limit
+
+        Returns:
+            Tuple (participants avec current_rank renseigné, nombre total de classés)
+        """
+        offset = max(offset, 0)
+        page, total = self.index.slice(offset, limit)
+
+        participants = {
+            str(participant.id): participant
+            for participant in CompetitionParticipant.objects.select_related(
+                'user', 'competition', 'portfolio'
+            ).filter(id__in=[key[1] for key in page])
+        }
+
+        results = []
+        for rank, key in enumerate(page, offset + 1):
+            participant = participants.get(key[1])
+            if participant is None:
+                continue
+            # Rang affiché uniquement, la persistance est faite par persist_ranks
+            participant.current_rank = rank
+            results.append(participant)
+        return results, total
+
+    def around(self, participant_id, radius=10):
+        """
+        Fenêtre "mon rang ± radius"
+
+        Returns:
+            Tuple (participants, nombre total de classés, rang du participant ou None)
+        """
+        rank = self.rank_of(participant_id)
+        if rank is None:
+            return [], self.count(), None
+        start = max(rank - 1 - radius, 0)
+        participants, total = self.window(start, rank + radius - start)
+        return participants, total, rank
+
+    # ------------------------------------------------------------------
+    # Persistance
+    # ------------------------------------------------------------------
+
+    def persist_ranks(self):
+        """
+        Écrit current_rank en base pour les participants dont le rang a changé
+
+        Returns:
+            Nombre de participants mis à jour
+        """
+        ranks = self.ranks()
+        changed = []
+        for participant in CompetitionParticipant.objects.filter(
+            competition_id=self.competition_id
+        ).only('id', 'current_rank', 'status'):
+            rank = ranks.get(str(participant.id)) if participant.status == 'ACTIVE' else None
+            if participant.current_rank != rank:
+                participant.current_rank = rank
+                changed.append(participant)
+
+        if changed:
+            CompetitionParticipant.objects.bulk_update(changed, ['current_rank'], batch_size=PERSIST_BATCH_SIZE)
+        return len(changed)
+
+
+def sync_participant(participant):
+    """Reporte dans le classement le statut et le rendement d'un participant"""
+    leaderboard = CompetitionLeaderboard(participant.competition_id)
+    if participant.status != 'ACTIVE':
+        leaderboard.remove(participant.id)
+        return
+    portfolio = participant.portfolio
+    leaderboard.update(participant.id, portfolio.total_value - portfolio.initial_capital)
+
+
+def sync_portfolio(portfolio):
+    """Repositionne le participant d'un portefeuille de compétition"""
+    if portfolio.portfolio_type != 'COMPETITION':
+        return
+    try:
+        participant = portfolio.competition_participation
+    except CompetitionParticipant.DoesNotExist:
+        return
+    participant.portfolio = portfolio
+    sync_participant(participant)
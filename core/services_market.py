@@ -0,0 +1,301 @@
+"""
+Simulateur de marché pour le module Trading
+Toutes les actions actives avancent en un seul pas vectorisé NumPy par tick
+(marche aléatoire ou mouvement brownien géométrique, bêta/volatilité par action).
+Les prix sont écrits par bulk_update et les bougies OHLCV par bulk_create.
+"""
+from decimal import Decimal
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+import logging
+
+try:
+    import numpy as np  # type: ignore
+    NUMPY_AVAILABLE = True
+except Exception:
+    NUMPY_AVAILABLE = False
+
+from .models_trading import StockExtended, PriceHistory, TradingOrder
+from .services_candles import CandleRollupService, TIMEFRAME_ORDER, bucket_start
+from .services_trading import OrderExecutionService
+
+logger = logging.getLogger(__name__)
+
+
+SIMULATION_MODELS = ('gbm', 'random_walk')
+
+# Périodes de bougies que le simulateur peut écrire (les plus grossières sont agrégées)
+SIMULATED_TIMEFRAMES = TIMEFRAME_ORDER[:5]
+
+MIN_PRICE = 0.01
+WRITE_BATCH_SIZE = 1000
+
+
+def _to_decimal(values):
+    """Tableau de prix -> liste de Decimal arrondis au centime"""
+    return [Decimal(f"{value:.2f}") for value in values.tolist()]
+
+
+class MarketSimulator:
+    """
+    Simulateur de cotations des actions StockExtended
+
+    Le rendement d'une action à chaque tick combine un facteur de marché commun
+    (pondéré par son bêta) et un bruit propre:
+        r_i = beta_i * (drift + market_volatility * Z_m) + idiosyncratic_volatility * Z_i
+
+    - 'random_walk': prix_i *= 1 + r_i
+    - 'gbm': prix_i *= exp(r_i - sigma_i² / 2), sigma_i étant la volatilité totale de l'action
+
+    Les prix et la bougie en cours sont tenus en mémoire entre deux ticks. La bougie
+    est écrite dans PriceHistory à la fermeture de sa période.
+    """
+
+    def __init__(self, model='gbm', seed=None, timeframe='1MIN', drift=0.0,
+                 market_volatility=0.002, idiosyncratic_volatility=0.003):
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("NumPy est requis pour la simulation de marché (pip install numpy)")
+        if model not in SIMULATION_MODELS:
+            raise ValueError(f"Modèle inconnu '{model}' (attendu: {', '.join(SIMULATION_MODELS)})")
+        if timeframe not in SIMULATED_TIMEFRAMES:
+            raise ValueError(f"Période de bougie non supportée: {timeframe}")
+
+        self.model = model
+        self.timeframe = timeframe
+        self.drift = drift
+        self.market_volatility = market_volatility
+        self.idiosyncratic_volatility = idiosyncratic_volatility
+        self.rng = np.random.default_rng(seed)
+
+        self.stocks = []
+        self.bucket = None
+        self.session_date = None
+        self.reload_requested = False
+        self.load()
+
+    # ------------------------------------------------------------------
+    # État
+    # ------------------------------------------------------------------
+
+    def load(self):
+        """(Re)charge les actions actives et leur état de cotation"""
+        self.stocks = list(
+            StockExtended.objects.filter(is_active=True).only(
+                'id', 'symbol', 'beta', 'current_price', 'high_price', 'low_price', 'volume', 'average_volume'
+            ).order_by('id')
+        )
+        count = len(self.stocks)
+        self.prices = np.array([float(s.current_price) for s in self.stocks], dtype=np.float64)
+        self.betas = np.array([float(s.beta) if s.beta is not None else 1.0 for s in self.stocks], dtype=np.float64)
+        self.day_high = np.array([float(s.high_price) for s in self.stocks], dtype=np.float64)
+        self.day_low = np.array([float(s.low_price) for s in self.stocks], dtype=np.float64)
+        self.day_volume = np.array([s.volume for s in self.stocks], dtype=np.int64)
+        # Volume moyen par tick: proportionnel au volume moyen journalier (1000 par défaut)
+        average = np.array([s.average_volume or 0 for s in self.stocks], dtype=np.float64)
+        self.tick_volume_mean = np.where(average > 0, average / 1000.0, 1000.0)
+
+        self.session_open = None
+        self.sigmas = np.sqrt((self.betas * self.market_volatility) ** 2 + self.idiosyncratic_volatility ** 2)
+        self._reset_candles()
+        logger.info(f"Simulateur de marché: {count} action(s) chargée(s)")
+        return count
+
+    def _reset_candles(self):
+        self.candle_open = self.prices.copy()
+        self.candle_high = self.prices.copy()
+        self.candle_low = self.prices.copy()
+        self.candle_volume = np.zeros(len(self.stocks), dtype=np.int64)
+
+    # ------------------------------------------------------------------
+    # Simulation
+    # ------------------------------------------------------------------
+
+    def step(self):
+        """
+        Avance tous les prix d'un pas (en mémoire)
+
+        Returns:
+            Tuple (prix précédents, nouveaux prix, volumes du tick)
+        """
+        count = len(self.stocks)
+        market = self.drift + self.market_volatility * self.rng.standard_normal()
+        returns = self.betas * market + self.idiosyncratic_volatility * self.rng.standard_normal(count)
+
+        previous = self.prices
+        if self.model == 'gbm':
+            prices = previous * np.exp(returns - self.sigmas ** 2 / 2)
+        else:
+            prices = previous * (1.0 + returns)
+        prices = np.maximum(prices, MIN_PRICE)
+
+        # Extrêmes intra-tick: au-delà de l'ouverture et de la clôture du pas
+        spread = np.abs(self.rng.standard_normal(count)) * self.sigmas / 2
+        high = np.maximum(previous, prices) * (1.0 + spread)
+        low = np.maximum(np.minimum(previous, prices) * (1.0 - spread), MIN_PRICE)
+        volumes = self.rng.poisson(self.tick_volume_mean).astype(np.int64)
+
+        self.prices = prices
+        self.candle_high = np.maximum(self.candle_high, high)
+        self.candle_low = np.minimum(self.candle_low, low)
+        self.candle_volume += volumes
+        self.day_high = np.maximum(self.day_high, high)
+        self.day_low = np.minimum(self.day_low, low)
+        self.day_volume += volumes
+        return previous, prices, volumes
+
+    def tick(self, now=None, persist=True, fill_orders=True):
+        """
+        Un tick de marché: pas de simulation, fermeture éventuelle de la bougie,
+        écriture des prix et exécution des ordres LIMIT atteints
+
+        Args:
+            now: Horodatage du tick (maintenant par défaut)
+            persist: Écrire les prix en base à ce tick
+            fill_orders: Exécuter les ordres LIMIT en attente au nouveau prix
+
+        Returns:
+            Dict {stocks, candles, filled}
+        """
+        now = now or timezone.now()
+        result = {'stocks': len(self.stocks), 'candles': 0, 'filled': 0}
+        if not self.stocks:
+            return result
+
+        bucket = bucket_start(now, self.timeframe)
+        if self.bucket is None:
+            self.bucket = bucket
+        elif bucket != self.bucket:
+            result['candles'] = self.flush_candles()
+            self.bucket = bucket
+            if self.reload_requested:
+                # Entre deux bougies: aucune bougie partielle n'est perdue
+                self.persist(now)
+                self.load()
+                self.reload_requested = False
+
+        session_date = timezone.localdate(now)
+        if session_date != self.session_date:
+            if self.session_date is not None:
+                self.roll_session()
+            self.session_date = session_date
+
+        self.step()
+        if persist:
+            self.persist(now)
+            if fill_orders:
+                result['filled'] = self.fill_limit_orders()
+        return result
+
+    def roll_session(self):
+        """Nouvelle séance: clôture précédente, ouverture, extrêmes et volume repartent du prix courant"""
+        self.session_open = self.prices.copy()
+        self.day_high = self.prices.copy()
+        self.day_low = self.prices.copy()
+        self.day_volume = np.zeros(len(self.stocks), dtype=np.int64)
+
+    # ------------------------------------------------------------------
+    # Écritures
+    # ------------------------------------------------------------------
+
+    def persist(self, now=None):
+        """Écrit les cotations de toutes les actions en une série de bulk_update"""
+        now = now or timezone.now()
+        prices = _to_decimal(self.prices)
+        highs = _to_decimal(self.day_high)
+        lows = _to_decimal(self.day_low)
+        volumes = self.day_volume.tolist()
+        fields = ['current_price', 'high_price', 'low_price', 'volume', 'last_price_update', 'updated_at']
+
+        for index, stock in enumerate(self.stocks):
+            stock.current_price = prices[index]
+            stock.high_price = highs[index]
+            stock.low_price = lows[index]
+            stock.volume = volumes[index]
+            stock.last_price_update = now
+            stock.updated_at = now
+
+        if self.session_open is not None:
+            # Séance changée depuis le chargement
+            opens = _to_decimal(self.session_open)
+            for index, stock in enumerate(self.stocks):
+                stock.previous_close = stock.opening_price = opens[index]
+            fields += ['previous_close', 'opening_price']
+
+        StockExtended.objects.bulk_update(self.stocks, fields, batch_size=WRITE_BATCH_SIZE)
+
+    def flush_candles(self):
+        """
+        Écrit la bougie en cours de chaque action dans PriceHistory et en ouvre une nouvelle
+
+        Les bougies déjà présentes pour cette période (écrites par un autre simulateur,
+        ou par ce processus avant un redémarrage) ne sont ni réécrites ni agrégées une
+        seconde fois: seules les bougies effectivement insérées alimentent les rollups.
+
+        Returns:
+            Nombre de bougies écrites
+        """
+        if self.bucket is None or not self.stocks:
+            return 0
+
+        opens = _to_decimal(self.candle_open)
+        highs = _to_decimal(self.candle_high)
+        lows = _to_decimal(self.candle_low)
+        closes = _to_decimal(self.prices)
+        volumes = self.candle_volume.tolist()
+
+        candles = [
+            PriceHistory(
+                stock_id=stock.id,
+                timestamp=self.bucket,
+                timeframe=self.timeframe,
+                open_price=opens[index],
+                high_price=highs[index],
+                low_price=lows[index],
+                close_price=closes[index],
+                volume=volumes[index],
+            )
+            for index, stock in enumerate(self.stocks)
+        ]
+        for attempt in range(2):
+            try:
+                with transaction.atomic():
+                    existing = set(PriceHistory.objects.filter(
+                        stock_id__in=[candle.stock_id for candle in candles],
+                        timestamp=self.bucket,
+                        timeframe=self.timeframe,
+                    ).values_list('stock_id', flat=True))
+                    inserted = [candle for candle in candles if candle.stock_id not in existing]
+                    # Sans ignore_conflicts: une bougie insérée entre-temps annule le lot
+                    # (relu une fois) plutôt que d'être agrégée deux fois
+                    PriceHistory.objects.bulk_create(inserted, batch_size=WRITE_BATCH_SIZE)
+                    # Résolutions plus grossières (5MIN ... 1MONTH) mises à jour incrémentalement
+                    CandleRollupService().ingest(inserted)
+                break
+            except IntegrityError:
+                if attempt:
+                    raise
+                logger.warning(f"Bougies du {self.bucket} écrites en parallèle, nouvelle lecture")
+        self._reset_candles()
+        return len(inserted)
+
+    def fill_limit_orders(self):
+        """
+        Exécute les ordres LIMIT en attente sur les actions qui en ont
+        (une requête pour trouver les actions concernées, un lot par action)
+
+        Returns:
+            Nombre d'ordres exécutés
+        """
+        stock_ids = set(
+            TradingOrder.objects.filter(status='PENDING', order_type='LIMIT')
+            .values_list('stock_id', flat=True).distinct()
+        )
+        if not stock_ids:
+            return 0
+
+        service = OrderExecutionService()
+        filled = 0
+        for stock in self.stocks:
+            if stock.id in stock_ids:
+                filled += len(service.execute_pending_limit_orders(stock, price=stock.current_price))
+        return filled
@@ -0,0 +1,219 @@
+"""
+Boîte de réception des notifications in-app
+Le nombre de notifications non lues de chaque utilisateur est tenu dans le cache
+Django: incrémenté à la création, décrémenté à la lecture, recompté depuis la base
+en cas d'absence (expiration, redémarrage) et réconcilié périodiquement. La liste
+est paginée par curseur sur (created_at, id), sans COUNT ni OFFSET.
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils.dateparse import parse_datetime
+import base64
+import logging
+import uuid
+
+from .models_notifications import Notification
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+
+UNREAD_COUNTER_TTL = 3600  # secondes: au-delà, le compteur est recompté depuis la base
+RECONCILE_BATCH_SIZE = 1000
+INBOX_PAGE_SIZE = 20
+INBOX_MAX_PAGE_SIZE = 100
+
+
+def _counter_key(user_id):
+    return f"notification_unread:{user_id}"
+
+
+def _unread(user_ids):
+    return Notification.objects.filter(
+        recipient_id__in=list(user_ids), notification_type='IN_APP', opened_at__isnull=True
+    )
+
+
+class UnreadCounter:
+    """
+    Compteurs de notifications in-app non lues
+
+    Les variations sont appliquées après le commit. Un compteur absent du cache
+    n'est pas modifié: la prochaine lecture le recompte depuis la base validée.
+    """
+
+    def get(self, user_id):
+        """Nombre de notifications non lues (une lecture du cache, un COUNT en cas d'absence)"""
+        count = cache.get(_counter_key(user_id))
+        if count is None:
+            count = _unread([user_id]).count()
+            # add: ne pas écraser un compteur posé entre-temps
+            cache.add(_counter_key(user_id), count, UNREAD_COUNTER_TTL)
+        return count
+
+    def _apply(self, user_id, delta):
+        key = _counter_key(user_id)
+        try:
+            count = cache.incr(key, delta)
+        except ValueError:
+            # Compteur absent: recompté à la prochaine lecture
+            return
+        if count < 0:
+            # Dérive (lecture déjà décomptée ailleurs): recompté à la prochaine lecture
+            cache.delete(key)
+
+    def increment(self, user_id, delta=1):
+        """Ajoute delta notifications non lues après le commit courant"""
+        if delta:
+            transaction.on_commit(lambda: self._apply(user_id, delta))
+
+    def decrement(self, user_id, delta=1):
+        """Retire delta notifications non lues après le commit courant"""
+        if delta:
+            transaction.on_commit(lambda: self._apply(user_id, -delta))
+
+    def increment_many(self, deltas):
+        """Applique plusieurs incréments {id utilisateur: delta} après le commit courant"""
+        deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+        if not deltas:
+            return
+
+        def _apply_all():
+            for user_id, delta in deltas.items():
+                self._apply(user_id, delta)
+
+        transaction.on_commit(_apply_all)
+
+    def reconcile(self, user_ids):
+        """
+        Recompte depuis la base les compteurs de plusieurs utilisateurs (une requête groupée)
+
+        Returns:
+            Nombre de compteurs écrits
+        """
+        user_ids = [str(user_id) for user_id in user_ids]
+        counts = {user_id: 0 for user_id in user_ids}
+        for recipient_id, count in _unread(user_ids).order_by().values('recipient_id').annotate(
+            count=Count('id')
+        ).values_list('recipient_id', 'count'):
+            counts[str(recipient_id)] = count
+        cache.set_many({_counter_key(user_id): count for user_id, count in counts.items()}, UNREAD_COUNTER_TTL)
+        return len(counts)
+
+    def reconcile_all(self, batch_size=RECONCILE_BATCH_SIZE):
+        """
+        Recompte les compteurs de tous les utilisateurs actifs, par tranches d'identifiants
+
+        Returns:
+            Nombre de compteurs écrits
+        """
+        users = User.objects.filter(is_active=True).order_by('id').values_list('id', flat=True)
+        last_id = None
+        written = 0
+        while True:
+            chunk = users.filter(id__gt=last_id) if last_id is not None else users
+            chunk = list(chunk[:batch_size])
+            if not chunk:
+                break
+            written += self.reconcile(chunk)
+            last_id = chunk[-1]
+        return written
+
+
+def encode_cursor(created_at, notification_id):
+    """Curseur opaque pointant après la notification (date de création, id)"""
+    raw = f"{created_at.isoformat()}|{notification_id}".encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Curseur -> (date de création, id notification); ValueError si le curseur est invalide"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, notification_id = base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8').split('|')
+        created_at = parse_datetime(created_at)
+        if created_at is None:
+            raise ValueError(cursor)
+        return created_at, uuid.UUID(notification_id)
+    except (ValueError, UnicodeError) as e:
+        raise ValueError(f"Curseur invalide: {cursor}") from e
+
+
+class NotificationInbox:
+    """
+    Notifications in-app d'un utilisateur, des plus récentes aux plus anciennes
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.counter = UnreadCounter()
+
+    def unread_count(self):
+        return self.counter.get(self.user.id)
+
+    def page(self, page_size=INBOX_PAGE_SIZE, cursor=None, unread_only=False, page=None):
+        """
+        Page de notifications après le curseur donné
+
+        Sans curseur, l'ancien paramètre page reste accepté (découpage par OFFSET).
+
+        Returns:
+            Dict {notifications, next_cursor, has_more}
+        """
+        page_size = max(1, min(page_size, INBOX_MAX_PAGE_SIZE))
+        notifications = Notification.objects.filter(
+            recipient=self.user, notification_type='IN_APP'
+        ).select_related('campaign').order_by('-created_at', '-id')
+        if unread_only:
+            notifications = notifications.filter(opened_at__isnull=True)
+
+        if cursor:
+            created_at, notification_id = decode_cursor(cursor)
+            notifications = notifications.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=notification_id)
+            )
+            offset = 0
+        else:
+            offset = (max(page or 1, 1) - 1) * page_size
+
+        # Une ligne de plus pour savoir s'il reste une page, sans COUNT
+        rows = list(notifications[offset:offset + page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        return {
+            'notifications': rows,
+            'next_cursor': encode_cursor(rows[-1].created_at, rows[-1].id) if has_more else None,
+            'has_more': has_more,
+        }
+
+    def mark_read(self, notification_id, now):
+        """
+        Marque une notification comme lue (une seule fois, même en cas d'appels concurrents)
+
+        Returns:
+            True si la notification existe pour cet utilisateur
+        """
+        notifications = Notification.objects.filter(id=notification_id, recipient=self.user)
+        notification_type = notifications.values_list('notification_type', flat=True).first()
+        if notification_type is None:
+            return False
+        updated = notifications.filter(opened_at__isnull=True).update(
+            opened_at=now, status='OPENED', updated_at=now
+        )
+        if updated and notification_type == 'IN_APP':
+            self.counter.decrement(self.user.id)
+        return True
+
+    def mark_all_read(self, now):
+        """
+        Marque toutes les notifications in-app non lues comme lues
+
+        Returns:
+            Nombre de notifications marquées
+        """
+        updated = _unread([self.user.id]).update(opened_at=now, status='OPENED')
+        self.counter.decrement(self.user.id, updated)
+        return updated
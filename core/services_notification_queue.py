@@ -0,0 +1,287 @@
+"""
+Worker de la file des notifications (NotificationQueue)
+Les entrées sont réservées par lots (SELECT ... FOR UPDATE SKIP LOCKED) dans l'ordre
+de priorité: plusieurs workers se partagent la file sans se bloquer. Un lot est
+envoyé en parallèle (emails par connexion SMTP partagée, SMS via utils_sms), puis
+les résultats et le journal NotificationLog sont écrits en bloc.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+import logging
+
+from .models_notifications import Notification, NotificationLog, NotificationQueue
+from .utils_email import EmailBatch
+from .utils_sms import get_sms_service, send_sms_mock, send_sms_nexmo, send_sms_twilio
+
+logger = logging.getLogger(__name__)
+
+
+QUEUE_BATCH_SIZE = 100
+QUEUE_CONCURRENCY = 4
+WRITE_BATCH_SIZE = 500
+
+# Canaux sans fournisseur externe: la notification enregistrée est la livraison
+IN_APP_CHANNELS = ('IN_APP', 'PUSH')
+
+
+class NotificationQueueWorker:
+    """
+    Traitement des entrées de la file des notifications
+
+    Cycle d'une entrée: QUEUED -> PROCESSING -> PROCESSED, ou RETRYING (reprise à
+    next_retry_at, délai doublé à chaque tentative) puis FAILED après max_retries
+    tentatives. Une entrée PROCESSING abandonnée par un worker arrêté est reprise
+    après STALE_AFTER.
+    """
+
+    RETRY_BASE_SECONDS = 30
+    RETRY_MAX_SECONDS = 3600
+    STALE_AFTER = timedelta(minutes=15)
+
+    def __init__(self, batch_size=QUEUE_BATCH_SIZE, concurrency=QUEUE_CONCURRENCY):
+        self.batch_size = batch_size
+        self.concurrency = max(1, concurrency)
+        self.from_email = settings.DEFAULT_FROM_EMAIL
+
+    # ------------------------------------------------------------------
+    # Réservation
+    # ------------------------------------------------------------------
+
+    def _due(self, now):
+        return NotificationQueue.objects.filter(
+            Q(status='QUEUED')
+            | Q(status='RETRYING', next_retry_at__lte=now)
+            | Q(status='PROCESSING', updated_at__lt=now - self.STALE_AFTER)
+        ).filter(
+            Q(notification__scheduled_at__isnull=True) | Q(notification__scheduled_at__lte=now)
+        )
+
+    def claim_batch(self, limit=None):
+        """
+        Réserve un lot d'entrées dues, par priorité puis ancienneté
+
+        Les lignes déjà verrouillées par un autre worker sont sautées (SKIP LOCKED).
+
+        Returns:
+            Liste des entrées réservées (notification et destinataire chargés)
+        """
+        limit = limit or self.batch_size
+        now = timezone.now()
+        with transaction.atomic():
+            ids = list(
+                self._due(now).select_for_update(skip_locked=True, of=('self',)).order_by(
+                    'priority', 'created_at'
+                ).values_list('id', flat=True)[:limit]
+            )
+            if not ids:
+                return []
+            NotificationQueue.objects.filter(id__in=ids).update(
+                status='PROCESSING', attempts=F('attempts') + 1, updated_at=now
+            )
+        return list(
+            NotificationQueue.objects.filter(id__in=ids).select_related(
+                'notification__recipient'
+            ).order_by('priority', 'created_at')
+        )
+
+    # ------------------------------------------------------------------
+    # Envoi
+    # ------------------------------------------------------------------
+
+    def _build_email(self, notification):
+        message = EmailMultiAlternatives(
+            subject=notification.subject,
+            body=notification.message,
+            from_email=self.from_email,
+            to=[notification.recipient.email] if notification.recipient.email else [],
+        )
+        if notification.html_content:
+            message.attach_alternative(notification.html_content, "text/html")
+        return message
+
+    def _send_emails(self, entries):
+        """Envoie un groupe d'emails sur une connexion SMTP; retourne {id entrée: erreur ou None}"""
+        batch = EmailBatch()
+        results = {}
+        for entry in entries:
+            try:
+                batch.add(str(entry.id), self._build_email(entry.notification))
+            except Exception as e:
+                results[str(entry.id)] = f"Préparation de l'email impossible: {e}"
+        for label, success in batch.send().items():
+            results[label] = None if success else batch.errors.get(label, 'Email non envoyé')
+        return results
+
+    def _send_sms(self, entry):
+        notification = entry.notification
+        phone = notification.recipient.phone
+        if not phone:
+            return {str(entry.id): 'Aucun numéro de téléphone'}
+
+        service = get_sms_service()
+        if service == 'twilio':
+            result = send_sms_twilio(phone, notification.message)
+        elif service == 'nexmo':
+            result = send_sms_nexmo(phone, notification.message)
+        else:
+            result = send_sms_mock(phone, notification.message, '')
+        return {str(entry.id): None if result.get('success') else result.get('error', 'SMS non envoyé')}
+
+    def _run(self, func, *args):
+        """Exécute un envoi dans un thread du pool en isolant ses connexions base de données"""
+        close_old_connections()
+        try:
+            return func(*args)
+        finally:
+            close_old_connections()
+
+    def dispatch(self, entries):
+        """
+        Envoie les notifications réservées en parallèle
+
+        Returns:
+            Dict id entrée (str) -> message d'erreur, ou None si l'envoi a réussi
+        """
+        results = {}
+        emails, sms = [], []
+        for entry in entries:
+            channel = entry.notification.notification_type
+            if channel == 'EMAIL':
+                emails.append(entry)
+            elif channel == 'SMS':
+                sms.append(entry)
+            elif channel in IN_APP_CHANNELS:
+                results[str(entry.id)] = None
+            else:
+                results[str(entry.id)] = f"Canal {channel} non pris en charge par la file"
+
+        # Emails répartis en groupes (une connexion SMTP par groupe), SMS un par tâche
+        groups = [emails[i::self.concurrency] for i in range(self.concurrency) if emails[i::self.concurrency]]
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = [executor.submit(self._run, self._send_emails, group) for group in groups]
+            futures += [executor.submit(self._run, self._send_sms, entry) for entry in sms]
+            for future in futures:
+                try:
+                    results.update(future.result())
+                except Exception as e:
+                    logger.error(f"Erreur d'envoi dans la file des notifications: {e}", exc_info=True)
+        return results
+
+    # ------------------------------------------------------------------
+    # Résultats
+    # ------------------------------------------------------------------
+
+    def _record(self, entries, results):
+        """Écrit en bloc les statuts des entrées et notifications, et le journal"""
+        now = timezone.now()
+        logs = []
+        for entry in entries:
+            notification = entry.notification
+            channel = notification.notification_type
+            error = results.get(str(entry.id), 'Envoi interrompu')
+
+            if error is None:
+                entry.status = 'PROCESSED'
+                entry.processed_at = now
+                entry.next_retry_at = None
+                notification.status = 'DELIVERED' if channel in IN_APP_CHANNELS else 'SENT'
+                notification.sent_at = now
+                if channel in IN_APP_CHANNELS:
+                    notification.delivered_at = now
+                notification.error_message = ''
+                logs.append(NotificationLog(
+                    notification=notification, level='INFO',
+                    message=f"Notification {channel} envoyée",
+                    details={'attempt': entry.attempts}
+                ))
+                continue
+
+            notification.error_message = error
+            notification.retry_count = entry.attempts
+            if entry.attempts >= notification.max_retries:
+                entry.status = 'FAILED'
+                entry.processed_at = now
+                entry.next_retry_at = None
+                notification.status = 'FAILED'
+                logs.append(NotificationLog(
+                    notification=notification, level='ERROR',
+                    message=f"Échec définitif de la notification {channel}",
+                    details={'attempt': entry.attempts, 'error': error}
+                ))
+            else:
+                delay = min(self.RETRY_BASE_SECONDS * 2 ** (entry.attempts - 1), self.RETRY_MAX_SECONDS)
+                entry.status = 'RETRYING'
+                entry.next_retry_at = now + timedelta(seconds=delay)
+                logs.append(NotificationLog(
+                    notification=notification, level='WARNING',
+                    message=f"Échec de la notification {channel}, nouvelle tentative dans {delay}s",
+                    details={'attempt': entry.attempts, 'error': error, 'retry_in': delay}
+                ))
+            entry.updated_at = now
+
+        with transaction.atomic():
+            NotificationQueue.objects.bulk_update(
+                entries, ['status', 'processed_at', 'next_retry_at', 'updated_at'],
+                batch_size=WRITE_BATCH_SIZE
+            )
+            Notification.objects.bulk_update(
+                [entry.notification for entry in entries],
+                ['status', 'sent_at', 'delivered_at', 'error_message', 'retry_count'],
+                batch_size=WRITE_BATCH_SIZE
+            )
+            NotificationLog.objects.bulk_create(logs, batch_size=WRITE_BATCH_SIZE)
+        return logs
+
+    # ------------------------------------------------------------------
+    # Boucle
+    # ------------------------------------------------------------------
+
+    def process_batch(self, limit=None):
+        """
+        Réserve, envoie et enregistre un lot
+
+        Returns:
+            Dict {claimed, sent, retrying, failed}
+        """
+        entries = self.claim_batch(limit)
+        stats = {'claimed': len(entries), 'sent': 0, 'retrying': 0, 'failed': 0}
+        if not entries:
+            return stats
+
+        self._record(entries, self.dispatch(entries))
+        for entry in entries:
+            if entry.status == 'PROCESSED':
+                stats['sent'] += 1
+            elif entry.status == 'RETRYING':
+                stats['retrying'] += 1
+            else:
+                stats['failed'] += 1
+        return stats
+
+    def drain(self, max_batches=None):
+        """
+        Traite les lots dus jusqu'à ce que la file soit vide (ou max_batches lots)
+
+        Returns:
+            Dict cumulé {claimed, sent, retrying, failed}
+        """
+        totals = {'claimed': 0, 'sent': 0, 'retrying': 0, 'failed': 0}
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            stats = self.process_batch()
+            for field, value in stats.items():
+                totals[field] += value
+            batches += 1
+            if stats['claimed'] < self.batch_size:
+                break
+        return totals
+
+
+def process_notification_queue(max_batches=None):
+    """Vide la file des notifications dues (point d'entrée des tâches d'arrière-plan)"""
+    return NotificationQueueWorker().drain(max_batches=max_batches)
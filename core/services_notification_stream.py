@@ -0,0 +1,167 @@
+"""
+Flux temps réel des notifications in-app (server-sent events)
+Chaque notification in-app est publiée sur le canal de son destinataire dès le
+commit; les connexions ouvertes du même processus la reçoivent immédiatement.
+Une connexion inactive relit la base à chaque battement de cœur, ce qui rattrape
+les notifications publiées par d'autres workers et celles manquées pendant une
+reconnexion (en-tête Last-Event-ID).
+"""
+from asgiref.sync import sync_to_async
+from collections import OrderedDict
+from datetime import timedelta
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.utils.encoders import JSONEncoder
+import asyncio
+import json
+import logging
+
+from .models_notifications import Notification
+from .serializers_notifications import NotificationSerializer
+from .utils_pubsub import get_broker
+
+logger = logging.getLogger(__name__)
+
+
+STREAM_HEARTBEAT_SECONDS = 25
+STREAM_MAX_SECONDS = 300  # le client se reconnecte ensuite (retry SSE)
+STREAM_RETRY_MS = 3000
+CATCH_UP_MARGIN = timedelta(seconds=30)  # commits tardifs: created_at antérieur à la publication
+CATCH_UP_LIMIT = 50
+SENT_MEMORY = 500
+
+
+def notification_channel(user_id):
+    return f"notifications:{user_id}"
+
+
+def notification_payload(notification):
+    """Représentation poussée au client (identique à celle de user_notifications)"""
+    return json.loads(json.dumps(NotificationSerializer(notification).data, cls=JSONEncoder))
+
+
+def publish_notification(notification):
+    """
+    Pousse une notification in-app à son destinataire après le commit courant
+    (sérialisée seulement s'il est connecté à ce processus)
+    """
+
+    def _publish():
+        try:
+            broker = get_broker()
+            channel = notification_channel(notification.recipient_id)
+            if broker.subscriber_count(channel):
+                broker.publish(channel, notification_payload(notification))
+        except Exception as e:
+            # La notification est enregistrée: elle sera relue par le flux
+            logger.error(f"Publication de la notification {notification.id} impossible: {str(e)}")
+
+    transaction.on_commit(_publish)
+
+
+def publish_notifications(notifications):
+    """
+    Pousse un lot de notifications in-app (bulk_create, sans signal) après le commit courant
+
+    Seuls les destinataires connectés à ce processus sont sérialisés; les autres
+    workers les relisent depuis la base.
+    """
+    notifications = list(notifications)
+
+    def _publish():
+        broker = get_broker()
+        for notification in notifications:
+            channel = notification_channel(notification.recipient_id)
+            if broker.subscriber_count(channel):
+                broker.publish(channel, notification_payload(notification))
+
+    if notifications:
+        transaction.on_commit(_publish)
+
+
+def format_event(payload):
+    """Événement SSE 'notification' identifié par l'id de la notification"""
+    data = json.dumps(payload, ensure_ascii=False)
+    return f"id: {payload['id']}\nevent: notification\ndata: {data}\n\n"
+
+
+class NotificationStream:
+    """
+    Flux SSE des notifications in-app d'un utilisateur
+
+    Garde la mémoire des derniers identifiants envoyés pour ne jamais pousser deux
+    fois la même notification (publication locale puis relecture de la base).
+    """
+
+    def __init__(self, user_id, last_event_id=None):
+        self.user_id = user_id
+        self.last_event_id = last_event_id
+        self.watermark = timezone.now()
+        self.sent = OrderedDict()
+
+    def _queryset(self):
+        return Notification.objects.filter(recipient_id=self.user_id, notification_type='IN_APP')
+
+    def _remember(self, notification_id):
+        self.sent[str(notification_id)] = True
+        while len(self.sent) > SENT_MEMORY:
+            self.sent.popitem(last=False)
+
+    def _start(self):
+        """Point de départ: la dernière notification reçue par le client, sinon maintenant"""
+        if self.last_event_id:
+            created_at = self._queryset().filter(id=self.last_event_id).values_list('created_at', flat=True).first()
+            if created_at is not None:
+                self.watermark = created_at
+        # Déjà connues du client: tout ce qui précède le point de départ dans la marge de relecture
+        for notification_id in self._queryset().filter(
+            created_at__gte=self.watermark - CATCH_UP_MARGIN, created_at__lte=self.watermark
+        ).values_list('id', flat=True):
+            self._remember(notification_id)
+
+    def _catch_up(self):
+        """Notifications non encore envoyées depuis le point de départ (une requête)"""
+        rows = list(
+            self._queryset().filter(created_at__gte=self.watermark - CATCH_UP_MARGIN).exclude(
+                id__in=list(self.sent)
+            ).select_related('recipient', 'campaign').order_by('created_at', 'id')[:CATCH_UP_LIMIT]
+        )
+        return [notification_payload(notification) for notification in rows]
+
+    def _advance(self, payload):
+        created_at = parse_datetime(payload.get('created_at') or '')
+        if created_at is not None and created_at > self.watermark:
+            self.watermark = created_at
+
+    async def events(self):
+        """Générateur asynchrone des fragments SSE"""
+        broker = get_broker()
+        subscription = broker.subscribe(notification_channel(self.user_id))
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + STREAM_MAX_SECONDS
+        try:
+            yield f"retry: {STREAM_RETRY_MS}\n\n"
+            await sync_to_async(self._start)()
+            # Rattrapage immédiat des notifications manquées pendant la reconnexion
+            pending = await sync_to_async(self._catch_up)() if self.last_event_id else []
+
+            while True:
+                for payload in pending:
+                    if payload['id'] in self.sent:
+                        continue
+                    self._remember(payload['id'])
+                    self._advance(payload)
+                    yield format_event(payload)
+
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    pending = [await asyncio.wait_for(subscription.get(), timeout=min(remaining, STREAM_HEARTBEAT_SECONDS))]
+                except asyncio.TimeoutError:
+                    pending = await sync_to_async(self._catch_up)()
+                    if not pending:
+                        yield ": ping\n\n"
+        finally:
+            broker.unsubscribe(subscription)
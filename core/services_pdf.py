@@ -1,5 +1,7 @@
 from io import BytesIO
 import logging
+import os
+import threading
 from django.template.loader import render_to_string
 from django.template import TemplateDoesNotExist
 from django.utils import timezone
@@ -39,6 +41,36 @@ from .models import SGI, User
 from .models_sgi import AccountOpeningRequest, SGIAccountTerms
 
 
+class CachedContractTemplate:
+    """Convention PDF parsée une fois par processus (voir get_cached_contract_template)"""
+
+    def __init__(self, path: str, mtime: float):
+        self.path = path
+        self.mtime = mtime
+        self.reader = PdfReader(path)
+        self.page_count = len(self.reader.pages)
+        # PdfReader lit son flux à la demande: un seul rendu à la fois par template
+        self.lock = threading.Lock()
+
+
+_contract_template_cache = {}
+_contract_template_cache_lock = threading.Lock()
+
+
+def get_cached_contract_template(path: str) -> CachedContractTemplate:
+    """
+    Retourne la convention PDF parsée depuis le cache du processus.
+    La clé est le chemin; l'entrée est rechargée si le fichier a été modifié (mtime).
+    """
+    mtime = os.path.getmtime(path)
+    with _contract_template_cache_lock:
+        cached = _contract_template_cache.get(path)
+        if cached is None or cached.mtime != mtime:
+            cached = CachedContractTemplate(path, mtime)
+            _contract_template_cache[path] = cached
+        return cached
+
+
 class ContractPDFService:
     """
     Génère un PDF de convention d'ouverture de compte-titres prérempli
@@ -212,8 +244,7 @@ class ContractPDFService:
             return None
         
         try:
-            reader = PdfReader(template_path)
-            writer = PdfWriter()
+            cached = get_cached_contract_template(template_path)
             
             # Prepare context for template
             template_context = {
@@ -224,135 +255,33 @@ class ContractPDFService:
                 'terms': context.get('terms'),
             }
 
-            overlays = []
-            pages_count = len(reader.pages)
-            for page_index in range(pages_count):
+            # Overlays only for the pages the template actually fills,
+            # all drawn on a single canvas and parsed once
+            filled_pages = template.get_filled_pages(cached.page_count)
+            overlays = {}
+            if filled_pages:
                 ov = BytesIO()
                 c = canvas.Canvas(ov, pagesize=A4)
-                c.setFont(template.font_name, template.font_size)
-                
-                # Use SGI-specific template to fill the page
-                template.fill_page(c, page_index, template_context)
-                
-                # OLD CODE BELOW - kept for backward compatibility if template doesn't handle page
-                # This will be removed once all SGIs have templates
-                if sgi and (sgi.name or '').strip().upper() in ('GEK', 'GEK CAPITAL', 'GEK CAPITAL SA') and False:
-                    # Page 1 (cover/summary) – keep for context; main dynamic pages are 22, 23, 26
-                    if page_index == 0:
-                        x = 25 * mm
-                        y = 250 * mm
-                        c.setFont("Helvetica-Bold", 11)
-                        c.drawString(x, y, f"{getattr(aor, 'full_name', '')}")
-                        y -= 7 * mm
-                        c.setFont("Helvetica", 10)
-                        email = (annex.get('page22', {}) or {}).get('email') or getattr(aor, 'email', '')
-                        phone = (annex.get('page22', {}) or {}).get('phone') or getattr(aor, 'phone', '')
-                        c.drawString(x, y, f"{email} | {phone}")
-                        y -= 7 * mm
-                        c.drawString(x, y, f"{getattr(aor, 'country_of_residence', '')} / {getattr(aor, 'nationality', '')}")
-                        y -= 10 * mm
-                        m = []
-                        if aor.funding_by_visa: m.append('VISA')
-                        if aor.funding_by_mobile_money: m.append('MOBILE MONEY')
-                        if aor.funding_by_bank_transfer: m.append('VIREMENT')
-                        if aor.funding_by_intermediary: m.append('INTERMEDIAIRE')
-                        if aor.funding_by_wu_mg_ria: m.append('WU/MG/RIA')
-                        c.drawString(x, y, f"Méthodes d'alimentation: {', '.join(m) or '—'}")
-                        # Compte individuel par défaut
-                        draw_checkbox(c, 17 * mm, 262 * mm, True)
-                        # Fait à / le
-                        c.drawString(35 * mm, 35 * mm, aor.country_of_residence or '')
-                        try:
-                            from django.utils import timezone
-                            c.drawString(120 * mm, 35 * mm, timezone.now().strftime('%d/%m/%Y'))
-                        except Exception:
-                            pass
-                    # Annexe 1 – formulaire (likely early page); we keep this minimal
-                    elif page_index == 1:
-                        x1 = 52 * mm
-                        y1 = 238 * mm
-                        # prefer annex overrides if present
-                        p22 = annex.get('page22', {}) if isinstance(annex, dict) else {}
-                        nom_override = p22.get('last_name')
-                        prenoms_override = p22.get('first_names')
-                        parts = (getattr(aor, 'full_name', '') or '').split()
-                        nom = parts[-1] if parts else ''
-                        prenoms = ' '.join(parts[:-1]) if len(parts) > 1 else ''
-                        if nom_override: nom = nom_override
-                        if prenoms_override: prenoms = prenoms_override
-                        c.drawString(x1, y1, nom)
-                        c.drawString(140 * mm, y1, prenoms)
-                        y2 = 230 * mm
-                        c.drawString(52 * mm, y2, (p22.get('nationality') or getattr(aor, 'nationality', '')))
-                        # Email / Téléphones
-                        c.drawString(30 * mm, 128 * mm, (p22.get('phone') or getattr(aor, 'phone', '')))
-                        c.drawString(120 * mm, 128 * mm, '')
-                        c.drawString(30 * mm, 120 * mm, (p22.get('email') or getattr(aor, 'email', '')))
-
-                    # === GEK dynamic pages ===
-                    # Page 22 (0-based 21): 'Annexe 1' section with identity and contact
-                    elif page_index == 21:
-                        # Basic identity fields
-                        p22 = annex.get('page22', {}) if isinstance(annex, dict) else {}
-                        parts = (getattr(aor, 'full_name', '') or '').split()
-                        nom = parts[-1] if parts else ''
-                        prenoms = ' '.join(parts[:-1]) if len(parts) > 1 else ''
-                        nom = p22.get('last_name') or nom
-                        prenoms = p22.get('first_names') or prenoms
-                        # Nom / Prénoms (top area)
-                        c.drawString(52 * mm, 238 * mm, nom)
-                        c.drawString(140 * mm, 238 * mm, prenoms)
-                        # Nationalité
-                        c.drawString(52 * mm, 230 * mm, (p22.get('nationality') or getattr(aor, 'nationality', '')))
-                        # Adresse fiscale (we only have country; placing country and phone/email lower)
-                        c.drawString(30 * mm, 176 * mm, (p22.get('fiscal_country') or getattr(aor, 'country_of_residence', '')))
-                        # Coordonnées du titulaire
-                        c.drawString(30 * mm, 128 * mm, (p22.get('phone') or getattr(aor, 'phone', '')))  # Tel Portable
-                        c.drawString(120 * mm, 128 * mm, '')               # Tel Domicile (unknown)
-                        c.drawString(30 * mm, 120 * mm, (p22.get('email') or getattr(aor, 'email', '')))   # Email
-
-                    # Page 23 (0-based 22): Restrictions éventuelles & coordonnées représentant, and consent email
-                    elif page_index == 22:
-                        # We don't know restrictions; leave unchecked. Fill coordinates of the titulaire again near the bottom if available
-                        # Email consent section – pre-check opting into electronic communication
-                        p23 = annex.get('page23', {}) if isinstance(annex, dict) else {}
-                        draw_checkbox(c, 26 * mm, 60 * mm, bool(p23.get('consent_email', True)))
-                        c.drawString(30 * mm, 56 * mm, (p23.get('email') or (annex.get('page22', {}) or {}).get('email') or getattr(aor, 'email', '')))
-
-                    # Page 26 (0-based 25): "CARACTÉRISTIQUES DU COMPTE" and signature block
-                    elif page_index == 25:
-                        # Check "Compte individuel pleine propriété"
-                        p26 = annex.get('page26', {}) if isinstance(annex, dict) else {}
-                        draw_checkbox(c, 17 * mm, 262 * mm, bool(p26.get('account_individual', True)))
-                        # Nom et prénoms de la personne désignée pour faire fonctionner le compte – use AOR full name
-                        c.drawString(30 * mm, 205 * mm, (p26.get('designated_operator_name') or getattr(aor, 'full_name', '')))
-                        # Fait à / le
-                        c.drawString(35 * mm, 35 * mm, (p26.get('place') or getattr(aor, 'country_of_residence', '')))
-                        try:
-                            from django.utils import timezone
-                            c.drawString(120 * mm, 35 * mm, (p26.get('date') or timezone.now().strftime('%d/%m/%Y')))
-                        except Exception:
-                            pass
-
-                c.showPage()
+                for page_index in filled_pages:
+                    c.setFont(template.font_name, template.font_size)
+                    template.fill_page(c, page_index, template_context)
+                    c.showPage()
                 c.save()
                 ov.seek(0)
-                overlays.append(PdfReader(ov).pages[0])
-
-            for i, page in enumerate(reader.pages):
-                page_out = page
-                if i < len(overlays):
-                    try:
-                        page_out.merge_page(overlays[i])
-                    except Exception:
-                        page_out.mergePage(overlays[i])  # type: ignore
-                writer.add_page(page_out)
+                overlays = dict(zip(filled_pages, PdfReader(ov).pages))
 
+            writer = PdfWriter()
             out_io = BytesIO()
-            writer.write(out_io)
-            out_io.seek(0)
-            return out_io.read()
+            with cached.lock:
+                for i, page in enumerate(cached.reader.pages):
+                    # add_page copies the page into the writer: the cached reader stays untouched
+                    page_out = writer.add_page(page)
+                    if i in overlays:
+                        page_out.merge_page(overlays[i])
+                writer.write(out_io)
+            return out_io.getvalue()
         except Exception:
+            logging.getLogger(__name__).warning("ContractPDFService: template-based generation failed", exc_info=True)
             return None
 
     def generate_pdf_response(self, html: str, filename: str = 'contrat.pdf') -> HttpResponse:
@@ -0,0 +1,125 @@
+"""
+Matrice des permissions par rôle
+Rôle -> frozenset des codes accordés, construite en une requête. Chaque processus
+en garde une copie locale et ne relit qu'une signature en base (nombre et dernière
+modification des associations rôle/permission, plus la version de l'espace de cache)
+toutes les quelques secondes: une vérification de permission est une simple
+recherche en mémoire, et une révocation atteint tous les workers sans dépendre du
+cache.
+"""
+from django.db.models import Count, Max
+import logging
+import threading
+import time
+
+from .models_permissions import RolePermission
+from .utils_cache import get_cache_version, invalidate_on_commit
+
+logger = logging.getLogger(__name__)
+
+
+# Espace de cache des réponses dérivées de la matrice (invalidé par les signaux)
+MATRIX_CACHE_NAMESPACE = 'role_permission_matrix'
+MATRIX_CACHE_TTL = 24 * 3600
+VERSION_CHECK_SECONDS = 5  # délai maximal de propagation d'une modification aux autres processus
+MAX_CHECK_CODES = 100
+
+EMPTY = frozenset()
+
+
+class PermissionMatrix:
+    """Codes accordés par rôle, pour une signature donnée (voir _signature)"""
+
+    def __init__(self, grants, version=None):
+        self.grants = {role: frozenset(codes) for role, codes in grants.items()}
+        self.version = version
+
+    @classmethod
+    def build(cls, version=None):
+        """Une requête sur les associations accordées"""
+        grants = {}
+        rows = RolePermission.objects.filter(is_granted=True).values_list('role', 'permission__code')
+        for role, code in rows:
+            grants.setdefault(role, set()).add(code)
+        return cls(grants, version=version)
+
+    def codes(self, role):
+        return self.grants.get(role, EMPTY)
+
+    def has(self, role, code):
+        return code in self.grants.get(role, EMPTY)
+
+    def check_many(self, role, codes):
+        granted = self.grants.get(role, EMPTY)
+        return {code: code in granted for code in codes}
+
+
+_matrix = None
+_checked_at = 0.0
+_matrix_lock = threading.Lock()
+
+
+def _signature():
+    """
+    Signature de l'état des permissions, lue en base par chaque processus
+
+    Les associations rôle/permission sont couvertes par la base (ajout, suppression,
+    modification via save()); les modifications de Permission (codes renommés) par la
+    version de l'espace de cache, changée par les signaux.
+    """
+    rows = RolePermission.objects.aggregate(count=Count('id'), updated_at=Max('updated_at'))
+    return (rows['count'], rows['updated_at'], get_cache_version(MATRIX_CACHE_NAMESPACE))
+
+
+def get_permission_matrix() -> PermissionMatrix:
+    """
+    Matrice courante du processus
+
+    La signature n'est relue qu'au-delà de VERSION_CHECK_SECONDS; la matrice n'est
+    reconstruite que si elle a changé.
+    """
+    global _matrix, _checked_at
+    matrix = _matrix
+    now = time.monotonic()
+    if matrix is not None and now - _checked_at < VERSION_CHECK_SECONDS:
+        return matrix
+
+    with _matrix_lock:
+        signature = _signature()
+        if _matrix is None or _matrix.version != signature:
+            _matrix = PermissionMatrix.build(version=signature)
+            logger.info(f"Matrice des permissions construite: {len(_matrix.grants)} rôle(s)")
+        _checked_at = now
+        return _matrix
+
+
+def role_permissions(role):
+    """frozenset des codes accordés au rôle"""
+    return get_permission_matrix().codes(role)
+
+
+def has_permission(user, code):
+    """Le rôle de l'utilisateur a-t-il la permission code ?"""
+    if not user or not user.is_authenticated:
+        return False
+    return get_permission_matrix().has(user.role, code)
+
+
+def check_permissions(user, codes):
+    """{code: bool} pour chaque code demandé"""
+    if not user or not user.is_authenticated:
+        return {code: False for code in codes}
+    return get_permission_matrix().check_many(user.role, codes)
+
+
+def _drop_local_matrix():
+    global _matrix
+    _matrix = None
+
+
+def invalidate_permission_matrix():
+    """
+    Invalide la matrice après le commit courant: immédiatement dans ce processus,
+    au plus tard après VERSION_CHECK_SECONDS dans les autres
+    """
+    invalidate_on_commit(MATRIX_CACHE_NAMESPACE, _drop_local_matrix)
@@ -0,0 +1,338 @@
+"""
+Indicateurs journaliers de la plateforme (DailyPlatformMetric)
+Les signaux incrémentent l'agrégat du jour après le commit (inscriptions, vérifications,
+OTP, changements de statut des SGI et des contrats); le tableau de bord admin lit
+n'importe quelle fenêtre de dates en un parcours d'intervalle, sans COUNT par jour.
+"""
+from collections import Counter
+from datetime import datetime, time, timedelta
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+import logging
+
+from .models import SGI, Contract, OTP
+from .models_dashboard import DailyPlatformMetric
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+
+REGISTRATIONS = 'registrations'
+VERIFICATIONS = 'verifications'
+OTP_SENT = 'otp_sent'
+OTP_USED = 'otp_used'
+OTP_INVALIDATED = 'otp_invalidated'
+SGI_CREATED = 'sgi_created'
+SGI_STATUS = 'sgi_status'
+CONTRACT_CREATED = 'contract_created'
+CONTRACT_STATUS = 'contract_status'
+
+DASHBOARD_DAYS = 30
+MAX_WINDOW_DAYS = 366
+
+# Champ suivi par modèle: sa valeur au chargement est comparée à l'enregistrement
+_TRACKED_FIELDS = {
+    User: 'is_verified',
+    OTP: 'is_used',
+    SGI: 'is_active',
+    Contract: 'status',
+}
+_INITIAL_ATTR = '_platform_metrics_initial'
+
+
+def _local_date(value):
+    return timezone.localdate(value) if value else timezone.localdate()
+
+
+def _increment(date, metric, dimension, delta):
+    rows = DailyPlatformMetric.objects.filter(date=date, metric=metric, dimension=dimension)
+    if rows.update(value=F('value') + delta, updated_at=timezone.now()):
+        return
+    try:
+        with transaction.atomic():
+            DailyPlatformMetric.objects.create(date=date, metric=metric, dimension=dimension, value=delta)
+    except IntegrityError:
+        # Ligne du jour créée entre-temps par une autre requête
+        rows.update(value=F('value') + delta, updated_at=timezone.now())
+
+
+def record(metric, dimension='', date=None, delta=1):
+    """Ajoute delta à l'indicateur du jour (ou de date) après le commit courant"""
+    date = date or timezone.localdate()
+    dimension = dimension or ''
+
+    def _record():
+        try:
+            _increment(date, metric, dimension, delta)
+        except Exception as e:
+            # L'écriture source est validée: écart rattrapé par backfill_platform_metrics
+            logger.error(f"Indicateur {metric}[{dimension}] du {date} non incrémenté: {str(e)}")
+
+    transaction.on_commit(_record)
+
+
+# ----------------------------------------------------------------------
+# Suivi des écritures (branché dans signals.py)
+# ----------------------------------------------------------------------
+
+def remember_state(instance):
+    """Mémorise la valeur suivie au chargement (sans requête si le champ est différé)"""
+    field = _TRACKED_FIELDS[type(instance)]
+    setattr(instance, _INITIAL_ATTR, instance.__dict__.get(field))
+
+
+def _changed(instance, field, created):
+    """(ancienne valeur, nouvelle valeur) si le champ a changé, sinon None"""
+    current = instance.__dict__.get(field)
+    previous = None if created else getattr(instance, _INITIAL_ATTR, current)
+    setattr(instance, _INITIAL_ATTR, current)
+    if previous == current:
+        return None
+    return previous, current
+
+
+def track_user(instance, created):
+    change = _changed(instance, 'is_verified', created)
+    if created:
+        record(REGISTRATIONS, instance.role, _local_date(instance.created_at))
+    if change and change[1]:
+        record(VERIFICATIONS)
+
+
+def track_otp(instance, created):
+    change = _changed(instance, 'is_used', created)
+    # Rattachés au jour d'envoi: le taux de succès du jour porte sur les OTP du jour
+    day = _local_date(instance.created_at)
+    if created:
+        record(OTP_SENT, instance.otp_type, day)
+    if change and change[1]:
+        record(OTP_USED, instance.otp_type, day)
+
+
+def invalidate_otps(queryset):
+    """
+    Invalide en masse des OTP non utilisés (renvoi d'un code, activation du compte)
+
+    L'UPDATE groupé ne déclenche pas post_save: les invalidations sont comptées ici,
+    par type et jour d'envoi. Elles ne sont pas des utilisations (used_at reste vide)
+    et n'entrent donc pas dans le taux de succès.
+
+    Returns:
+        Nombre d'OTP invalidés
+    """
+    rows = list(queryset.filter(is_used=False).values_list('pk', 'otp_type', 'created_at'))
+    if not rows:
+        return 0
+    updated = OTP.objects.filter(pk__in=[pk for pk, _, _ in rows], is_used=False).update(is_used=True)
+    for (otp_type, day), count in Counter((otp_type, _local_date(created_at)) for _, otp_type, created_at in rows).items():
+        record(OTP_INVALIDATED, otp_type, day, delta=count)
+    return updated
+
+
+def track_sgi(instance, created):
+    change = _changed(instance, 'is_active', created)
+    status = 'ACTIVE' if instance.is_active else 'INACTIVE'
+    if created:
+        record(SGI_CREATED, status, _local_date(instance.created_at))
+    elif change:
+        record(SGI_STATUS, status)
+
+
+def track_contract(instance, created):
+    change = _changed(instance, 'status', created)
+    if created:
+        record(CONTRACT_CREATED, '', _local_date(instance.created_at))
+    elif change:
+        record(CONTRACT_STATUS, instance.status)
+
+
+# ----------------------------------------------------------------------
+# Reconstruction
+# ----------------------------------------------------------------------
+
+def _day_bounds(start, end):
+    tz = timezone.get_current_timezone()
+    return (
+        timezone.make_aware(datetime.combine(start, time.min), tz),
+        timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min), tz),
+    )
+
+
+def _grouped(queryset, date_field, dimension_field=None):
+    """Comptes par (jour, dimension) en une requête"""
+    fields = ['day'] + ([dimension_field] if dimension_field else [])
+    rows = queryset.annotate(day=TruncDate(date_field)).order_by().values(*fields).annotate(count=Count('pk'))
+    return [(row['day'], row[dimension_field] if dimension_field else '', row['count']) for row in rows]
+
+
+def _source_models(apps=None):
+    """Modèles sources et modèle d'agrégat (historiques dans une migration de données)"""
+    if apps is None:
+        return User, OTP, SGI, Contract, DailyPlatformMetric
+    return tuple(apps.get_model('core', name) for name in ('User', 'OTP', 'SGI', 'Contract', 'DailyPlatformMetric'))
+
+
+def backfill(start, end, apps=None):
+    """
+    Recalcule depuis les tables sources les indicateurs des jours start..end inclus
+
+    Les vérifications sont rattachées au jour d'inscription et les statuts des SGI au
+    jour de création (aucun horodatage de transition n'est stocké); les statuts des
+    contrats utilisent approved_at, rejected_at, ou updated_at pour les autres.
+
+    Args:
+        apps: Registre des modèles historiques (migration de données), sinon les modèles courants
+
+    Returns:
+        Nombre de lignes écrites
+    """
+    UserModel, OTPModel, SGIModel, ContractModel, MetricModel = _source_models(apps)
+    low, high = _day_bounds(start, end)
+
+    def window(field):
+        return {f'{field}__gte': low, f'{field}__lt': high}
+
+    contracts = ContractModel.objects.exclude(status='PENDING')
+    otps = OTPModel.objects.filter(**window('created_at'))
+    groups = {
+        REGISTRATIONS: _grouped(UserModel.objects.filter(**window('created_at')), 'created_at', 'role'),
+        VERIFICATIONS: _grouped(UserModel.objects.filter(is_verified=True, **window('created_at')), 'created_at'),
+        OTP_SENT: _grouped(otps, 'created_at', 'otp_type'),
+        OTP_USED: _grouped(otps.filter(is_used=True, used_at__isnull=False), 'created_at', 'otp_type'),
+        OTP_INVALIDATED: _grouped(otps.filter(is_used=True, used_at__isnull=True), 'created_at', 'otp_type'),
+        SGI_CREATED: [
+            (day, 'ACTIVE' if active else 'INACTIVE', count)
+            for day, active, count in _grouped(SGIModel.objects.filter(**window('created_at')), 'created_at', 'is_active')
+        ],
+        CONTRACT_CREATED: _grouped(ContractModel.objects.filter(**window('created_at')), 'created_at'),
+        CONTRACT_STATUS: (
+            _grouped(contracts.filter(status='APPROVED', **window('approved_at')), 'approved_at', 'status')
+            + _grouped(contracts.filter(status='REJECTED', **window('rejected_at')), 'rejected_at', 'status')
+            + _grouped(
+                contracts.exclude(status__in=['APPROVED', 'REJECTED']).filter(**window('updated_at')),
+                'updated_at', 'status'
+            )
+        ),
+    }
+
+    rows = [
+        MetricModel(date=day, metric=metric, dimension=str(dimension), value=count)
+        for metric, counts in groups.items()
+        for day, dimension, count in counts
+        if day is not None
+    ]
+    with transaction.atomic():
+        MetricModel.objects.filter(date__gte=start, date__lte=end).delete()
+        MetricModel.objects.bulk_create(rows, batch_size=500)
+    logger.info(f"Indicateurs du {start} au {end} reconstruits: {len(rows)} ligne(s)")
+    return len(rows)
+
+
+# ----------------------------------------------------------------------
+# Lectures
+# ----------------------------------------------------------------------
+
+def series(metric, start, end, dimension=None):
+    """
+    Série journalière d'un indicateur (jours sans valeur à 0), en un parcours d'intervalle
+
+    Returns:
+        Liste [{date, count}] de start à end inclus
+    """
+    rows = DailyPlatformMetric.objects.filter(metric=metric, date__gte=start, date__lte=end)
+    if dimension is not None:
+        rows = rows.filter(dimension=dimension)
+    totals = dict(rows.order_by().values('date').annotate(total=Sum('value')).values_list('date', 'total'))
+    return [
+        {'date': (start + timedelta(days=offset)).isoformat(), 'count': totals.get(start + timedelta(days=offset), 0)}
+        for offset in range((end - start).days + 1)
+    ]
+
+
+def _rate(part, total):
+    return round((part / total * 100), 2) if total > 0 else 0
+
+
+def admin_dashboard(start=None, end=None):
+    """
+    Statistiques du tableau de bord admin en cinq requêtes, quel que soit le nombre
+    d'utilisateurs: une agrégation conditionnelle par table (utilisateurs, SGI,
+    contrats), une sur les indicateurs journaliers et la série des inscriptions.
+    """
+    now = timezone.now()
+    today = timezone.localdate()
+    end = min(end or today, today)
+    start = start or end - timedelta(days=DASHBOARD_DAYS - 1)
+    start = max(start, end - timedelta(days=MAX_WINDOW_DAYS - 1))
+
+    role_aggregates = {}
+    for role_code, _ in User.ROLE_CHOICES:
+        role_aggregates[f'{role_code}__count'] = Count('id', filter=Q(role=role_code))
+        role_aggregates[f'{role_code}__active'] = Count('id', filter=Q(role=role_code, is_active=True))
+    users = User.objects.aggregate(
+        total=Count('id'),
+        active=Count('id', filter=Q(is_active=True)),
+        verified=Count('id', filter=Q(is_verified=True)),
+        **role_aggregates
+    )
+    sgis = SGI.objects.aggregate(total=Count('id'), active=Count('id', filter=Q(is_active=True)))
+    contracts = Contract.objects.aggregate(
+        total=Count('id'),
+        pending=Count('id', filter=Q(status='PENDING')),
+        approved=Count('id', filter=Q(status='APPROVED')),
+    )
+
+    week_start = today - timedelta(days=6)
+    month_start = today - timedelta(days=DASHBOARD_DAYS - 1)
+    registrations = Q(metric=REGISTRATIONS)
+    daily = DailyPlatformMetric.objects.filter(date__gte=month_start, date__lte=today).aggregate(
+        new_today=Sum('value', filter=registrations & Q(date=today)),
+        new_week=Sum('value', filter=registrations & Q(date__gte=week_start)),
+        new_month=Sum('value', filter=registrations),
+        otp_sent_today=Sum('value', filter=Q(metric=OTP_SENT, date=today)),
+        otp_used_today=Sum('value', filter=Q(metric=OTP_USED, date=today)),
+    )
+    daily = {key: value or 0 for key, value in daily.items()}
+
+    return {
+        'users': {
+            'total': users['total'],
+            'active': users['active'],
+            'verified': users['verified'],
+            'verification_rate': _rate(users['verified'], users['total']),
+            'new_today': daily['new_today'],
+            'new_week': daily['new_week'],
+            'new_month': daily['new_month'],
+            'by_role': {
+                role_code: {
+                    'name': role_name,
+                    'count': users[f'{role_code}__count'],
+                    'active': users[f'{role_code}__active']
+                }
+                for role_code, role_name in User.ROLE_CHOICES
+            }
+        },
+        'sgis': {
+            'total': sgis['total'],
+            'active': sgis['active'],
+            'pending': sgis['total'] - sgis['active'],
+            'approval_rate': _rate(sgis['active'], sgis['total'])
+        },
+        'contracts': {
+            'total': contracts['total'],
+            'pending': contracts['pending'],
+            'approved': contracts['approved'],
+            'approval_rate': _rate(contracts['approved'], contracts['total'])
+        },
+        'otp': {
+            'sent_today': daily['otp_sent_today'],
+            'success_rate': _rate(daily['otp_used_today'], daily['otp_sent_today'])
+        },
+        'registration_evolution': series(REGISTRATIONS, start, end),
+        'window': {'start': start.isoformat(), 'end': end.isoformat()},
+        'last_updated': now.isoformat()
+    }
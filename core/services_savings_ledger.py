@@ -0,0 +1,386 @@
+"""
+Grand livre d'épargne Ma Caisse
+Chaque dépôt ou retrait est une écriture immuable (SavingsLedgerEntry). Le solde du
+compte d'épargne et le total épargné de la participation en sont des projections,
+mises à jour par des UPDATE atomiques (F()) dans la même transaction que l'écriture:
+aucun verrou global, deux dépôts concurrents d'un même utilisateur ne se perdent plus.
+"""
+from collections import namedtuple
+from datetime import date, timedelta
+from decimal import Decimal
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+import logging
+import uuid
+
+from .models_savings_challenge import (
+    SavingsAccount, SavingsChallenge, ChallengeParticipation, SavingsDeposit, SavingsLedgerEntry
+)
+from .services_challenge_leaderboard import ChallengeLeaderboardService, touch_participation
+from .services_community import CommunityStatsService
+
+logger = logging.getLogger(__name__)
+
+
+POINTS_PER_FCFA = 1000  # 1 point par 1000 FCFA déposés
+RECONCILE_BATCH_SIZE = 500
+
+LedgerResult = namedtuple('LedgerResult', ['entry', 'balance', 'replayed'])
+
+
+class SavingsLedgerError(Exception):
+    """Mouvement refusé (solde insuffisant, participation absente, référence déjà utilisée)"""
+
+
+def active_accounts():
+    """Comptes actifs, le plus récent d'abord: le premier de chaque utilisateur est son compte principal"""
+    return SavingsAccount.objects.filter(status='ACTIVE').order_by('-created_at', '-id')
+
+
+def main_account_number(user):
+    """Numéro du compte principal: 17 caractères de l'identifiant de l'utilisateur (20 au total)"""
+    return f"ACC{user.id.hex[:17]}"
+
+
+def get_or_create_main_account(user):
+    """
+    Compte d'épargne principal actif de l'utilisateur (créé au besoin)
+
+    Le compte est recherché et créé par utilisateur: un numéro déjà attribué n'est
+    jamais repris, qu'il appartienne à un autre utilisateur ou à un compte inactif.
+
+    Raises:
+        SavingsLedgerError: le numéro du compte principal est déjà attribué
+    """
+    account = active_accounts().filter(user=user).first()
+    if account:
+        return account
+    account_number = main_account_number(user)
+    try:
+        with transaction.atomic():
+            account, _ = SavingsAccount.objects.get_or_create(
+                user=user,
+                status='ACTIVE',
+                defaults={
+                    'account_number': account_number,
+                    'account_name': "Compte Principal",
+                    'balance': Decimal('0.00'),
+                    'account_type': 'BASIC',
+                }
+            )
+    except IntegrityError:
+        owner = SavingsAccount.objects.filter(account_number=account_number).values('user_id', 'status').first()
+        if owner is None:
+            raise
+        if owner['user_id'] != user.id:
+            logger.error(f"Numéro de compte {account_number} déjà attribué à un autre utilisateur")
+            raise SavingsLedgerError('Numéro de compte déjà attribué')
+        raise SavingsLedgerError("Compte d'épargne inactif")
+    return account
+
+
+def get_or_create_active_participation(user):
+    """Participation active de l'utilisateur, inscrite au défi public par défaut au besoin"""
+    participation = ChallengeParticipation.objects.filter(user=user, status='ACTIVE').first()
+    if participation:
+        return participation
+
+    default_challenge = SavingsChallenge.objects.filter(status='ACTIVE', is_public=True).first()
+    if not default_challenge:
+        # Créer un défi par défaut
+        start_date = date.today()
+        default_challenge = SavingsChallenge.objects.create(
+            title="Défi d'épargne général",
+            description="Défi d'épargne pour tous les utilisateurs",
+            short_description="Défi d'épargne mensuel pour débutants",
+            challenge_type='MONTHLY',
+            category='BEGINNER',
+            target_amount=Decimal('50000.00'),
+            minimum_deposit=Decimal('1000.00'),
+            duration_days=30,
+            start_date=start_date,
+            end_date=start_date + timedelta(days=30),
+            is_public=True,
+            status='ACTIVE',
+            created_by=user
+        )
+
+    participation, _ = ChallengeParticipation.objects.get_or_create(
+        user=user,
+        challenge=default_challenge,
+        defaults={'personal_target': default_challenge.target_amount, 'status': 'ACTIVE'}
+    )
+    return participation
+
+
+class SavingsLedgerService:
+    """
+    Écritures du grand livre d'épargne et projection des soldes
+    """
+
+    # ------------------------------------------------------------------
+    # Mouvements
+    # ------------------------------------------------------------------
+
+    def _replay(self, user, reference):
+        """Résultat d'un mouvement déjà écrit avec cette référence (None sinon)"""
+        entry = SavingsLedgerEntry.objects.filter(reference=reference).select_related('account').first()
+        if entry is None:
+            return None
+        if entry.user_id != user.id:
+            raise SavingsLedgerError('Référence de transaction déjà utilisée')
+        balance = entry.account.balance if entry.account else None
+        return LedgerResult(entry, balance, True)
+
+    def _record(self, user, reference, write):
+        """Écrit un mouvement une seule fois par référence, même sous rejeu concurrent"""
+        replayed = self._replay(user, reference)
+        if replayed:
+            return replayed
+        try:
+            with transaction.atomic():
+                return write()
+        except IntegrityError:
+            # Même référence écrite entre-temps par une requête concurrente
+            replayed = self._replay(user, reference)
+            if replayed is None:
+                raise
+            return replayed
+
+    def deposit(self, user, amount, deposit_method, bank_name='', reference=None):
+        """
+        Enregistre un dépôt confirmé
+
+        Returns:
+            LedgerResult (écriture, nouveau solde du compte, rejeu ou non)
+        """
+        reference = reference or f'DEP{uuid.uuid4().hex[:20]}'
+
+        def write():
+            participation = get_or_create_active_participation(user)
+            account = get_or_create_main_account(user)
+            now = timezone.now()
+            points = int(amount / POINTS_PER_FCFA)
+
+            deposit = SavingsDeposit.objects.create(
+                participation=participation,
+                amount=amount,
+                deposit_method=deposit_method,
+                bank_name=bank_name,
+                status='CONFIRMED',
+                transaction_reference=reference,
+                points_awarded=points,
+                processed_at=now
+            )
+            entry = SavingsLedgerEntry.objects.create(
+                user=user, account=account, participation=participation, deposit=deposit,
+                entry_type='DEPOSIT', amount=amount, points=points, reference=reference
+            )
+
+            # Projections
+            SavingsAccount.objects.filter(pk=account.pk).update(
+                balance=F('balance') + amount, updated_at=now
+            )
+            ChallengeParticipation.objects.filter(pk=participation.pk).update(
+                total_saved=F('total_saved') + amount,
+                deposits_count=F('deposits_count') + 1,
+                points_earned=F('points_earned') + points,
+                last_deposit_at=now,
+                updated_at=now
+            )
+            account.refresh_from_db(fields=['balance'])
+            CommunityStatsService().refresh_account(account.pk)
+            touch_participation(participation.pk, participation.challenge_id)
+            return LedgerResult(entry, account.balance, False)
+
+        return self._record(user, reference, write)
+
+    def withdraw(self, user, amount, reference=None):
+        """
+        Enregistre un retrait si le solde le permet
+
+        Le débit est un UPDATE conditionnel (solde >= montant): deux retraits
+        concurrents ne peuvent pas rendre le solde négatif.
+
+        Raises:
+            SavingsLedgerError: solde insuffisant ou aucune participation active
+        """
+        reference = reference or f'WTH{uuid.uuid4().hex[:20]}'
+
+        def write():
+            account = active_accounts().filter(user=user).first()
+            if not account:
+                raise SavingsLedgerError('Solde insuffisant')
+            participation = ChallengeParticipation.objects.filter(user=user, status='ACTIVE').first()
+            if not participation:
+                raise SavingsLedgerError('Aucune participation active trouvée')
+
+            now = timezone.now()
+            debited = SavingsAccount.objects.filter(pk=account.pk, balance__gte=amount).update(
+                balance=F('balance') - amount, updated_at=now
+            )
+            if not debited:
+                raise SavingsLedgerError('Solde insuffisant')
+
+            # Enregistrement de retrait comme dépôt négatif
+            withdrawal = SavingsDeposit.objects.create(
+                participation=participation,
+                amount=-amount,
+                deposit_method='WITHDRAWAL',
+                bank_name='',
+                status='CONFIRMED',
+                transaction_reference=reference,
+                processed_at=now
+            )
+            entry = SavingsLedgerEntry.objects.create(
+                user=user, account=account, participation=participation, deposit=withdrawal,
+                entry_type='WITHDRAWAL', amount=-amount, reference=reference
+            )
+            ChallengeParticipation.objects.filter(pk=participation.pk).update(
+                total_saved=F('total_saved') - amount, updated_at=now
+            )
+            account.refresh_from_db(fields=['balance'])
+            CommunityStatsService().refresh_account(account.pk)
+            touch_participation(participation.pk, participation.challenge_id)
+            return LedgerResult(entry, account.balance, False)
+
+        return self._record(user, reference, write)
+
+    # ------------------------------------------------------------------
+    # Réconciliation
+    # ------------------------------------------------------------------
+
+    def backfill(self, user_ids=None):
+        """
+        Crée les écritures des dépôts confirmés antérieurs au grand livre
+
+        Returns:
+            Nombre d'écritures créées
+        """
+        deposits = SavingsDeposit.objects.filter(
+            status='CONFIRMED', ledger_entry__isnull=True, participation__isnull=False
+        ).select_related('participation')
+        if user_ids is not None:
+            deposits = deposits.filter(participation__user_id__in=user_ids)
+
+        accounts = {}
+        for account_id, account_user_id in active_accounts().values_list('id', 'user_id'):
+            accounts.setdefault(account_user_id, account_id)
+
+        used = set(SavingsLedgerEntry.objects.values_list('reference', flat=True))
+        created = 0
+        batch = []
+        for deposit in deposits.iterator(chunk_size=RECONCILE_BATCH_SIZE):
+            user_id = deposit.participation.user_id
+            reference = deposit.transaction_reference
+            if not reference or reference in used:
+                reference = f'LEGACY{deposit.id.hex}'
+            used.add(reference)
+
+            batch.append(SavingsLedgerEntry(
+                user_id=user_id,
+                account_id=accounts.get(user_id),
+                participation_id=deposit.participation_id,
+                deposit=deposit,
+                entry_type='WITHDRAWAL' if deposit.amount < 0 else 'DEPOSIT',
+                amount=deposit.amount,
+                points=deposit.points_awarded or 0,
+                reference=reference,
+            ))
+            if len(batch) >= RECONCILE_BATCH_SIZE:
+                SavingsLedgerEntry.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        if batch:
+            SavingsLedgerEntry.objects.bulk_create(batch)
+            created += len(batch)
+        return created
+
+    def unrecorded_balances(self, user_ids=None):
+        """Comptes avec un solde mais sans aucune écriture (soldes antérieurs au grand livre)"""
+        accounts = SavingsAccount.objects.exclude(balance=0).filter(ledger_entries__isnull=True)
+        if user_ids is not None:
+            accounts = accounts.filter(user_id__in=user_ids)
+        return accounts
+
+    def reconcile(self, user_ids=None, apply=True):
+        """
+        Recalcule en masse les projections à partir du grand livre
+
+        Les dépôts confirmés antérieurs au grand livre sont d'abord repris (backfill):
+        sans eux, la projection effacerait les soldes historiques. La réconciliation est
+        refusée si un compte garde un solde qu'aucune écriture ne justifie.
+        Le calcul et l'écriture se font dans une transaction (annulée en simple rapport).
+
+        Args:
+            user_ids: Restreindre à ces utilisateurs (tous par défaut)
+            apply: Écrire les corrections (sinon simple rapport)
+
+        Returns:
+            Dict {backfilled, accounts, participations}: écritures reprises et
+            nombre de projections divergentes
+
+        Raises:
+            SavingsLedgerError: soldes sans écriture
+        """
+        entries = SavingsLedgerEntry.objects.all()
+        if user_ids is not None:
+            entries = entries.filter(user_id__in=user_ids)
+
+        with transaction.atomic():
+            backfilled = self.backfill(user_ids)
+            unrecorded = self.unrecorded_balances(user_ids).count()
+            if unrecorded:
+                raise SavingsLedgerError(
+                    f"{unrecorded} compte(s) avec un solde sans écriture au grand livre: réconciliation refusée"
+                )
+
+            # Verrouiller avant d'agréger: un mouvement concurrent attend la fin de la
+            # réconciliation et s'applique ensuite sur la projection corrigée
+            locked_accounts = list(SavingsAccount.objects.select_for_update().filter(
+                id__in=list(entries.filter(account__isnull=False).values_list('account_id', flat=True).distinct())
+            ).only('id', 'balance'))
+            locked_participations = list(ChallengeParticipation.objects.select_for_update().filter(
+                id__in=list(entries.filter(participation__isnull=False).values_list('participation_id', flat=True).distinct())
+            ).only('id', 'challenge_id', 'total_saved', 'deposits_count'))
+
+            account_totals = dict(
+                entries.filter(account__isnull=False).order_by().values('account_id')
+                .annotate(total=Sum('amount')).values_list('account_id', 'total')
+            )
+            participation_totals = {
+                row['participation_id']: row
+                for row in entries.filter(participation__isnull=False).order_by().values('participation_id')
+                .annotate(total=Sum('amount'), deposits=Count('id', filter=Q(entry_type='DEPOSIT')))
+            }
+
+            accounts = []
+            for account in locked_accounts:
+                total = account_totals.get(account.id, Decimal('0.00'))
+                if account.balance != total:
+                    logger.warning(f"Compte {account.id}: solde {account.balance} != grand livre {total}")
+                    account.balance = total
+                    accounts.append(account)
+
+            participations = []
+            for participation in locked_participations:
+                row = participation_totals.get(participation.id, {'total': Decimal('0.00'), 'deposits': 0})
+                if participation.total_saved != row['total'] or participation.deposits_count != row['deposits']:
+                    participation.total_saved = row['total']
+                    participation.deposits_count = row['deposits']
+                    participations.append(participation)
+
+            if not apply:
+                transaction.set_rollback(True)
+            else:
+                SavingsAccount.objects.bulk_update(accounts, ['balance'], batch_size=RECONCILE_BATCH_SIZE)
+                ChallengeParticipation.objects.bulk_update(
+                    participations, ['total_saved', 'deposits_count'], batch_size=RECONCILE_BATCH_SIZE
+                )
+                if accounts:
+                    transaction.on_commit(CommunityStatsService().invalidate)
+                for challenge_id in {participation.challenge_id for participation in participations}:
+                    transaction.on_commit(ChallengeLeaderboardService(challenge_id).resync)
+
+        return {'backfilled': backfilled, 'accounts': len(accounts), 'participations': len(participations)}
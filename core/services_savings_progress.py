@@ -0,0 +1,196 @@
+"""
+Index des rangs des progressions d'épargne (UserSavingsProgress)
+Chaque challenge a dans le cache Django la liste triée des montants épargnés de
+ses participants, relue depuis la base au plus tard après PROGRESS_RANK_TIMEOUT.
+Le rang, l'effectif et le podium se lisent sans COUNT, et les index de plusieurs
+challenges se chargent en un aller-retour (cache.get_many).
+"""
+from bisect import bisect_left, insort
+from django.core.cache import cache
+from django.db import transaction
+import logging
+
+from .models_dashboard import UserSavingsProgress
+from .utils_cache import (
+    acquire_lock, bump_cache_version, get_cache_version, get_or_build_many, release_lock, set_until_expiry
+)
+
+logger = logging.getLogger(__name__)
+
+
+PROGRESS_RANK_NAMESPACE = 'savings_progress_rank'
+PROGRESS_RANK_TIMEOUT = 3600
+PODIUM_SIZE = 3
+
+
+def _sort_key(progress_id, current_amount):
+    """Clé de tri: montant décroissant, puis identifiant (ordre stable du podium)"""
+    return (-current_amount, str(progress_id))
+
+
+class SavingsProgressRankIndex:
+    """
+    Rangs des participants aux challenges d'épargne
+
+    Entrée en cache par challenge:
+    - keys: clés de tri (-montant, id progression), triées
+    - entries: id progression -> clé de tri
+    Le rang d'un montant est 1 + le nombre de participants ayant épargné strictement
+    plus (les ex aequo partagent le rang), comme l'ancienne propriété rank.
+    """
+
+    def _key(self, challenge_id, version=None):
+        version = version or get_cache_version(PROGRESS_RANK_NAMESPACE)
+        return f"{PROGRESS_RANK_NAMESPACE}:{version}:{challenge_id}"
+
+    def _lock_key(self, challenge_id):
+        return f"{PROGRESS_RANK_NAMESPACE}:lock:{challenge_id}"
+
+    # ------------------------------------------------------------------
+    # Construction et verrou
+    # ------------------------------------------------------------------
+
+    def _build(self, challenge_ids):
+        """Construit les index de plusieurs challenges en une requête"""
+        indexes = {str(challenge_id): {'keys': [], 'entries': {}} for challenge_id in challenge_ids}
+        rows = UserSavingsProgress.objects.filter(challenge_id__in=list(challenge_ids)).order_by().values_list(
+            'challenge_id', 'id', 'current_amount'
+        )
+        for challenge_id, progress_id, amount in rows:
+            key = _sort_key(progress_id, amount)
+            index = indexes[str(challenge_id)]
+            index['keys'].append(key)
+            index['entries'][key[1]] = key
+        for index in indexes.values():
+            index['keys'].sort()
+        return indexes
+
+    def load_many(self, challenge_ids):
+        """
+        Index de plusieurs challenges: une lecture du cache, une requête pour les absents
+        (construits sous le verrou de chaque challenge)
+
+        Returns:
+            Dict id challenge (str) -> index
+        """
+        version = get_cache_version(PROGRESS_RANK_NAMESPACE)
+        keys = {
+            self._key(challenge_id, version): str(challenge_id)
+            for challenge_id in {str(challenge_id) for challenge_id in challenge_ids}
+        }
+        indexes = get_or_build_many(
+            {key: self._lock_key(challenge_id) for key, challenge_id in keys.items()},
+            lambda missing: {
+                self._key(challenge_id, version): index
+                for challenge_id, index in self._build([keys[key] for key in missing]).items()
+            },
+            PROGRESS_RANK_TIMEOUT
+        )
+        return {keys[key]: index for key, index in indexes.items()}
+
+    def _apply(self, challenge_id, progress_id, current_amount):
+        """
+        Repositionne une progression (retirée si current_amount est None)
+        Sans verrou, les index sont invalidés et seront reconstruits à la prochaine lecture.
+        """
+        lock_key = self._lock_key(challenge_id)
+        if not acquire_lock(lock_key):
+            logger.warning(f"Index des rangs du challenge {challenge_id} verrouillé, invalidation")
+            self.invalidate()
+            return
+
+        try:
+            key = self._key(challenge_id)
+            index = cache.get(key)
+            if index is None:
+                # Pas encore construit: la prochaine lecture lira la base à jour
+                return
+
+            progress_id = str(progress_id)
+            keys, entries = index['keys'], index['entries']
+            old_key = entries.pop(progress_id, None)
+            if old_key is not None:
+                position = bisect_left(keys, old_key)
+                if position < len(keys) and keys[position] == old_key:
+                    del keys[position]
+            if current_amount is not None:
+                new_key = _sort_key(progress_id, current_amount)
+                insort(keys, new_key)
+                entries[progress_id] = new_key
+
+            set_until_expiry(key, index)
+        finally:
+            release_lock(lock_key)
+
+    # ------------------------------------------------------------------
+    # Mises à jour
+    # ------------------------------------------------------------------
+
+    def update(self, progress):
+        """Repositionne une progression après le commit courant"""
+        challenge_id, progress_id, amount = progress.challenge_id, progress.id, progress.current_amount
+        transaction.on_commit(lambda: self._apply(challenge_id, progress_id, amount))
+
+    def remove(self, progress):
+        """Retire une progression après le commit courant"""
+        challenge_id, progress_id = progress.challenge_id, progress.id
+        transaction.on_commit(lambda: self._apply(challenge_id, progress_id, None))
+
+    def invalidate(self):
+        """Force la reconstruction de tous les index à la prochaine lecture"""
+        bump_cache_version(PROGRESS_RANK_NAMESPACE)
+
+    # ------------------------------------------------------------------
+    # Lectures
+    # ------------------------------------------------------------------
+
+    def rank_of(self, progress):
+        """Rang d'une progression dans son challenge"""
+        index = self.load_many([progress.challenge_id])[str(progress.challenge_id)]
+        return bisect_left(index['keys'], (-progress.current_amount,)) + 1
+
+    def summaries(self, progresses):
+        """
+        Rang, effectif et podium de plusieurs progressions (une par challenge) en
+        un aller-retour cache et au plus deux requêtes
+
+        Renseigne aussi le rang sur chaque progression (lu ensuite par progress.rank).
+
+        Returns:
+            Dict id challenge (str) -> {rank, total_participants, leaderboard}
+        """
+        progresses = list(progresses)
+        indexes = self.load_many([progress.challenge_id for progress in progresses])
+
+        podium_ids = {
+            key[1]
+            for index in indexes.values()
+            for key in index['keys'][:PODIUM_SIZE]
+        }
+        leaders = {
+            str(leader.id): leader
+            for leader in UserSavingsProgress.objects.filter(id__in=list(podium_ids)).select_related('user')
+        }
+
+        summaries = {}
+        for progress in progresses:
+            index = indexes[str(progress.challenge_id)]
+            progress._rank = bisect_left(index['keys'], (-progress.current_amount,)) + 1
+
+            leaderboard = []
+            for position, key in enumerate(index['keys'][:PODIUM_SIZE], 1):
+                leader = leaders.get(key[1])
+                if leader is None:
+                    continue
+                leaderboard.append({
+                    'rank': position,
+                    'name': leader.user.get_full_name() or leader.user.username,
+                    'amount': float(leader.current_amount)
+                })
+
+            summaries[str(progress.challenge_id)] = {
+                'rank': progress._rank,
+                'total_participants': len(index['keys']),
+                'leaderboard': leaderboard,
+            }
+        return summaries
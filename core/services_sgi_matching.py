@@ -0,0 +1,232 @@
+"""
+Index de matching SGI précalculé.
+Chaque SGI active est réduite à un vecteur de caractéristiques (niveaux de risque
+et horizons acceptés, bornes de montant, tranche de performance) construit une
+seule fois par processus. Le scoring d'un profil client ne touche plus la base
+et ne reconstruit plus les données d'affichage des SGI.
+"""
+from bisect import bisect_right
+from collections import OrderedDict, namedtuple
+from decimal import Decimal
+import logging
+import threading
+
+from .models import SGI
+from .utils_cache import get_cache_version, invalidate_on_commit
+
+logger = logging.getLogger(__name__)
+
+
+# Barème du score de compatibilité (sur 100)
+OBJECTIVE_SCORE = 20  # forfaitaire: le modèle SGI ne décrit pas les objectifs qu'elle accepte
+RISK_SCORE = 25
+HORIZON_SCORE = 20
+AMOUNT_SCORE = 15
+
+RISK_CODES = [code for code, _ in SGI.RISK_LEVELS]
+HORIZON_CODES = [code for code, _ in SGI.INVESTMENT_HORIZONS]
+
+# Espace de cache dont la version partagée invalide l'index dans tous les processus
+INDEX_CACHE_NAMESPACE = 'sgi_matching_index'
+
+
+SGIFeatures = namedtuple('SGIFeatures', [
+    'sgi_id', 'risk_mask', 'horizon_mask', 'min_amount', 'max_amount', 'performance_score',
+])
+
+
+def _mask(values, codes):
+    """Encode une liste de codes en masque de bits (None = tous les codes acceptés)"""
+    if values is None:
+        return (1 << len(codes)) - 1
+    return sum(1 << codes.index(value) for value in values if value in codes)
+
+
+def performance_score(historical_performance) -> int:
+    """Tranche de performance historique: 10 points si >= 5%, 5 points si >= 0%"""
+    if historical_performance >= 5:
+        return 10
+    if historical_performance >= 0:
+        return 5
+    return 0
+
+
+def build_sgi_features(sgi) -> SGIFeatures:
+    """
+    Calcule le vecteur de caractéristiques d'une SGI
+
+    Le modèle SGI ne porte pas encore supported_risk_levels / supported_horizons:
+    en leur absence tous les niveaux sont acceptés. Le montant minimum des
+    conditions d'ouverture (SGIAccountTerms) relève la borne basse si renseigné.
+    """
+    min_amount = sgi.min_investment_amount
+    terms = getattr(sgi, 'account_terms', None)
+    if terms is not None and terms.has_minimum_amount and terms.minimum_amount_value:
+        min_amount = max(min_amount, terms.minimum_amount_value)
+
+    return SGIFeatures(
+        sgi_id=str(sgi.id),
+        risk_mask=_mask(getattr(sgi, 'supported_risk_levels', None), RISK_CODES),
+        horizon_mask=_mask(getattr(sgi, 'supported_horizons', None), HORIZON_CODES),
+        min_amount=min_amount,
+        max_amount=sgi.max_investment_amount,
+        performance_score=performance_score(sgi.historical_performance),
+    )
+
+
+def amount_is_compatible(features: SGIFeatures, amount) -> bool:
+    """Vérifie que le montant du client est dans les bornes de la SGI"""
+    return amount >= features.min_amount and (features.max_amount is None or amount <= features.max_amount)
+
+
+def _sgi_data(sgi) -> dict:
+    """Données d'affichage d'une SGI dans les résultats de matching"""
+    return {
+        'sgi_id': str(sgi.id),
+        'sgi_name': sgi.name,
+        'sgi_description': sgi.description,
+        'manager_name': sgi.manager_name,
+        'manager_email': sgi.manager_email,
+        'matching_score': 0,
+        'min_investment_amount': float(sgi.min_investment_amount),
+        'max_investment_amount': float(sgi.max_investment_amount) if sgi.max_investment_amount else None,
+        'historical_performance': float(sgi.historical_performance),
+        'management_fees': float(sgi.management_fees),
+        'entry_fees': float(sgi.entry_fees),
+        'logo': sgi.logo.url if sgi.logo else None,
+        'website': sgi.website,
+        'is_verified': sgi.is_verified,
+        'total_clients': getattr(sgi, 'total_clients', 0),
+        'total_assets_under_management': float(getattr(sgi, 'total_assets_under_management', 0) or 0),
+    }
+
+
+class SGIMatchingIndex:
+    """
+    Index en mémoire des SGI actives pour le matching
+
+    Les scores risque/horizon/performance ne dépendent que du couple
+    (tolérance au risque, horizon) du client: ils sont précalculés pour chacun
+    des couples possibles. Seul le critère de montant reste évalué par profil.
+    Les classements déjà calculés sont conservés (LRU) par clé de profil.
+    """
+
+    MAX_RANKINGS = 512
+
+    def __init__(self, sgis, version=None):
+        self.version = version
+        self.features = [build_sgi_features(sgi) for sgi in sgis]
+        self.data = [_sgi_data(sgi) for sgi in sgis]
+        self.positions = {features.sgi_id: i for i, features in enumerate(self.features)}
+
+        # Score de base (hors montant) de chaque SGI, pour chaque couple (risque, horizon)
+        self.base_scores = {}
+        for r, risk in enumerate(RISK_CODES):
+            for h, horizon in enumerate(HORIZON_CODES):
+                self.base_scores[(risk, horizon)] = [
+                    OBJECTIVE_SCORE
+                    + (RISK_SCORE if f.risk_mask >> r & 1 else 0)
+                    + (HORIZON_SCORE if f.horizon_mask >> h & 1 else 0)
+                    + f.performance_score
+                    for f in self.features
+                ]
+
+        self._rankings = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.features)
+
+    def _base_scores_for(self, risk, horizon):
+        scores = self.base_scores.get((risk, horizon))
+        if scores is None:
+            # Valeur hors référentiel: aucun point de risque/horizon
+            scores = [OBJECTIVE_SCORE + f.performance_score for f in self.features]
+        return scores
+
+    def ranking(self, risk, horizon, amount):
+        """
+        Classement des SGI pour une clé de profil
+
+        Returns:
+            Tuple (scores négatifs triés, positions) - ordre décroissant de score,
+            à score égal l'ordre du catalogue (-created_at) est conservé
+        """
+        key = (risk, horizon, Decimal(amount))
+        with self._lock:
+            cached = self._rankings.get(key)
+            if cached is not None:
+                self._rankings.move_to_end(key)
+                return cached
+
+        base = self._base_scores_for(risk, horizon)
+        scored = sorted(
+            (-(score + (AMOUNT_SCORE if amount_is_compatible(f, key[2]) else 0)), i)
+            for i, (score, f) in enumerate(zip(base, self.features))
+        )
+        ranking = (tuple(s for s, _ in scored), tuple(i for _, i in scored))
+
+        with self._lock:
+            self._rankings[key] = ranking
+            if len(self._rankings) > self.MAX_RANKINGS:
+                self._rankings.popitem(last=False)
+        return ranking
+
+    def match(self, client_profile, top_k=None):
+        """Résultats de matching (les top_k meilleurs si précisé)"""
+        neg_scores, positions = self.ranking(
+            client_profile.risk_tolerance, client_profile.investment_horizon, client_profile.investment_amount
+        )
+        if top_k is not None:
+            neg_scores, positions = neg_scores[:top_k], positions[:top_k]
+        return [
+            {**self.data[i], 'matching_score': -neg_score}
+            for neg_score, i in zip(neg_scores, positions)
+        ]
+
+    def count_matches(self, client_profile, min_score) -> int:
+        """Nombre de SGI atteignant min_score pour ce profil"""
+        neg_scores, _ = self.ranking(
+            client_profile.risk_tolerance, client_profile.investment_horizon, client_profile.investment_amount
+        )
+        return bisect_right(neg_scores, -min_score)
+
+    def get_features(self, sgi_id):
+        """Vecteur de caractéristiques d'une SGI indexée (None si absente)"""
+        position = self.positions.get(str(sgi_id))
+        return self.features[position] if position is not None else None
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_matching_index() -> SGIMatchingIndex:
+    """
+    Retourne l'index de matching du processus, reconstruit si une SGI
+    ou ses conditions ont été modifiées depuis sa construction
+    """
+    global _index
+    version = get_cache_version(INDEX_CACHE_NAMESPACE)
+    index = _index
+    if index is not None and index.version == version:
+        return index
+
+    with _index_lock:
+        if _index is None or _index.version != version:
+            sgis = list(SGI.objects.filter(is_active=True).select_related('account_terms'))
+            _index = SGIMatchingIndex(sgis, version=version)
+            logger.info(f"Index de matching SGI construit: {len(_index)} SGI actives")
+        return _index
+
+
+def _drop_local_index():
+    global _index
+    _index = None
+
+
+def invalidate_matching_index():
+    """
+    Invalide l'index de matching de tous les processus après le commit courant
+    """
+    invalidate_on_commit(INDEX_CACHE_NAMESPACE, _drop_local_index)
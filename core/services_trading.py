@@ -0,0 +1,286 @@
+"""
+Moteur d'exécution des ordres de trading (simulation)
+Chaque exécution se fait dans une transaction, portefeuille et positions verrouillés
+par select_for_update: deux exécutions concurrentes sur un même portefeuille
+sont sérialisées et ne peuvent pas dépenser deux fois les mêmes liquidités.
+"""
+from collections import defaultdict
+from decimal import Decimal, ROUND_HALF_UP
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+import logging
+
+from .models_trading import Portfolio, Holding, TradingOrder, Transaction
+from .services_leaderboard import sync_portfolio
+
+logger = logging.getLogger(__name__)
+
+
+COMMISSION_RATE = Decimal('0.001')
+CENT = Decimal('0.01')
+
+
+class OrderExecutionError(Exception):
+    """Ordre non exécutable (prix limite, fonds ou position insuffisants)"""
+
+
+def _cents(amount):
+    return amount.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+class _FillBatch:
+    """
+    Écritures d'un lot d'exécutions, appliquées en masse par flush()
+
+    Les portefeuilles et leurs positions sont chargés verrouillés; les exécutions
+    modifient ces objets en mémoire puis flush() écrit chaque table en une fois.
+    """
+
+    def __init__(self, portfolios, holdings, now):
+        self.portfolios = portfolios  # id -> Portfolio verrouillé
+        self.holdings = holdings  # (portfolio_id, stock_id) -> Holding verrouillée
+        self.now = now
+        self.new_holdings = {}
+        self.changed_holdings = {}
+        self.deleted_holdings = {}
+        self.orders = []
+        self.transactions = []
+
+    def fill(self, order, price):
+        """
+        Exécute un ordre au prix donné (en mémoire)
+
+        Raises:
+            OrderExecutionError: ordre non exécutable, rien n'est modifié
+        """
+        if order.order_type == 'LIMIT':
+            if order.side == 'BUY' and price > order.limit_price:
+                raise OrderExecutionError('Prix trop élevé pour l\'ordre limite')
+            if order.side == 'SELL' and price < order.limit_price:
+                raise OrderExecutionError('Prix trop bas pour l\'ordre limite')
+
+        portfolio = self.portfolios[order.portfolio_id]
+        key = (order.portfolio_id, order.stock_id)
+        holding = self.holdings.get(key)
+
+        # Calculer les frais (0.1% de commission)
+        total_amount = _cents(price * order.quantity)
+        commission = _cents(total_amount * COMMISSION_RATE)
+
+        if order.side == 'BUY':
+            total_cost = total_amount + commission
+            if portfolio.current_cash < total_cost:
+                raise OrderExecutionError('Fonds insuffisants')
+
+            portfolio.current_cash -= total_cost
+            if holding is None and key in self.deleted_holdings:
+                # Position soldée plus tôt dans le lot: la ligne existante est réutilisée
+                holding = self.deleted_holdings.pop(key)
+                holding.quantity = order.quantity
+                holding.average_cost = price
+                holding.total_cost = total_amount
+                holding.current_value = total_amount
+                holding.last_transaction_date = self.now
+                self.holdings[key] = holding
+                self.changed_holdings[key] = holding
+            elif holding is None:
+                holding = Holding(
+                    portfolio_id=order.portfolio_id,
+                    stock_id=order.stock_id,
+                    quantity=order.quantity,
+                    average_cost=price,
+                    total_cost=total_amount,
+                    current_value=total_amount,
+                    first_purchase_date=self.now,
+                    last_transaction_date=self.now,
+                )
+                self.holdings[key] = holding
+                self.new_holdings[key] = holding
+            else:
+                quantity = holding.quantity + order.quantity
+                cost = holding.total_cost + total_amount
+                holding.average_cost = _cents(cost / quantity)
+                holding.quantity = quantity
+                holding.total_cost = cost
+                holding.current_value = _cents(quantity * price)
+                holding.last_transaction_date = self.now
+                self._touch(key, holding)
+
+        else:  # SELL
+            if holding is None:
+                raise OrderExecutionError('Aucune position à vendre')
+            if holding.quantity < order.quantity:
+                raise OrderExecutionError('Quantité insuffisante à vendre')
+
+            portfolio.current_cash += total_amount - commission
+            holding.quantity -= order.quantity
+            if holding.quantity == 0:
+                del self.holdings[key]
+                if self.new_holdings.pop(key, None) is None:
+                    self.changed_holdings.pop(key, None)
+                    self.deleted_holdings[key] = holding
+            else:
+                holding.total_cost -= _cents(holding.average_cost * order.quantity)
+                holding.current_value = _cents(holding.quantity * price)
+                holding.last_transaction_date = self.now
+                self._touch(key, holding)
+
+        order.status = 'FILLED'
+        order.filled_quantity = order.quantity
+        order.average_fill_price = price
+        order.filled_at = self.now
+        order.updated_at = self.now
+        self.orders.append(order)
+
+        trade = Transaction(
+            portfolio_id=order.portfolio_id,
+            stock_id=order.stock_id,
+            order=order,
+            transaction_type=order.side,
+            quantity=order.quantity,
+            price=price,
+            total_amount=total_amount,
+            commission=commission,
+        )
+        self.transactions.append(trade)
+        return trade
+
+    def _touch(self, key, holding):
+        if key not in self.new_holdings:
+            self.changed_holdings[key] = holding
+
+    def flush(self):
+        """Écrit le lot: une requête par table modifiée"""
+        if not self.orders:
+            return
+
+        if self.deleted_holdings:
+            Holding.objects.filter(id__in=[h.id for h in self.deleted_holdings.values()]).delete()
+        if self.new_holdings:
+            Holding.objects.bulk_create(list(self.new_holdings.values()))
+        if self.changed_holdings:
+            changed = list(self.changed_holdings.values())
+            for holding in changed:
+                holding.updated_at = self.now
+            Holding.objects.bulk_update(changed, [
+                'quantity', 'average_cost', 'total_cost', 'current_value',
+                'last_transaction_date', 'updated_at',
+            ])
+
+        TradingOrder.objects.bulk_update(self.orders, [
+            'status', 'filled_quantity', 'average_fill_price', 'filled_at', 'updated_at',
+        ])
+        Transaction.objects.bulk_create(self.transactions)
+
+        # Valeur totale = liquidités + positions (toutes chargées sous verrou)
+        values = defaultdict(Decimal)
+        for (portfolio_id, _), holding in self.holdings.items():
+            values[portfolio_id] += holding.current_value
+
+        touched = {order.portfolio_id for order in self.orders}
+        portfolios = [self.portfolios[pid] for pid in touched]
+        for portfolio in portfolios:
+            portfolio.total_value = portfolio.current_cash + values[portfolio.id]
+            portfolio.updated_at = self.now
+        Portfolio.objects.bulk_update(portfolios, ['current_cash', 'total_value', 'updated_at'])
+
+        # bulk_update n'envoie pas post_save: repositionnement explicite au classement
+        for portfolio in portfolios:
+            sync_portfolio(portfolio)
+
+
+class OrderExecutionService:
+    """
+    Exécution des ordres de trading en attente
+    """
+
+    def _lock(self, portfolio_ids, now):
+        """
+        Verrouille les portefeuilles puis toutes leurs positions
+        (toujours dans l'ordre des identifiants, pour éviter les interblocages)
+        """
+        portfolio_ids = sorted(set(portfolio_ids), key=str)
+        portfolios = {
+            p.id: p for p in Portfolio.objects.select_for_update().filter(id__in=portfolio_ids).order_by('id')
+        }
+        holdings = {
+            (h.portfolio_id, h.stock_id): h
+            for h in Holding.objects.select_for_update().filter(portfolio_id__in=portfolio_ids).order_by('id')
+        }
+        return _FillBatch(portfolios, holdings, now)
+
+    def execute(self, order_id, user=None, price=None):
+        """
+        Exécute un ordre en attente au cours actuel de l'action (ou au prix donné)
+
+        Args:
+            order_id: Identifiant de l'ordre
+            user: Si fourni, l'ordre doit appartenir à un portefeuille de cet utilisateur
+            price: Prix d'exécution (cours actuel par défaut)
+
+        Returns:
+            Tuple (ordre, transaction)
+
+        Raises:
+            TradingOrder.DoesNotExist: ordre introuvable ou déjà exécuté
+            OrderExecutionError: ordre non exécutable
+        """
+        filters = {'id': order_id, 'status': 'PENDING'}
+        if user is not None:
+            filters['portfolio__user'] = user
+
+        with transaction.atomic():
+            portfolio_id = TradingOrder.objects.values_list('portfolio_id', flat=True).get(**filters)
+            batch = self._lock([portfolio_id], timezone.now())
+
+            # Relu sous verrou: une exécution concurrente a pu le remplir entre-temps
+            order = TradingOrder.objects.select_for_update().get(id=order_id, status='PENDING')
+            trade = batch.fill(order, order.stock.current_price if price is None else price)
+            batch.flush()
+
+        order.portfolio = batch.portfolios[order.portfolio_id]
+        return order, trade
+
+    def execute_pending_limit_orders(self, stock, price=None):
+        """
+        Exécute tous les ordres LIMIT en attente d'une action dont la limite est
+        atteinte au nouveau prix, en une transaction et un lot d'écritures
+
+        Les ordres non exécutables (fonds ou position insuffisants) restent en attente.
+
+        Args:
+            stock: Action (StockExtended)
+            price: Nouveau prix (cours actuel par défaut)
+
+        Returns:
+            Liste des transactions créées
+        """
+        price = stock.current_price if price is None else price
+
+        with transaction.atomic():
+            eligible = TradingOrder.objects.filter(
+                stock=stock, status='PENDING', order_type='LIMIT'
+            ).filter(
+                Q(side='BUY', limit_price__gte=price) | Q(side='SELL', limit_price__lte=price)
+            )
+            portfolio_ids = list(eligible.values_list('portfolio_id', flat=True).distinct())
+            if not portfolio_ids:
+                return []
+
+            batch = self._lock(portfolio_ids, timezone.now())
+            orders = list(
+                eligible.select_for_update().filter(portfolio_id__in=batch.portfolios)
+                .order_by('created_at')
+            )
+
+            trades = []
+            for order in orders:
+                try:
+                    trades.append(batch.fill(order, price))
+                except OrderExecutionError as e:
+                    logger.info(f"Ordre {order.id} laissé en attente: {e}")
+            batch.flush()
+
+        logger.info(f"{len(trades)} ordre(s) LIMIT exécuté(s) sur {stock.symbol} à {price}")
+        return trades
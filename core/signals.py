@@ -0,0 +1,154 @@
+"""
+Signaux de l'application core
+Invalidation des données précalculées lorsque leurs sources sont modifiées.
+"""
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import SGI, Contract, OTP, User
+from .models_dashboard import UserInvestment, UserSavingsProgress, DashboardTransaction
+from .models_notifications import Notification
+from .models_permissions import Permission, RolePermission
+from .models_sgi import SGIAccountTerms, SGIRating
+from .models_savings_challenge import SavingsAccount, ChallengeParticipation
+from .models_trading import Portfolio, CompetitionParticipant
+from .services_challenge_leaderboard import touch_participation
+from .services_community import CommunityStatsService
+from .services_comparator import invalidate_comparator_cache, refresh_rating_summary
+from .services_dashboard_stats import mark_stale
+from .services_leaderboard import CompetitionLeaderboard, sync_participant, sync_portfolio
+from .services_notification_inbox import UnreadCounter
+from .services_notification_stream import publish_notification
+from .services_permissions import invalidate_permission_matrix
+from .services_platform_metrics import remember_state, track_contract, track_otp, track_sgi, track_user
+from .services_savings_progress import SavingsProgressRankIndex
+from .services_sgi_matching import invalidate_matching_index
+
+
+@receiver([post_save, post_delete], sender=SGI)
+@receiver([post_save, post_delete], sender=SGIAccountTerms)
+def invalidate_sgi_caches(sender, **kwargs):
+    """Une SGI ou ses conditions d'ouverture ont changé: index de matching et comparateur à reconstruire"""
+    invalidate_matching_index()
+    invalidate_comparator_cache()
+
+
+@receiver([post_save, post_delete], sender=SGIRating)
+def update_sgi_rating_summary(sender, instance, **kwargs):
+    """Met à jour le résumé des notes de la SGI notée"""
+    origin = kwargs.get('origin')
+    if origin is not None and getattr(origin, 'model', type(origin)) is SGI:
+        # Suppression en cascade de la SGI: son résumé est supprimé avec elle
+        return
+    refresh_rating_summary(instance.sgi_id)
+
+
+@receiver(post_save, sender=CompetitionParticipant)
+def update_leaderboard_participant(sender, instance, **kwargs):
+    """Un participant a rejoint la compétition ou changé de statut: repositionnement au classement"""
+    sync_participant(instance)
+
+
+@receiver(post_delete, sender=CompetitionParticipant)
+def remove_leaderboard_participant(sender, instance, **kwargs):
+    """Retire un participant supprimé du classement"""
+    CompetitionLeaderboard(instance.competition_id).remove(instance.id)
+
+
+@receiver(post_save, sender=Portfolio)
+def update_leaderboard_portfolio(sender, instance, **kwargs):
+    """La valeur d'un portefeuille de compétition a changé: repositionnement au classement"""
+    sync_portfolio(instance)
+
+
+@receiver(post_save, sender=SavingsAccount)
+def update_community_index_account(sender, instance, **kwargs):
+    """Un compte d'épargne a été créé ou modifié: repositionnement dans l'index communautaire"""
+    CommunityStatsService().sync_account(instance)
+
+
+@receiver(post_delete, sender=SavingsAccount)
+def remove_community_index_account(sender, instance, **kwargs):
+    """Retire un compte d'épargne supprimé de l'index communautaire"""
+    CommunityStatsService().remove_account(instance.id)
+
+
+@receiver(post_save, sender=ChallengeParticipation)
+def update_challenge_leaderboard_participation(sender, instance, **kwargs):
+    """Une participation a été créée ou modifiée: rescorage dans le classement du défi"""
+    touch_participation(instance.id, instance.challenge_id)
+
+
+@receiver(post_save, sender=UserSavingsProgress)
+def update_savings_progress_rank(sender, instance, **kwargs):
+    """Le montant épargné d'une progression a changé: repositionnement dans l'index des rangs"""
+    SavingsProgressRankIndex().update(instance)
+
+
+@receiver(post_delete, sender=UserSavingsProgress)
+def remove_savings_progress_rank(sender, instance, **kwargs):
+    """Retire une progression supprimée de l'index des rangs"""
+    SavingsProgressRankIndex().remove(instance)
+
+
+@receiver([post_save, post_delete], sender=UserInvestment)
+@receiver([post_save, post_delete], sender=DashboardTransaction)
+@receiver([post_save, post_delete], sender=UserSavingsProgress)
+def mark_dashboard_stats_stale(sender, instance, **kwargs):
+    """Une donnée du dashboard a changé: l'instantané de l'utilisateur est à recalculer"""
+    mark_stale(instance.user_id)
+
+
+@receiver(post_save, sender=Notification)
+def count_unread_notification(sender, instance, created, **kwargs):
+    """Une notification in-app a été créée: compteur de non lues incrémenté et notification poussée"""
+    if created and instance.notification_type == 'IN_APP' and instance.opened_at is None:
+        UnreadCounter().increment(instance.recipient_id)
+        publish_notification(instance)
+
+
+@receiver(post_delete, sender=Notification)
+def uncount_unread_notification(sender, instance, **kwargs):
+    """Une notification in-app non lue a été supprimée: compteur de non lues décrémenté"""
+    if instance.notification_type == 'IN_APP' and instance.opened_at is None:
+        UnreadCounter().decrement(instance.recipient_id)
+
+
+@receiver(post_init, sender=User)
+@receiver(post_init, sender=OTP)
+@receiver(post_init, sender=SGI)
+@receiver(post_init, sender=Contract)
+def remember_platform_metrics_state(sender, instance, **kwargs):
+    """Mémorise l'état suivi par les indicateurs journaliers (vérification, statut...)"""
+    remember_state(instance)
+
+
+@receiver(post_save, sender=User)
+def record_user_metrics(sender, instance, created, **kwargs):
+    """Inscription ou vérification: indicateurs journaliers du tableau de bord admin"""
+    track_user(instance, created)
+
+
+@receiver(post_save, sender=OTP)
+def record_otp_metrics(sender, instance, created, **kwargs):
+    """OTP envoyé ou utilisé: indicateurs journaliers du tableau de bord admin"""
+    track_otp(instance, created)
+
+
+@receiver(post_save, sender=SGI)
+def record_sgi_metrics(sender, instance, created, **kwargs):
+    """SGI créée ou (dés)activée: indicateurs journaliers du tableau de bord admin"""
+    track_sgi(instance, created)
+
+
+@receiver(post_save, sender=Contract)
+def record_contract_metrics(sender, instance, created, **kwargs):
+    """Contrat créé ou changement de statut: indicateurs journaliers du tableau de bord admin"""
+    track_contract(instance, created)
+
+
+@receiver([post_save, post_delete], sender=RolePermission)
+@receiver([post_save, post_delete], sender=Permission)
+def invalidate_role_permission_matrix(sender, **kwargs):
+    """Permission accordée, révoquée ou modifiée: matrice des permissions à reconstruire"""
+    invalidate_permission_matrix()
@@ -0,0 +1,118 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from ..models import SGI, Contract
+from ..services_analytics import business_intelligence, sgi_analytics, time_series
+
+User = get_user_model()
+
+
+class AnalyticsReportTests(TestCase):
+    """Rapports analytiques: agrégations groupées en requêtes constantes, mises en cache"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.customer = User.objects.create_user(
+            email='client@example.com', password='secret-pass-123', is_verified=True
+        )
+        self.sgis = [self.create_sgi(index) for index in range(2)]
+        self.contract(self.sgis[0], 'APPROVED', '50000')
+        self.contract(self.sgis[0], 'APPROVED', '30000')
+        self.contract(self.sgis[0], 'REJECTED', '10000')
+        self.contract(self.sgis[1], 'PENDING', '20000')
+
+    def create_sgi(self, index):
+        return SGI.objects.create(
+            name=f'SGI {index}', description='Test', address='Dakar', manager_name=f'Manager {index}',
+            manager_email=f'manager{index}@example.com', email=f'sgi{index}@example.com',
+            min_investment_amount=Decimal('10000')
+        )
+
+    def contract(self, sgi, status, amount):
+        return Contract.objects.create(
+            customer=self.customer, sgi=sgi, investment_amount=Decimal(amount), funding_source='CASH', status=status
+        )
+
+    def test_sgi_analytics_groups_contracts_per_sgi(self):
+        with self.assertNumQueries(3):
+            report = sgi_analytics(days=7)
+
+        self.assertEqual(report['overview']['total_sgis'], 2)
+        first = report['performance_ranking'][0]
+        self.assertEqual(first['sgi_name'], 'SGI 0')
+        self.assertEqual((first['total_contracts'], first['approved_contracts']), (3, 2))
+        self.assertEqual(first['total_investment'], Decimal('80000'))
+        self.assertEqual(first['manager'], 'Manager 0')
+        self.assertEqual(len(report['registration_evolution']), 7)
+        self.assertEqual(report['registration_evolution'][-1]['count'], 2)
+
+    def test_sgi_analytics_queries_do_not_grow_with_sgis(self):
+        for index in range(2, 8):
+            self.contract(self.create_sgi(index), 'APPROVED', '15000')
+
+        with self.assertNumQueries(3):
+            report = sgi_analytics(days=30)
+
+        self.assertEqual(len(report['performance_ranking']), 8)
+
+    def test_reports_are_cached_per_parameters(self):
+        sgi_analytics(days=7)
+        business_intelligence()
+
+        with self.assertNumQueries(0):
+            sgi_analytics(days=7)
+            business_intelligence()
+        with self.assertNumQueries(3):
+            sgi_analytics(days=14)
+
+    def test_business_intelligence_aggregates(self):
+        with self.assertNumQueries(3):
+            report = business_intelligence()
+
+        self.assertEqual(report['growth_metrics']['new_users_current_month'], 1)
+        self.assertEqual(report['financial_metrics']['total_investment'], 80000.0)
+        self.assertEqual(report['financial_metrics']['average_contract_value'], 40000.0)
+        self.assertEqual(report['conversion_funnel']['verification_to_contract'], 100.0)
+        self.assertEqual(report['conversion_funnel']['contract_to_approval'], 50.0)
+
+    def test_endpoint_validates_days(self):
+        admin = User.objects.create_superuser(email='admin@example.com', password='secret-pass-123')
+        client = APIClient()
+        client.force_authenticate(admin)
+
+        self.assertEqual(client.get('/api/admin/sgis/analytics/', {'days': 'trente'}).status_code, 400)
+        response = client.get('/api/admin/sgis/analytics/', {'days': 5})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['registration_evolution']), 5)
+
+
+class TimeSeriesTests(TestCase):
+    """Séries temporelles: périodes vides à zéro, regroupement par semaine et par mois"""
+
+    def setUp(self):
+        self.today = timezone.localdate()
+        User.objects.create_user(email='client@example.com', password='secret-pass-123')
+
+    def test_weekly_and_monthly_buckets(self):
+        users = User.objects.all()
+        start = self.today - timedelta(days=20)
+
+        weeks = time_series(users, 'created_at', start, self.today, bucket='week')
+        months = time_series(users, 'created_at', start, self.today, bucket='month')
+
+        self.assertTrue(all(date.fromisoformat(point['date']).weekday() == 0 for point in weeks))
+        self.assertEqual(weeks[-1]['count'], 1)
+        self.assertEqual(sum(point['count'] for point in weeks), 1)
+        self.assertTrue(all(date.fromisoformat(point['date']).day == 1 for point in months))
+        self.assertEqual(months[-1]['count'], 1)
+
+    def test_unknown_bucket_is_refused(self):
+        with self.assertRaises(ValueError):
+            time_series(User.objects.all(), 'created_at', self.today, self.today, bucket='year')
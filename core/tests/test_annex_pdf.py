@@ -0,0 +1,71 @@
+import tempfile
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from ..models import SGI
+from ..models_sgi import AccountOpeningJob, AccountOpeningRequest
+from ..services_annex_pdf import AnnexPDFService, AnnexRenderError
+from ..services_contract_pipeline import ContractPipelineService
+
+User = get_user_model()
+
+
+class AnnexPDFServiceTests(TestCase):
+    """Annexes: une page en erreur interrompt le rendu"""
+
+    def test_failed_page_aborts_render(self):
+        service = AnnexPDFService()
+        with mock.patch.object(service, '_draw_page22', side_effect=ValueError('page 22')):
+            with self.assertRaises(AnnexRenderError):
+                service.generate_annexes_pdf(None, {})
+        self.assertIsNone(service._image_cache)
+
+    def test_annexes_rendered(self):
+        pdf = AnnexPDFService().generate_annexes_pdf(None, {}).getvalue()
+
+        self.assertTrue(pdf.startswith(b'%PDF'))
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), BACKGROUND_TASKS_MODE='worker')
+class AnnexRenderFallbackTests(TestCase):
+    """Pipeline: des annexes impossibles à dessiner n'empêchent pas l'envoi du contrat"""
+
+    def setUp(self):
+        customer = User.objects.create_user(email='client@example.com', password='secret-pass-123')
+        aor = AccountOpeningRequest.objects.create(
+            customer=customer, full_name='Client Test', email='client@example.com', phone='+221770000000',
+            country_of_residence='Sénégal', nationality='Sénégalaise', sources_of_income='Salaire',
+            investor_profile='PRUDENT', annex_data={'page22': {'nom_complet': 'Client Test'}}
+        )
+        self.service = ContractPipelineService()
+        self.job = self.service.enqueue(aor)
+
+    def test_contract_sent_without_annexes(self):
+        with mock.patch.object(self.service.annex_service, 'generate_annexes_pdf', side_effect=AnnexRenderError('Page 22')), \
+                mock.patch.object(self.service.email_service, 'send_contract_emails', return_value={'client': True, 'errors': []}) as send:
+            job = self.service.process(self.job.id)
+
+        self.assertEqual((job.status, job.attempts), ('COMPLETED', 1))
+        self.assertEqual(job.stage_results['render']['annexes_error'], 'Page 22')
+        self.assertTrue(send.call_args.kwargs['contract_pdf'])
+        self.assertIsNone(send.call_args.kwargs['annexes_pdf'])
+
+
+class DownloadAnnexesPDFViewTests(TestCase):
+    """Téléchargement des annexes: une page en erreur est signalée au client, pas en 500"""
+
+    def test_render_error_is_reported(self):
+        sgi = SGI.objects.create(
+            name='SGI Test', description='Test', address='Dakar', manager_name='Manager',
+            manager_email='manager@example.com', email='sgi@example.com',
+            min_investment_amount=Decimal('10000')
+        )
+        with mock.patch('core.services_annex_pdf.AnnexPDFService._draw_page22', side_effect=ValueError('page 22')):
+            response = self.client.post(
+                '/api/download-annexes-pdf/', {'sgi_id': str(sgi.id), 'annex_data': {}}, content_type='application/json'
+            )
+
+        self.assertEqual(response.status_code, 422)
@@ -0,0 +1,100 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from ..models_notifications import (
+    Notification, NotificationCampaign, NotificationPreference, NotificationQueue, NotificationTemplate
+)
+from ..services_campaigns import CampaignFanOut, fan_out_campaign, get_campaign_progress, start_campaign
+from ..views_notifications import start_campaign as start_campaign_view
+
+User = get_user_model()
+
+
+@override_settings(BACKGROUND_TASKS_MODE='worker')
+class CampaignFanOutTests(TestCase):
+    """Diffusion des campagnes: par tranches, hors requête, reprenable sans doublons"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.admin = User.objects.create_user(
+            email='admin@example.com', password='secret-pass-123', role='ADMIN', first_name='Awa'
+        )
+        template = NotificationTemplate.objects.create(
+            name='Annonce', template_type='EMAIL', category='MARKETING',
+            subject_template='Bonjour {{ user_first_name }}', body_template='Message pour {{ user_email }}',
+            created_by=self.admin
+        )
+        self.campaign = NotificationCampaign.objects.create(
+            name='Annonce', campaign_type='ONE_TIME', template=template, target_audience='CUSTOMERS',
+            created_by=self.admin
+        )
+        self.customers = [
+            User.objects.create_user(
+                email=f'client{index}@example.com', password='secret-pass-123', role='CUSTOMER',
+                first_name=f'Client{index}'
+            )
+            for index in range(5)
+        ]
+
+    def test_start_defers_fan_out(self):
+        self.assertFalse(start_campaign(self.campaign))
+
+        self.campaign.refresh_from_db()
+        self.assertEqual((self.campaign.status, self.campaign.total_recipients), ('ACTIVE', 5))
+        self.assertEqual(get_campaign_progress(self.campaign.id)['state'], 'QUEUED')
+        self.assertFalse(Notification.objects.exists())
+
+    def test_fan_out_renders_and_queues(self):
+        NotificationPreference.objects.create(user=self.customers[0], global_opt_out=True)
+        start_campaign(self.campaign)
+
+        progress = fan_out_campaign(self.campaign.id)
+
+        self.assertEqual((progress['state'], progress['created'], progress['skipped']), ('DONE', 4, 1))
+        notification = Notification.objects.get(recipient=self.customers[1])
+        self.assertEqual(notification.subject, 'Bonjour Client1')
+        self.assertEqual(notification.message, 'Message pour client1@example.com')
+        self.assertFalse(Notification.objects.filter(recipient=self.customers[0]).exists())
+        self.assertEqual(NotificationQueue.objects.filter(priority=100).count(), 4)
+
+    def test_interrupted_fan_out_resumes_without_duplicates(self):
+        start_campaign(self.campaign)
+        CampaignFanOut(self.campaign, chunk_size=2).run()
+
+        # Interruption après la première tranche (destinataires parcourus par identifiant)
+        notified = sorted(customer.id for customer in self.customers)[:2]
+        Notification.objects.exclude(recipient_id__in=notified).delete()
+        progress = CampaignFanOut(self.campaign, chunk_size=2).run()
+
+        notifications = Notification.objects.filter(campaign=self.campaign)
+        self.assertEqual(notifications.count(), 5)
+        self.assertEqual(notifications.values('recipient').distinct().count(), 5)
+        self.assertEqual(progress['state'], 'DONE')
+
+    def test_queries_per_chunk_do_not_grow_with_recipients(self):
+        start_campaign(self.campaign)
+        with CaptureQueriesContext(connection) as queries:
+            CampaignFanOut(self.campaign, chunk_size=10).run()
+        few = len(queries)
+
+        Notification.objects.all().delete()
+        for index in range(5, 15):
+            User.objects.create_user(email=f'client{index}@example.com', password='secret-pass-123', role='CUSTOMER')
+        with CaptureQueriesContext(connection) as queries:
+            CampaignFanOut(self.campaign, chunk_size=20).run()
+
+        self.assertEqual(len(queries), few)
+
+    def test_start_endpoint_accepts_draft_once(self):
+        def post():
+            request = APIRequestFactory().post(f'/api/notifications/campaigns/{self.campaign.id}/start/')
+            force_authenticate(request, user=self.admin)
+            return start_campaign_view(request, campaign_id=self.campaign.id)
+
+        self.assertEqual(post().status_code, 202)
+        self.assertEqual(post().status_code, 400)
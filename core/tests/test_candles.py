@@ -0,0 +1,61 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from ..models_trading import PriceHistory, StockExtended
+from ..services_market import MarketSimulator
+from ..views_trading import stock_price_history
+
+User = get_user_model()
+
+
+class MarketSimulatorCandleTests(TestCase):
+    """Bougies: une bougie déjà écrite n'est pas agrégée une seconde fois; historique servi en lignes par défaut"""
+
+    def setUp(self):
+        price = Decimal('100.00')
+        self.stock = StockExtended.objects.create(
+            symbol='XAM', company_name='Xamila', sector='Finance', industry='Banque', category='BLUE_CHIP',
+            market_cap=Decimal('1000000'), shares_outstanding=10000,
+            current_price=price, opening_price=price, high_price=price, low_price=price, previous_close=price,
+        )
+        self.viewer = User.objects.create_user(email='viewer@example.com', password='secret-pass-123')
+        self.bucket = timezone.now().replace(minute=0, second=0, microsecond=0)
+
+    def _flush(self):
+        simulator = MarketSimulator(seed=1)
+        simulator.bucket = self.bucket
+        simulator.step()
+        return simulator.flush_candles()
+
+    def test_existing_candle_not_rolled_up_twice(self):
+        self.assertEqual(self._flush(), 1)
+        hourly = PriceHistory.objects.get(timeframe='1HOUR', timestamp=self.bucket)
+        minute = PriceHistory.objects.get(timeframe='1MIN', timestamp=self.bucket)
+
+        self.assertEqual(self._flush(), 0)
+
+        hourly.refresh_from_db()
+        self.assertEqual(hourly.volume, minute.volume)
+        self.assertEqual(PriceHistory.objects.filter(timeframe='1MIN').count(), 1)
+
+    def get_history(self, **params):
+        request = APIRequestFactory().get('/', params)
+        force_authenticate(request, self.viewer)
+        return stock_price_history(request, self.stock.id)
+
+    def test_price_history_defaults_to_rows(self):
+        self._flush()
+
+        response = self.get_history(max_points='100000')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['layout'], 'rows')
+        self.assertEqual(len(response.data['price_history']), 1)
+        self.assertIn('columns', self.get_history(layout='columns', days='2').data)
+
+    def test_invalid_price_history_parameters_are_refused(self):
+        for params in ({'max_points': 'abc'}, {'max_points': '-5'}, {'days': '0'}, {'layout': 'xml'}):
+            self.assertEqual(self.get_history(**params).status_code, 400, params)
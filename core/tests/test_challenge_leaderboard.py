@@ -0,0 +1,65 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from ..models_savings_challenge import ChallengeLeaderboard
+from ..services_challenge_leaderboard import ChallengeLeaderboardService
+from ..services_savings_ledger import SavingsLedgerService, get_or_create_active_participation
+
+User = get_user_model()
+
+
+class ChallengeLeaderboardServiceTests(TestCase):
+    """Classement matérialisé d'un défi: rescorage incrémental calculé en base"""
+
+    def setUp(self):
+        self.ledger = SavingsLedgerService()
+        self.users = [User.objects.create_user(email=f'saver{i}@example.com', password='secret-pass-123') for i in range(5)]
+        with self.captureOnCommitCallbacks(execute=True):
+            for i, user in enumerate(self.users):
+                self.ledger.deposit(user, Decimal(1000 * (i + 1)), 'MOBILE_MONEY')
+        self.challenge_id = get_or_create_active_participation(self.users[0]).challenge_id
+        self.leaderboard = ChallengeLeaderboardService(self.challenge_id)
+
+    def ranking(self):
+        """Emails dans l'ordre des rangs matérialisés"""
+        return list(
+            ChallengeLeaderboard.objects.filter(challenge_id=self.challenge_id).order_by('rank').values_list(
+                'participation__user__email', flat=True
+            )
+        )
+
+    def test_movements_keep_ranks_consistent(self):
+        self.assertEqual(self.ranking(), [f'saver{i}@example.com' for i in (4, 3, 2, 1, 0)])
+
+        # Rescorage incrémental: aucune resynchronisation complète
+        with self.assertNoLogs('core.services_challenge_leaderboard', level='INFO'):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.ledger.deposit(self.users[0], Decimal('4500'), 'MOBILE_MONEY')
+            self.assertEqual(self.ranking(), [f'saver{i}@example.com' for i in (0, 4, 3, 2, 1)])
+
+            with self.captureOnCommitCallbacks(execute=True):
+                self.ledger.withdraw(self.users[4], Decimal('4000'))
+        self.assertEqual(self.ranking(), [f'saver{i}@example.com' for i in (0, 3, 2, 1, 4)])
+        self.assertEqual(
+            list(ChallengeLeaderboard.objects.filter(challenge_id=self.challenge_id).order_by('rank').values_list('rank', flat=True)),
+            [1, 2, 3, 4, 5]
+        )
+        self.assertEqual(self.leaderboard.resync(), 0)
+
+    def test_left_participation_is_removed(self):
+        participation = get_or_create_active_participation(self.users[2])
+        with self.captureOnCommitCallbacks(execute=True):
+            participation.status = 'WITHDRAWN'
+            participation.save()
+
+        self.assertEqual(self.ranking(), [f'saver{i}@example.com' for i in (4, 3, 1, 0)])
+        self.assertEqual(self.leaderboard.resync(), 0)
+
+    def test_unmaterialized_leaderboard_is_rebuilt(self):
+        ChallengeLeaderboard.objects.filter(challenge_id=self.challenge_id).delete()
+
+        self.leaderboard.ensure()
+        self.assertEqual(self.ranking(), [f'saver{i}@example.com' for i in (4, 3, 2, 1, 0)])
+        self.assertEqual(self.leaderboard.around(get_or_create_active_participation(self.users[2]).id, radius=1)[1], 3)
@@ -0,0 +1,52 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+
+from ..models_savings_challenge import SavingsAccount
+from ..services_community import CommunityStatsService
+from ..services_savings_ledger import SavingsLedgerService, get_or_create_main_account
+
+User = get_user_model()
+
+
+class CommunityStatsServiceTests(TestCase):
+    """Index communautaire: dépôts et retraits repositionnent les comptes"""
+
+    def setUp(self):
+        cache.clear()
+        self.ledger = SavingsLedgerService()
+        self.community = CommunityStatsService()
+        self.alice = User.objects.create_user(email='alice@example.com', password='secret-pass-123')
+        self.bob = User.objects.create_user(email='bob@example.com', password='secret-pass-123')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ledger.deposit(self.alice, Decimal('3000'), 'MOBILE_MONEY')
+            self.ledger.deposit(self.bob, Decimal('2000'), 'MOBILE_MONEY')
+
+    def sort_key(self, user):
+        account = get_or_create_main_account(user)
+        return (-account.balance, str(account.id))
+
+    def test_ledger_movements_update_index(self):
+        self.assertEqual(self.community.totals()['total_saved'], 5000.0)
+        self.assertEqual(self.community.rank_of_user(self.alice.id), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ledger.deposit(self.bob, Decimal('2000'), 'MOBILE_MONEY')
+            self.ledger.withdraw(self.alice, Decimal('500'))
+
+        totals = self.community.totals()
+        self.assertEqual((totals['total_participants'], totals['total_saved']), (2, 6500.0))
+        self.assertEqual(self.community.rank_of_user(self.bob.id), 1)
+        self.assertEqual(self.community.rank_of_user(self.alice.id), 2)
+        keys, start, total = self.community.slice(after=self.sort_key(self.bob))
+        self.assertEqual((len(keys), start, total), (1, 1, 2))
+
+    def test_rebuild_reads_database(self):
+        self.community.totals()
+        SavingsAccount.objects.filter(user=self.alice).update(balance=Decimal('10'))
+
+        self.assertEqual(self.community.rebuild(), 2)
+        self.assertEqual(self.community.totals()['total_saved'], 2010.0)
+        self.assertEqual(self.community.rank_of_user(self.alice.id), 2)
@@ -0,0 +1,61 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from ..models_trading import CompetitionParticipant, Portfolio, TradingCompetition
+from ..services_leaderboard import CompetitionLeaderboard
+
+User = get_user_model()
+
+
+class CompetitionLeaderboardTests(TestCase):
+    """Classement d'une compétition de trading tenu dans le cache"""
+
+    def setUp(self):
+        cache.clear()
+        now = timezone.now()
+        owner = User.objects.create_user(email='organizer@example.com', password='secret-pass-123')
+        self.competition = TradingCompetition.objects.create(
+            name='Compétition', description='Test', initial_capital=Decimal('1000'),
+            registration_start=now - timedelta(days=2), registration_end=now - timedelta(days=1),
+            start_date=now - timedelta(days=1), end_date=now + timedelta(days=30), status='ACTIVE',
+            created_by=owner
+        )
+        self.participants = [self.join(f'trader{i}@example.com', Decimal(1000 + 100 * i)) for i in range(3)]
+        self.leaderboard = CompetitionLeaderboard(self.competition.id)
+
+    def join(self, email, total_value):
+        user = User.objects.create_user(email=email, password='secret-pass-123')
+        portfolio = Portfolio.objects.create(
+            user=user, name='Compétition', portfolio_type='COMPETITION', initial_capital=Decimal('1000'),
+            current_cash=Decimal('1000'), total_value=total_value
+        )
+        return CompetitionParticipant.objects.create(
+            competition=self.competition, user=user, portfolio=portfolio, status='ACTIVE'
+        )
+
+    def test_portfolio_change_moves_participant(self):
+        first, second, third = self.participants
+        self.assertEqual(self.leaderboard.rank_of(third.id), 1)
+
+        first.portfolio.total_value = Decimal('5000')
+        with self.captureOnCommitCallbacks(execute=True):
+            first.portfolio.save()
+
+        self.assertEqual(self.leaderboard.ranks(), {str(first.id): 1, str(third.id): 2, str(second.id): 3})
+        participants, total = self.leaderboard.window(1, 1)
+        self.assertEqual((participants[0].id, participants[0].current_rank, total), (third.id, 2, 3))
+
+    def test_update_before_build_is_read_from_database(self):
+        first = self.participants[0]
+        first.portfolio.total_value = Decimal('5000')
+        with self.captureOnCommitCallbacks(execute=True):
+            first.portfolio.save()
+
+        self.assertEqual(self.leaderboard.rank_of(first.id), 1)
+        self.assertEqual(self.leaderboard.persist_ranks(), 3)
+        self.assertEqual(CompetitionParticipant.objects.get(pk=first.pk).current_rank, 1)
@@ -0,0 +1,64 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO
+from types import SimpleNamespace
+
+from django.test import SimpleTestCase
+from pypdf import PdfReader
+
+from ..pdf_templates import BasePDFTemplate, NSIATemplate
+from ..services_pdf import ContractPDFService, get_cached_contract_template
+
+
+class AllPagesTemplate(BasePDFTemplate):
+    def fill_page(self, canvas_obj, page_num, context):
+        pass
+
+
+class ContractTemplateCacheTests(SimpleTestCase):
+    """Conventions PDF: parsées une fois par processus, rechargées si le fichier change"""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'convention.pdf')
+        shutil.copy(NSIATemplate().get_template_path(), self.path)
+
+    def test_template_parsed_once(self):
+        self.assertIs(get_cached_contract_template(self.path), get_cached_contract_template(self.path))
+
+    def test_modified_template_is_reloaded(self):
+        first = get_cached_contract_template(self.path)
+        os.utime(self.path, (first.mtime + 10, first.mtime + 10))
+
+        self.assertIsNot(get_cached_contract_template(self.path), first)
+
+
+class FilledPagesTests(SimpleTestCase):
+    """Pages recouvertes: seules celles que le template remplit"""
+
+    def test_declared_pages_within_template(self):
+        self.assertEqual(NSIATemplate().get_filled_pages(26), (0, 1, 21, 22, 25))
+        self.assertEqual(NSIATemplate().get_filled_pages(22), (0, 1, 21))
+
+    def test_undeclared_pages_default_to_all(self):
+        self.assertEqual(AllPagesTemplate().get_filled_pages(3), (0, 1, 2))
+        self.assertEqual(BasePDFTemplate().get_filled_pages(3), ())
+
+
+class ContractTemplateGenerationTests(SimpleTestCase):
+    """Génération depuis le template: pages non remplies copiées telles quelles"""
+
+    def test_unfilled_pages_are_copied(self):
+        context = {'sgi': SimpleNamespace(name='NSIA'), 'aor': None, 'annex': {}}
+        service = ContractPDFService()
+
+        first = service._generate_from_template(context)
+        second = service._generate_from_template(context)
+
+        template = PdfReader(NSIATemplate().get_template_path())
+        generated = PdfReader(BytesIO(first))
+        self.assertEqual(len(generated.pages), len(template.pages))
+        self.assertEqual(generated.pages[5].extract_text(), template.pages[5].extract_text())
+        self.assertEqual(len(second), len(first))
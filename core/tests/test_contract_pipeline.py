@@ -0,0 +1,118 @@
+import tempfile
+from datetime import timedelta
+from io import BytesIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from ..models_sgi import AccountOpeningJob, AccountOpeningRequest
+from ..services_contract_pipeline import ContractPipelineService
+
+User = get_user_model()
+
+SENT = {'client': True, 'errors': []}
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), BACKGROUND_TASKS_MODE='worker')
+class ContractPipelineServiceTests(TestCase):
+    """Pipeline contrat: réservation exclusive, reprise à l'étape en erreur, backoff puis échec"""
+
+    def setUp(self):
+        self.customer = User.objects.create_user(email='client@example.com', password='secret-pass-123')
+        self.aor = AccountOpeningRequest.objects.create(
+            customer=self.customer, full_name='Client Test', email='client@example.com', phone='+221770000000',
+            country_of_residence='Sénégal', nationality='Sénégalaise', sources_of_income='Salaire',
+            investor_profile='PRUDENT', annex_data={'page22': {'nom_complet': 'Client Test'}}
+        )
+        self.service = ContractPipelineService()
+        render = mock.patch.object(
+            self.service.annex_service, 'generate_annexes_pdf', side_effect=lambda *args: BytesIO(b'%PDF-annexes')
+        )
+        render.start()
+        self.addCleanup(render.stop)
+        self.job = self.service.enqueue(self.aor)
+
+    def send(self, **kwargs):
+        return mock.patch.object(self.service.email_service, 'send_contract_emails', **kwargs)
+
+    def test_job_runs_all_stages(self):
+        with self.send(return_value=SENT):
+            job = self.service.process(self.job.id)
+
+        self.assertEqual((job.status, job.stage, job.attempts), ('COMPLETED', 'DONE', 1))
+        self.assertEqual(set(job.stage_results), {'render', 'store', 'email'})
+        self.assertIsNotNone(job.completed_at)
+
+    def test_running_job_is_claimed_once(self):
+        self.assertIsNotNone(self.service._claim(self.job.id))
+
+        self.assertIsNone(self.service._claim(self.job.id))
+        self.assertIsNone(self.service.process(self.job.id))
+
+    def test_stale_running_job_is_reclaimed(self):
+        self.service._claim(self.job.id)
+        stale = timezone.now() - ContractPipelineService.STALE_AFTER - timedelta(minutes=1)
+        AccountOpeningJob.objects.filter(pk=self.job.id).update(updated_at=stale)
+
+        self.assertIn(self.job.id, self.service.due_jobs().values_list('id', flat=True))
+        self.assertEqual(self.service._claim(self.job.id).attempts, 2)
+
+    def test_failed_stage_is_retried_with_backoff(self):
+        with self.send(return_value={'errors': ['SMTP indisponible']}):
+            job = self.service.process(self.job.id)
+
+        self.assertEqual((job.status, job.stage), ('RETRY', 'EMAIL'))
+        delay = (job.next_retry_at - job.updated_at).total_seconds()
+        self.assertAlmostEqual(delay, ContractPipelineService.RETRY_BASE_SECONDS, delta=1)
+        self.assertNotIn(job.id, self.service.due_jobs().values_list('id', flat=True))
+
+    def test_retry_resumes_at_failed_stage(self):
+        with self.send(return_value={'errors': ['SMTP indisponible']}):
+            self.service.process(self.job.id)
+        AccountOpeningJob.objects.filter(pk=self.job.id).update(next_retry_at=timezone.now())
+
+        with self.send(return_value=SENT), \
+                mock.patch.object(self.service, '_stage_render') as render:
+            self.assertEqual(self.service.process_due_jobs(), 1)
+
+        render.assert_not_called()
+        job = AccountOpeningJob.objects.get(pk=self.job.id)
+        self.assertEqual((job.status, job.attempts, job.last_error), ('COMPLETED', 2, ''))
+
+    def test_job_fails_after_max_attempts(self):
+        AccountOpeningJob.objects.filter(pk=self.job.id).update(max_attempts=1)
+
+        with self.send(side_effect=OSError('SMTP indisponible')):
+            job = self.service.process(self.job.id)
+
+        self.assertEqual(job.status, 'FAILED')
+        self.assertIsNone(job.next_retry_at)
+        self.assertIn('SMTP indisponible', job.last_error)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), BACKGROUND_TASKS_MODE='worker')
+class AccountOpeningRequestCreateViewTests(TestCase):
+    """Création de demande: réponse 202 avec le job, traitement laissé au worker"""
+
+    def setUp(self):
+        self.customer = User.objects.create_user(email='client@example.com', password='secret-pass-123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    def test_request_is_accepted_and_queued(self):
+        response = self.client.post('/api/account-opening/request/', {
+            'full_name': 'Client Test', 'email': 'client@example.com', 'phone': '+221770000000',
+            'country_of_residence': 'Sénégal', 'nationality': 'Sénégalaise',
+            'sources_of_income': 'Salaire', 'investor_profile': 'PRUDENT', 'funding_by_mobile_money': True,
+        }, format='json')
+
+        self.assertEqual(response.status_code, 202, response.data)
+        job = AccountOpeningJob.objects.get(pk=response.data['job']['id'])
+        self.assertEqual((job.status, job.attempts), ('PENDING', 0))
+        self.assertTrue(response.data['job_status_url'].endswith(f'/api/account-opening/jobs/{job.id}/'))
+
+        status_response = self.client.get(f'/api/account-opening/jobs/{job.id}/')
+        self.assertEqual(status_response.status_code, 200)
@@ -0,0 +1,86 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ..models import SGI
+from ..models_dashboard import DashboardTransaction, UserDashboardStats, UserInvestment
+from ..services_dashboard_stats import DASHBOARD_STATS_TTL, DashboardStatsService
+
+User = get_user_model()
+
+
+@override_settings(BACKGROUND_TASKS_MODE='worker')
+class DashboardStatsServiceTests(TestCase):
+    """Statistiques du dashboard: instantané servi tel quel, recalculé une fois quand il est périmé"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(email='investor@example.com', password='secret-pass-123')
+        self.sgi = SGI.objects.create(
+            name='SGI Test', description='Test', address='Dakar', manager_name='Manager',
+            manager_email='manager@example.com', email='sgi@example.com', min_investment_amount=Decimal('10000')
+        )
+        self.service = DashboardStatsService()
+
+    def invest(self, invested, value):
+        with self.captureOnCommitCallbacks(execute=True):
+            UserInvestment.objects.create(
+                user=self.user, sgi=self.sgi, invested_amount=Decimal(invested), current_value=Decimal(value)
+            )
+
+    def test_first_access_computes_snapshot(self):
+        self.invest('1000', '1100')
+
+        stats = self.service.get(self.user)
+
+        self.assertEqual(stats.total_portfolio_value, Decimal('1100'))
+        self.assertEqual(stats.global_performance_percentage, Decimal('10.00'))
+
+    def test_write_marks_snapshot_stale(self):
+        self.service.get(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            DashboardTransaction.objects.create(
+                user=self.user, transaction_type='SAVINGS', amount=Decimal('500'), status='CONFIRMED',
+                description='Épargne', reference_id='TX-1'
+            )
+
+        stale = self.service.get(self.user)
+        self.assertEqual(stale.current_month_savings, Decimal('0'))
+
+        self.assertEqual(self.service.refresh_stale(), 1)
+        self.assertEqual(self.service.get(self.user).current_month_savings, Decimal('500'))
+
+    def test_stale_snapshot_refreshed_once(self):
+        self.service.get(self.user)
+        self.invest('1000', '1200')
+
+        with mock.patch('core.services_dashboard_stats.run_in_background') as background:
+            self.service.get(self.user)
+            self.service.get(self.user)
+
+        self.assertEqual(background.call_count, 1)
+
+    def test_expired_snapshot_is_refreshed(self):
+        self.service.get(self.user)
+        UserDashboardStats.objects.filter(user=self.user).update(
+            last_updated=timezone.now() - timedelta(seconds=DASHBOARD_STATS_TTL + 1)
+        )
+
+        self.assertTrue(self.service.is_stale(UserDashboardStats.objects.get(user=self.user)))
+        self.assertEqual(self.service.refresh_stale(), 1)
+        self.assertFalse(self.service.is_stale(UserDashboardStats.objects.get(user=self.user)))
+
+    def test_refresh_batches_users(self):
+        users = [User.objects.create_user(email=f'user{i}@example.com', password='secret-pass-123') for i in range(5)]
+
+        with self.assertNumQueries(5):
+            # investissements, épargne, challenge actif, instantanés existants, bulk_create
+            written = self.service.refresh([user.id for user in users])
+
+        self.assertEqual(written, 5)
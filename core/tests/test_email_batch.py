@@ -0,0 +1,103 @@
+import base64
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.mail import EmailMessage
+from django.test import TestCase
+
+from ..models_sgi import AccountOpeningRequest
+from ..services_email import ContractEmailService
+from ..utils_email import EmailBatch, EncodedAttachment
+
+User = get_user_model()
+
+
+class FakeConnection:
+    """Connexion SMTP factice: compte les ouvertures et échoue pour certains destinataires"""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.opened = 0
+        self.sent = []
+
+    def open(self):
+        self.opened += 1
+
+    def close(self):
+        pass
+
+    def send_messages(self, messages):
+        for message in messages:
+            if self.failing & set(message.recipients()):
+                raise OSError('550 refusé')
+            self.sent.append(message)
+        return len(messages)
+
+
+def message(to):
+    return EmailMessage(subject='Test', body='Corps', from_email='noreply@example.com', to=[to])
+
+
+class EmailBatchTests(TestCase):
+    """Lot d'emails: une connexion pour tout le lot, un échec n'interrompt pas les suivants"""
+
+    def test_batch_uses_one_connection(self):
+        connection = FakeConnection()
+        batch = EmailBatch(connection)
+        for index in range(5):
+            batch.add(f'admin:{index}', message(f'admin{index}@example.com'))
+
+        results = batch.send()
+
+        self.assertTrue(all(results.values()))
+        self.assertEqual((connection.opened, len(connection.sent)), (1, 5))
+
+    def test_failed_message_does_not_stop_batch(self):
+        connection = FakeConnection(failing={'refuse@example.com'})
+        batch = EmailBatch(connection)
+        batch.add('client', message('client@example.com'))
+        batch.add('manager', message('refuse@example.com'))
+        batch.add('team', message('team@example.com'))
+
+        results = batch.send()
+
+        self.assertEqual(results, {'client': True, 'manager': False, 'team': True})
+        self.assertIn('550', batch.errors['manager'])
+
+    def test_encoded_attachment_keeps_content(self):
+        attachment = EncodedAttachment(b'%PDF-1.4 contenu', 'application/pdf')
+
+        part = attachment.as_mime('Contrat_é.pdf')
+
+        self.assertEqual(base64.b64decode(part.get_payload()), b'%PDF-1.4 contenu')
+        self.assertEqual(part.get_filename(), 'Contrat_é.pdf')
+
+
+class ContractEmailServiceTests(TestCase):
+    """Emails de contrat: tous les destinataires dans un lot, pièces jointes encodées une fois"""
+
+    def setUp(self):
+        customer = User.objects.create_user(email='client@example.com', password='secret-pass-123')
+        self.aor = AccountOpeningRequest.objects.create(
+            customer=customer, full_name='Client Test', email='client@example.com', phone='+221770000000',
+            country_of_residence='Sénégal', nationality='Sénégalaise', sources_of_income='Salaire',
+            investor_profile='PRUDENT'
+        )
+
+    def test_all_recipients_receive_documents(self):
+        results = ContractEmailService().send_contract_emails(
+            self.aor, b'%PDF-contrat', b'%PDF-annexes', sgi_manager_email='manager@example.com',
+            admin_emails=['admin1@example.com', 'admin2@example.com']
+        )
+
+        self.assertEqual(results['errors'], [])
+        self.assertTrue(all(results[key] for key in ('client', 'sgi_manager', 'xamila_team', 'admin')))
+        self.assertEqual(len(mail.outbox), 5)
+        for sent in mail.outbox:
+            self.assertEqual(len(sent.attachments), 2)
+
+    def test_contract_sent_without_annexes(self):
+        results = ContractEmailService().send_contract_emails(self.aor, b'%PDF-contrat', None)
+
+        self.assertTrue(results['client'])
+        self.assertEqual([len(sent.attachments) for sent in mail.outbox], [1, 1])
@@ -0,0 +1,27 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+User = get_user_model()
+
+
+class AdminExportTests(TestCase):
+    """Exports en flux: un filtre invalide est refusé avant l'envoi des en-têtes"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(email='admin@example.com', password='secret-pass-123', role='ADMIN')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_invalid_filter_is_refused(self):
+        for dataset, query in (('cohorts', 'annee=abc'), ('savings_deposits', 'challenge=not-a-uuid')):
+            response = self.client.get(f'/api/admin/export/{dataset}/?{query}')
+            self.assertEqual(response.status_code, 400, query)
+
+    def test_export_streams_rows(self):
+        response = self.client.get('/api/admin/export/users/?output=jsonl')
+
+        self.assertEqual(response.status_code, 200)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertIn('admin@example.com', lines[0])
@@ -0,0 +1,83 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from ..authentication import EmailOrPhoneBackend
+from ..services_auth import EMAIL, PHONE, normalize_identifier, resolve_user
+
+User = get_user_model()
+
+
+class ResolveUserTests(TestCase):
+    """Résolution de l'identifiant: une requête sur la colonne indexée, aucune si invalide"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='client@example.com', password='secret-pass-123', phone='+33612345678'
+        )
+
+    def test_identifier_is_normalized(self):
+        self.assertEqual(normalize_identifier('  client@EXAMPLE.com '), (EMAIL, ['client@example.com']))
+        self.assertEqual(normalize_identifier('06 12 34 56 78'), (PHONE, ['0612345678', '+33612345678']))
+        self.assertEqual(normalize_identifier('pas un identifiant'), (None, []))
+
+    def test_email_and_phone_resolved_in_one_query(self):
+        for identifier in ('client@example.com', '06.12.34.56.78', '+33 6 12 34 56 78'):
+            with self.assertNumQueries(1):
+                self.assertEqual(resolve_user(identifier), self.user)
+
+    def test_invalid_identifier_skips_database(self):
+        with self.assertNumQueries(0):
+            self.assertIsNone(resolve_user('inconnu'))
+
+    def test_shared_phone_resolves_nobody(self):
+        User.objects.create_user(email='autre@example.com', password='secret-pass-123', phone='+33612345678')
+
+        self.assertIsNone(resolve_user('0612345678'))
+
+    def test_backend_delegates_to_service(self):
+        backend = EmailOrPhoneBackend()
+
+        self.assertEqual(backend.authenticate(None, username='0612345678', password='secret-pass-123'), self.user)
+        self.assertIsNone(backend.authenticate(None, username='0612345678', password='mauvais'))
+
+
+class LoginEndpointTests(TestCase):
+    """Connexion: tokens émis, réponse réduite sur demande, erreurs sans détail du compte"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='client@example.com', password='secret-pass-123', phone='+33612345678', first_name='Awa'
+        )
+
+    def test_login_by_phone_returns_tokens(self):
+        response = self.client.post(
+            '/api/auth/login/', {'username': '06 12 34 56 78', 'password': 'secret-pass-123'}, format='json'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access', response.data['tokens'])
+        self.assertEqual(response.data['user']['email'], 'client@example.com')
+
+    def test_minimal_payload(self):
+        response = self.client.post(
+            '/api/auth/login/', {'email': 'client@example.com', 'password': 'secret-pass-123', 'minimal': True},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data['user']), {'id', 'email', 'first_name', 'last_name', 'role', 'is_verified'})
+        self.assertEqual(response.data['user']['id'], str(self.user.id))
+
+    def test_failures(self):
+        wrong = self.client.post(
+            '/api/auth/login/', {'email': 'client@example.com', 'password': 'mauvais'}, format='json'
+        )
+        unknown = self.client.post(
+            '/api/auth/login/', {'email': 'personne@example.com', 'password': 'secret-pass-123'}, format='json'
+        )
+        missing = self.client.post('/api/auth/login/', {'email': 'client@example.com'}, format='json')
+
+        self.assertEqual((wrong.status_code, unknown.status_code, missing.status_code), (401, 401, 400))
+        self.assertEqual(wrong.data, unknown.data)
@@ -0,0 +1,98 @@
+import unittest
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+
+from ..models_trading import Portfolio, PriceHistory, StockExtended, TradingOrder
+from ..services_market import NUMPY_AVAILABLE, MarketSimulator
+
+User = get_user_model()
+
+
+@unittest.skipUnless(NUMPY_AVAILABLE, 'NumPy non installé')
+class MarketSimulatorTests(TestCase):
+    """Simulateur de marché: pas reproductibles, écritures groupées, séances et ordres LIMIT"""
+
+    def setUp(self):
+        self.stocks = [self.create_stock(f'XA{index}', Decimal('100.00')) for index in range(3)]
+        self.now = timezone.now().replace(second=0, microsecond=0)
+
+    def create_stock(self, symbol, price):
+        return StockExtended.objects.create(
+            symbol=symbol, company_name=symbol, sector='Finance', industry='Banque', category='BLUE_CHIP',
+            market_cap=Decimal('1000000'), shares_outstanding=10000,
+            current_price=price, opening_price=price, high_price=price, low_price=price, previous_close=price,
+        )
+
+    def test_seed_makes_runs_reproducible(self):
+        first = MarketSimulator(seed=42)
+        second = MarketSimulator(seed=42)
+        for _ in range(5):
+            first.step()
+            second.step()
+
+        self.assertEqual(first.prices.tolist(), second.prices.tolist())
+
+    def test_unknown_model_is_refused(self):
+        with self.assertRaises(ValueError):
+            MarketSimulator(model='brownian')
+
+    def test_tick_persists_every_stock_in_one_update(self):
+        simulator = MarketSimulator(seed=1)
+
+        with self.assertNumQueries(2):
+            # bulk_update des cotations + recherche des ordres LIMIT en attente
+            simulator.tick(now=self.now)
+
+        for simulated, price in zip(simulator.stocks, simulator.prices.tolist()):
+            stock = StockExtended.objects.get(pk=simulated.pk)
+            self.assertEqual(stock.current_price, Decimal(f'{price:.2f}'))
+            self.assertGreaterEqual(stock.high_price, stock.current_price)
+            self.assertLessEqual(stock.low_price, stock.current_price)
+
+    def test_candle_written_when_period_closes(self):
+        simulator = MarketSimulator(seed=1)
+        simulator.tick(now=self.now)
+        simulator.tick(now=self.now + timedelta(seconds=30))
+
+        result = simulator.tick(now=self.now + timedelta(minutes=1))
+
+        self.assertEqual(result['candles'], 3)
+        candle = PriceHistory.objects.get(stock=self.stocks[0], timeframe='1MIN', timestamp=self.now)
+        self.assertLessEqual(candle.low_price, min(candle.open_price, candle.close_price))
+        self.assertGreaterEqual(candle.high_price, max(candle.open_price, candle.close_price))
+
+    def test_new_session_moves_previous_close(self):
+        simulator = MarketSimulator(seed=1)
+        simulator.tick(now=self.now)
+        close = simulator.prices[0]
+
+        simulator.tick(now=self.now + timedelta(days=1))
+
+        stock = StockExtended.objects.get(pk=simulator.stocks[0].pk)
+        self.assertEqual(stock.previous_close, Decimal(f'{close:.2f}'))
+        self.assertEqual(stock.opening_price, stock.previous_close)
+
+    def test_reached_limit_orders_are_filled(self):
+        user = User.objects.create_user(email='trader@example.com', password='secret-pass-123')
+        portfolio = Portfolio.objects.create(
+            user=user, name='Principal', initial_capital=Decimal('10000'),
+            current_cash=Decimal('10000'), total_value=Decimal('10000')
+        )
+        reached = TradingOrder.objects.create(
+            portfolio=portfolio, stock=self.stocks[0], order_type='LIMIT', side='BUY',
+            quantity=Decimal('1'), limit_price=Decimal('1000.00')
+        )
+        TradingOrder.objects.create(
+            portfolio=portfolio, stock=self.stocks[1], order_type='LIMIT', side='BUY',
+            quantity=Decimal('1'), limit_price=Decimal('1.00')
+        )
+
+        result = MarketSimulator(seed=1).tick(now=self.now)
+
+        reached.refresh_from_db()
+        self.assertEqual((result['filled'], reached.status), (1, 'FILLED'))
+        self.assertEqual(TradingOrder.objects.filter(status='PENDING').count(), 1)
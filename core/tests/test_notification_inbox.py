@@ -0,0 +1,112 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from ..models_notifications import Notification
+from ..services_notification_inbox import NotificationInbox, UnreadCounter, decode_cursor
+
+User = get_user_model()
+
+
+class UnreadCounterTests(TestCase):
+    """Compteurs de non lues: tenus dans le cache, recomptés en cas d'absence ou de dérive"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(email='client@example.com', password='secret-pass-123')
+        self.inbox = NotificationInbox(self.user)
+
+    def notify(self, channel='IN_APP'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Notification.objects.create(
+                recipient=self.user, notification_type=channel, subject='Sujet', message='Message'
+            )
+
+    def test_count_is_served_from_cache(self):
+        self.notify()
+        self.assertEqual(self.inbox.unread_count(), 1)
+
+        self.notify()
+        self.notify(channel='EMAIL')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.inbox.unread_count(), 2)
+
+    def test_notification_read_once(self):
+        notification = self.notify()
+        self.notify()
+        self.inbox.unread_count()
+
+        for _ in range(2):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertTrue(self.inbox.mark_read(notification.id, timezone.now()))
+
+        self.assertEqual(self.inbox.unread_count(), 1)
+
+    def test_mark_all_read_resets_count(self):
+        for _ in range(3):
+            self.notify()
+        self.inbox.unread_count()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.inbox.mark_all_read(timezone.now()), 3)
+
+        self.assertEqual(self.inbox.unread_count(), 0)
+
+    def test_reconcile_fixes_drift(self):
+        self.notify()
+        self.inbox.unread_count()
+        Notification.objects.filter(recipient=self.user).update(opened_at=timezone.now())
+
+        UnreadCounter().reconcile_all()
+
+        self.assertEqual(self.inbox.unread_count(), 0)
+
+
+class NotificationInboxPageTests(TestCase):
+    """Liste des notifications: pages par curseur sans doublon ni trou"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(email='client@example.com', password='secret-pass-123')
+        Notification.objects.bulk_create([
+            Notification(recipient=self.user, notification_type='IN_APP', subject=f'Sujet {index}', message='Message')
+            for index in range(5)
+        ])
+
+    def test_cursor_walks_every_notification_once(self):
+        inbox = NotificationInbox(self.user)
+        seen, cursor = [], None
+        while True:
+            page = inbox.page(page_size=2, cursor=cursor)
+            seen += [notification.id for notification in page['notifications']]
+            cursor = page['next_cursor']
+            if not page['has_more']:
+                break
+
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(set(seen), set(Notification.objects.values_list('id', flat=True)))
+        self.assertIsNone(cursor)
+
+    def test_invalid_cursor_is_refused(self):
+        with self.assertRaises(ValueError):
+            decode_cursor('pas-un-curseur')
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get('/api/notifications/user/notifications/', {'cursor': 'pas-un-curseur'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_endpoint_returns_page_and_unread_count(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        response = client.get('/api/notifications/user/notifications/', {'page_size': 3})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['notifications']), 3)
+        self.assertTrue(response.data['pagination']['has_more'])
+        self.assertEqual(response.data['stats']['unread_count'], 5)
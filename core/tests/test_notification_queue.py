@@ -0,0 +1,87 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.test import TestCase
+from django.utils import timezone
+
+from ..models_notifications import Notification, NotificationLog, NotificationQueue
+from ..services_notification_queue import NotificationQueueWorker
+
+User = get_user_model()
+
+
+def smtp_down(self, entries):
+    return {str(entry.id): 'SMTP indisponible' for entry in entries}
+
+
+class NotificationQueueWorkerTests(TestCase):
+    """File des notifications: priorité, envoi groupé, reprises avec backoff puis échec"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='client@example.com', password='secret-pass-123')
+        self.worker = NotificationQueueWorker(concurrency=2)
+
+    def enqueue(self, channel='EMAIL', priority=100, scheduled_at=None):
+        notification = Notification.objects.create(
+            recipient=self.user, notification_type=channel, subject='Sujet', message='Message',
+            scheduled_at=scheduled_at
+        )
+        return NotificationQueue.objects.create(notification=notification, priority=priority)
+
+    def test_entries_claimed_by_priority(self):
+        self.enqueue(priority=200)
+        urgent = self.enqueue(priority=10)
+
+        claimed = self.worker.claim_batch(limit=1)
+
+        self.assertEqual([entry.id for entry in claimed], [urgent.id])
+        self.assertEqual((claimed[0].status, claimed[0].attempts), ('PROCESSING', 1))
+        self.assertEqual(len(self.worker.claim_batch()), 1)
+
+    def test_scheduled_entries_wait(self):
+        self.enqueue(scheduled_at=timezone.now() + timedelta(hours=1))
+
+        self.assertEqual(self.worker.claim_batch(), [])
+
+    def test_batch_is_sent_and_recorded(self):
+        for _ in range(3):
+            self.enqueue()
+        in_app = self.enqueue(channel='IN_APP')
+
+        stats = self.worker.drain()
+
+        self.assertEqual((stats['claimed'], stats['sent']), (4, 4))
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(Notification.objects.filter(status='SENT').count(), 3)
+        in_app.notification.refresh_from_db()
+        self.assertEqual(in_app.notification.status, 'DELIVERED')
+        self.assertEqual(NotificationLog.objects.filter(level='INFO').count(), 4)
+
+    def test_failed_send_is_retried_then_fails(self):
+        entry = self.enqueue()
+
+        with mock.patch.object(NotificationQueueWorker, '_send_emails', smtp_down):
+            self.assertEqual(self.worker.process_batch()['retrying'], 1)
+            entry.refresh_from_db()
+            self.assertEqual(entry.status, 'RETRYING')
+            self.assertEqual(self.worker.claim_batch(), [])
+
+            for _ in range(2):
+                NotificationQueue.objects.filter(pk=entry.pk).update(next_retry_at=timezone.now())
+                stats = self.worker.process_batch()
+
+        entry.refresh_from_db()
+        self.assertEqual((stats['failed'], entry.status, entry.attempts), (1, 'FAILED', 3))
+        self.assertEqual(entry.notification.status, 'FAILED')
+        self.assertEqual(NotificationLog.objects.filter(level='ERROR').count(), 1)
+
+    def test_abandoned_entry_is_reclaimed(self):
+        entry = self.enqueue()
+        self.worker.claim_batch()
+        NotificationQueue.objects.filter(pk=entry.pk).update(
+            updated_at=timezone.now() - NotificationQueueWorker.STALE_AFTER - timedelta(minutes=1)
+        )
+
+        self.assertEqual([claimed.id for claimed in self.worker.claim_batch()], [entry.id])
@@ -0,0 +1,34 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from ..models_notifications import Notification
+from ..services_notification_stream import notification_channel
+from ..utils_pubsub import get_broker
+
+User = get_user_model()
+
+
+class NotificationStreamTests(TestCase):
+    """Flux SSE: refusé hors ASGI plutôt que mis en tampon"""
+
+    def test_stream_requires_asgi(self):
+        response = self.client.get('/api/notifications/user/stream/')
+
+        self.assertEqual(response.status_code, 501)
+        self.assertEqual(response.json()['code'], 'STREAM_REQUIRES_ASGI')
+
+    def test_notification_serialized_only_for_connected_recipient(self):
+        user = User.objects.create_user(email='reader@example.com', password='secret-pass-123')
+        broker = get_broker()
+        with mock.patch('core.services_notification_stream.notification_payload') as payload:
+            with self.captureOnCommitCallbacks(execute=True):
+                Notification.objects.create(recipient=user, notification_type='IN_APP', subject='Dépôt', message='Reçu')
+            payload.assert_not_called()
+
+            with mock.patch.object(broker, 'subscriber_count', return_value=1), mock.patch.object(broker, 'publish') as publish:
+                with self.captureOnCommitCallbacks(execute=True):
+                    Notification.objects.create(recipient=user, notification_type='IN_APP', subject='Dépôt', message='Reçu')
+            payload.assert_called_once()
+            publish.assert_called_once_with(notification_channel(user.id), payload.return_value)
@@ -0,0 +1,122 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from ..models_trading import Holding, Portfolio, StockExtended, TradingOrder, Transaction
+from ..services_trading import OrderExecutionError, OrderExecutionService
+from ..views_trading import execute_order
+
+User = get_user_model()
+
+
+class OrderExecutionServiceTests(TestCase):
+    """Exécution des ordres: liquidités jamais dépensées deux fois, ordres LIMIT exécutés en lot"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='trader@example.com', password='secret-pass-123')
+        self.portfolio = Portfolio.objects.create(
+            user=self.user, name='Principal', initial_capital=Decimal('1000'),
+            current_cash=Decimal('1000'), total_value=Decimal('1000')
+        )
+        price = Decimal('100.00')
+        self.stock = StockExtended.objects.create(
+            symbol='XAM', company_name='Xamila', sector='Finance', industry='Banque', category='BLUE_CHIP',
+            market_cap=Decimal('1000000'), shares_outstanding=10000,
+            current_price=price, opening_price=price, high_price=price, low_price=price, previous_close=price,
+        )
+        self.service = OrderExecutionService()
+
+    def order(self, quantity, side='BUY', order_type='MARKET', limit_price=None):
+        return TradingOrder.objects.create(
+            portfolio=self.portfolio, stock=self.stock, order_type=order_type, side=side,
+            quantity=Decimal(quantity), limit_price=limit_price
+        )
+
+    def test_buy_then_sell_updates_cash_and_holding(self):
+        self.service.execute(self.order(5).id)
+        self.service.execute(self.order(2, side='SELL').id, price=Decimal('110.00'))
+
+        self.portfolio.refresh_from_db()
+        holding = Holding.objects.get(portfolio=self.portfolio, stock=self.stock)
+        # Achat 500 + 0.50 de commission, vente 220 - 0.22 de commission
+        self.assertEqual(self.portfolio.current_cash, Decimal('719.28'))
+        self.assertEqual((holding.quantity, holding.total_cost), (Decimal('3'), Decimal('300.00')))
+        self.assertEqual(self.portfolio.total_value, Decimal('719.28') + holding.current_value)
+
+    def test_order_is_executed_once(self):
+        order = self.order(1)
+        self.service.execute(order.id)
+
+        with self.assertRaises(TradingOrder.DoesNotExist):
+            self.service.execute(order.id)
+        self.assertEqual(Transaction.objects.filter(order=order).count(), 1)
+
+    def test_unaffordable_order_changes_nothing(self):
+        order = self.order(20)
+
+        with self.assertRaises(OrderExecutionError):
+            self.service.execute(order.id)
+
+        order.refresh_from_db()
+        self.portfolio.refresh_from_db()
+        self.assertEqual((order.status, self.portfolio.current_cash), ('PENDING', Decimal('1000.00')))
+        self.assertFalse(Holding.objects.exists())
+
+    def test_sold_out_holding_is_deleted(self):
+        self.service.execute(self.order(2).id)
+        self.service.execute(self.order(2, side='SELL').id)
+
+        self.assertFalse(Holding.objects.filter(portfolio=self.portfolio).exists())
+
+    def test_reached_limit_orders_filled_in_one_batch(self):
+        self.order(4, order_type='LIMIT', limit_price=Decimal('95.00'))
+        self.order(4, order_type='LIMIT', limit_price=Decimal('95.00'))
+        self.order(4, order_type='LIMIT', limit_price=Decimal('95.00'))
+        out_of_reach = self.order(1, order_type='LIMIT', limit_price=Decimal('80.00'))
+
+        trades = self.service.execute_pending_limit_orders(self.stock, price=Decimal('90.00'))
+
+        # 2 ordres de 360.36 passent, le troisième dépasserait les liquidités et reste en attente
+        self.assertEqual(len(trades), 2)
+        self.assertEqual(TradingOrder.objects.filter(status='PENDING').count(), 2)
+        out_of_reach.refresh_from_db()
+        self.assertEqual(out_of_reach.status, 'PENDING')
+        self.portfolio.refresh_from_db()
+        self.assertEqual(self.portfolio.current_cash, Decimal('279.28'))
+        self.assertEqual(Holding.objects.get(portfolio=self.portfolio).quantity, Decimal('8'))
+
+
+class ExecuteOrderViewTests(TestCase):
+    """Endpoint d'exécution: ordre d'un autre utilisateur introuvable, fonds insuffisants refusés"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='trader@example.com', password='secret-pass-123')
+        portfolio = Portfolio.objects.create(
+            user=self.user, name='Principal', initial_capital=Decimal('100'),
+            current_cash=Decimal('100'), total_value=Decimal('100')
+        )
+        price = Decimal('100.00')
+        stock = StockExtended.objects.create(
+            symbol='XAM', company_name='Xamila', sector='Finance', industry='Banque', category='BLUE_CHIP',
+            market_cap=Decimal('1000000'), shares_outstanding=10000,
+            current_price=price, opening_price=price, high_price=price, low_price=price, previous_close=price,
+        )
+        self.order = TradingOrder.objects.create(
+            portfolio=portfolio, stock=stock, order_type='MARKET', side='BUY', quantity=Decimal('1')
+        )
+
+    def post(self, user):
+        request = APIRequestFactory().post(f'/api/trading/orders/{self.order.id}/execute/')
+        force_authenticate(request, user=user)
+        return execute_order(request, order_id=self.order.id)
+
+    def test_other_user_order_is_not_found(self):
+        other = User.objects.create_user(email='other@example.com', password='secret-pass-123')
+
+        self.assertEqual(self.post(other).status_code, 404)
+
+    def test_insufficient_funds_is_refused(self):
+        # 100 + 0.10 de commission > 100 de liquidités
+        self.assertEqual(self.post(self.user).status_code, 400)
@@ -0,0 +1,39 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from .. import services_permissions
+from ..models_permissions import Permission, RolePermission
+
+User = get_user_model()
+
+
+class PermissionMatrixTests(TestCase):
+    """Matrice des permissions: une révocation faite ailleurs est vue sans invalidation locale"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='manager@example.com', password='secret-pass-123', role='SGI_MANAGER')
+        permission = Permission.objects.create(name='Voir les contrats', code='view_contracts', category='contracts')
+        self.grant = RolePermission.objects.create(role='SGI_MANAGER', permission=permission)
+        services_permissions._matrix = None
+
+    def expire_local_matrix(self):
+        services_permissions._checked_at = 0.0
+
+    def test_revocation_reaches_process_without_local_invalidation(self):
+        self.assertTrue(services_permissions.has_permission(self.user, 'view_contracts'))
+
+        # Les callbacks on_commit ne s'exécutent pas dans TestCase: comme pour un autre worker,
+        # seule la signature en base peut révéler la modification
+        self.grant.is_granted = False
+        self.grant.save()
+        self.assertTrue(services_permissions.has_permission(self.user, 'view_contracts'))
+
+        self.expire_local_matrix()
+        self.assertFalse(services_permissions.has_permission(self.user, 'view_contracts'))
+
+    def test_deleted_grant_is_dropped(self):
+        self.assertTrue(services_permissions.has_permission(self.user, 'view_contracts'))
+        self.grant.delete()
+
+        self.expire_local_matrix()
+        self.assertFalse(services_permissions.has_permission(self.user, 'view_contracts'))
@@ -0,0 +1,133 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from ..models import OTP
+from ..models_dashboard import DailyPlatformMetric
+from ..services_platform_metrics import (
+    MAX_WINDOW_DAYS, OTP_INVALIDATED, OTP_SENT, OTP_USED, REGISTRATIONS, VERIFICATIONS,
+    admin_dashboard, backfill, invalidate_otps, series
+)
+
+User = get_user_model()
+
+
+def metric_value(metric, dimension=''):
+    row = DailyPlatformMetric.objects.filter(date=timezone.localdate(), metric=metric, dimension=dimension).first()
+    return row.value if row else 0
+
+
+class PlatformMetricTrackingTests(TestCase):
+    """Indicateurs journaliers: incrémentés après le commit, reconstruits à l'identique"""
+
+    def create_user(self, email, **extra):
+        with self.captureOnCommitCallbacks(execute=True):
+            return User.objects.create_user(email=email, password='secret-pass-123', **extra)
+
+    def create_otp(self, user, otp_type='REGISTRATION'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return OTP.objects.create(
+                user=user, code='123456', otp_type=otp_type, expires_at=timezone.now() + timedelta(minutes=10)
+            )
+
+    def test_registration_and_verification_counted_once(self):
+        user = self.create_user('client@example.com')
+        self.create_user('sgi@example.com', role='SGI_MANAGER')
+
+        for _ in range(2):
+            user.is_verified = True
+            with self.captureOnCommitCallbacks(execute=True):
+                user.save()
+
+        self.assertEqual(metric_value(REGISTRATIONS, 'CUSTOMER'), 1)
+        self.assertEqual(metric_value(REGISTRATIONS, 'SGI_MANAGER'), 1)
+        self.assertEqual(metric_value(VERIFICATIONS), 1)
+
+    def test_otp_use_and_invalidation_are_distinct(self):
+        user = self.create_user('client@example.com')
+        used = self.create_otp(user)
+        self.create_otp(user)
+        self.create_otp(user)
+
+        used.is_used = True
+        used.used_at = timezone.now()
+        with self.captureOnCommitCallbacks(execute=True):
+            used.save()
+            self.assertEqual(invalidate_otps(OTP.objects.filter(user=user)), 2)
+
+        self.assertEqual(metric_value(OTP_SENT, 'REGISTRATION'), 3)
+        self.assertEqual(metric_value(OTP_USED, 'REGISTRATION'), 1)
+        self.assertEqual(metric_value(OTP_INVALIDATED, 'REGISTRATION'), 2)
+        self.assertEqual(invalidate_otps(OTP.objects.filter(user=user)), 0)
+
+    def test_backfill_matches_live_counters(self):
+        user = self.create_user('client@example.com', is_verified=True)
+        self.create_user('other@example.com')
+        otp = self.create_otp(user)
+        self.create_otp(user)
+        otp.is_used = True
+        otp.used_at = timezone.now()
+        with self.captureOnCommitCallbacks(execute=True):
+            otp.save()
+            invalidate_otps(OTP.objects.filter(user=user))
+
+        fields = ('date', 'metric', 'dimension', 'value')
+        live = set(DailyPlatformMetric.objects.values_list(*fields))
+        today = timezone.localdate()
+
+        backfill(today, today)
+
+        self.assertEqual(set(DailyPlatformMetric.objects.values_list(*fields)), live)
+
+
+class PlatformMetricReadTests(TestCase):
+    """Lectures: séries complétées par des zéros, tableau de bord en requêtes constantes"""
+
+    def setUp(self):
+        self.today = timezone.localdate()
+        DailyPlatformMetric.objects.bulk_create([
+            DailyPlatformMetric(date=self.today, metric=REGISTRATIONS, dimension='CUSTOMER', value=3),
+            DailyPlatformMetric(date=self.today, metric=REGISTRATIONS, dimension='SGI_MANAGER', value=1),
+            DailyPlatformMetric(date=self.today - timedelta(days=2), metric=REGISTRATIONS, dimension='CUSTOMER', value=2),
+        ])
+
+    def test_series_fills_missing_days(self):
+        start = self.today - timedelta(days=3)
+
+        points = series(REGISTRATIONS, start, self.today)
+
+        self.assertEqual([point['count'] for point in points], [0, 2, 0, 4])
+        self.assertEqual(series(REGISTRATIONS, start, self.today, dimension='SGI_MANAGER')[-1]['count'], 1)
+
+    def test_dashboard_queries_do_not_grow_with_users(self):
+        User.objects.create_user(email='client@example.com', password='secret-pass-123')
+        with self.assertNumQueries(5):
+            admin_dashboard()
+
+        for index in range(10):
+            User.objects.create_user(email=f'client{index}@example.com', password='secret-pass-123')
+        with self.assertNumQueries(5):
+            stats = admin_dashboard()
+
+        self.assertEqual(stats['users']['total'], 11)
+        self.assertEqual((stats['users']['new_today'], stats['users']['new_week']), (4, 6))
+        self.assertEqual(len(stats['registration_evolution']), 30)
+
+    def test_dashboard_window_is_clamped(self):
+        stats = admin_dashboard(self.today - timedelta(days=1000), self.today + timedelta(days=10))
+
+        self.assertEqual(stats['window']['end'], self.today.isoformat())
+        self.assertEqual(len(stats['registration_evolution']), MAX_WINDOW_DAYS)
+
+    def test_endpoint_rejects_invalid_dates(self):
+        admin = User.objects.create_superuser(email='admin@example.com', password='secret-pass-123')
+        client = APIClient()
+        client.force_authenticate(admin)
+
+        self.assertEqual(client.get('/api/admin/dashboard/stats/', {'start': 'hier'}).status_code, 400)
+        response = client.get('/api/admin/dashboard/stats/', {'start': (self.today - timedelta(days=6)).isoformat()})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['registration_evolution']), 7)
@@ -0,0 +1,42 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+
+from ..services_community import CommunityStatsService, SaversDirectory
+from ..services_savings_ledger import SavingsLedgerService
+
+User = get_user_model()
+
+
+class SaversDirectoryTests(TestCase):
+    """Annuaire des épargnants: recherche par sous-chaîne, rang global persisté"""
+
+    def setUp(self):
+        cache.clear()
+        ledger = SavingsLedgerService()
+        self.jean = User.objects.create_user(
+            email='jean.dupont@example.com', password='secret-pass-123', first_name='Jean', last_name='Dupont'
+        )
+        self.marie = User.objects.create_user(
+            email='marie@example.com', password='secret-pass-123', first_name='Marie', last_name='Curie'
+        )
+        ledger.deposit(self.jean, Decimal('1000'), 'MOBILE_MONEY')
+        ledger.deposit(self.marie, Decimal('4000'), 'MOBILE_MONEY')
+
+    def test_search_matches_substring_with_persisted_rank(self):
+        self.assertEqual(CommunityStatsService().persist_ranks(), 2)
+        self.assertEqual(CommunityStatsService().persist_ranks(), 0)
+
+        directory = SaversDirectory().page(search='dupont')
+        self.assertEqual([account.user_id for account in directory['accounts']], [self.jean.id])
+        self.assertEqual(directory['accounts'][0].global_rank, 2)
+
+    def test_listing_reads_ranks_from_index(self):
+        directory = SaversDirectory().page(page_size=1)
+        self.assertEqual((directory['accounts'][0].user_id, directory['accounts'][0].global_rank), (self.marie.id, 1))
+
+        following = SaversDirectory().page(page_size=1, cursor=directory['next_cursor'])
+        self.assertEqual((following['accounts'][0].user_id, following['accounts'][0].global_rank), (self.jean.id, 2))
+        self.assertIsNone(following['next_cursor'])
@@ -0,0 +1,152 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from ..models_savings_challenge import SavingsAccount, SavingsDeposit, SavingsLedgerEntry
+from ..services_savings_ledger import (
+    SavingsLedgerError, SavingsLedgerService, get_or_create_active_participation, get_or_create_main_account,
+    main_account_number
+)
+
+User = get_user_model()
+
+
+class SavingsLedgerServiceTests(TestCase):
+    """Grand livre d'épargne: rejeu idempotent, débit conditionnel, réconciliation"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='saver@example.com', password='secret-pass-123')
+        self.service = SavingsLedgerService()
+
+    def balance(self):
+        return get_or_create_main_account(self.user).balance
+
+    def test_deposit_updates_projections(self):
+        result = self.service.deposit(self.user, Decimal('5000'), 'MOBILE_MONEY', reference='DEP-1')
+
+        self.assertFalse(result.replayed)
+        self.assertEqual(result.balance, Decimal('5000'))
+        participation = get_or_create_active_participation(self.user)
+        self.assertEqual(participation.total_saved, Decimal('5000'))
+        self.assertEqual(participation.deposits_count, 1)
+        self.assertEqual(result.entry.points, 5)
+
+    def test_replayed_reference_is_written_once(self):
+        first = self.service.deposit(self.user, Decimal('5000'), 'MOBILE_MONEY', reference='DEP-REPLAY')
+        second = self.service.deposit(self.user, Decimal('5000'), 'MOBILE_MONEY', reference='DEP-REPLAY')
+
+        self.assertTrue(second.replayed)
+        self.assertEqual(second.entry.pk, first.entry.pk)
+        self.assertEqual(SavingsLedgerEntry.objects.filter(reference='DEP-REPLAY').count(), 1)
+        self.assertEqual(SavingsDeposit.objects.filter(transaction_reference='DEP-REPLAY').count(), 1)
+        self.assertEqual(self.balance(), Decimal('5000'))
+
+    def test_reference_of_another_user_is_refused(self):
+        other = User.objects.create_user(email='other@example.com', password='secret-pass-123')
+        self.service.deposit(self.user, Decimal('5000'), 'MOBILE_MONEY', reference='DEP-SHARED')
+
+        with self.assertRaises(SavingsLedgerError):
+            self.service.deposit(other, Decimal('5000'), 'MOBILE_MONEY', reference='DEP-SHARED')
+
+    def test_withdrawal_within_balance(self):
+        self.service.deposit(self.user, Decimal('5000'), 'MOBILE_MONEY')
+        result = self.service.withdraw(self.user, Decimal('2000'))
+
+        self.assertEqual(result.balance, Decimal('3000'))
+        self.assertEqual(result.entry.amount, Decimal('-2000'))
+        self.assertEqual(get_or_create_active_participation(self.user).total_saved, Decimal('3000'))
+
+    def test_withdrawal_above_balance_is_refused(self):
+        self.service.deposit(self.user, Decimal('5000'), 'MOBILE_MONEY')
+
+        with self.assertRaises(SavingsLedgerError):
+            self.service.withdraw(self.user, Decimal('5000.01'))
+        self.assertEqual(self.balance(), Decimal('5000'))
+        self.assertFalse(SavingsLedgerEntry.objects.filter(entry_type='WITHDRAWAL').exists())
+
+    def test_withdrawal_without_account_is_refused(self):
+        with self.assertRaises(SavingsLedgerError):
+            self.service.withdraw(self.user, Decimal('1000'))
+
+    def test_reconcile_restores_projections_from_ledger(self):
+        self.service.deposit(self.user, Decimal('5000'), 'MOBILE_MONEY')
+        self.service.withdraw(self.user, Decimal('1000'))
+        account = get_or_create_main_account(self.user)
+        SavingsAccount.objects.filter(pk=account.pk).update(balance=Decimal('99999'))
+
+        report = self.service.reconcile(apply=False)
+        self.assertEqual(report, {'backfilled': 0, 'accounts': 1, 'participations': 0})
+        self.assertEqual(self.balance(), Decimal('99999'))
+
+        report = self.service.reconcile()
+        self.assertEqual(report, {'backfilled': 0, 'accounts': 1, 'participations': 0})
+        self.assertEqual(self.balance(), Decimal('4000'))
+        self.assertEqual(self.service.reconcile(), {'backfilled': 0, 'accounts': 0, 'participations': 0})
+
+    def test_reconcile_keeps_legacy_deposits(self):
+        participation = get_or_create_active_participation(self.user)
+        account = get_or_create_main_account(self.user)
+        SavingsDeposit.objects.create(
+            participation=participation, amount=Decimal('3000'), deposit_method='MOBILE_MONEY',
+            status='CONFIRMED', transaction_reference='LEGACY-DEP'
+        )
+        SavingsAccount.objects.filter(pk=account.pk).update(balance=Decimal('3000'))
+        self.service.deposit(self.user, Decimal('1000'), 'MOBILE_MONEY')
+
+        report = self.service.reconcile(apply=False)
+        self.assertEqual(report['backfilled'], 1)
+        self.assertFalse(SavingsLedgerEntry.objects.filter(reference='LEGACY-DEP').exists())
+
+        self.assertEqual(self.service.reconcile()['backfilled'], 1)
+        self.assertEqual(self.balance(), Decimal('4000'))
+
+    def test_reconcile_refuses_unrecorded_balance(self):
+        self.service.deposit(self.user, Decimal('1000'), 'MOBILE_MONEY')
+        SavingsAccount.objects.create(
+            user=self.user, account_number='ACC-LEGACY', account_name='Ancien', status='INACTIVE',
+            balance=Decimal('2500')
+        )
+
+        with self.assertRaises(SavingsLedgerError):
+            self.service.reconcile()
+        self.assertEqual(self.service.reconcile(user_ids=[]), {'backfilled': 0, 'accounts': 0, 'participations': 0})
+
+    def test_main_account_is_looked_up_by_user(self):
+        frozen = SavingsAccount.objects.create(
+            user=self.user, account_number=f"ACC{str(self.user.id)[:8]}", account_name='Gelé', status='FROZEN'
+        )
+
+        account = get_or_create_main_account(self.user)
+        self.assertNotEqual(account.pk, frozen.pk)
+        self.assertEqual((account.user_id, account.status), (self.user.id, 'ACTIVE'))
+        self.assertEqual(self.service.deposit(self.user, Decimal('1000'), 'MOBILE_MONEY').entry.account_id, account.pk)
+
+    def test_account_number_of_another_user_is_refused(self):
+        other = User.objects.create_user(email='other@example.com', password='secret-pass-123')
+        SavingsAccount.objects.create(
+            user=other, account_number=main_account_number(self.user), account_name='Autre', status='ACTIVE'
+        )
+
+        with self.assertRaises(SavingsLedgerError):
+            get_or_create_main_account(self.user)
+        self.assertFalse(SavingsAccount.objects.filter(user=self.user).exists())
+
+    def test_backfill_uses_main_account(self):
+        participation = get_or_create_active_participation(self.user)
+        older = SavingsAccount.objects.create(
+            user=self.user, account_number='ACC-OLD', account_name='Ancien', status='ACTIVE'
+        )
+        main = SavingsAccount.objects.create(
+            user=self.user, account_number='ACC-NEW', account_name='Principal', status='ACTIVE'
+        )
+        SavingsAccount.objects.filter(pk=older.pk).update(created_at=main.created_at.replace(year=2020))
+        deposit = SavingsDeposit.objects.create(
+            participation=participation, amount=Decimal('3000'), deposit_method='MOBILE_MONEY',
+            status='CONFIRMED', transaction_reference='LEGACY-DEP'
+        )
+
+        self.assertEqual(get_or_create_main_account(self.user).pk, main.pk)
+        self.assertEqual(self.service.backfill(), 1)
+        self.assertEqual(SavingsLedgerEntry.objects.get(deposit=deposit).account_id, main.pk)
+        self.assertEqual(self.service.backfill(), 0)
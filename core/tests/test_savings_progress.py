@@ -0,0 +1,51 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+
+from ..models_dashboard import UserSavingsProgress
+from ..services_savings_ledger import get_or_create_active_participation
+from ..services_savings_progress import SavingsProgressRankIndex
+from ..utils_cache import acquire_lock, release_lock
+
+User = get_user_model()
+
+
+class SavingsProgressRankIndexTests(TestCase):
+    """Index des rangs des progressions: construction sous verrou, mises à jour"""
+
+    def setUp(self):
+        cache.clear()
+        users = [User.objects.create_user(email=f'progress{i}@example.com', password='secret-pass-123') for i in range(3)]
+        self.challenge_id = get_or_create_active_participation(users[0]).challenge_id
+        self.progresses = [
+            UserSavingsProgress.objects.create(user=user, challenge_id=self.challenge_id, current_amount=Decimal(100 * (i + 1)))
+            for i, user in enumerate(users)
+        ]
+        self.index = SavingsProgressRankIndex()
+
+    def test_update_moves_progress(self):
+        first = self.progresses[0]
+        self.assertEqual(self.index.summaries([first])[str(self.challenge_id)]['rank'], 3)
+
+        first.current_amount = Decimal('1000')
+        with self.captureOnCommitCallbacks(execute=True):
+            first.save()
+
+        summary = self.index.summaries([first])[str(self.challenge_id)]
+        self.assertEqual((summary['rank'], summary['total_participants']), (1, 3))
+        self.assertEqual([row['amount'] for row in summary['leaderboard']], [1000.0, 300.0, 200.0])
+
+    def test_build_is_not_stored_while_update_holds_lock(self):
+        lock = self.index._lock_key(self.challenge_id)
+        key = self.index._key(self.challenge_id)
+        self.assertTrue(acquire_lock(lock))
+        try:
+            self.assertEqual(len(self.index.load_many([self.challenge_id])[str(self.challenge_id)]['keys']), 3)
+            self.assertIsNone(cache.get(key))
+        finally:
+            release_lock(lock)
+
+        self.index.load_many([self.challenge_id])
+        self.assertIn('expires_at', cache.get(key))
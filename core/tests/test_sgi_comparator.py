@@ -0,0 +1,118 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from ..models import SGI
+from ..models_sgi import SGIAccountTerms, SGIRating, SGIRatingSummary
+from ..services_comparator import SGIComparatorService
+
+User = get_user_model()
+
+
+class SGIComparatorServiceTests(TestCase):
+    """Comparateur SGI: nombre de requêtes constant, notes tenues à jour par les résumés"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.customer = User.objects.create_user(email='client@example.com', password='secret-pass-123')
+
+    def create_sgi(self, index, score=None):
+        sgi = SGI.objects.create(
+            name=f'SGI {index}', description='Test', address='Dakar', manager_name='Manager',
+            manager_email=f'manager{index}@example.com', email=f'sgi{index}@example.com',
+            min_investment_amount=Decimal('10000')
+        )
+        SGIAccountTerms.objects.create(
+            sgi=sgi, country='Sénégal', headquarters_address='Dakar', director_name='Directeur',
+            profile='Profil', minimum_amount_value=Decimal(index * 1000), deposit_methods=['MOBILE_MONEY']
+        )
+        if score:
+            SGIRating.objects.create(sgi=sgi, customer=self.customer, score=score)
+        return sgi
+
+    def count_queries(self, compute):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            compute()
+        return len(queries)
+
+    def test_compare_queries_do_not_grow_with_sgis(self):
+        for index in range(2):
+            self.create_sgi(index, score=4)
+        few = self.count_queries(lambda: SGIComparatorService().compare())
+
+        for index in range(2, 8):
+            self.create_sgi(index, score=3)
+        many = self.count_queries(lambda: SGIComparatorService().compare())
+
+        self.assertEqual(few, many)
+
+    def test_match_queries_do_not_grow_with_sgis(self):
+        self.create_sgi(1, score=4)
+        few = self.count_queries(lambda: SGIComparatorService().match(wanted_methods=['MOBILE_MONEY']))
+
+        for index in range(2, 8):
+            self.create_sgi(index, score=3)
+        many = self.count_queries(lambda: SGIComparatorService().match(wanted_methods=['MOBILE_MONEY']))
+
+        self.assertEqual(few, many)
+
+    def test_compare_is_sorted_and_cached(self):
+        for index in (3, 1, 2):
+            self.create_sgi(index)
+
+        results = SGIComparatorService().compare(order_by='minimum_amount_value', direction='desc')
+        with self.assertNumQueries(0):
+            cached = SGIComparatorService().compare(order_by='minimum_amount_value', direction='desc')
+
+        self.assertEqual([entry['sgi']['name'] for entry in results], ['SGI 3', 'SGI 2', 'SGI 1'])
+        self.assertEqual(cached, results)
+
+    def test_rating_updates_summary(self):
+        sgi = self.create_sgi(1, score=5)
+        other = User.objects.create_user(email='other@example.com', password='secret-pass-123')
+        SGIRating.objects.create(sgi=sgi, customer=other, score=2)
+
+        summary = SGIRatingSummary.objects.get(sgi=sgi)
+        self.assertEqual((summary.ratings_count, summary.avg_rating), (2, 3.5))
+
+        SGIRating.objects.filter(customer=other).delete()
+        cache.clear()
+        entry = SGIComparatorService().compare()[0]
+        self.assertEqual((entry['ratings_count'], entry['avg_rating']), (1, 5.0))
+
+    def test_missing_summaries_are_backfilled(self):
+        sgi = self.create_sgi(1, score=4)
+        SGIRatingSummary.objects.all().delete()
+
+        entry = SGIComparatorService().compare()[0]
+
+        self.assertEqual((entry['ratings_count'], entry['avg_rating']), (1, 4.0))
+        self.assertTrue(SGIRatingSummary.objects.filter(sgi=sgi).exists())
+
+
+class SGIComparatorViewTests(TestCase):
+    """Endpoint du comparateur: résultats et total"""
+
+    def test_comparator_lists_active_sgis(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        user = User.objects.create_user(email='client@example.com', password='secret-pass-123')
+        SGI.objects.create(
+            name='SGI Test', description='Test', address='Dakar', manager_name='Manager',
+            manager_email='manager@example.com', email='sgi@example.com', min_investment_amount=Decimal('10000')
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+
+        response = client.get('/api/sgis/comparator/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total'], 1)
+        self.assertIsNone(response.data['results'][0]['terms'])
@@ -0,0 +1,38 @@
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from ..models import ClientInvestmentProfile, SGIMatchingRequest
+
+User = get_user_model()
+
+
+class SGIMatchingViewTests(TestCase):
+    """Lancement du matching: paramètres invalides refusés avant toute écriture"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='investor@example.com', password='secret-pass-123')
+        ClientInvestmentProfile.objects.create(
+            user=self.user, full_name='Investisseur', phone='+221770000000', date_of_birth=date(1990, 1, 1),
+            profession='Ingénieur', monthly_income=Decimal('500000'), investment_objective='GROWTH',
+            risk_tolerance='MODERATE', investment_horizon='MEDIUM', investment_amount=Decimal('100000'),
+            investment_experience='BEGINNER', is_complete=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_invalid_top_k_is_refused(self):
+        for top_k in ('abc', '-1', '0'):
+            response = self.client.post('/api/matching/launch/', {'top_k': top_k}, format='json')
+            self.assertEqual(response.status_code, 400, top_k)
+        self.assertFalse(SGIMatchingRequest.objects.exists())
+
+    def test_top_k_limits_results(self):
+        response = self.client.post('/api/matching/launch/', {'top_k': '2'}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(response.data['matched_sgis']), 2)
+        self.assertEqual(SGIMatchingRequest.objects.get().status, 'COMPLETED')
@@ -0,0 +1,52 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from ..utils_cache import SortedCacheIndex, acquire_lock, release_lock
+
+
+class SortedCacheIndexTests(TestCase):
+    """Index trié segmenté: déplacements, lectures par position, éviction"""
+
+    def setUp(self):
+        cache.clear()
+        self.members = {str(i): (-(i % 7), str(i)) for i in range(40)}
+        self.index = SortedCacheIndex('test_index', lambda: list(self.members.values()), 600, segment_size=4)
+
+    def test_moves_keep_index_sorted(self):
+        self.assertEqual(self.index.count(), 40)
+        for i in range(0, 60, 3):
+            member = str(i)
+            if i % 2:
+                self.members.pop(member, None)
+                self.index.move(member, None)
+            else:
+                self.members[member] = (-(i % 11), member)
+                self.index.move(member, self.members[member])
+
+        keys = sorted(self.members.values())
+        self.assertEqual(self.index.slice(0, 100), (keys, len(keys)))
+        self.assertEqual(self.index.slice(10, 5)[0], keys[10:15])
+        self.assertEqual(self.index.total(), sum(key[0] for key in keys))
+        self.assertEqual(self.index.positions([(-3,), keys[7]]), [keys.index(min(k for k in keys if k >= (-3,))), 7])
+        self.assertEqual(self.index.keys_of(['0', '3']), {'0': self.members['0']})
+
+    def test_build_waits_for_lock(self):
+        lock = self.index._lock_key
+        self.assertTrue(acquire_lock(lock))
+        try:
+            # Verrou tenu par une mise à jour: l'index est servi sans être stocké
+            self.assertEqual(self.index.count(), 40)
+            self.assertIsNone(cache.get(f"{self.index._prefix()}:meta"))
+        finally:
+            release_lock(lock)
+        self.assertEqual(self.index.count(), 40)
+        self.assertIsNotNone(cache.get(f"{self.index._prefix()}:meta"))
+
+    def test_evicted_segment_invalidates_index(self):
+        self.index.count()
+        prefix = self.index._prefix()
+        cache.delete(f"{prefix}:segment:0")
+        self.members['new'] = (-100, 'new')
+
+        self.assertEqual(self.index.slice(0, 1)[0], [(-100, 'new')])
+        self.assertNotEqual(self.index._prefix(), prefix)
@@ -54,6 +54,7 @@ urlpatterns = [
     
     # User permissions
     path('user/permissions/', views_permissions.UserPermissionsView.as_view(), name='user_permissions'),
+    path('user/permissions/check/', views_permissions.check_permissions_batch, name='check_permissions_batch'),
     path('user/permissions/check/<str:permission_code>/', views_permissions.check_permission, name='check_permission'),
     
     # === ENDPOINTS SAVINGS CHALLENGE === (Temporairement désactivé - vues en cours de développement)
@@ -103,6 +104,7 @@ urlpatterns = [
     # === ENDPOINTS OUVERTURE COMPTE TITRE ===
     path('account-opening/request/', views.AccountOpeningRequestCreateView.as_view(), name='account-opening-request-create'),
     path('account-opening/requests/', views.AccountOpeningRequestListView.as_view(), name='account-opening-requests'),
+    path('account-opening/jobs/<uuid:job_id>/', views.AccountOpeningJobStatusView.as_view(), name='account-opening-job-status'),
     path('account-opening/prefill/<uuid:sgi_id>/', views.ContractPrefillView.as_view(), name='contract-prefill'),
     path('account-opening/submit/', views.ContractSubmitOneClickView.as_view(), name='contract-submit-oneclick'),
     path('account-opening/authorize/', views.XamilaAuthorizationToggleView.as_view(), name='xamila-authorization-toggle'),
@@ -84,6 +84,7 @@ urlpatterns = [
     
     # Reporting et exports
     path('export/users/', views_admin_advanced.admin_export_users, name='admin_export_users'),
+    path('export/<str:dataset>/', views_admin_advanced.admin_export_dataset, name='admin_export_dataset'),
     path('bi/', views_admin_advanced.admin_business_intelligence, name='admin_business_intelligence'),
     
     # Système de matching
@@ -13,7 +13,7 @@ urlpatterns = [
     path('challenges/', views_savings_challenge.SavingsChallengeListView.as_view(), name='challenge-list'),
     path('challenges/<uuid:pk>/', views_savings_challenge.SavingsChallengeDetailView.as_view(), name='challenge-detail'),
     path('challenges/<uuid:challenge_id>/join/', views_savings_challenge.join_challenge, name='join-challenge'),
-    path('challenges/<uuid:challenge_id>/leaderboard/', views_savings_challenge.challenge_leaderboard, name='challenge-leaderboard'),
+    path('challenges/<uuid:challenge_id>/leaderboard/', views_savings_challenge.get_leaderboard, name='challenge-leaderboard'),
     path('challenges/<uuid:challenge_id>/update-leaderboard/', views_savings_challenge.update_leaderboard, name='update-leaderboard'),
     
     # === CHALLENGE PARTICIPATIONS ===
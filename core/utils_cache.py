@@ -0,0 +1,478 @@
+"""
+Utilitaires de cache versionné
+Chaque espace de noms porte une version stockée dans le cache Django: la changer
+invalide d'un coup toutes les clés de l'espace. L'invalidation n'atteint tous les
+processus que si le cache est partagé (Redis, voir CACHES dans les settings); avec
+le cache mémoire local elle ne vaut que pour le processus courant.
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from django.core.cache import cache
+from django.db import transaction
+import hashlib
+import json
+import logging
+import time
+import uuid
+import zlib
+
+logger = logging.getLogger(__name__)
+
+
+def _version_key(namespace):
+    return f"{namespace}:version"
+
+
+def get_cache_version(namespace):
+    """Version courante d'un espace de noms (créée au premier accès)"""
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_cache_version(namespace):
+    """Invalide immédiatement toutes les clés d'un espace de noms"""
+    cache.set(_version_key(namespace), uuid.uuid4().hex, None)
+
+
+def invalidate_on_commit(namespace, callback=None):
+    """
+    Invalide un espace de noms après le commit de la transaction courante
+    (immédiatement hors transaction)
+
+    Args:
+        namespace: Espace de noms à invalider
+        callback: Fonction optionnelle appelée après l'invalidation
+    """
+    def _invalidate():
+        bump_cache_version(namespace)
+        if callback is not None:
+            callback()
+
+    transaction.on_commit(_invalidate)
+
+
+def make_cache_key(namespace, params=None):
+    """
+    Construit une clé versionnée à partir de paramètres sérialisables
+
+    Args:
+        namespace: Espace de noms de la clé
+        params: Paramètres identifiant l'entrée (dict, liste...)
+    """
+    digest = hashlib.md5(
+        json.dumps(params, sort_keys=True, default=str).encode('utf-8')
+    ).hexdigest()
+    return f"{namespace}:{get_cache_version(namespace)}:{digest}"
+
+
+# ----------------------------------------------------------------------
+# Verrous et entrées reconstruites depuis la base
+# ----------------------------------------------------------------------
+
+CACHE_LOCK_TIMEOUT = 5
+CACHE_LOCK_ATTEMPTS = 20
+
+
+def acquire_lock(lock_key, timeout=CACHE_LOCK_TIMEOUT, attempts=CACHE_LOCK_ATTEMPTS):
+    """Pose un verrou (cache.add), en réessayant pendant environ attempts * 10 ms"""
+    for _ in range(attempts):
+        if cache.add(lock_key, 1, timeout):
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def release_lock(lock_key):
+    cache.delete(lock_key)
+
+
+def set_until_expiry(key, value):
+    """
+    Réécrit une entrée mise à jour sans prolonger sa durée de vie
+    (échéance fixée à la construction par get_or_build_many)
+    """
+    remaining = value['expires_at'] - time.time()
+    if remaining > 0:
+        cache.set(key, value, remaining)
+    else:
+        cache.delete(key)
+
+
+def get_or_build_many(entries, build, timeout):
+    """
+    Entrées en cache, les absentes construites depuis la base sous leur verrou
+
+    Le cache est relu une fois le verrou pris: une mise à jour incrémentale, qui prend
+    le même verrou et ignore une entrée absente, ne peut pas s'intercaler entre la
+    lecture de la base et l'écriture en cache. Une entrée dont le verrou n'a pu être
+    pris est servie sans être stockée.
+
+    Args:
+        entries: Dict clé de cache -> clé de verrou
+        build: Fonction (liste des clés absentes) -> dict clé -> entrée (dict)
+        timeout: Durée de vie des entrées construites, en secondes (échéance
+            enregistrée dans l'entrée sous 'expires_at')
+
+    Returns:
+        Dict clé de cache -> entrée
+    """
+    values = cache.get_many(list(entries))
+    missing = [key for key in entries if key not in values]
+    if not missing:
+        return values
+
+    locked = [key for key in missing if acquire_lock(entries[key])]
+    try:
+        if locked:
+            values.update(cache.get_many(locked))
+        missing = [key for key in missing if key not in values]
+        if missing:
+            built = build(missing)
+            expires_at = time.time() + timeout
+            for value in built.values():
+                value['expires_at'] = expires_at
+            cache.set_many({key: built[key] for key in missing if key in locked}, timeout)
+            values.update(built)
+    finally:
+        for key in locked:
+            release_lock(entries[key])
+    return values
+
+
+# ----------------------------------------------------------------------
+# Index trié segmenté
+# ----------------------------------------------------------------------
+
+SEGMENT_SIZE = 500
+
+
+class IndexEvicted(Exception):
+    """Segment d'un index absent du cache alors que l'index est construit"""
+
+
+class SortedCacheIndex:
+    """
+    Index trié de clés tenu dans le cache, découpé en segments
+
+    Les clés sont des tuples dont le dernier élément est l'identifiant du membre.
+    Entrées en cache, sous la version courante de l'espace de noms:
+    - meta: (id, première clé, taille) de chaque segment, effectif, somme des
+      premières composantes des clés (total), échéance
+    - un segment: liste triée d'au plus 2 * segment_size clés consécutives
+    - un groupe de membres: membre -> clé courante, pour les membres dont l'empreinte
+      (crc32) désigne ce groupe (nombre de groupes fixé à la construction)
+    Déplacer un membre ne relit et ne réécrit que meta, son groupe et au plus deux
+    segments; une position se lit dans meta et un segment. Une entrée évincée du
+    cache est détectée (IndexEvicted) et l'index invalidé.
+
+    L'index n'est construit que sous son verrou, qui sérialise aussi les
+    déplacements. Toutes les entrées d'une construction partagent la même échéance:
+    l'index est relu depuis la base au plus tard timeout secondes après.
+    """
+
+    def __init__(self, namespace, build, timeout, segment_size=SEGMENT_SIZE):
+        """
+        Args:
+            namespace: Espace de noms (versionné) de l'index
+            build: Fonction sans argument renvoyant les clés de tous les membres
+            timeout: Durée de vie de l'index, en secondes
+        """
+        self.namespace = namespace
+        self.build = build
+        self.timeout = timeout
+        self.segment_size = segment_size
+
+    @property
+    def _lock_key(self):
+        return f"{self.namespace}:lock"
+
+    def _prefix(self):
+        return f"{self.namespace}:{get_cache_version(self.namespace)}"
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+
+    def _layout(self, keys):
+        """meta et segments d'une liste de clés triées"""
+        segments, contents = [], {}
+        for number, start in enumerate(range(0, len(keys), self.segment_size)):
+            chunk = keys[start:start + self.segment_size]
+            segments.append((number, chunk[0], len(chunk)))
+            contents[number] = chunk
+        meta = {
+            'segments': segments,
+            'count': len(keys),
+            'total': sum(key[0] for key in keys),
+            'next_segment': len(segments),
+            'groups': max(len(segments), 1),
+            'expires_at': time.time() + self.timeout,
+        }
+        return meta, contents
+
+    @staticmethod
+    def _group(meta, member):
+        return zlib.crc32(member.encode('utf-8')) % meta['groups']
+
+    def _members(self, prefix, meta, members):
+        """Groupes des membres demandés: id du groupe -> dict membre -> clé"""
+        groups = {self._group(meta, member) for member in members}
+        if 'detached' in meta:
+            found = meta['detached']['members']
+            return {group: found for group in groups}
+        cached = cache.get_many([f"{prefix}:members:{group}" for group in groups])
+        contents = {group: cached.get(f"{prefix}:members:{group}") for group in groups}
+        if any(entries is None for entries in contents.values()):
+            raise IndexEvicted(self.namespace)
+        return contents
+
+    def _detached(self):
+        """Index construit depuis la base et servi sans être stocké"""
+        keys = sorted(self.build())
+        meta, contents = self._layout(keys)
+        meta['detached'] = {'segments': contents, 'members': {key[-1]: key for key in keys}}
+        return meta
+
+    def _load(self, prefix):
+        """meta de l'index, construit sous verrou s'il est absent"""
+        meta = cache.get(f"{prefix}:meta")
+        if meta is not None:
+            return meta
+
+        if not acquire_lock(self._lock_key):
+            return self._detached()
+        try:
+            meta = cache.get(f"{prefix}:meta")
+            if meta is not None:
+                return meta
+            keys = sorted(self.build())
+            meta, contents = self._layout(keys)
+            entries = {f"{prefix}:segment:{number}": chunk for number, chunk in contents.items()}
+            groups = {f"{prefix}:members:{group}": {} for group in range(meta['groups'])}
+            for key in keys:
+                groups[f"{prefix}:members:{self._group(meta, key[-1])}"][key[-1]] = key
+            entries.update(groups)
+            cache.set_many(entries, self.timeout)
+            # meta en dernier: sa présence signale un index complet
+            cache.set(f"{prefix}:meta", meta, self.timeout)
+            return meta
+        finally:
+            release_lock(self._lock_key)
+
+    def _segments(self, prefix, meta, numbers):
+        """Contenu des segments demandés (IndexEvicted si l'un d'eux a disparu)"""
+        if 'detached' in meta:
+            return {number: meta['detached']['segments'][number] for number in numbers}
+        found = cache.get_many([f"{prefix}:segment:{number}" for number in numbers])
+        contents = {number: found.get(f"{prefix}:segment:{number}") for number in numbers}
+        if any(chunk is None for chunk in contents.values()):
+            raise IndexEvicted(self.namespace)
+        return contents
+
+    def _read(self, reader):
+        """Applique reader(prefix, meta); index reconstruit hors cache si un segment a disparu"""
+        prefix = self._prefix()
+        try:
+            return reader(prefix, self._load(prefix))
+        except IndexEvicted:
+            logger.warning(f"Index {self.namespace} incomplet dans le cache, invalidation")
+            self.invalidate()
+            return reader(None, self._detached())
+
+    @staticmethod
+    def _locate(segments, key):
+        """Indice du segment pouvant contenir key"""
+        return max(bisect_right([segment[1] for segment in segments], key) - 1, 0)
+
+    # ------------------------------------------------------------------
+    # Mises à jour
+    # ------------------------------------------------------------------
+
+    def move(self, member, key):
+        """
+        Place un membre à la clé key (retiré si key est None)
+
+        Sans index construit, rien à faire: la prochaine lecture lira la base à jour.
+        Sans verrou ou si un segment a disparu, l'index est invalidé.
+        """
+        if not acquire_lock(self._lock_key):
+            logger.warning(f"Index {self.namespace} verrouillé, invalidation")
+            self.invalidate()
+            return
+
+        try:
+            prefix = self._prefix()
+            meta = cache.get(f"{prefix}:meta")
+            if meta is None:
+                return
+            member = str(member)
+            try:
+                group = self._group(meta, member)
+                members = self._members(prefix, meta, [member])[group]
+                old = members.get(member)
+                if old == key:
+                    return
+                changed, dropped = self._move(prefix, meta, old, key)
+            except IndexEvicted:
+                logger.warning(f"Index {self.namespace} incomplet dans le cache, invalidation")
+                self.invalidate()
+                return
+
+            remaining = meta['expires_at'] - time.time()
+            if remaining <= 0:
+                self.invalidate()
+                return
+            if key is None:
+                members.pop(member, None)
+            else:
+                members[member] = key
+            entries = {f"{prefix}:segment:{number}": chunk for number, chunk in changed.items()}
+            entries[f"{prefix}:members:{group}"] = members
+            cache.set_many(entries, remaining)
+            if dropped:
+                cache.delete_many([f"{prefix}:segment:{number}" for number in dropped])
+            cache.set(f"{prefix}:meta", meta, remaining)
+        finally:
+            release_lock(self._lock_key)
+
+    def _move(self, prefix, meta, old, key):
+        """
+        Déplace old vers key dans meta et les segments concernés
+
+        Returns:
+            Tuple (segments modifiés: id -> contenu, ids des segments supprimés)
+        """
+        segments = meta['segments']
+        numbers = {segments[self._locate(segments, k)][0] for k in (old, key) if k is not None and segments}
+        contents = self._segments(prefix, meta, numbers)
+        changed, dropped = {}, []
+
+        if old is not None and segments:
+            position = self._locate(segments, old)
+            number = segments[position][0]
+            chunk = contents[number]
+            index = bisect_left(chunk, old)
+            if index < len(chunk) and chunk[index] == old:
+                del chunk[index]
+                meta['count'] -= 1
+                meta['total'] -= old[0]
+                if chunk or len(segments) == 1:
+                    segments[position] = (number, chunk[0] if chunk else old, len(chunk))
+                    changed[number] = chunk
+                else:
+                    del segments[position]
+                    dropped.append(number)
+
+        if key is not None:
+            if not segments:
+                number = meta['next_segment']
+                meta['next_segment'] += 1
+                segments.append((number, key, 0))
+                contents[number] = []
+            position = self._locate(segments, key)
+            number = segments[position][0]
+            if number not in contents:
+                # Segment voisin d'un segment vidé par le retrait
+                contents.update(self._segments(prefix, meta, {number}))
+            chunk = contents[number]
+            insort(chunk, key)
+            meta['count'] += 1
+            meta['total'] += key[0]
+            if len(chunk) > 2 * self.segment_size:
+                # Segment trop grand: coupé en deux
+                tail_number = meta['next_segment']
+                meta['next_segment'] += 1
+                head, tail = chunk[:self.segment_size], chunk[self.segment_size:]
+                segments[position] = (number, head[0], len(head))
+                segments.insert(position + 1, (tail_number, tail[0], len(tail)))
+                changed[number], changed[tail_number] = head, tail
+            else:
+                segments[position] = (number, chunk[0], len(chunk))
+                changed[number] = chunk
+        return changed, dropped
+
+    def invalidate(self):
+        """Force la reconstruction de l'index à la prochaine lecture"""
+        bump_cache_version(self.namespace)
+
+    # ------------------------------------------------------------------
+    # Lectures
+    # ------------------------------------------------------------------
+
+    def count(self):
+        return self._load(self._prefix())['count']
+
+    def total(self):
+        """Somme des premières composantes des clés"""
+        return self._load(self._prefix())['total']
+
+    def keys_of(self, members):
+        """Dict membre -> clé courante pour les membres classés parmi members"""
+        members = [str(member) for member in members]
+
+        def reader(prefix, meta):
+            groups = self._members(prefix, meta, members)
+            keys = {}
+            for member in members:
+                key = groups[self._group(meta, member)].get(member)
+                if key is not None:
+                    keys[member] = key
+            return keys
+
+        return self._read(reader)
+
+    def positions(self, keys, right=False):
+        """
+        Positions (à partir de 0) d'insertion de clés, éventuellement partielles
+
+        Args:
+            right: Position après les clés égales (bisect_right) plutôt qu'avant
+
+        Returns:
+            Liste des positions, dans l'ordre de keys
+        """
+        bisect = bisect_right if right else bisect_left
+
+        def reader(prefix, meta):
+            segments = meta['segments']
+            if not segments:
+                return [0 for _ in keys]
+            located = [self._locate(segments, key) for key in keys]
+            contents = self._segments(prefix, meta, {segments[position][0] for position in located})
+            offsets = [0]
+            for segment in segments:
+                offsets.append(offsets[-1] + segment[2])
+            return [
+                offsets[position] + bisect(contents[segments[position][0]], key)
+                for key, position in zip(keys, located)
+            ]
+
+        return self._read(reader)
+
+    def slice(self, start, limit):
+        """
+        Clés des positions start à start + limit (exclue)
+
+        Returns:
+            Tuple (clés, effectif total)
+        """
+        start = max(start, 0)
+
+        def reader(prefix, meta):
+            wanted, offset = [], 0
+            for number, _, size in meta['segments']:
+                if offset + size > start and offset < start + limit:
+                    wanted.append((number, offset))
+                offset += size
+            contents = self._segments(prefix, meta, {number for number, _ in wanted})
+            keys = []
+            for number, offset in wanted:
+                keys.extend(contents[number][max(start - offset, 0):start + limit - offset])
+            return keys[:limit], meta['count']
+
+        return self._read(reader)
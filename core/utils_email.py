@@ -2,10 +2,12 @@
 Utilitaires pour l'envoi d'emails OTP et notifications
 """
 
-from django.core.mail import send_mail, EmailMultiAlternatives
+from django.core.mail import send_mail, get_connection, EmailMultiAlternatives
 from django.template.loader import render_to_string
 from django.conf import settings
 from django.utils.html import strip_tags
+from email import encoders
+from email.mime.base import MIMEBase
 import logging
 
 logger = logging.getLogger(__name__)
@@ -258,3 +260,102 @@ def send_password_reset_email(user, reset_token):
     except Exception as e:
         logger.error(f"Erreur lors de l'envoi de l'email de réinitialisation: {str(e)}")
         return {'success': False, 'error': str(e)}
+
+
+class EncodedAttachment:
+    """
+    Pièce jointe encodée une seule fois (base64), réutilisable dans plusieurs messages
+
+    Le contenu n'est encodé qu'à la création; chaque appel à as_mime() ne crée
+    qu'une enveloppe MIME légère avec son propre nom de fichier.
+    """
+
+    def __init__(self, content, mimetype='application/octet-stream'):
+        self.mimetype = mimetype
+        self.size = len(content)
+        part = MIMEBase(*mimetype.split('/', 1))
+        part.set_payload(content)
+        encoders.encode_base64(part)
+        self._payload = part.get_payload()
+
+    def as_mime(self, filename):
+        """Retourne une partie MIME prête à être attachée à un EmailMessage"""
+        part = MIMEBase(*self.mimetype.split('/', 1))
+        part.set_payload(self._payload)
+        part['Content-Transfer-Encoding'] = 'base64'
+        try:
+            filename.encode('ascii')
+        except UnicodeEncodeError:
+            filename = ('utf-8', '', filename)
+        part.add_header('Content-Disposition', 'attachment', filename=filename)
+        return part
+
+
+class EmailBatch:
+    """
+    Lot d'emails envoyés sur une seule connexion SMTP
+
+    Usage:
+        batch = EmailBatch()
+        batch.add('client', message_client)
+        batch.add('admin:a@x.com', message_admin)
+        results = batch.send()  # {'client': True, 'admin:a@x.com': False}
+    """
+
+    def __init__(self, connection=None):
+        self.connection = connection
+        self._items = []
+        self.errors = {}
+
+    def __len__(self):
+        return len(self._items)
+
+    def add(self, label, message):
+        """Ajoute un message au lot sous un libellé (clé des résultats)"""
+        self._items.append((label, message))
+
+    def send(self):
+        """
+        Envoie tous les messages du lot en réutilisant la même connexion
+
+        Un échec n'interrompt pas le lot: la connexion est rouverte et
+        l'envoi continue avec les messages suivants.
+
+        Returns:
+            dict: libellé -> True si le message est parti
+        """
+        results = {label: False for label, _ in self._items}
+        if not self._items:
+            return results
+
+        connection = self.connection or get_connection()
+        try:
+            connection.open()
+        except Exception as e:
+            logger.error(f"Connexion SMTP impossible, lot de {len(self._items)} email(s) non envoyé: {e}")
+            for label, _ in self._items:
+                self.errors[label] = str(e)
+            return results
+
+        try:
+            for label, message in self._items:
+                if not message.recipients():
+                    self.errors[label] = 'Aucun destinataire'
+                    continue
+                message.connection = connection
+                try:
+                    results[label] = bool(connection.send_messages([message]))
+                except Exception as e:
+                    self.errors[label] = str(e)
+                    logger.error(f"Erreur envoi email ({label}): {e}")
+                    # La session SMTP peut être inutilisable après une erreur
+                    connection.close()
+                    try:
+                        connection.open()
+                    except Exception:
+                        # Les envois suivants retenteront l'ouverture individuellement
+                        pass
+        finally:
+            connection.close()
+
+        return results
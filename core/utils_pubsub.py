@@ -0,0 +1,99 @@
+"""
+Publication/abonnement en mémoire pour les flux temps réel
+Les abonnés sont des files asyncio (connexions SSE servies par ASGI); la
+publication peut venir de n'importe quel thread (callbacks on_commit des vues
+synchrones). La diffusion est locale au processus: les flux complètent par une
+relecture périodique de la base pour les messages publiés par d'autres workers.
+"""
+
+from collections import defaultdict
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+SUBSCRIPTION_QUEUE_SIZE = 100
+
+
+class Subscription:
+    """Abonnement d'une connexion à un canal"""
+
+    def __init__(self, channel, loop, maxsize=SUBSCRIPTION_QUEUE_SIZE):
+        self.channel = channel
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def _put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Abonné trop lent: le message sera relu depuis la base
+            self.dropped += 1
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class LocalBroker:
+    """
+    Courtier en mémoire: canal -> abonnements
+
+    Usage:
+        subscription = broker.subscribe('notifications:42')  # dans la boucle asyncio
+        broker.publish('notifications:42', {...})            # depuis n'importe quel thread
+        message = await subscription.get()
+        broker.unsubscribe(subscription)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def subscribe(self, channel):
+        """Abonne la boucle asyncio courante à un canal"""
+        subscription = Subscription(channel, asyncio.get_running_loop())
+        with self._lock:
+            self._subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.channel)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.channel]
+
+    def publish(self, channel, message):
+        """
+        Diffuse un message aux abonnés du canal (sans attendre leur lecture)
+
+        Returns:
+            Nombre d'abonnés locaux notifiés
+        """
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._put, message)
+            except RuntimeError:
+                # Boucle fermée: connexion terminée entre-temps
+                self.unsubscribe(subscription)
+        return len(subscriptions)
+
+    def subscriber_count(self, channel=None):
+        with self._lock:
+            if channel is not None:
+                return len(self._subscriptions.get(channel, ()))
+            return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+
+_broker = LocalBroker()
+
+
+def get_broker():
+    """Courtier du processus"""
+    return _broker
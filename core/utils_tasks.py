@@ -0,0 +1,94 @@
+"""
+Utilitaires pour l'exécution de traitements en arrière-plan
+Les tâches sont lancées après le commit de la transaction courante,
+afin que le travail en arrière-plan voie toujours les données persistées.
+"""
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Modes supportés:
+# - 'thread': exécution dans un thread démon du processus web (défaut)
+# - 'sync': exécution immédiate après le commit, dans la requête (debug/tests)
+# - 'worker': rien n'est lancé, les jobs persistés sont traités par une commande
+BACKGROUND_TASK_MODES = ('thread', 'sync', 'worker')
+
+
+def get_background_mode():
+    """Retourne le mode d'exécution des tâches d'arrière-plan"""
+    mode = getattr(settings, 'BACKGROUND_TASKS_MODE', 'thread')
+    if mode not in BACKGROUND_TASK_MODES:
+        logger.warning(f"Mode de tâches inconnu '{mode}', utilisation de 'thread'")
+        return 'thread'
+    return mode
+
+
+def _run_task(func, args, kwargs):
+    """Exécute une tâche en isolant ses connexions base de données"""
+    close_old_connections()
+    try:
+        func(*args, **kwargs)
+    except Exception as e:
+        logger.error(f"Erreur tâche d'arrière-plan {getattr(func, '__name__', func)}: {e}", exc_info=True)
+    finally:
+        close_old_connections()
+
+
+def run_in_background(func, *args, **kwargs):
+    """
+    Programme l'exécution de func(*args, **kwargs) après le commit courant
+
+    Args:
+        func: Fonction à exécuter
+        *args, **kwargs: Arguments transmis à la fonction
+
+    Returns:
+        bool: True si la tâche a été programmée dans ce processus,
+              False si elle est laissée au worker
+    """
+    mode = get_background_mode()
+    if mode == 'worker':
+        return False
+
+    def _start():
+        if mode == 'sync':
+            _run_task(func, args, kwargs)
+            return
+        thread = threading.Thread(
+            target=_run_task,
+            args=(func, args, kwargs),
+            name=f"xamila-task-{getattr(func, '__name__', 'task')}",
+            daemon=True,
+        )
+        thread.start()
+
+    transaction.on_commit(_start)
+    return True
+
+
+def run_later(delay, func, *args, **kwargs):
+    """
+    Programme func(*args, **kwargs) dans delay secondes, après le commit courant
+
+    Seul le mode 'thread' relance lui-même les tâches différées (minuteur démon du
+    processus web). Le minuteur est perdu si le processus redémarre: le worker
+    (commande de traitement en --loop) reste le filet de sécurité.
+
+    Returns:
+        bool: True si la tâche a été programmée dans ce processus
+    """
+    if get_background_mode() != 'thread':
+        return False
+
+    def _start():
+        timer = threading.Timer(delay, _run_task, args=(func, args, kwargs))
+        timer.name = f"xamila-task-{getattr(func, '__name__', 'task')}"
+        timer.daemon = True
+        timer.start()
+
+    transaction.on_commit(_start)
+    return True
@@ -3,12 +3,13 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.contrib.auth.models import User
-from django.db.models import Q, Count, Avg, Sum
+from django.db.models import Q, Count, Sum
 from django.utils import timezone
 from django.core.mail import send_mail, EmailMultiAlternatives
 from django.conf import settings
 from django.template.loader import render_to_string
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
 from django.http import FileResponse, Http404, HttpResponse
 import logging
 import os
@@ -17,10 +18,12 @@ from .models import (
     SGI, ClientInvestmentProfile, SGIMatchingRequest,
     ClientSGIInteraction, EmailNotification, AdminDashboardEntry
 )
-from .models_sgi import SGIAccountTerms, SGIRating, AccountOpeningRequest
+from .models_sgi import SGIAccountTerms, AccountOpeningRequest, AccountOpeningJob
 from .services_pdf import ContractPDFService, WEASYPRINT_AVAILABLE
 from .services_email import ContractEmailService
-from .services_annex_pdf import AnnexPDFService
+from .services_annex_pdf import AnnexPDFService, AnnexRenderError
+from .services_contract_pipeline import ContractPipelineService
+from .services_comparator import SGIComparatorService
 from django.core.files.base import ContentFile
 from .serializers import (
     SGISerializer, SGIListSerializer, ClientInvestmentProfileSerializer,
@@ -30,7 +33,7 @@ from .serializers import (
     AdminDashboardEntrySerializer, MatchingCriteriaSerializer,
     SGISelectionSerializer, SGIStatisticsSerializer, ClientStatisticsSerializer,
     SGIAccountTermsSerializer, SGIRatingSerializer, SGIRatingCreateSerializer,
-    AccountOpeningRequestSerializer, AccountOpeningRequestCreateSerializer,
+    AccountOpeningRequestSerializer, AccountOpeningRequestCreateSerializer, AccountOpeningJobSerializer,
     ManagerContractSerializer, ManagerClientListItemSerializer
 )
 from .services import SGIMatchingService, EmailNotificationService
@@ -157,6 +160,20 @@ class SGIMatchingView(APIView):
                     status=status.HTTP_404_NOT_FOUND
                 )
             
+            top_k = request.data.get('top_k')
+            if top_k not in (None, ''):
+                try:
+                    top_k = int(top_k)
+                except (TypeError, ValueError):
+                    top_k = 0
+                if top_k <= 0:
+                    return Response(
+                        {'error': 'top_k doit être un entier positif'},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+            else:
+                top_k = None
+            
             # Créer la demande de matching
             matching_request = SGIMatchingRequest.objects.create(
                 client_profile=client_profile,
@@ -165,11 +182,11 @@ class SGIMatchingView(APIView):
             
             # Lancer le service de matching
             matching_service = SGIMatchingService()
-            results = matching_service.find_matching_sgis(client_profile)
+            results = matching_service.find_matching_sgis(client_profile, top_k=top_k)
             
             # Mettre à jour la demande avec les résultats
             matching_request.matched_sgis = results
-            matching_request.total_matches = len([r for r in results if r['matching_score'] >= 50])
+            matching_request.total_matches = matching_service.count_matches(client_profile)
             matching_request.status = 'COMPLETED'
             matching_request.completed_at = timezone.now()
             matching_request.save()
@@ -385,6 +402,9 @@ class ContractPDFPreviewView(APIView):
                     response['Content-Disposition'] = 'attachment; filename="contrat_complet_preview.pdf"'
                     return response
                     
+                except AnnexRenderError as e:
+                    logger.warning(f"Annexes non générées, prévisualisation du contrat seul: {e}")
+                    return contract_response
                 except Exception as e:
                     logger.error(f"Erreur fusion PDFs: {e}", exc_info=True)
                     # En cas d'erreur, retourner juste le contrat vierge
@@ -408,72 +428,15 @@ class SGIComparatorView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        # Filtres
-        country = request.query_params.get('country')
-        bank_name = request.query_params.get('bank')
-        sgi_name = request.query_params.get('sgi_name')
-        digital_only = request.query_params.get('digital_only')
-
-        # Base: toutes les SGI actives
-        sgi_qs = SGI.objects.filter(is_active=True)
-        
-        # Filtrer par nom de SGI si spécifié
-        if sgi_name:
-            sgi_qs = sgi_qs.filter(name__icontains=sgi_name)
-        
-        # Récupérer les terms associés
-        terms_dict = {}
-        for term in SGIAccountTerms.objects.select_related('sgi').filter(sgi__in=sgi_qs):
-            terms_dict[term.sgi_id] = term
-        
-        # Filtrer par critères de terms
-        filtered_sgis = []
-        for sgi in sgi_qs:
-            term = terms_dict.get(sgi.id)
-            
-            # Si des filtres sont appliqués, vérifier les terms
-            if country or digital_only or bank_name:
-                if not term:
-                    continue  # Pas de terms, ne peut pas matcher les critères
-                
-                if country and term.country.lower() != country.lower():
-                    continue
-                if digital_only == 'true' and not term.is_digital_opening:
-                    continue
-                if bank_name and bank_name.lower() not in (term.preferred_customer_banks or []):
-                    continue
-            
-            filtered_sgis.append((sgi, term))
-        
-        # Si aucun résultat avec filtres, afficher toutes les SGI
-        if not filtered_sgis and (country or digital_only or bank_name):
-            filtered_sgis = [(sgi, terms_dict.get(sgi.id)) for sgi in sgi_qs]
-        
-        # Tri
-        order_by = request.query_params.get('order_by', 'minimum_amount_value')
-        direction = request.query_params.get('order', 'asc')
-        
-        def get_sort_value(item):
-            sgi, term = item
-            if order_by == 'minimum_amount_value':
-                return term.minimum_amount_value if term and term.minimum_amount_value else 0
-            elif order_by == 'opening_fees_amount':
-                return term.opening_fees_amount if term and term.opening_fees_amount else 0
-            elif order_by == 'custody_fees':
-                return term.custody_fees if term and term.custody_fees else 0
-            return 0
-        
-        filtered_sgis.sort(key=get_sort_value, reverse=(direction == 'desc'))
-        
-        # Construire la réponse
-        data = []
-        for sgi, term in filtered_sgis:
-            data.append({
-                'sgi': SGIListSerializer(sgi).data,
-                'terms': SGIAccountTermsSerializer(term).data if term else None,
-                'avg_rating': float(SGIRating.objects.filter(sgi=sgi).aggregate(Avg('score'))['score__avg'] or 0),
-                'ratings_count': SGIRating.objects.filter(sgi=sgi).count(),
-            })
+        # Filtres et tri (résultat mis en cache par combinaison)
+        data = SGIComparatorService().compare(
+            country=request.query_params.get('country'),
+            bank_name=request.query_params.get('bank'),
+            sgi_name=request.query_params.get('sgi_name'),
+            digital_only=request.query_params.get('digital_only'),
+            order_by=request.query_params.get('order_by', 'minimum_amount_value'),
+            direction=request.query_params.get('order', 'asc'),
+        )
         
         return Response({'results': data, 'total': len(data)})
 
@@ -504,74 +467,15 @@ class ComparatorMatchView(APIView):
             }
             # Autres méthodes informatives (intermédiaire/WU...) non filtrantes pour le moment
 
-            # Base SGI actives
-            sgi_qs = SGI.objects.filter(is_active=True)
-            terms_qs = SGIAccountTerms.objects.select_related('sgi').filter(sgi__in=sgi_qs)
-
-            # Filtre digital si demandé
-            if wants_100_percent_digital_sgi:
-                terms_qs = terms_qs.filter(is_digital_opening=True)
-
-            # Filtre sur montant dispo vs min_investment_amount (SGI)
-            if available_minimum_amount is not None:
-                sgi_ids_amount = sgi_qs.filter(min_investment_amount__lte=available_minimum_amount).values_list('id', flat=True)
-                terms_qs = terms_qs.filter(sgi_id__in=list(sgi_ids_amount))
-
-            # Filtre sur méthodes de dépôt: doit contenir au moins une méthode cochée
+            # Filtres digital / montant / méthodes de dépôt, tri qualité vs frais
             wanted_methods = [name for name, v in funding_flags.items() if v]
-            if wanted_methods:
-                # JSONField contains-any workaround: filtrer en Python après fetch limité
-                candidates = list(terms_qs)
-                filtered = []
-                for t in candidates:
-                    dm = t.deposit_methods or []
-                    if any(m in dm for m in wanted_methods):
-                        filtered.append(t)
-                terms_qs = filtered
-            else:
-                terms_qs = list(terms_qs)
-
-            # Aucune correspondance: fallback à toutes les SGI actives
-            fallback = False
-            if not terms_qs:
-                fallback = True
-                terms_qs = list(SGIAccountTerms.objects.select_related('sgi').filter(sgi__is_active=True))
-
-            # Tri: qualité vs frais
-            prefer_quality = bool(payload.get('prefer_service_quality_over_fees', True))
-            if prefer_quality:
-                # Tri par vérification SGI puis performance historique desc puis frais de gestion asc
-                def sort_key(t):
-                    s = t.sgi
-                    return (
-                        0 if s.is_verified else 1,
-                        -(s.historical_performance or 0),
-                        (s.management_fees or 0)
-                    )
-                terms_qs.sort(key=sort_key)
-            else:
-                # Frais bas: gestion asc, frais ouverture asc, frais de garde asc
-                def coalesce(x):
-                    return x if x is not None else 0
-                def sort_key(t):
-                    s = t.sgi
-                    return (
-                        coalesce(s.management_fees),
-                        coalesce(t.opening_fees_amount),
-                        coalesce(t.custody_fees)
-                    )
-                terms_qs.sort(key=sort_key)
-
-            # Construire la réponse
-            results = []
-            for t in terms_qs:
-                s = t.sgi
-                results.append({
-                    'sgi': SGIListSerializer(s).data,
-                    'terms': SGIAccountTermsSerializer(t).data,
-                    'avg_rating': float(SGIRating.objects.filter(sgi=s).aggregate(Avg('score'))['score__avg'] or 0),
-                    'ratings_count': SGIRating.objects.filter(sgi=s).count(),
-                })
+            matched = SGIComparatorService().match(
+                wants_digital=wants_100_percent_digital_sgi,
+                available_amount=available_minimum_amount,
+                wanted_methods=wanted_methods,
+                prefer_quality=bool(payload.get('prefer_service_quality_over_fees', True)),
+            )
+            results, fallback = matched['results'], matched['fallback']
 
             return Response({
                 'results': results,
@@ -697,7 +601,8 @@ class SGIRatingView(APIView):
 class AccountOpeningRequestCreateView(APIView):
     """
     Création de la demande d'ouverture de compte titre (SGI optionnelle)
-    Envoie des emails à la SGI (si fournie), au client et à Xamila
+    Répond 202 avec le job de traitement: les PDF et les emails à la SGI (si fournie),
+    au client et à Xamila sont traités en arrière-plan (voir AccountOpeningJobStatusView)
     """
     permission_classes = [permissions.IsAuthenticated]
 
@@ -710,121 +615,15 @@ class AccountOpeningRequestCreateView(APIView):
             req_obj = serializer.save()
             logger.info(f"AccountOpeningRequest créé: {req_obj.id}")
 
-            # === GÉNÉRATION DES PDFs ===
-            contract_pdf_bytes = None
-            annexes_pdf_bytes = None
-            
-            try:
-                # 1. Charger le contrat vierge commercial (PDF statique de la SGI)
-                import os
-                from django.conf import settings
-                
-                # Déterminer le fichier de contrat vierge selon la SGI
-                if req_obj.sgi and req_obj.sgi.name:
-                    sgi_name = req_obj.sgi.name.upper()
-                    if 'NSIA' in sgi_name:
-                        contract_filename = 'NSIA_Convention_Compte_Titres.pdf'
-                    elif 'GEK' in sgi_name:
-                        contract_filename = 'GEK --Convention commerciale VF 2025.pdf'
-                    else:
-                        # Par défaut, utiliser NSIA
-                        contract_filename = 'NSIA_Convention_Compte_Titres.pdf'
-                else:
-                    contract_filename = 'NSIA_Convention_Compte_Titres.pdf'
-                
-                contract_path = os.path.join(settings.BASE_DIR, 'contracts', contract_filename)
-                
-                if os.path.exists(contract_path):
-                    with open(contract_path, 'rb') as f:
-                        contract_pdf_bytes = f.read()
-                    logger.info(f"Contrat vierge chargé: {contract_filename} ({len(contract_pdf_bytes)} bytes)")
-                    
-                    # Sauvegarder le contrat en base de données
-                    req_obj.contract_pdf.save(
-                        f'contrat_{req_obj.id}.pdf',
-                        ContentFile(contract_pdf_bytes),
-                        save=False
-                    )
-                else:
-                    logger.warning(f"Contrat vierge introuvable: {contract_path}")
-                    
-            except Exception as e:
-                logger.error(f"Erreur chargement contrat vierge: {e}", exc_info=True)
-            
-            try:
-                # 2. Générer les annexes pré-remplies
-                annex_service = AnnexPDFService()
-                annex_data = req_obj.annex_data or {}
-                
-                if annex_data:
-                    annexes_buffer = annex_service.generate_annexes_pdf(req_obj, annex_data)
-                    annexes_pdf_bytes = annexes_buffer.read()
-                    annexes_buffer.seek(0)
-                    logger.info(f"Annexes PDF générées: {len(annexes_pdf_bytes)} bytes")
-                    
-                    # Sauvegarder les annexes en base de données
-                    req_obj.annexes_pdf.save(
-                        f'annexes_{req_obj.id}.pdf',
-                        ContentFile(annexes_pdf_bytes),
-                        save=False
-                    )
-                else:
-                    logger.warning("Pas de données d'annexes disponibles")
-                    
-            except Exception as e:
-                logger.error(f"Erreur génération annexes PDF: {e}", exc_info=True)
-            
-            # Sauvegarder les modifications (PDFs)
-            req_obj.save()
-            
-            # === ENVOI DES EMAILS ===
-            if contract_pdf_bytes and annexes_pdf_bytes:
-                try:
-                    # Récupérer l'email du manager SGI
-                    sgi_manager_email = None
-                    if req_obj.sgi:
-                        sgi_manager_email = getattr(req_obj.sgi, 'manager_email', None)
-                    
-                    # Récupérer les emails des admins
-                    from .models import User
-                    admin_emails = list(
-                        User.objects.filter(role='ADMIN', is_active=True)
-                        .values_list('email', flat=True)
-                    )
-                    
-                    # Utiliser le nouveau service d'email
-                    email_service = ContractEmailService()
-                    email_results = email_service.send_contract_emails(
-                        aor=req_obj,
-                        contract_pdf=contract_pdf_bytes,
-                        annexes_pdf=annexes_pdf_bytes,
-                        sgi_manager_email=sgi_manager_email,
-                        admin_emails=admin_emails if admin_emails else None
-                    )
-                    
-                    logger.info(f"Résultats envoi emails: {email_results}")
-                    
-                    if email_results.get('errors'):
-                        logger.warning(f"Erreurs lors de l'envoi des emails: {email_results['errors']}")
-                        
-                except Exception as e:
-                    logger.error(f"Erreur lors de l'envoi des emails: {e}", exc_info=True)
-            else:
-                logger.warning("PDFs non générés, envoi d'emails de base")
-                # Fallback: envoyer un email simple sans PDFs
-                try:
-                    from_email = getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@xamila.com')
-                    send_mail(
-                        subject='Xamila - Confirmation de votre demande d\'ouverture de compte titre',
-                        message=f"Bonjour {req_obj.full_name},\n\nVotre demande a été reçue. Nous vous recontacterons sous 48h.",
-                        from_email=from_email,
-                        recipient_list=[req_obj.email],
-                        fail_silently=True,
-                    )
-                except Exception as e:
-                    logger.error(f"Erreur envoi email fallback: {e}")
+            # PDFs (contrat + annexes), stockage et emails traités en arrière-plan
+            job = ContractPipelineService().enqueue(req_obj)
 
-            return Response(AccountOpeningRequestSerializer(req_obj).data, status=status.HTTP_201_CREATED)
+            data = AccountOpeningRequestSerializer(req_obj).data
+            data['job'] = AccountOpeningJobSerializer(job).data
+            data['job_status_url'] = request.build_absolute_uri(
+                reverse('account-opening-job-status', kwargs={'job_id': job.id})
+            )
+            return Response(data, status=status.HTTP_202_ACCEPTED)
         except (OSError, PermissionError) as e:
             # Retry creation without file fields to avoid 500 on storage permission issues
             data_wo_files = request.data.copy()
@@ -876,6 +675,24 @@ class AccountOpeningRequestCreateView(APIView):
             return Response({'error': 'Erreur interne'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class AccountOpeningJobStatusView(APIView):
+    """
+    Statut du traitement asynchrone d'une demande d'ouverture de compte
+    (génération des PDF, stockage, envoi des emails)
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, job_id):
+        job = get_object_or_404(
+            AccountOpeningJob.objects.select_related('account_opening_request'),
+            id=job_id
+        )
+        is_customer = job.account_opening_request.customer_id == request.user.id
+        if not (is_customer or request.user.is_staff):
+            return Response({'detail': 'Accès non autorisé'}, status=status.HTTP_403_FORBIDDEN)
+        return Response(AccountOpeningJobSerializer(job).data)
+
+
 class ContractPDFGenerateView(APIView):
     """
     Génère un PDF prérempli depuis AccountOpeningRequest + SGI (+ Terms)
@@ -1342,6 +1159,11 @@ class DownloadAnnexesPDFView(APIView):
             )
             return response
             
+        except AnnexRenderError as e:
+            return Response(
+                {'error': f'Annexes impossibles à générer: {str(e)}'},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
         except Exception as e:
             logger.error(f"Erreur génération PDF annexes: {str(e)}")
             import traceback
@@ -8,7 +8,7 @@ from django.shortcuts import render
 from django.contrib.auth import get_user_model
 from django.db.models import Q, Count, Sum, Avg
 from django.utils import timezone
-from datetime import timedelta, datetime
+from datetime import date, timedelta, datetime
 from rest_framework import status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
@@ -22,6 +22,7 @@ from .models_sgi import SGIManager, SGIManagerAssignment
 from .serializers import UserSerializer
 from .models_sgi import SGIAccountTerms
 from .permissions import IsAdminUser
+from .services_platform_metrics import admin_dashboard
 
 User = get_user_model()
 
@@ -291,88 +292,23 @@ def admin_user_action(request, user_id):
 def admin_dashboard_stats(request):
     """
     Statistiques pour le tableau de bord admin
-    GET /api/admin/dashboard/stats/
-    """
-    now = timezone.now()
-    today = now.date()
-    week_ago = now - timedelta(days=7)
-    month_ago = now - timedelta(days=30)
-    
-    # Statistiques utilisateurs
-    total_users = User.objects.count()
-    active_users = User.objects.filter(is_active=True).count()
-    verified_users = User.objects.filter(is_verified=True).count()
-    new_users_today = User.objects.filter(created_at__date=today).count()
-    new_users_week = User.objects.filter(created_at__gte=week_ago).count()
-    new_users_month = User.objects.filter(created_at__gte=month_ago).count()
-    
-    # Statistiques par rôle
-    role_stats = {}
-    for role_code, role_name in User.ROLE_CHOICES:
-        role_stats[role_code] = {
-            'name': role_name,
-            'count': User.objects.filter(role=role_code).count(),
-            'active': User.objects.filter(role=role_code, is_active=True).count()
-        }
-    
-    # Statistiques SGI
-    total_sgis = SGI.objects.count()
-    active_sgis = SGI.objects.filter(is_active=True).count()
-    pending_sgis = SGI.objects.filter(is_active=False).count()
+    GET /api/admin/dashboard/stats/?start=AAAA-MM-JJ&end=AAAA-MM-JJ
     
-    # Statistiques contrats
-    total_contracts = Contract.objects.count()
-    pending_contracts = Contract.objects.filter(status='PENDING').count()
-    approved_contracts = Contract.objects.filter(status='APPROVED').count()
-    
-    # Statistiques OTP
-    otp_sent_today = OTP.objects.filter(created_at__date=today).count()
-    otp_success_rate = 0
-    if otp_sent_today > 0:
-        otp_used_today = OTP.objects.filter(created_at__date=today, is_used=True).count()
-        otp_success_rate = round((otp_used_today / otp_sent_today) * 100, 2)
-    
-    # Évolution des inscriptions (30 derniers jours)
-    registration_evolution = []
-    for i in range(30):
-        date = (now - timedelta(days=i)).date()
-        count = User.objects.filter(created_at__date=date).count()
-        registration_evolution.append({
-            'date': date.isoformat(),
-            'count': count
-        })
-    registration_evolution.reverse()
+    Inscriptions et OTP lus dans les indicateurs journaliers (DailyPlatformMetric);
+    la fenêtre de registration_evolution vaut par défaut les 30 derniers jours.
+    """
+    try:
+        start = request.query_params.get('start')
+        end = request.query_params.get('end')
+        start = date.fromisoformat(start) if start else None
+        end = date.fromisoformat(end) if end else None
+    except ValueError:
+        return Response(
+            {'error': 'Dates invalides (format attendu: AAAA-MM-JJ)'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     
-    return Response({
-        'users': {
-            'total': total_users,
-            'active': active_users,
-            'verified': verified_users,
-            'verification_rate': round((verified_users / total_users * 100), 2) if total_users > 0 else 0,
-            'new_today': new_users_today,
-            'new_week': new_users_week,
-            'new_month': new_users_month,
-            'by_role': role_stats
-        },
-        'sgis': {
-            'total': total_sgis,
-            'active': active_sgis,
-            'pending': pending_sgis,
-            'approval_rate': round((active_sgis / total_sgis * 100), 2) if total_sgis > 0 else 0
-        },
-        'contracts': {
-            'total': total_contracts,
-            'pending': pending_contracts,
-            'approved': approved_contracts,
-            'approval_rate': round((approved_contracts / total_contracts * 100), 2) if total_contracts > 0 else 0
-        },
-        'otp': {
-            'sent_today': otp_sent_today,
-            'success_rate': otp_success_rate
-        },
-        'registration_evolution': registration_evolution,
-        'last_updated': now.isoformat()
-    })
+    return Response(admin_dashboard(start, end))
 
 
 # ===== GESTION DES SGI =====
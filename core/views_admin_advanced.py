@@ -6,11 +6,10 @@ Gestion avancée des SGI, contrats, et fonctionnalités business
 
 from django.shortcuts import render
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
 from django.db.models import Q, Count, Sum, Avg, F
 from django.utils import timezone
-from django.http import HttpResponse
 from datetime import timedelta, datetime
-import csv
 import json
 from rest_framework import status, permissions
 from rest_framework.decorators import api_view, permission_classes
@@ -24,6 +23,8 @@ from .serializers_admin import (
     AdminReportFilterSerializer, AdminBulkActionSerializer
 )
 from .permissions import IsAdminUser
+from .services_analytics import business_intelligence, sgi_analytics
+from .services_export import DATASETS, EXPORT_FORMATS
 
 User = get_user_model()
 
@@ -35,67 +36,14 @@ User = get_user_model()
 def admin_sgi_analytics(request):
     """
     Analytics avancées des SGI
-    GET /api/admin/sgis/analytics/
+    GET /api/admin/sgis/analytics/?days=30
     """
-    # Statistiques globales SGI
-    total_sgis = SGI.objects.count()
-    active_sgis = SGI.objects.filter(is_active=True).count()
-    pending_sgis = SGI.objects.filter(is_active=False).count()
-    
-    # Performance des SGI
-    sgi_performance = []
-    for sgi in SGI.objects.filter(is_active=True):
-        contracts = Contract.objects.filter(sgi=sgi)
-        total_contracts = contracts.count()
-        approved_contracts = contracts.filter(status='APPROVED').count()
-        
-        performance_data = {
-            'sgi_id': sgi.id,
-            'sgi_name': sgi.name,
-            'manager': f"{sgi.manager.first_name} {sgi.manager.last_name}",
-            'total_contracts': total_contracts,
-            'approved_contracts': approved_contracts,
-            'approval_rate': round((approved_contracts / total_contracts * 100), 2) if total_contracts > 0 else 0,
-            'total_investment': contracts.filter(status='APPROVED').aggregate(
-                total=Sum('investment_amount')
-            )['total'] or 0,
-            'average_investment': contracts.filter(status='APPROVED').aggregate(
-                avg=Avg('investment_amount')
-            )['avg'] or 0,
-            'created_at': sgi.created_at
-        }
-        sgi_performance.append(performance_data)
-    
-    # Trier par taux d'approbation
-    sgi_performance.sort(key=lambda x: x['approval_rate'], reverse=True)
-    
-    # Top 5 SGI par performance
-    top_sgis = sgi_performance[:5]
-    
-    # Évolution des inscriptions SGI (30 derniers jours)
-    now = timezone.now()
-    sgi_evolution = []
-    for i in range(30):
-        date = (now - timedelta(days=i)).date()
-        count = SGI.objects.filter(created_at__date=date).count()
-        sgi_evolution.append({
-            'date': date.isoformat(),
-            'count': count
-        })
-    sgi_evolution.reverse()
+    try:
+        days = min(max(int(request.query_params.get('days', 30)), 1), 366)
+    except ValueError:
+        return Response({'error': 'Paramètre days invalide'}, status=status.HTTP_400_BAD_REQUEST)
     
-    return Response({
-        'overview': {
-            'total_sgis': total_sgis,
-            'active_sgis': active_sgis,
-            'pending_sgis': pending_sgis,
-            'activation_rate': round((active_sgis / total_sgis * 100), 2) if total_sgis > 0 else 0
-        },
-        'performance_ranking': sgi_performance,
-        'top_performers': top_sgis,
-        'registration_evolution': sgi_evolution,
-        'last_updated': now.isoformat()
-    })
+    return Response(sgi_analytics(days))
 
 
 @api_view(['POST'])
@@ -354,59 +302,48 @@ def admin_contract_action(request, contract_id):
 
 # ===== REPORTING ET EXPORT =====
 
+def _stream_export(request, name):
+    """Export en flux d'un jeu de données (?output=csv|jsonl, ?gzip=true)"""
+    dataset = DATASETS.get(name)
+    if dataset is None:
+        return Response(
+            {'error': f"Export inconnu: {name}", 'available': sorted(DATASETS)},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    # ?format= est réservé par DRF à la négociation de contenu
+    output = request.query_params.get('output', 'csv').lower()
+    if output not in EXPORT_FORMATS:
+        return Response(
+            {'error': f"Format invalide: {output}", 'available': list(EXPORT_FORMATS)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    compress = request.query_params.get('gzip', 'false').lower() == 'true'
+    
+    try:
+        return dataset.export(request.query_params, fmt=output, compress=compress).response(name)
+    except (ValidationError, ValueError, TypeError) as e:
+        return Response({'error': f"Filtre invalide: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+
+
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
 def admin_export_users(request):
     """
-    Export des utilisateurs en CSV
-    GET /api/admin/export/users/
+    Export des utilisateurs en flux (CSV par défaut, JSONL, gzip)
+    GET /api/admin/export/users/?role=&is_verified=&country=&output=csv|jsonl&gzip=true
     """
-    # Filtres
-    role = request.query_params.get('role', None)
-    is_verified = request.query_params.get('is_verified', None)
-    country = request.query_params.get('country', None)
-    
-    users = User.objects.all()
-    
-    if role:
-        users = users.filter(role=role)
-    if is_verified is not None:
-        users = users.filter(is_verified=is_verified.lower() == 'true')
-    if country:
-        users = users.filter(
-            Q(country_of_residence__icontains=country) |
-            Q(country_of_origin__icontains=country)
-        )
-    
-    # Créer le fichier CSV
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="users_export_{timezone.now().strftime("%Y%m%d_%H%M%S")}.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow([
-        'ID', 'Username', 'Email', 'Prénom', 'Nom', 'Téléphone', 'Rôle',
-        'Actif', 'Vérifié', 'Pays de résidence', 'Pays d\'origine',
-        'Date d\'inscription', 'Dernière connexion'
-    ])
-    
-    for user in users:
-        writer.writerow([
-            str(user.id),
-            user.username,
-            user.email,
-            user.first_name,
-            user.last_name,
-            user.phone,
-            user.get_role_display(),
-            'Oui' if user.is_active else 'Non',
-            'Oui' if user.is_verified else 'Non',
-            user.country_of_residence,
-            user.country_of_origin,
-            user.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-            user.last_login.strftime('%Y-%m-%d %H:%M:%S') if user.last_login else 'Jamais'
-        ])
-    
-    return response
+    return _stream_export(request, 'users')
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def admin_export_dataset(request, dataset):
+    """
+    Export en flux d'un jeu de données: contracts, savings_deposits, cohorts (ou users)
+    GET /api/admin/export/<dataset>/?output=csv|jsonl&gzip=true
+    """
+    return _stream_export(request, dataset)
 
 
 @api_view(['GET'])
@@ -416,78 +353,7 @@ def admin_business_intelligence(request):
     Business Intelligence et métriques avancées
     GET /api/admin/bi/
     """
-    now = timezone.now()
-    
-    # Métriques de croissance
-    current_month = now.replace(day=1)
-    last_month = (current_month - timedelta(days=1)).replace(day=1)
-    
-    current_month_users = User.objects.filter(created_at__gte=current_month).count()
-    last_month_users = User.objects.filter(
-        created_at__gte=last_month,
-        created_at__lt=current_month
-    ).count()
-    
-    user_growth_rate = 0
-    if last_month_users > 0:
-        user_growth_rate = round(((current_month_users - last_month_users) / last_month_users) * 100, 2)
-    
-    # Métriques d'engagement
-    active_users_7d = User.objects.filter(last_login__gte=now - timedelta(days=7)).count()
-    active_users_30d = User.objects.filter(last_login__gte=now - timedelta(days=30)).count()
-    total_users = User.objects.count()
-    
-    engagement_7d = round((active_users_7d / total_users * 100), 2) if total_users > 0 else 0
-    engagement_30d = round((active_users_30d / total_users * 100), 2) if total_users > 0 else 0
-    
-    # Métriques financières
-    total_investment = Contract.objects.filter(status='APPROVED').aggregate(
-        total=Sum('investment_amount')
-    )['total'] or 0
-    
-    monthly_investment = Contract.objects.filter(
-        status='APPROVED',
-        updated_at__gte=current_month
-    ).aggregate(total=Sum('investment_amount'))['total'] or 0
-    
-    # Conversion funnel
-    total_registrations = User.objects.count()
-    verified_users = User.objects.filter(is_verified=True).count()
-    users_with_contracts = Contract.objects.values('client').distinct().count()
-    approved_contracts = Contract.objects.filter(status='APPROVED').count()
-    
-    conversion_rates = {
-        'registration_to_verification': round((verified_users / total_registrations * 100), 2) if total_registrations > 0 else 0,
-        'verification_to_contract': round((users_with_contracts / verified_users * 100), 2) if verified_users > 0 else 0,
-        'contract_to_approval': round((approved_contracts / Contract.objects.count() * 100), 2) if Contract.objects.count() > 0 else 0
-    }
-    
-    # Top pays par utilisateurs
-    country_stats = User.objects.values('country_of_residence').annotate(
-        count=Count('id')
-    ).order_by('-count')[:10]
-    
-    return Response({
-        'growth_metrics': {
-            'user_growth_rate_monthly': user_growth_rate,
-            'new_users_current_month': current_month_users,
-            'new_users_last_month': last_month_users
-        },
-        'engagement_metrics': {
-            'active_users_7d': active_users_7d,
-            'active_users_30d': active_users_30d,
-            'engagement_rate_7d': engagement_7d,
-            'engagement_rate_30d': engagement_30d
-        },
-        'financial_metrics': {
-            'total_investment': float(total_investment),
-            'monthly_investment': float(monthly_investment),
-            'average_contract_value': float(total_investment / approved_contracts) if approved_contracts > 0 else 0
-        },
-        'conversion_funnel': conversion_rates,
-        'geographic_distribution': list(country_stats),
-        'generated_at': now.isoformat()
-    })
+    return Response(business_intelligence())
 
 
 # ===== SYSTÈME DE MATCHING SGI =====
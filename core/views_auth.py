@@ -29,6 +29,8 @@ from .serializers import (
     AdminUserCreationSerializer,
     OTPSerializer
 )
+from .services_auth import authenticate_identifier, minimal_user_payload
+from .services_platform_metrics import invalidate_otps
 
 
 # ================================
@@ -79,7 +81,11 @@ def send_otp_email(user, otp_code, purpose):
 
 
 def create_tokens_for_user(user):
-    """Crée les tokens JWT pour un utilisateur"""
+    """
+    Crée les tokens JWT pour un utilisateur
+    Claims limités à l'identifiant (user_id, plus exp/iat/jti/token_type): le profil
+    est relu côté API, les jetons restent courts à signer et à transmettre.
+    """
     try:
         refresh = RefreshToken.for_user(user)
         return {
@@ -601,11 +607,7 @@ def resend_otp(request):
         user = User.objects.get(id=user_id)
         
         # Invalider les anciens OTP
-        OTP.objects.filter(
-            user=user,
-            otp_type='REGISTRATION',
-            is_used=False
-        ).update(is_used=True)
+        invalidate_otps(OTP.objects.filter(user=user, otp_type='REGISTRATION'))
         
         # Créer un nouveau OTP
         otp_code = generate_otp_code()
@@ -641,101 +643,60 @@ def resend_otp(request):
 @permission_classes([AllowAny])
 def login_user(request):
     """
-    Connexion utilisateur avec email/mot de passe
+    Connexion utilisateur avec email ou téléphone et mot de passe
+
+    minimal=true (corps ou query string): l'utilisateur est renvoyé sous forme
+    réduite (id, email, nom, rôle, vérification) au lieu du UserSerializer complet
     """
-    logger.info(f"login_user called with data: {request.data}")
-    logger.info(f"Request headers: {dict(request.headers)}")
-    logger.info(f"Request method: {request.method}")
-    
     # Accepter 'email' ou 'username' comme clé pour l'identifiant
-    email = request.data.get('email') or request.data.get('username')
+    identifier = request.data.get('email') or request.data.get('username')
     password = request.data.get('password')
     
-    logger.info(f"Extracted email: {email}, password provided: {bool(password)}")
-    
-    if not email or not password:
-        logger.error("Login failed: Username or password missing")
+    if not identifier or not password:
         return Response({
             'error': 'Identifiant (email ou téléphone) et mot de passe requis'
         }, status=status.HTTP_400_BAD_REQUEST)
     
-    # Authentifier par email ou téléphone
     try:
-        logger.info(f"Attempting authentication with username: {email}")
-        
-        # Rechercher l'utilisateur directement dans la base
-        from django.db.models import Q
-        try:
-            user = User.objects.get(Q(email=email) | Q(phone=email))
-            logger.info(f"User found: {user.email}, checking password...")
-            if user.check_password(password):
-                authenticated_user = user
-                logger.info("Password check successful")
-            else:
-                authenticated_user = None
-                logger.warning("Password check failed")
-        except User.DoesNotExist:
-            authenticated_user = None
-            logger.warning(f"User not found: {email}")
-        except Exception as db_error:
-            logger.error(f"Database error during user lookup: {str(db_error)}")
-            authenticated_user = None
-        logger.info(f"Authentication result: {authenticated_user is not None}")
-        
-        if authenticated_user:
-            if not authenticated_user.is_active:
-                logger.warning(f"Login failed: User {email} is not active")
-                return Response({
-                    'error': 'Compte non activé. Vérifiez votre email.',
-                    'user_id': authenticated_user.id
-                }, status=status.HTTP_401_UNAUTHORIZED)
-            
-            logger.info(f"Login successful for user: {email}")
-            
-            # Générer les tokens
-            try:
-                tokens = create_tokens_for_user(authenticated_user)
-                logger.info("JWT tokens generated successfully")
-            except Exception as token_error:
-                logger.error(f"Token generation failed: {str(token_error)}")
-                return Response({
-                    'error': f'Erreur génération token: {str(token_error)}'
-                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            
-            # Mettre à jour la dernière connexion (skip for now to avoid timezone issues)
-            # try:
-            #     from django.utils import timezone
-            #     authenticated_user.last_login = timezone.now()
-            #     authenticated_user.save()
-            #     logger.info("Last login updated")
-            # except Exception as save_error:
-            #     logger.error(f"Failed to update last login: {str(save_error)}")
-            #     # Continue anyway, this is not critical
-            
-            return Response({
-                'message': 'Connexion réussie',
-                'user': UserSerializer(authenticated_user).data,
-                'tokens': tokens
-            }, status=status.HTTP_200_OK)
-        else:
-            logger.warning(f"Login failed: Invalid credentials for {email}")
-            return Response({
-                'error': 'Identifiant ou mot de passe incorrect'
-            }, status=status.HTTP_401_UNAUTHORIZED)
-            
-    except User.DoesNotExist:
-        logger.warning(f"Login failed: User {email} does not exist")
+        authenticated_user = authenticate_identifier(identifier, password)
+    except Exception as e:
+        logger.exception(f"Erreur lors de la connexion: {str(e)}")
+        return Response({
+            'error': f'Erreur serveur: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
+    if authenticated_user is None:
+        logger.warning("Échec de connexion: identifiant ou mot de passe incorrect")
         return Response({
             'error': 'Identifiant ou mot de passe incorrect'
         }, status=status.HTTP_401_UNAUTHORIZED)
-    except Exception as e:
-        import traceback
-        logger.error(f"Login error: {str(e)}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
+    
+    if not authenticated_user.is_active:
+        logger.warning(f"Échec de connexion: compte {authenticated_user.id} non activé")
         return Response({
-            'error': f'Erreur serveur: {str(e)}',
-            'traceback': traceback.format_exc()
+            'error': 'Compte non activé. Vérifiez votre email.',
+            'user_id': authenticated_user.id
+        }, status=status.HTTP_401_UNAUTHORIZED)
+    
+    # Générer les tokens
+    try:
+        tokens = create_tokens_for_user(authenticated_user)
+    except Exception as token_error:
+        return Response({
+            'error': f'Erreur génération token: {str(token_error)}'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
+    minimal = request.data.get('minimal', request.query_params.get('minimal', 'false'))
+    if str(minimal).lower() == 'true':
+        user_data = minimal_user_payload(authenticated_user)
+    else:
+        user_data = UserSerializer(authenticated_user).data
+    
+    return Response({
+        'message': 'Connexion réussie',
+        'user': user_data,
+        'tokens': tokens
+    }, status=status.HTTP_200_OK)
 
 
 # ================================
@@ -46,6 +46,7 @@ from .serializers_auth import (
 from .utils_sms import send_sms_otp
 from .utils_email import send_email_otp
 from .utils_kyc import KYCVerificationService
+from .services_platform_metrics import invalidate_otps
 
 User = get_user_model()
 
@@ -221,12 +222,13 @@ class CustomerOTPVerificationView(APIView):
             user.phone_verified = True
             user.save()
             
-            # Marquer les OTP comme utilisés
-            OTP.objects.filter(
+            # Marquer les OTP vérifiés comme utilisés, invalider les autres codes en attente
+            email_valid.mark_as_used()
+            sms_valid.mark_as_used()
+            invalidate_otps(OTP.objects.filter(
                 user=user,
-                otp_type__in=['EMAIL_VERIFICATION', 'PHONE_VERIFICATION'],
-                is_used=False
-            ).update(is_used=True)
+                otp_type__in=['EMAIL_VERIFICATION', 'PHONE_VERIFICATION']
+            ))
         
         # Générer les tokens JWT
         refresh = RefreshToken.for_user(user)
@@ -248,18 +250,14 @@ class CustomerOTPVerificationView(APIView):
         }, status=status.HTTP_200_OK)
     
     def verify_otp(self, user, code, otp_type):
-        """Vérifie un code OTP"""
-        try:
-            otp = OTP.objects.get(
-                user=user,
-                code=code,
-                otp_type=otp_type,
-                is_used=False,
-                expires_at__gt=timezone.now()
-            )
-            return True
-        except OTP.DoesNotExist:
-            return False
+        """Vérifie un code OTP (retourne l'OTP valide, sinon None)"""
+        return OTP.objects.filter(
+            user=user,
+            code=code,
+            otp_type=otp_type,
+            is_used=False,
+            expires_at__gt=timezone.now()
+        ).first()
 
 
 @extend_schema(
@@ -16,6 +16,8 @@ from datetime import datetime, timedelta
 from .models import User
 from .models_dashboard import UserInvestment, UserSavingsProgress, DashboardTransaction, UserDashboardStats
 from .models_savings_challenge import SavingsChallenge
+from .services_dashboard_stats import DashboardStatsService
+from .services_savings_progress import SavingsProgressRankIndex
 import logging
 
 logger = logging.getLogger(__name__)
@@ -29,52 +31,8 @@ def customer_dashboard_stats(request):
     logger.info(f"Dashboard stats request for user: {user.email}")
     
     try:
-        # Récupérer ou créer les stats du dashboard
-        dashboard_stats, created = UserDashboardStats.objects.get_or_create(
-            user=user,
-            defaults={
-                'total_portfolio_value': 0,
-                'total_invested_amount': 0,
-                'global_performance_percentage': 0,
-                'current_month_savings': 0,
-                'savings_rank': 0,
-                'total_savings': 0
-            }
-        )
-        
-        # Rafraîchir les statistiques si nécessaire (plus de 1h)
-        from django.utils import timezone
-        if created or (timezone.now() - dashboard_stats.last_updated).seconds > 3600:
-            dashboard_stats.refresh_stats()
-            dashboard_stats.save()
-        
-        # Force refresh pour debug
-        logger.info(f"Force refreshing stats for {user.email}")
-        dashboard_stats.refresh_stats()
-        dashboard_stats.save()
-        
-        # Calculer les données supplémentaires
-        from datetime import datetime
-        current_month = datetime.now().replace(day=1)
-        
-        # Épargne du mois actuel
-        monthly_savings = DashboardTransaction.objects.filter(
-            user=user,
-            transaction_type='SAVINGS',
-            status='CONFIRMED',
-            created_at__gte=current_month
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        # Rang dans le challenge actuel
-        active_challenge = SavingsChallenge.objects.filter(status='ACTIVE').first()
-        savings_rank = 0
-        if active_challenge:
-            user_progress = UserSavingsProgress.objects.filter(
-                user=user, 
-                challenge=active_challenge
-            ).first()
-            if user_progress:
-                savings_rank = user_progress.rank
+        # Instantané enregistré (recalculé en arrière-plan s'il est périmé)
+        dashboard_stats = DashboardStatsService().get(user)
         
         stats_data = {
             'user_id': str(user.id),
@@ -83,8 +41,8 @@ def customer_dashboard_stats(request):
             'total_portfolio_value': float(dashboard_stats.total_portfolio_value),
             'total_invested_amount': float(dashboard_stats.total_invested_amount),
             'global_performance_percentage': float(dashboard_stats.global_performance_percentage),
-            'current_month_savings': float(monthly_savings),
-            'savings_rank': savings_rank or dashboard_stats.savings_rank,
+            'current_month_savings': float(dashboard_stats.current_month_savings),
+            'savings_rank': dashboard_stats.savings_rank,
             'total_savings': float(dashboard_stats.total_savings),
             'last_updated': dashboard_stats.last_updated.isoformat()
         }
@@ -141,31 +99,17 @@ def user_savings_challenges(request):
     
     try:
         # Récupérer les progressions de l'utilisateur
-        user_progress = UserSavingsProgress.objects.filter(
+        user_progress = list(UserSavingsProgress.objects.filter(
             user=user
-        ).select_related('challenge').order_by('-created_at')
+        ).select_related('challenge').order_by('-created_at'))
+        
+        # Rangs, effectifs et podiums de tous les challenges en un aller-retour
+        summaries = SavingsProgressRankIndex().summaries(user_progress)
         
         challenges_data = []
         for progress in user_progress:
             challenge = progress.challenge
-            
-            # Calculer le classement global
-            total_participants = UserSavingsProgress.objects.filter(
-                challenge=challenge
-            ).count()
-            
-            # Top 3 du classement
-            leaderboard = UserSavingsProgress.objects.filter(
-                challenge=challenge
-            ).order_by('-current_amount')[:3]
-            
-            leaderboard_data = []
-            for i, leader in enumerate(leaderboard, 1):
-                leaderboard_data.append({
-                    'rank': i,
-                    'name': leader.user.get_full_name() or leader.user.username,
-                    'amount': float(leader.current_amount)
-                })
+            summary = summaries[str(challenge.id)]
             
             challenge_data = {
                 'id': str(challenge.id),
@@ -176,9 +120,9 @@ def user_savings_challenges(request):
                 'progress_percentage': float(progress.progress_percentage),
                 'streak_days': progress.streak_days,
                 'badges_earned': progress.badges_earned,
-                'rank': progress.rank,
-                'total_participants': total_participants,
-                'leaderboard': leaderboard_data,
+                'rank': summary['rank'],
+                'total_participants': summary['total_participants'],
+                'leaderboard': summary['leaderboard'],
                 'start_date': challenge.start_date.isoformat(),
                 'end_date': challenge.end_date.isoformat(),
                 'is_active': challenge.is_active,
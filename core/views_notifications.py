@@ -6,11 +6,18 @@ Endpoints REST pour la gestion des notifications
 from rest_framework import generics, status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
 from django.db.models import Q, Count, Avg, Sum, F
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 from datetime import datetime, timedelta
 from decimal import Decimal
+import uuid
 
 from .models_notifications import (
     NotificationTemplate, NotificationCampaign, Notification,
@@ -26,6 +33,11 @@ from .serializers_notifications import (
     WebhookEndpointCreateSerializer, NotificationPreferenceUpdateSerializer,
     NotificationStatsSerializer, CampaignStatsSerializer
 )
+from .services_campaigns import (
+    campaign_recipients, get_campaign_progress, start_campaign as start_campaign_fan_out
+)
+from .services_notification_inbox import INBOX_PAGE_SIZE, NotificationInbox, UnreadCounter
+from .services_notification_stream import NotificationStream
 
 User = get_user_model()
 
@@ -144,21 +156,14 @@ def start_campaign(request, campaign_id):
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    campaign.status = 'ACTIVE'
-    campaign.started_at = timezone.now()
-    campaign.save()
-    
-    recipients = _get_campaign_recipients(campaign)
-    notifications_created = _create_campaign_notifications(campaign, recipients)
-    
-    campaign.total_recipients = len(recipients)
-    campaign.save()
+    # Diffusion par tranches hors de la requête (thread ou worker run_campaigns)
+    start_campaign_fan_out(campaign)
     
     return Response({
-        'message': 'Campagne démarrée avec succès',
+        'message': 'Campagne démarrée, diffusion en cours',
         'campaign': NotificationCampaignSerializer(campaign).data,
-        'notifications_created': notifications_created
-    })
+        'progress': get_campaign_progress(campaign.id)
+    }, status=status.HTTP_202_ACCEPTED)
 
 
 class NotificationListView(generics.ListCreateAPIView):
@@ -219,7 +224,9 @@ def mark_as_read(request, notification_id):
     if notification.status == 'DELIVERED' and not notification.opened_at:
         notification.opened_at = timezone.now()
         notification.save()
-    
+        if notification.notification_type == 'IN_APP':
+            UnreadCounter().decrement(request.user.id)
+
     return Response({
         'message': 'Notification marquée comme lue',
         'notification': NotificationSerializer(notification).data
@@ -245,42 +252,34 @@ class NotificationPreferenceView(generics.RetrieveUpdateAPIView):
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def user_notifications(request):
-    """Notifications de l'utilisateur connecté"""
-    notifications = Notification.objects.filter(
-        recipient=request.user,
-        notification_type='IN_APP'
-    ).select_related('campaign').order_by('-created_at')
-    
-    # Filtres
+    """Notifications de l'utilisateur connecté (pagination par curseur)"""
+    inbox = NotificationInbox(request.user)
     unread_only = request.query_params.get('unread_only', 'false').lower() == 'true'
-    if unread_only:
-        notifications = notifications.filter(opened_at__isnull=True)
-    
-    # Pagination simple
-    page_size = int(request.query_params.get('page_size', 20))
-    page = int(request.query_params.get('page', 1))
-    offset = (page - 1) * page_size
     
-    total_count = notifications.count()
-    notifications_page = notifications[offset:offset + page_size]
-    
-    unread_count = Notification.objects.filter(
-        recipient=request.user,
-        notification_type='IN_APP',
-        opened_at__isnull=True
-    ).count()
+    try:
+        page_size = int(request.query_params.get('page_size', INBOX_PAGE_SIZE))
+        page = int(request.query_params.get('page', 1))
+        result = inbox.page(
+            page_size=page_size,
+            cursor=request.query_params.get('cursor'),
+            unread_only=unread_only,
+            page=page
+        )
+    except ValueError:
+        return Response(
+            {'error': 'Paramètres de pagination invalides'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     
     return Response({
-        'notifications': NotificationSerializer(notifications_page, many=True).data,
+        'notifications': NotificationSerializer(result['notifications'], many=True).data,
         'pagination': {
-            'page': page,
             'page_size': page_size,
-            'total_count': total_count,
-            'total_pages': (total_count + page_size - 1) // page_size
+            'next_cursor': result['next_cursor'],
+            'has_more': result['has_more']
         },
         'stats': {
-            'unread_count': unread_count,
-            'total_count': total_count
+            'unread_count': inbox.unread_count()
         }
     })
 
@@ -289,36 +288,20 @@ def user_notifications(request):
 @permission_classes([permissions.IsAuthenticated])
 def mark_notification_as_read(request, notification_id):
     """Marquer une notification comme lue"""
-    try:
-        notification = Notification.objects.get(
-            id=notification_id,
-            recipient=request.user
-        )
-        if not notification.opened_at:
-            notification.opened_at = timezone.now()
-            notification.status = 'OPENED'
-            notification.save()
-        
-        return Response({'success': True, 'message': 'Notification marquée comme lue'})
-    except Notification.DoesNotExist:
+    if not NotificationInbox(request.user).mark_read(notification_id, timezone.now()):
         return Response(
             {'error': 'Notification non trouvée'}, 
             status=status.HTTP_404_NOT_FOUND
         )
+    
+    return Response({'success': True, 'message': 'Notification marquée comme lue'})
 
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def mark_all_notifications_as_read(request):
     """Marquer toutes les notifications comme lues"""
-    updated_count = Notification.objects.filter(
-        recipient=request.user,
-        notification_type='IN_APP',
-        opened_at__isnull=True
-    ).update(
-        opened_at=timezone.now(),
-        status='OPENED'
-    )
+    updated_count = NotificationInbox(request.user).mark_all_read(timezone.now())
     
     return Response({
         'success': True, 
@@ -329,14 +312,65 @@ def mark_all_notifications_as_read(request):
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def notification_count(request):
-    """Nombre de notifications non lues"""
-    unread_count = Notification.objects.filter(
-        recipient=request.user,
-        notification_type='IN_APP',
-        opened_at__isnull=True
-    ).count()
+    """Nombre de notifications non lues (compteur en cache)"""
+    return Response({'unread_count': NotificationInbox(request.user).unread_count()})
+
+
+def _stream_user(request):
+    """
+    Utilisateur authentifié par JWT: en-tête Authorization, ou paramètre token
+    (EventSource ne permet pas d'envoyer d'en-têtes)
+    """
+    authentication = JWTAuthentication()
+    try:
+        raw_token = request.GET.get('token')
+        if raw_token:
+            return authentication.get_user(authentication.get_validated_token(raw_token))
+        result = authentication.authenticate(request)
+        return result[0] if result else None
+    except (AuthenticationFailed, InvalidToken, TokenError):
+        return None
+
+
+async def notification_stream(request):
+    """
+    Flux temps réel des notifications in-app (text/event-stream)
+    
+    Servi par ASGI (xamila/asgi.py): chaque connexion est une tâche asyncio, pas un
+    thread. Le client se reconnecte automatiquement après STREAM_MAX_SECONDS en
+    renvoyant Last-Event-ID, ce qui rattrape les notifications manquées.
+    
+    Sous WSGI (gunicorn), Django met en tampon tout le flux asynchrone: le client ne
+    recevrait rien avant la fin et un worker synchrone resterait bloqué. Le flux
+    répond alors 501; le client se rabat sur user_notifications / notification_count.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {'error': 'Flux temps réel indisponible sur ce serveur', 'code': 'STREAM_REQUIRES_ASGI'},
+            status=501
+        )
+    
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Méthode non autorisée'}, status=405)
+    
+    user = await sync_to_async(_stream_user)(request)
+    if user is None or not user.is_active:
+        return JsonResponse({'error': 'Authentification requise'}, status=401)
     
-    return Response({'unread_count': unread_count})
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    if last_event_id:
+        try:
+            last_event_id = str(uuid.UUID(last_event_id))
+        except ValueError:
+            last_event_id = None
+    
+    response = StreamingHttpResponse(
+        NotificationStream(user.id, last_event_id).events(),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # pas de mise en tampon par nginx
+    return response
 
 
 class WebhookEndpointListView(generics.ListCreateAPIView):
@@ -398,108 +432,10 @@ def notification_stats(request):
 
 def _calculate_campaign_recipients(campaign):
     """Calculer le nombre de destinataires d'une campagne"""
-    recipients = _get_campaign_recipients(campaign)
-    campaign.total_recipients = len(recipients)
+    campaign.total_recipients = campaign_recipients(campaign).count()
     campaign.save()
 
 
-def _get_campaign_recipients(campaign):
-    """Récupérer la liste des destinataires d'une campagne"""
-    if campaign.target_audience == 'ALL_USERS':
-        return User.objects.filter(is_active=True)
-    elif campaign.target_audience == 'CUSTOMERS':
-        return User.objects.filter(role='CUSTOMER', is_active=True)
-    elif campaign.target_audience == 'SGI_MANAGERS':
-        return User.objects.filter(role='SGI_MANAGER', is_active=True)
-    elif campaign.target_audience == 'STUDENTS':
-        return User.objects.filter(role='STUDENT', is_active=True)
-    elif campaign.target_audience == 'CUSTOM':
-        queryset = User.objects.filter(is_active=True)
-        filters = campaign.custom_audience_filter
-        
-        if 'roles' in filters:
-            queryset = queryset.filter(role__in=filters['roles'])
-        if 'registration_date_after' in filters:
-            queryset = queryset.filter(date_joined__gte=filters['registration_date_after'])
-        
-        return queryset
-    
-    return User.objects.none()
-
-
-def _create_campaign_notifications(campaign, recipients):
-    """Créer les notifications pour une campagne"""
-    template = campaign.template
-    notifications_created = 0
-    
-    for recipient in recipients:
-        if not _should_send_notification(recipient, template.category):
-            continue
-        
-        context = _get_notification_context(recipient)
-        subject = _render_template(template.subject_template, context)
-        message = _render_template(template.body_template, context)
-        
-        notification = Notification.objects.create(
-            recipient=recipient,
-            campaign=campaign,
-            notification_type=template.template_type,
-            subject=subject,
-            message=message,
-            priority='NORMAL',
-            scheduled_at=campaign.scheduled_at
-        )
-        
-        NotificationQueue.objects.create(
-            notification=notification,
-            priority=notification.priority
-        )
-        
-        notifications_created += 1
-    
-    return notifications_created
-
-
-def _should_send_notification(user, category):
-    """Vérifier si une notification doit être envoyée"""
-    try:
-        preferences = NotificationPreference.objects.get(user=user)
-        if preferences.global_opt_out:
-            return False
-        
-        user_prefs = preferences.preferences
-        if category in user_prefs.get('EMAIL', {}):
-            return user_prefs['EMAIL'][category]
-        
-        return True
-    except NotificationPreference.DoesNotExist:
-        return True
-
-
-def _get_notification_context(user):
-    """Récupérer le contexte pour personnaliser une notification"""
-    return {
-        'user_name': user.get_full_name() or user.username,
-        'user_email': user.email,
-        'user_first_name': user.first_name,
-        'user_last_name': user.last_name,
-        'current_date': timezone.now().strftime('%d/%m/%Y'),
-    }
-
-
-def _render_template(template_string, context):
-    """Rendre un template avec le contexte donné"""
-    if not template_string:
-        return ''
-    
-    try:
-        from django.template import Template, Context
-        template = Template(template_string)
-        return template.render(Context(context))
-    except Exception:
-        return template_string
-
-
 def _get_default_preferences():
     """Récupérer les préférences par défaut"""
     return {
@@ -5,9 +5,14 @@ from rest_framework.generics import ListAPIView
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from .models_permissions import Permission, RolePermission
 from .serializers import PermissionSerializer, RolePermissionSerializer
 from .permissions import IsAdminUser
+from .services_permissions import (
+    MATRIX_CACHE_NAMESPACE, MATRIX_CACHE_TTL, MAX_CHECK_CODES, check_permissions, has_permission, role_permissions
+)
+from .utils_cache import make_cache_key
 
 # Données de test temporaires pour les permissions
 TEST_PERMISSIONS = [
@@ -33,6 +38,9 @@ class UserPermissionsView(generics.ListAPIView):
     """
     Récupère les permissions d'un utilisateur basées sur son rôle
     GET /api/user/permissions/
+
+    La liste sérialisée de chaque rôle est partagée en cache et invalidée avec la
+    matrice des permissions.
     """
     serializer_class = RolePermissionSerializer
     permission_classes = [IsAuthenticated]
@@ -48,6 +56,22 @@ class UserPermissionsView(generics.ListAPIView):
         # Retourner les RolePermissions au lieu des Permissions pour avoir is_granted
         return role_permissions
 
+    def list(self, request, *args, **kwargs):
+        role = request.user.role
+        if not role_permissions(role):
+            data = []
+        else:
+            key = make_cache_key(MATRIX_CACHE_NAMESPACE, {'view': 'user_permissions', 'role': role})
+            data = cache.get(key)
+            if data is None:
+                data = self.get_serializer(self.get_queryset().order_by('id'), many=True).data
+                cache.set(key, data, MATRIX_CACHE_TTL)
+
+        page = self.paginate_queryset(data)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(data)
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def check_permission(request, permission_code):
@@ -55,18 +79,36 @@ def check_permission(request, permission_code):
     Vérifie si l'utilisateur a une permission spécifique
     GET /api/user/permissions/check/{permission_code}/
     """
-    user = request.user
-    
-    try:
-        # Vérifier si la permission existe et est accordée pour ce rôle
-        role_permission = RolePermission.objects.get(
-            role=user.role,
-            permission__code=permission_code,
-            is_granted=True
-        )
-        return Response({'has_permission': True})
-    except RolePermission.DoesNotExist:
-        return Response({'has_permission': False})
+    return Response({'has_permission': has_permission(request.user, permission_code)})
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+def check_permissions_batch(request):
+    """
+    Vérifie plusieurs permissions en un appel
+    GET /api/user/permissions/check/?codes=users.view,users.edit
+    POST /api/user/permissions/check/ {"codes": ["users.view", "users.edit"]}
+    """
+    if request.method == 'POST':
+        codes = request.data.get('codes') or []
+    else:
+        codes = request.query_params.get('codes', '').split(',')
+    if not isinstance(codes, list):
+        return Response({
+            'error': 'codes doit être une liste de codes de permission'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    codes = list(dict.fromkeys(str(code).strip() for code in codes if str(code).strip()))
+    if not codes:
+        return Response({
+            'error': 'Au moins un code de permission est requis'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    if len(codes) > MAX_CHECK_CODES:
+        return Response({
+            'error': f'{MAX_CHECK_CODES} codes au maximum par appel'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({'permissions': check_permissions(request.user, codes)})
 
 @api_view(['GET'])
 def admin_permissions_list(request):
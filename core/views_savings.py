@@ -13,6 +13,8 @@ from django.utils import timezone
 from django.db.models import Sum, Count
 from .models_savings_challenge import SavingsAccount, SavingsDeposit, SavingsGoal, ChallengeParticipation
 from .models import User
+from .services_savings_ledger import SavingsLedgerService, SavingsLedgerError, get_or_create_main_account
+from .services_community import CommunityStatsService, SaversDirectory, saver_row
 
 logger = logging.getLogger(__name__)
 
@@ -26,23 +28,11 @@ def savings_account(request):
         user = request.user
         logger.info(f"Savings account request for user: {user.email}")
         
-        # Récupérer le compte d'épargne principal
-        savings_account = SavingsAccount.objects.filter(
-            user=user,
-            status='ACTIVE'
-        ).first()
-        
-        if not savings_account:
-            # Créer un compte par défaut s'il n'existe pas
-            savings_account = SavingsAccount.objects.create(
-                user=user,
-                account_name="Compte Principal",
-                account_number=f"ACC{str(user.id)[:8]}",
-                balance=Decimal('0.00'),
-                account_type='BASIC',
-                status='ACTIVE'
-            )
-            logger.info(f"Created default savings account for {user.email}")
+        # Récupérer le compte d'épargne principal (créé par défaut s'il n'existe pas)
+        try:
+            savings_account = get_or_create_main_account(user)
+        except SavingsLedgerError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
         # Calculer les statistiques
         total_deposits = SavingsDeposit.objects.filter(
@@ -229,49 +219,6 @@ def savings_deposit(request):
                 'error': 'Montant invalide'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Récupérer ou créer une participation active
-        from .models_savings_challenge import ChallengeParticipation, SavingsChallenge
-        participation = ChallengeParticipation.objects.filter(
-            user=user,
-            status='ACTIVE'
-        ).first()
-        
-        if not participation:
-            # Créer un défi par défaut s'il n'existe pas
-            default_challenge = SavingsChallenge.objects.filter(
-                status='ACTIVE',
-                is_public=True
-            ).first()
-            
-            if not default_challenge:
-                # Créer un défi par défaut
-                from datetime import date, timedelta
-                start_date = date.today()
-                end_date = start_date + timedelta(days=30)
-                
-                default_challenge = SavingsChallenge.objects.create(
-                    title="Défi d'épargne général",
-                    description="Défi d'épargne pour tous les utilisateurs",
-                    short_description="Défi d'épargne mensuel pour débutants",
-                    challenge_type='MONTHLY',
-                    category='BEGINNER',
-                    target_amount=Decimal('50000.00'),
-                    minimum_deposit=Decimal('1000.00'),
-                    duration_days=30,
-                    start_date=start_date,
-                    end_date=end_date,
-                    is_public=True,
-                    status='ACTIVE',
-                    created_by=user
-                )
-            
-            participation = ChallengeParticipation.objects.create(
-                user=user,
-                challenge=default_challenge,
-                personal_target=default_challenge.target_amount,
-                status='ACTIVE'
-            )
-        
         # Mapper la méthode de dépôt
         method_mapping = {
             'home': 'CASH',
@@ -280,38 +227,26 @@ def savings_deposit(request):
         }
         deposit_method = method_mapping.get(methode_depot, 'BANK_TRANSFER')
         
-        # Récupérer la banque depuis les données
-        banque = request.data.get('banque', '')
-        
-        # Créer le dépôt
-        deposit = SavingsDeposit.objects.create(
-            participation=participation,
-            amount=montant,
-            deposit_method=deposit_method,
-            bank_name=banque,
-            status='CONFIRMED',
-            transaction_reference=f'DEP{uuid.uuid4().hex[:20]}',
-            processed_at=timezone.now()
-        )
-        
-        # Mettre à jour la participation
-        participation.total_saved += montant
-        participation.deposits_count += 1
-        participation.points_earned += int(montant / 1000)  # 1 point par 1000 FCFA
-        participation.save()
-        
-        # Mettre à jour le compte d'épargne
-        savings_account = SavingsAccount.objects.filter(
-            user=user,
-            status='ACTIVE'
-        ).first()
+        # Écriture au grand livre et mise à jour atomique des soldes
+        # (une référence déjà reçue, ex: callback mobile money rejoué, n'est comptée qu'une fois)
+        try:
+            result = SavingsLedgerService().deposit(
+                user, montant, deposit_method,
+                bank_name=banque or '',
+                reference=request.data.get('reference') or None
+            )
+        except SavingsLedgerError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
-        if savings_account:
-            savings_account.balance += montant
-            savings_account.save()
-            nouveau_solde = str(savings_account.balance)
-        else:
-            nouveau_solde = str(montant)
+        deposit = result.entry.deposit
+        nouveau_solde = str(result.balance)
+        if result.replayed:
+            return Response({
+                'success': True,
+                'message': 'Dépôt déjà enregistré',
+                'nouveau_solde': nouveau_solde,
+                'reference': result.entry.reference
+            }, status=status.HTTP_200_OK)
         
         # Créer une notification pour le dépôt
         try:
@@ -385,52 +320,20 @@ def savings_withdraw(request):
                 'error': 'Montant invalide'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Vérifier le solde disponible
-        savings_account = SavingsAccount.objects.filter(
-            user=user,
-            status='ACTIVE'
-        ).first()
-        
-        if not savings_account or savings_account.balance < montant:
-            return Response({
-                'error': 'Solde insuffisant'
-            }, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Trouver la participation active
-        participation = ChallengeParticipation.objects.filter(
-            user=user,
-            status='ACTIVE'
-        ).first()
-        
-        if not participation:
-            return Response({
-                'error': 'Aucune participation active trouvée'
-            }, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Créer l'enregistrement de retrait comme dépôt négatif
-        withdrawal = SavingsDeposit.objects.create(
-            participation=participation,
-            amount=-montant,  # Montant négatif pour le retrait
-            deposit_method='WITHDRAWAL',
-            bank_name='',
-            status='CONFIRMED',
-            transaction_reference=f'WTH{uuid.uuid4().hex[:20]}',
-            processed_at=timezone.now()
-        )
-        
-        # Mettre à jour la participation
-        participation.total_saved -= montant
-        participation.save()
-        
-        # Mettre à jour le solde du compte
-        savings_account.balance -= montant
-        savings_account.save()
+        # Débit conditionnel et écriture au grand livre dans une transaction
+        try:
+            result = SavingsLedgerService().withdraw(
+                user, montant,
+                reference=request.data.get('reference') or None
+            )
+        except SavingsLedgerError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
         response_data = {
             'success': True,
             'message': f'Retrait de {montant:,} FCFA effectué avec succès'.replace('/', '.'),
-            'nouveau_solde': str(savings_account.balance),
-            'reference': withdrawal.transaction_reference
+            'nouveau_solde': str(result.balance),
+            'reference': result.entry.reference
         }
         
         logger.info(f"Withdrawal processed successfully for {user.email}: {montant} FCFA")
@@ -451,126 +354,28 @@ def collective_progress(request):
     """Récupère les données de progression collective"""
     
     try:
-        from .models_savings_challenge import ChallengeParticipation, SavingsChallenge
-        
-        # Statistiques globales - utiliser les comptes d'épargne pour cohérence
-        total_participants = SavingsAccount.objects.filter(status='ACTIVE').count()
-        total_saved = SavingsAccount.objects.filter(status='ACTIVE').aggregate(
-            total=Sum('balance')
-        )['total'] or 0
-        
-        # Défis actifs
-        active_challenges = SavingsChallenge.objects.filter(
-            status='ACTIVE',
-            is_public=True
-        ).count()
-        
-        # Progression par défi
-        challenges_progress = []
-        for challenge in SavingsChallenge.objects.filter(status='ACTIVE', is_public=True)[:5]:
-            participants = ChallengeParticipation.objects.filter(
-                challenge=challenge,
-                status='ACTIVE'
-            )
-            
-            total_saved_challenge = participants.aggregate(
-                total=Sum('total_saved')
-            )['total'] or 0
-            
-            progress_percentage = 0
-            if challenge.target_amount > 0:
-                progress_percentage = min(100, (total_saved_challenge / challenge.target_amount) * 100)
-            
-            challenges_progress.append({
-                'id': str(challenge.id),
-                'title': challenge.title,
-                'description': challenge.description,
-                'target_amount': float(challenge.target_amount),
-                'current_amount': float(total_saved_challenge),
-                'progress_percentage': round(progress_percentage, 2),
-                'participants_count': participants.count(),
-                'end_date': challenge.end_date.isoformat() if challenge.end_date else None
-            })
-        
-        # Top participants (anonymisés)
-        top_participants = []
-        participations = ChallengeParticipation.objects.filter(
-            status='ACTIVE'
-        ).order_by('-total_saved')[:10]
-        
-        for i, participation in enumerate(participations, 1):
-            top_participants.append({
-                'rank': i,
-                'username': f"Épargnant #{i}",
-                'total_saved': float(participation.total_saved),
-                'challenge': participation.challenge.title,
-                'progress_percentage': round(participation.progress_percentage, 2)
-            })
+        # Totaux et classement tenus dans l'index communautaire (cache partagé)
+        community = CommunityStatsService()
         
-        # Calculer le niveau de la communauté basé sur le montant total
-        community_level = min(5, max(1, int(total_saved / 10000000)))  # 1 niveau par 10M FCFA
-        next_level_target = (community_level + 1) * 10000000
-        progress_to_next = (total_saved / next_level_target) * 100 if next_level_target > 0 else 0
-        
-        # Adapter la structure pour correspondre au frontend - utiliser les comptes d'épargne
-        top_savers = []
-        for i, account in enumerate(SavingsAccount.objects.filter(status='ACTIVE').order_by('-balance')[:10], 1):
-            # Calculer la progression basée sur l'objectif d'épargne mensuel en BD
-            progress = 0
-            if account.user.monthly_savings_goal > 0:
-                progress = (account.balance / account.user.monthly_savings_goal) * 100
-            
-            # Utiliser le username ou construire un nom d'affichage
-            display_name = account.user.username if account.user.username else f"Épargnant #{i}"
-            
-            top_savers.append({
-                'id': str(account.user.id),
-                'display_name': display_name,
-                'amount': float(account.balance),
-                'is_current_user': account.user == request.user,
-                'level': min(5, max(1, int(account.balance / 100000))),  # 1 niveau par 100K FCFA
-                'progress': round(progress, 2),
-                'rank': i
-            })
+        top_savers = community.top_savers(limit=10)
+        for saver in top_savers:
+            saver['is_current_user'] = saver['id'] == str(request.user.id)
         
         # Utilisateur actuel - utiliser l'utilisateur authentifié
-        current_user_account = SavingsAccount.objects.filter(
-            user=request.user,
-            status='ACTIVE'
-        ).first()
-        
         current_user = None
-        if current_user_account:
-            user_rank = list(SavingsAccount.objects.filter(
+        user_rank = community.rank_of_user(request.user.id)
+        if user_rank is not None:
+            current_user_account = SavingsAccount.objects.filter(
+                user=request.user,
                 status='ACTIVE'
-            ).order_by('-balance').values_list('user__id', flat=True)).index(current_user_account.user.id) + 1
-            
-            # Calculer la progression basée sur l'objectif d'épargne mensuel en BD
-            progress = 0
-            if current_user_account.user.monthly_savings_goal > 0:
-                progress = (current_user_account.balance / current_user_account.user.monthly_savings_goal) * 100
-            
-            # Utiliser le username ou le nom complet
-            display_name = current_user_account.user.username if current_user_account.user.username else f"{current_user_account.user.first_name} {current_user_account.user.last_name}"
-            
-            current_user = {
-                'id': str(current_user_account.user.id),
-                'display_name': display_name,
-                'amount': float(current_user_account.balance),
-                'is_current_user': True,
-                'level': min(5, max(1, int(current_user_account.balance / 100000))),
-                'progress': round(progress, 2),
-                'rank': user_rank
-            }
+            ).order_by('-balance').first()
+            if current_user_account:
+                current_user_account.user = request.user
+                current_user = saver_row(current_user_account, user_rank)
+                current_user['is_current_user'] = True
         
         response_data = {
-            'community_stats': {
-                'total_participants': total_participants,
-                'total_saved': float(total_saved),
-                'community_level': community_level,
-                'next_level_target': next_level_target,
-                'progress_to_next': round(progress_to_next, 2)
-            },
+            'community_stats': community.totals(),
             'top_savers': top_savers,
             'current_user': current_user
         }
@@ -590,75 +395,54 @@ def collective_progress(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def all_savers(request):
-    """Récupère tous les épargnants avec pagination et recherche"""
+    """Récupère tous les épargnants avec pagination par curseur et recherche"""
     
     try:
-        from django.core.paginator import Paginator
-        from .models_savings_challenge import ChallengeParticipation
-        
         # Paramètres de pagination
-        page = int(request.GET.get('page', 1))
-        page_size = int(request.GET.get('page_size', 10))
+        try:
+            page = max(int(request.GET.get('page', 1)), 1)
+            page_size = int(request.GET.get('page_size', 10))
+        except ValueError:
+            return Response({'error': 'page et page_size doivent être des entiers'}, status=status.HTTP_400_BAD_REQUEST)
+        cursor = request.GET.get('cursor') or None
         search = request.GET.get('search', '').strip()
         
-        # Base queryset - tous les comptes d'épargne actifs
-        queryset = SavingsAccount.objects.filter(status='ACTIVE').order_by('-balance')
-        
-        # Filtrage par recherche si fourni
-        if search:
-            queryset = queryset.filter(
-                Q(user__first_name__icontains=search) |
-                Q(user__last_name__icontains=search) |
-                Q(user__email__icontains=search)
-            )
-        
-        # Pagination
-        paginator = Paginator(queryset, page_size)
-        page_obj = paginator.get_page(page)
+        try:
+            directory = SaversDirectory().page(page_size=page_size, cursor=cursor, page=page, search=search)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
         # Construire la liste des épargnants
         savers_list = []
-        for i, account in enumerate(page_obj.object_list):
-            # Calculer le rang global
-            global_rank = (page - 1) * page_size + i + 1
-            
-            # Calculer la progression basée sur l'objectif d'épargne mensuel en BD
-            progress = 0
-            if account.user.monthly_savings_goal > 0:
-                progress = (account.balance / account.user.monthly_savings_goal) * 100
-            
-            # Utiliser le username ou construire un nom d'affichage
-            display_name = account.user.username if account.user.username else f"{account.user.first_name} {account.user.last_name}"
-            username = account.user.username if account.user.username else account.user.email
-            
-            savers_list.append({
-                'id': str(account.user.id),
-                'display_name': display_name,
-                'username': username,
-                'first_name': account.user.first_name or '',
-                'last_name': account.user.last_name or '',
-                'email': account.user.email or '',
-                'country': account.user.country or '',
-                'country_of_residence': account.user.country_of_residence or '',
-                'amount': float(account.balance),
+        for account in directory['accounts']:
+            user = account.user
+            saver = saver_row(account, account.global_rank)
+            saver.update({
+                'username': user.username if user.username else user.email,
+                'first_name': user.first_name or '',
+                'last_name': user.last_name or '',
+                'email': user.email or '',
+                'country': user.country or '',
+                'country_of_residence': user.country_of_residence or '',
                 'total_savings': float(account.balance),
-                'is_current_user': account.user == request.user,
-                'level': min(5, max(1, int(account.balance / 100000))),
-                'progress': round(progress, 2),
-                'rank': global_rank,
-                'savings_goal': float(account.user.monthly_savings_goal),
+                'is_current_user': user.id == request.user.id,
+                'savings_goal': float(user.monthly_savings_goal),
                 'current_savings': float(account.balance)
             })
+            savers_list.append(saver)
         
-        # Construire la réponse paginée
+        # Construire la réponse paginée (numéros de page conservés pour le parcours sans recherche)
+        current_page = directory['page']
+        has_next = directory['next_cursor'] is not None
         response_data = {
             'results': savers_list,
-            'count': paginator.count,
-            'next': page_obj.next_page_number() if page_obj.has_next() else None,
-            'previous': page_obj.previous_page_number() if page_obj.has_previous() else None
+            'count': directory['count'],
+            'next_cursor': directory['next_cursor'],
+            'next': current_page + 1 if current_page and has_next else None,
+            'previous': current_page - 1 if current_page and current_page > 1 else None
         }
         
-        logger.info(f"All savers data retrieved successfully - Page {page}/{paginator.num_pages}")
+        logger.info(f"All savers data retrieved successfully - {len(savers_list)} result(s)")
         return Response(response_data, status=status.HTTP_200_OK)
         
     except Exception as e:
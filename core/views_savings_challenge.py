@@ -13,13 +13,14 @@ from decimal import Decimal
 
 from .models_savings_challenge import (
     SavingsChallenge, ChallengeParticipation, SavingsDeposit,
-    SavingsGoal, SavingsAccount, ChallengeLeaderboard
+    SavingsGoal, SavingsAccount
 )
 from .serializers_savings_challenge import (
     SavingsChallengeSerializer, ChallengeParticipationSerializer,
     SavingsDepositSerializer, SavingsGoalSerializer,
     SavingsAccountSerializer, ChallengeLeaderboardSerializer
 )
+from .services_challenge_leaderboard import ChallengeLeaderboardService
 from .utils_cohorte_access import verifier_acces_challenge_actif
 
 
@@ -332,20 +333,53 @@ def get_leaderboard(request, challenge_id):
             status=status.HTTP_404_NOT_FOUND
         )
     
-    # Récupérer le classement
-    leaderboard = ChallengeLeaderboard.objects.filter(
-        challenge=challenge
-    ).select_related('participation__user').order_by('rank')
+    try:
+        window = int(request.query_params.get('window', 10))
+        page = int(request.query_params.get('page', 1))
+        page_size = int(request.query_params.get('page_size', 50))
+    except (TypeError, ValueError):
+        return Response(
+            {'error': 'window, page et page_size doivent être des entiers'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    leaderboard = ChallengeLeaderboardService(challenge.id)
+    leaderboard.ensure()
     
-    serializer = ChallengeLeaderboardSerializer(leaderboard, many=True)
-    return Response(serializer.data)
+    # Fenêtre "mon rang ± window" ou page du classement matérialisé
+    around_me = request.query_params.get('around_me') == 'true'
+    my_participation_id = ChallengeParticipation.objects.filter(
+        challenge=challenge,
+        user=request.user
+    ).values_list('id', flat=True).first()
+    
+    if around_me:
+        window = min(max(window, 0), 100)
+        if my_participation_id is None:
+            entries, my_rank = [], None
+        else:
+            entries, my_rank = leaderboard.around(my_participation_id, radius=window)
+    else:
+        page = max(page, 1)
+        page_size = min(max(page_size, 1), 200)
+        entries = leaderboard.window((page - 1) * page_size, page_size)
+        my_rank = leaderboard.rank_of(my_participation_id) if my_participation_id else None
+    
+    # Le corps reste la liste des lignes; effectif et rang de l'utilisateur en en-têtes
+    serializer = ChallengeLeaderboardSerializer(entries, many=True)
+    response = Response(serializer.data)
+    response['X-Total-Count'] = leaderboard.count()
+    if my_rank is not None:
+        response['X-My-Rank'] = my_rank
+    return response
 
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def update_leaderboard(request, challenge_id):
     """
-    Mettre à jour le classement d'un défi (admin seulement)
+    Resynchroniser le classement d'un défi (admin seulement)
+    Le classement est tenu à jour à chaque mouvement: seules les lignes divergentes sont réécrites.
     """
     if not request.user.role in ['ADMIN', 'SUPPORT']:
         return Response(
@@ -361,37 +395,9 @@ def update_leaderboard(request, challenge_id):
             status=status.HTTP_404_NOT_FOUND
         )
     
-    # Supprimer l'ancien classement
-    ChallengeLeaderboard.objects.filter(challenge=challenge).delete()
-    
-    # Calculer le nouveau classement
-    participations = ChallengeParticipation.objects.filter(
-        challenge=challenge,
-        status__in=['ACTIVE', 'COMPLETED']
-    ).order_by('-total_saved', '-points_earned')
-    
-    # Créer les nouvelles entrées de classement
-    leaderboard_entries = []
-    for rank, participation in enumerate(participations, 1):
-        # Calculer le score basé sur plusieurs facteurs
-        progress_score = participation.progress_percentage
-        streak_score = participation.longest_streak * 5
-        consistency_score = participation.deposits_count * 2
-        
-        total_score = progress_score + streak_score + consistency_score
-        
-        leaderboard_entries.append(
-            ChallengeLeaderboard(
-                challenge=challenge,
-                participation=participation,
-                rank=rank,
-                score=Decimal(str(total_score))
-            )
-        )
-    
-    ChallengeLeaderboard.objects.bulk_create(leaderboard_entries)
+    written = ChallengeLeaderboardService(challenge.id).resync()
     
-    return Response({'message': 'Classement mis à jour avec succès'})
+    return Response({'message': 'Classement mis à jour avec succès', 'updated_entries': written})
 
 
 # Vues pour les objectifs d'épargne personnels
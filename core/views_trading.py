@@ -21,6 +21,13 @@ from .serializers_trading import (
     TradingCompetitionSerializer, CompetitionParticipantSerializer,
     PortfolioCreateSerializer, OrderCreateSerializer, CompetitionCreateSerializer
 )
+from .services_candles import CandleRollupService, DEFAULT_MAX_POINTS
+from .services_leaderboard import CompetitionLeaderboard
+from .services_trading import OrderExecutionService, OrderExecutionError
+
+# Historique des prix: plafond de points et formats de réponse (lignes par défaut)
+MAX_POINTS_LIMIT = 5000
+PRICE_HISTORY_LAYOUTS = ('rows', 'columns')
 
 
 class StockListView(generics.ListAPIView):
@@ -70,6 +77,8 @@ class StockDetailView(generics.RetrieveAPIView):
 def stock_price_history(request, stock_id):
     """
     Historique des prix d'une action
+    GET ?timeframe=1DAY&days=30&max_points=500&layout=rows|columns
+    (layout=columns: séries compactes en colonnes, sur demande)
     """
     try:
         stock = StockExtended.objects.get(id=stock_id, is_active=True)
@@ -81,23 +90,55 @@ def stock_price_history(request, stock_id):
     
     # Paramètres de filtrage
     timeframe = request.query_params.get('timeframe', '1DAY')
-    days = int(request.query_params.get('days', 30))
+    try:
+        days = int(request.query_params.get('days', 30))
+        max_points = int(request.query_params.get('max_points', DEFAULT_MAX_POINTS))
+    except (TypeError, ValueError):
+        return Response(
+            {'error': 'days et max_points doivent être des entiers'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if days < 1 or max_points < 1:
+        return Response(
+            {'error': 'days et max_points doivent être positifs'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    max_points = min(max_points, MAX_POINTS_LIMIT)
+    output = request.query_params.get('layout', 'rows')
+    if output not in PRICE_HISTORY_LAYOUTS:
+        return Response(
+            {'error': f"Format invalide: {output}", 'available': list(PRICE_HISTORY_LAYOUTS)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     
-    # Récupérer l'historique
+    # Série servie depuis la résolution stockée la plus proche, sous-échantillonnée
     start_date = timezone.now() - timedelta(days=days)
-    price_history = PriceHistory.objects.filter(
-        stock=stock,
-        timeframe=timeframe,
-        timestamp__gte=start_date
-    ).order_by('timestamp')
+    series = CandleRollupService().get_series(stock, timeframe, start_date, max_points=max_points)
     
-    serializer = PriceHistorySerializer(price_history, many=True)
-    return Response({
+    columns = series['columns']
+    
+    response = {
         'stock': StockExtendedSerializer(stock).data,
-        'price_history': serializer.data,
-        'timeframe': timeframe,
-        'period_days': days
-    })
+        'timeframe': series['timeframe'],
+        'requested_timeframe': timeframe,
+        'downsampled': series['downsampled'],
+        'period_days': days,
+        'layout': output,
+    }
+    if output == 'columns':
+        response['columns'] = columns
+    else:
+        response['price_history'] = [
+            {
+                'timestamp': ts, 'timeframe': series['timeframe'],
+                'open_price': o, 'high_price': h, 'low_price': l, 'close_price': c, 'volume': v,
+            }
+            for ts, o, h, l, c, v in zip(
+                columns['timestamp'], columns['open'], columns['high'],
+                columns['low'], columns['close'], columns['volume']
+            )
+        ]
+    return Response(response)
 
 
 class PortfolioListView(generics.ListCreateAPIView):
@@ -250,132 +291,20 @@ class TradingOrderDetailView(generics.RetrieveUpdateDestroyAPIView):
 def execute_order(request, order_id):
     """
     Exécuter un ordre de trading (simulation)
+    Portefeuille et positions sont verrouillés pendant l'exécution (voir OrderExecutionService)
     """
     try:
-        order = TradingOrder.objects.get(
-            id=order_id,
-            portfolio__user=request.user,
-            status='PENDING'
-        )
+        order, transaction = OrderExecutionService().execute(order_id, user=request.user)
     except TradingOrder.DoesNotExist:
         return Response(
             {'error': 'Ordre introuvable ou déjà exécuté'},
             status=status.HTTP_404_NOT_FOUND
         )
-    
-    # Simulation d'exécution
-    stock = order.stock
-    execution_price = stock.current_price
-    
-    # Vérifier les conditions d'exécution pour les ordres à cours limité
-    if order.order_type == 'LIMIT':
-        if order.side == 'BUY' and execution_price > order.limit_price:
-            return Response(
-                {'error': 'Prix trop élevé pour l\'ordre limite'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        elif order.side == 'SELL' and execution_price < order.limit_price:
-            return Response(
-                {'error': 'Prix trop bas pour l\'ordre limite'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-    
-    # Calculer les frais (0.1% de commission)
-    total_amount = execution_price * order.quantity
-    commission = total_amount * Decimal('0.001')
-    
-    # Exécuter l'ordre
-    if order.side == 'BUY':
-        # Vérifier les fonds
-        total_cost = total_amount + commission
-        if order.portfolio.current_cash < total_cost:
-            return Response(
-                {'error': 'Fonds insuffisants'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # Débiter le cash
-        order.portfolio.current_cash -= total_cost
-        
-        # Créer ou mettre à jour la position
-        holding, created = Holding.objects.get_or_create(
-            portfolio=order.portfolio,
-            stock=stock,
-            defaults={
-                'quantity': order.quantity,
-                'average_cost': execution_price,
-                'total_cost': total_amount,
-                'current_value': total_amount,
-                'first_purchase_date': timezone.now(),
-                'last_transaction_date': timezone.now()
-            }
+    except OrderExecutionError as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_400_BAD_REQUEST
         )
-        
-        if not created:
-            # Mettre à jour la position existante
-            total_quantity = holding.quantity + order.quantity
-            total_cost = holding.total_cost + total_amount
-            holding.average_cost = total_cost / total_quantity
-            holding.quantity = total_quantity
-            holding.total_cost = total_cost
-            holding.current_value = total_quantity * stock.current_price
-            holding.last_transaction_date = timezone.now()
-            holding.save()
-    
-    else:  # SELL
-        # Vérifier la position
-        try:
-            holding = Holding.objects.get(
-                portfolio=order.portfolio,
-                stock=stock
-            )
-        except Holding.DoesNotExist:
-            return Response(
-                {'error': 'Aucune position à vendre'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        if holding.quantity < order.quantity:
-            return Response(
-                {'error': 'Quantité insuffisante à vendre'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # Créditer le cash
-        net_proceeds = total_amount - commission
-        order.portfolio.current_cash += net_proceeds
-        
-        # Mettre à jour la position
-        holding.quantity -= order.quantity
-        if holding.quantity == 0:
-            holding.delete()
-        else:
-            holding.total_cost -= (holding.average_cost * order.quantity)
-            holding.current_value = holding.quantity * stock.current_price
-            holding.last_transaction_date = timezone.now()
-            holding.save()
-    
-    # Mettre à jour l'ordre
-    order.status = 'FILLED'
-    order.filled_quantity = order.quantity
-    order.average_fill_price = execution_price
-    order.filled_at = timezone.now()
-    order.save()
-    
-    # Sauvegarder le portefeuille
-    order.portfolio.save()
-    
-    # Créer la transaction
-    transaction = Transaction.objects.create(
-        portfolio=order.portfolio,
-        stock=stock,
-        order=order,
-        transaction_type=order.side,
-        quantity=order.quantity,
-        price=execution_price,
-        total_amount=total_amount,
-        commission=commission
-    )
     
     return Response({
         'message': 'Ordre exécuté avec succès',
@@ -603,23 +532,46 @@ def competition_leaderboard(request, competition_id):
             status=status.HTTP_404_NOT_FOUND
         )
     
-    # Récupérer les participants classés par performance
-    participants = CompetitionParticipant.objects.filter(
+    leaderboard = CompetitionLeaderboard(competition.id)
+
+    # Fenêtre "mon rang ± window" ou page du classement (lecture seule)
+    around_me = request.query_params.get('around_me') == 'true'
+    my_participant_id = CompetitionParticipant.objects.filter(
         competition=competition,
-        status='ACTIVE'
-    ).select_related('user', 'portfolio').annotate(
-        portfolio_return=F('portfolio__total_value') - F('portfolio__initial_capital')
-    ).order_by('-portfolio_return')
-    
-    # Mettre à jour les rangs
-    for rank, participant in enumerate(participants, 1):
-        participant.current_rank = rank
-        participant.save()
-    
+        user=request.user
+    ).values_list('id', flat=True).first()
+
+    try:
+        window = int(request.query_params.get('window', 10))
+        page = int(request.query_params.get('page', 1))
+        page_size = int(request.query_params.get('page_size', 50))
+    except (TypeError, ValueError):
+        return Response(
+            {'error': 'window, page et page_size doivent être des entiers'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    if around_me:
+        window = min(max(window, 0), 100)
+        if my_participant_id is None:
+            participants, total, my_rank = [], leaderboard.count(), None
+        else:
+            participants, total, my_rank = leaderboard.around(my_participant_id, radius=window)
+        pagination = {'window': window}
+    else:
+        page = max(page, 1)
+        page_size = min(max(page_size, 1), 200)
+        participants, total = leaderboard.window((page - 1) * page_size, page_size)
+        my_rank = leaderboard.rank_of(my_participant_id) if my_participant_id else None
+        pagination = {'page': page, 'page_size': page_size}
+
     serializer = CompetitionParticipantSerializer(participants, many=True)
     return Response({
         'competition': TradingCompetitionSerializer(competition).data,
-        'leaderboard': serializer.data
+        'leaderboard': serializer.data,
+        'total': total,
+        'my_rank': my_rank,
+        **pagination
     })
 
 
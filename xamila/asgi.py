@@ -3,6 +3,11 @@ ASGI config for xamila project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Le flux temps réel des notifications (api/notifications/user/stream/) garde une
+connexion ouverte par utilisateur: servir l'application par ASGI (uvicorn,
+daphne) pour qu'une connexion soit une tâche asyncio et non un worker bloqué.
+Servi par WSGI (gunicorn), le flux répond 501.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
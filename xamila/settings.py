@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 
 from pathlib import Path
 from decouple import config
+from django.core.exceptions import ImproperlyConfigured
+import logging
 import os
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -224,6 +226,55 @@ EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', 'True').lower() == 'true'
 EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER', 'franckalain.digital@gmail.com')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', 'vrzh neej gywy kuva')
 
+# ================================
+# CACHE CONFIGURATION
+# ================================
+
+# Cache partagé entre processus (Redis) si REDIS_URL est défini: les versions d'espaces
+# de noms, verrous et index précalculés (core/utils_cache.py) ne sont vus par tous les
+# workers et toutes les commandes de gestion qu'avec un cache partagé. À défaut, cache
+# mémoire local (propre à chaque processus) avec un avertissement, sauf si
+# REQUIRE_SHARED_CACHE est activé (voir .env.example).
+REDIS_URL = config('REDIS_URL', default='')
+REQUIRE_SHARED_CACHE = config('REQUIRE_SHARED_CACHE', default=False, cast=bool)
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'xamila',
+        }
+    }
+elif REQUIRE_SHARED_CACHE:
+    raise ImproperlyConfigured("REQUIRE_SHARED_CACHE est activé mais REDIS_URL n'est pas défini")
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'xamila-default',
+        }
+    }
+    if not DEBUG:
+        logging.getLogger(__name__).warning(
+            "REDIS_URL non défini: cache mémoire local, les invalidations ne sont pas "
+            "partagées entre les processus"
+        )
+
+# ================================
+# BACKGROUND TASKS CONFIGURATION
+# ================================
+
+# 'thread' (défaut), 'sync' ou 'worker' (voir core/utils_tasks.py)
+# En mode 'thread', les nouvelles tentatives du pipeline contrat sont relancées par le
+# processus web; un redémarrage les perd. Déployer aussi le worker
+#   python manage.py process_contract_jobs --loop
+# (obligatoire en mode 'worker' ou 'sync') pour reprendre les jobs RETRY et RUNNING bloqués.
+BACKGROUND_TASKS_MODE = config('BACKGROUND_TASKS_MODE', default='thread')
+
+# Pipeline contrat des demandes d'ouverture de compte
+CONTRACT_PIPELINE_MAX_ATTEMPTS = config('CONTRACT_PIPELINE_MAX_ATTEMPTS', default=5, cast=int)
+
 # ================================
 # AUTHENTICATION CONFIGURATION
 # ================================
@@ -472,6 +523,12 @@ CORS_ALLOWED_HEADERS = [
     'x-requested-with',
 ]
 
+# Headers de réponse lisibles par le navigateur (métadonnées des classements paginés)
+CORS_EXPOSE_HEADERS = [
+    'x-total-count',
+    'x-my-rank',
+]
+
 # Méthodes HTTP autorisées
 CORS_ALLOWED_METHODS = [
     'DELETE',